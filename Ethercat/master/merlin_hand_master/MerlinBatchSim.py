@@ -0,0 +1,320 @@
+import multiprocessing
+from multiprocessing import shared_memory
+from typing import List, Optional
+
+import numpy as np
+
+from .MerlinPdoLayout import RXPDO_DTYPE, TXPDO_DTYPE
+from .MerlinTypes import MotorState, MotorStateFrame
+
+
+# `error_status` bit set by the thermal model (injected errors are OR-ed in).
+ERROR_OVER_TEMPERATURE = 0x1
+
+
+class SimHandBatch:
+    """
+    `num_hands` simulated Merlin hands stepped together: the SimSlave motor
+    model vectorized over (num_hands, num_motors) arrays, plus a first-order
+    winding thermal model that raises ERROR_OVER_TEMPERATURE.
+
+    `commands` (RXPDO_DTYPE) and `states` (TXPDO_DTYPE) are the process images
+    of all hands; write goals into `commands` (or through `hand(i)`), call
+    `tick()`, read `states`.
+    """
+
+    def __init__(
+        self,
+        num_hands: int,
+        num_motors: int = 15,
+        *,
+        commands: Optional[np.ndarray] = None,
+        states: Optional[np.ndarray] = None,
+        position_tau_s: float = 0.02,
+        ambient_temperature: float = 30.0,
+        thermal_tau_s: float = 20.0,
+        thermal_gain: float = 5.0,
+        over_temperature: float = 90.0,
+    ) -> None:
+        """
+        :param num_hands: Hands in the batch.
+        :param num_motors: Motors per hand.
+        :param commands: Optional (num_hands, num_motors) RXPDO_DTYPE array to use in
+                         place (e.g. a shared-memory view); zeros by default.
+        :param states: Optional (num_hands, num_motors) TXPDO_DTYPE array to use in place.
+        :param position_tau_s: Time constant of the position tracking (SimSlave: 20 ms).
+        :param ambient_temperature: Starting and steady-state winding temperature.
+        :param thermal_tau_s: Winding thermal time constant.
+        :param thermal_gain: Steady-state temperature rise per A^2 of q-axis current.
+        :param over_temperature: Winding temperature that sets ERROR_OVER_TEMPERATURE.
+        """
+        shape = (num_hands, num_motors)
+        self.commands = commands if commands is not None else np.zeros(shape, dtype=RXPDO_DTYPE)
+        self.states = states if states is not None else np.zeros(shape, dtype=TXPDO_DTYPE)
+        if self.commands.shape != shape or self.states.shape != shape:
+            raise ValueError(f"commands and states must have shape {shape}")
+        self._num_hands = num_hands
+        self._num_motors = num_motors
+        self.position_tau_s = position_tau_s
+        self.ambient_temperature = ambient_temperature
+        self.thermal_tau_s = thermal_tau_s
+        self.thermal_gain = thermal_gain
+        self.over_temperature = over_temperature
+
+        self.positions = np.zeros(shape)
+        self.winding_temperature = np.full(shape, float(ambient_temperature))
+        # Reported per motor (OR-ed with the thermal flag); edit to inject faults.
+        self.error_status = np.zeros(shape, dtype=np.uint32)
+        self.ticks = 0
+
+        self._step = np.zeros(shape)
+        self._enabled = np.zeros(shape, dtype=bool)
+        self._heat = np.zeros(shape)
+        self._flags = np.zeros(shape, dtype=np.uint32)
+
+        self.states["input_voltage"] = 24.0
+        self.states["winding_temperature"] = self.winding_temperature
+        self.states["powerstage_temperature"] = 30.0
+        self.states["ic_temperature"] = 35.0
+
+    @property
+    def num_hands(self) -> int:
+        return self._num_hands
+
+    @property
+    def num_motors(self) -> int:
+        return self._num_motors
+
+    def hand(self, index: int) -> "SimHand":
+        return SimHand(self, index)
+
+    def hands(self) -> List["SimHand"]:
+        return [SimHand(self, i) for i in range(self._num_hands)]
+
+    def set_error_status(self, hand: int, motor: int, value: int) -> None:
+        """Inject (or clear with 0) error bits on one motor."""
+        self.error_status[hand, motor] = value
+
+    def tick(self, dt: float = 0.001, ticks: int = 1) -> None:
+        """Consume the commands and produce the next states, `ticks` times."""
+        cmd, st = self.commands, self.states
+        alpha = min(1.0, dt / self.position_tau_s)
+        k_thermal = min(1.0, dt / self.thermal_tau_s)
+        step, enabled, heat, flags = self._step, self._enabled, self._heat, self._flags
+        temperature = self.winding_temperature
+        for _ in range(ticks):
+            np.not_equal(cmd["torque_enable"], 0, out=enabled)
+
+            # Position: first-order tracking of goal_position while enabled.
+            np.subtract(cmd["goal_position"], self.positions, out=step)
+            step *= alpha
+            step *= enabled
+            self.positions += step
+            step /= dt
+            st["present_position"] = self.positions
+            st["present_velocity"] = step
+
+            # Currents follow their goals while enabled.
+            np.multiply(cmd["goal_id"], enabled, out=st["present_id"])
+            np.multiply(cmd["goal_iq"], enabled, out=st["present_iq"])
+
+            # Winding temperature: first order towards ambient + gain * iq^2.
+            np.square(st["present_iq"], out=heat)
+            heat *= self.thermal_gain
+            heat += self.ambient_temperature
+            heat -= temperature
+            heat *= k_thermal
+            temperature += heat
+            st["winding_temperature"] = temperature
+
+            np.greater(temperature, self.over_temperature, out=flags, casting="unsafe")
+            flags *= ERROR_OVER_TEMPERATURE
+            flags |= self.error_status
+            st["error_status"] = flags
+        self.ticks += ticks
+
+
+class SimHand:
+    """
+    One hand of a SimHandBatch or ShardedSimHands with the motor command /
+    state API of MerlinMaster_v1. Goals take effect at the next tick.
+    """
+
+    def __init__(self, batch, index: int) -> None:
+        if not (0 <= index < batch.num_hands):
+            raise IndexError(f"hand {index} out of range [0, {batch.num_hands - 1}]")
+        self._batch = batch
+        self._index = index
+
+    @property
+    def num_motors(self) -> int:
+        return self._batch.num_motors
+
+    def set_motor_goals(
+        self,
+        motor_idx: int,
+        *,
+        torque_enable: Optional[int] = None,
+        goal_id: Optional[float] = None,
+        goal_iq: Optional[float] = None,
+        goal_velocity: Optional[float] = None,
+        goal_position: Optional[float] = None,
+    ) -> None:
+        self._check_motor_index(motor_idx)
+        cmd = self._batch.commands[self._index]
+        for name, value in (
+            ("torque_enable", torque_enable),
+            ("goal_id", goal_id),
+            ("goal_iq", goal_iq),
+            ("goal_velocity", goal_velocity),
+            ("goal_position", goal_position),
+        ):
+            if value is not None:
+                cmd[name][motor_idx] = value
+
+    def get_motor_state(self, motor_idx: int) -> MotorState:
+        self._check_motor_index(motor_idx)
+        return MotorStateFrame.frombytes(self._batch.states[self._index, motor_idx].tobytes())[0]
+
+    def get_all_states(self) -> MotorStateFrame:
+        return MotorStateFrame.frombytes(self._batch.states[self._index].tobytes())
+
+    def get_states_array(self) -> np.ndarray:
+        """States as a (num_motors,) TXPDO_DTYPE array (a copy)."""
+        return self._batch.states[self._index].copy()
+
+    def _check_motor_index(self, idx: int) -> None:
+        if not (0 <= idx < self._batch.num_motors):
+            raise IndexError(f"motor_idx {idx} out of range [0, {self._batch.num_motors - 1}]")
+
+
+# ---- Sharded across processes ----------------------------------------------------
+
+def _shard_worker(conn, cmd_name: str, state_name: str, num_hands: int, num_motors: int,
+                  lo: int, hi: int, model: dict) -> None:
+    cmd_shm = shared_memory.SharedMemory(name=cmd_name)
+    state_shm = shared_memory.SharedMemory(name=state_name)
+    commands = np.ndarray((num_hands, num_motors), dtype=RXPDO_DTYPE, buffer=cmd_shm.buf)
+    states = np.ndarray((num_hands, num_motors), dtype=TXPDO_DTYPE, buffer=state_shm.buf)
+    batch = SimHandBatch(hi - lo, num_motors, commands=commands[lo:hi], states=states[lo:hi], **model)
+    conn.send(True)
+    try:
+        while True:
+            msg = conn.recv()
+            if msg[0] == "tick":
+                batch.tick(msg[1], msg[2])
+                conn.send(True)
+            elif msg[0] == "error":
+                batch.set_error_status(msg[1] - lo, msg[2], msg[3])
+                conn.send(True)
+            else:
+                break
+    finally:
+        del batch, commands, states
+        cmd_shm.close()
+        state_shm.close()
+
+
+class ShardedSimHands:
+    """
+    SimHandBatch split across worker processes. The command and state images
+    of all hands live in shared memory, so the caller reads and writes them
+    as one (num_hands, num_motors) array without copies; `tick()` only sends
+    a short message to each worker and waits for all of them.
+    """
+
+    def __init__(self, num_hands: int, num_motors: int = 15, num_workers: Optional[int] = None, **model) -> None:
+        """
+        :param num_workers: Worker processes (default: CPU count, at most one per hand).
+        :param model: Keyword arguments of SimHandBatch (time constants, thresholds).
+        """
+        if num_workers is None:
+            num_workers = multiprocessing.cpu_count()
+        num_workers = max(1, min(num_workers, num_hands))
+        self._num_hands = num_hands
+        self._num_motors = num_motors
+        shape = (num_hands, num_motors)
+
+        self._cmd_shm = shared_memory.SharedMemory(create=True, size=RXPDO_DTYPE.itemsize * num_hands * num_motors)
+        self._state_shm = shared_memory.SharedMemory(create=True, size=TXPDO_DTYPE.itemsize * num_hands * num_motors)
+        self.commands = np.ndarray(shape, dtype=RXPDO_DTYPE, buffer=self._cmd_shm.buf)
+        self.states = np.ndarray(shape, dtype=TXPDO_DTYPE, buffer=self._state_shm.buf)
+        self.commands[...] = 0
+        self.ticks = 0
+
+        bounds = np.linspace(0, num_hands, num_workers + 1).astype(int)
+        self._shards = list(zip(bounds[:-1], bounds[1:]))
+        self._conns = []
+        self._workers = []
+        for lo, hi in self._shards:
+            parent, child = multiprocessing.Pipe()
+            proc = multiprocessing.Process(
+                target=_shard_worker,
+                args=(child, self._cmd_shm.name, self._state_shm.name, num_hands, num_motors,
+                      int(lo), int(hi), model),
+                name=f"MerlinBatchSim-{lo}", daemon=True,
+            )
+            proc.start()
+            self._conns.append(parent)
+            self._workers.append(proc)
+        for conn in self._conns:
+            conn.recv()
+
+    @property
+    def num_hands(self) -> int:
+        return self._num_hands
+
+    @property
+    def num_motors(self) -> int:
+        return self._num_motors
+
+    @property
+    def num_workers(self) -> int:
+        return len(self._workers)
+
+    def hand(self, index: int) -> SimHand:
+        return SimHand(self, index)
+
+    def hands(self) -> List[SimHand]:
+        return [SimHand(self, i) for i in range(self._num_hands)]
+
+    def tick(self, dt: float = 0.001, ticks: int = 1) -> None:
+        """Step every hand `ticks` times; returns when all workers are done."""
+        for conn in self._conns:
+            conn.send(("tick", dt, ticks))
+        for conn in self._conns:
+            conn.recv()
+        self.ticks += ticks
+
+    def set_error_status(self, hand: int, motor: int, value: int) -> None:
+        """Inject (or clear with 0) error bits on one motor."""
+        for conn, (lo, hi) in zip(self._conns, self._shards):
+            if lo <= hand < hi:
+                conn.send(("error", hand, motor, value))
+                conn.recv()
+                return
+        raise IndexError(f"hand {hand} out of range [0, {self._num_hands - 1}]")
+
+    def close(self) -> None:
+        """Stop the workers and remove the shared memory."""
+        for conn in self._conns:
+            try:
+                conn.send(("stop",))
+            except (BrokenPipeError, OSError):
+                pass
+        for proc in self._workers:
+            proc.join(timeout=1.0)
+        self._conns, self._workers = [], []
+        del self.commands, self.states
+        for shm in (self._cmd_shm, self._state_shm):
+            shm.close()
+            shm.unlink()
+
+    def __enter__(self) -> "ShardedSimHands":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+__all__ = ["SimHandBatch", "SimHand", "ShardedSimHands", "ERROR_OVER_TEMPERATURE"]
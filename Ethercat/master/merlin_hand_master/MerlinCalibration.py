@@ -0,0 +1,198 @@
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+from .MerlinPdoLayout import RXPDO_DTYPE, TXPDO_DTYPE
+
+
+# Joint-side values, in the column order of the PDO fields they come from:
+# present_iq / present_velocity / present_position (goal_iq / goal_velocity /
+# goal_position), which are adjacent in both layouts.
+JOINT_DTYPE = np.dtype([
+    ("torque", "<f4"),
+    ("velocity", "<f4"),
+    ("position", "<f4"),
+])
+
+_TX_COLUMNS = slice(TXPDO_DTYPE.names.index("present_iq"), TXPDO_DTYPE.names.index("present_position") + 1)
+_RX_COLUMNS = slice(RXPDO_DTYPE.names.index("goal_iq"), RXPDO_DTYPE.names.index("goal_position") + 1)
+_TX_WIDTH = TXPDO_DTYPE.itemsize // 4
+_RX_WIDTH = RXPDO_DTYPE.itemsize // 4
+
+CALIBRATION_COLUMNS = ("offset", "sign", "scale", "torque_constant", "lower", "upper")
+_DEFAULTS = {"offset": 0.0, "sign": 1.0, "scale": 1.0, "torque_constant": 1.0,
+             "lower": -np.inf, "upper": np.inf}
+
+
+class CalibrationTable:
+    """
+    Per-motor conversion between raw motor values and joint values:
+
+        position = sign * (present_position - offset) / scale
+        velocity = sign * present_velocity / scale
+        torque   = sign * present_iq * torque_constant * scale
+
+    `scale` is the gear ratio (motor rad per joint rad), `torque_constant`
+    Nm/A at the motor (1: torque is the current seen from the joint), and
+    `lower` / `upper` the joint limits applied to position goals. `encode_into`
+    is the inverse, for goals.
+
+    The per-motor terms are folded into (num_motors, 3) gain and offset
+    arrays, so converting a frame is two in-place array operations on the
+    float32 image, whatever the motor count.
+    """
+
+    def __init__(
+        self,
+        num_motors: int,
+        offset: Union[float, Sequence[float]] = 0.0,
+        sign: Union[float, Sequence[float]] = 1.0,
+        scale: Union[float, Sequence[float]] = 1.0,
+        torque_constant: Union[float, Sequence[float]] = 1.0,
+        lower: Union[float, Sequence[float]] = -np.inf,
+        upper: Union[float, Sequence[float]] = np.inf,
+    ) -> None:
+        """
+        :param num_motors: Motors per frame.
+        Each other parameter is a scalar for all motors or one value per motor.
+        """
+        self._num_motors = num_motors
+        columns = dict(offset=offset, sign=sign, scale=scale, torque_constant=torque_constant,
+                       lower=lower, upper=upper)
+        for name, value in columns.items():
+            value = np.broadcast_to(np.asarray(value, dtype=np.float64), (num_motors,)).copy()
+            setattr(self, name, value)
+        if not np.all(np.abs(self.sign) == 1.0):
+            raise ValueError("sign must be +1 or -1")
+        if np.any(self.scale == 0.0) or np.any(self.torque_constant == 0.0):
+            raise ValueError("scale and torque_constant must be non-zero")
+        if np.any(self.lower > self.upper):
+            raise ValueError("lower limit above upper limit")
+
+        # raw -> joint: (raw - raw_offset) * gain; joint -> raw: joint * inv_gain + raw_offset.
+        gain = np.stack([self.sign * self.torque_constant * self.scale,
+                         self.sign / self.scale,
+                         self.sign / self.scale], axis=1)
+        raw_offset = np.zeros((num_motors, 3))
+        raw_offset[:, 2] = self.offset
+        self._gain = gain.astype(np.float32)
+        self._inv_gain = (1.0 / gain).astype(np.float32)
+        self._raw_offset = raw_offset.astype(np.float32)
+        # Joint limits in raw units per column (only position is limited), so
+        # goals are clipped after the conversion in two whole-array operations.
+        raw_lo = np.full((num_motors, 3), -np.inf)
+        raw_hi = np.full((num_motors, 3), np.inf)
+        ends = self.offset[:, None] + np.stack([self.lower, self.upper], axis=1) * (self.sign * self.scale)[:, None]
+        raw_lo[:, 2] = ends.min(axis=1)
+        raw_hi[:, 2] = ends.max(axis=1)
+        self._raw_lo = raw_lo.astype(np.float32)
+        self._raw_hi = raw_hi.astype(np.float32)
+        self._scratch = np.zeros((num_motors, 3), dtype=np.float32)
+
+    @property
+    def num_motors(self) -> int:
+        return self._num_motors
+
+    # ---- Files ------------------------------------------------------------------
+
+    @classmethod
+    def load(cls, path: str, num_motors: Optional[int] = None) -> "CalibrationTable":
+        """
+        Read a CSV table with a header row: a `motor` column and any of
+        offset, sign, scale, torque_constant, lower, upper (missing columns
+        and motors keep the identity defaults).
+
+        :param num_motors: Motors per frame (default: highest motor index + 1).
+        """
+        data = np.atleast_1d(np.genfromtxt(path, delimiter=",", names=True, dtype=np.float64, encoding="utf-8"))
+        names = data.dtype.names or ()
+        if "motor" not in names:
+            raise ValueError(f"{path}: no 'motor' column")
+        unknown = set(names) - set(CALIBRATION_COLUMNS) - {"motor"}
+        if unknown:
+            raise ValueError(f"{path}: unknown columns {sorted(unknown)}")
+        motors = data["motor"].astype(np.intp)
+        if num_motors is None:
+            num_motors = int(motors.max()) + 1 if len(motors) else 0
+        if len(motors) and not (motors.min() >= 0 and motors.max() < num_motors):
+            raise IndexError(f"{path}: motor index out of range [0, {num_motors - 1}]")
+        columns = {}
+        for name in CALIBRATION_COLUMNS:
+            values = np.full(num_motors, _DEFAULTS[name])
+            if name in names:
+                values[motors] = data[name]
+            columns[name] = values
+        return cls(num_motors, **columns)
+
+    def save(self, path: str) -> None:
+        """Write the table as CSV (readable by `load`)."""
+        table = np.column_stack([np.arange(self._num_motors)] + [getattr(self, name) for name in CALIBRATION_COLUMNS])
+        np.savetxt(path, table, delimiter=",", header=",".join(("motor",) + CALIBRATION_COLUMNS),
+                   comments="", fmt=["%d"] + ["%.9g"] * len(CALIBRATION_COLUMNS))
+
+    # ---- Conversion -------------------------------------------------------------
+
+    def decode_into(self, raw: np.ndarray, out: np.ndarray) -> None:
+        """
+        Joint values of one frame.
+
+        :param raw: (num_motors, 9) float32 view of the TxPDO image.
+        :param out: (num_motors, 3) float32 array, written in place (JOINT_DTYPE column order).
+        """
+        np.subtract(raw[:, _TX_COLUMNS], self._raw_offset, out=out)
+        out *= self._gain
+
+    def encode_into(self, joint: np.ndarray, mask: np.ndarray, raw: np.ndarray) -> None:
+        """
+        Raw goals from joint goals; position goals are clipped to the joint limits.
+
+        :param joint: (num_motors, 3) joint goals (torque, velocity, position).
+        :param mask: (num_motors, 3) bool, which goals to write.
+        :param raw: (num_motors, 5) float32 view of the RxPDO image, written in place.
+        """
+        scratch = self._scratch
+        np.multiply(joint, self._inv_gain, out=scratch)
+        scratch += self._raw_offset
+        np.maximum(scratch, self._raw_lo, out=scratch)
+        np.minimum(scratch, self._raw_hi, out=scratch)
+        np.copyto(raw[:, _RX_COLUMNS], scratch, where=mask)
+
+    def decode(self, states: np.ndarray) -> np.ndarray:
+        """Joint values of TXPDO_DTYPE records of any shape (..., num_motors), e.g. a recording."""
+        states = np.ascontiguousarray(states)
+        raw = states.view(np.float32).reshape(states.shape + (_TX_WIDTH,))
+        out = np.empty(states.shape + (3,), dtype=np.float32)
+        np.subtract(raw[..., _TX_COLUMNS], self._raw_offset, out=out)
+        out *= self._gain
+        return out.view(JOINT_DTYPE).reshape(states.shape)
+
+    def encode(self, joint: np.ndarray) -> np.ndarray:
+        """
+        Raw (goal_iq, goal_velocity, goal_position) of JOINT_DTYPE goals of
+        any shape (..., num_motors), as a (..., num_motors, 3) float32 array.
+        """
+        values = np.ascontiguousarray(joint).view(np.float32).reshape(joint.shape + (3,)).copy()
+        values *= self._inv_gain
+        values += self._raw_offset
+        np.maximum(values, self._raw_lo, out=values)
+        np.minimum(values, self._raw_hi, out=values)
+        return values
+
+
+def raw_state_view(state_buf, num_motors: int) -> np.ndarray:
+    """(num_motors, 9) float32 view of a TxPDO image."""
+    return np.frombuffer(state_buf, dtype=np.float32, count=num_motors * _TX_WIDTH).reshape(num_motors, _TX_WIDTH)
+
+
+def raw_command_view(out_buf, num_motors: int) -> np.ndarray:
+    """(num_motors, 5) float32 view of an RxPDO image (column 0, torque_enable, is an integer)."""
+    return np.frombuffer(out_buf, dtype=np.float32, count=num_motors * _RX_WIDTH).reshape(num_motors, _RX_WIDTH)
+
+
+__all__ = [
+    "CalibrationTable",
+    "JOINT_DTYPE",
+    "CALIBRATION_COLUMNS",
+    "raw_state_view",
+    "raw_command_view",
+]
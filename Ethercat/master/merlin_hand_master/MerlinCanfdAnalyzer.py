@@ -0,0 +1,558 @@
+import argparse
+import struct
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from .MerlinCanfdCodec import NUM_MOTORS, RXPDO_BASE_STDID, TXPDO_BASE_STDID
+
+
+CANFD_BRS = 0x01
+CANFD_ESI = 0x02
+CANFD_FDF = 0x04
+
+LINKTYPE_CAN_SOCKETCAN = 227
+
+_PCAP_MAGIC_US = 0xA1B2C3D4
+_PCAP_MAGIC_NS = 0xA1B23C4D
+
+# Default cyclic schedule: one 24-byte command and one 48-byte status frame per
+# motor per cycle at 1 / 5 Mbit/s (the boards' FDCAN timing) takes ~3.4 ms per
+# cycle with worst-case stuffing, so 15 motors fit at 250 Hz (~86 % load), not 1 kHz.
+SCHEDULE_RATE_HZ = 250.0
+
+
+class FrameChunk(NamedTuple):
+    """A batch of captured frames as parallel arrays (one row per frame)."""
+
+    timestamp: np.ndarray   # float64 seconds
+    std_id: np.ndarray      # uint32 (11-bit ID)
+    length: np.ndarray      # uint8 payload bytes
+    brs: np.ndarray         # bool, bit-rate switch
+    fd: np.ndarray          # bool, CAN-FD frame
+    data: np.ndarray        # uint8 (N, 64), zero padded
+
+
+def _make_chunk(ts: List[float], ids: List[int], lens: List[int], brs: List[bool],
+                fd: List[bool], payloads: List[bytes]) -> FrameChunk:
+    data = np.zeros((len(ts), 64), dtype=np.uint8)
+    for i, p in enumerate(payloads):
+        data[i, :len(p)] = np.frombuffer(p, dtype=np.uint8)
+    return FrameChunk(
+        np.asarray(ts, dtype=np.float64),
+        np.asarray(ids, dtype=np.uint32),
+        np.asarray(lens, dtype=np.uint8),
+        np.asarray(brs, dtype=bool),
+        np.asarray(fd, dtype=bool),
+        data,
+    )
+
+
+# ---- Capture readers (streaming, bounded memory) -------------------------------
+
+def read_candump(path: str, chunk_frames: int = 65_536) -> Iterator[FrameChunk]:
+    """
+    Stream frames from a `candump -l` log file.
+
+    Lines look like `(1700000000.123456) can0 200##1<hex>` (CAN-FD, flags nibble
+    after `##`) or `(…) can0 123#DEADBEEF` (classic CAN). Remote frames are skipped.
+    """
+    ts, ids, lens, brs, fd, payloads = [], [], [], [], [], []
+    with open(path, "r") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < 3 or not parts[0].startswith("("):
+                continue
+            frame = parts[2]
+            if "##" in frame:
+                can_id, rest = frame.split("##", 1)
+                flags = int(rest[0], 16)
+                payload = bytes.fromhex(rest[1:])
+                is_fd, is_brs = True, bool(flags & CANFD_BRS)
+            elif "#" in frame:
+                can_id, rest = frame.split("#", 1)
+                if rest.startswith("R"):
+                    continue
+                payload = bytes.fromhex(rest)
+                is_fd, is_brs = False, False
+            else:
+                continue
+
+            ts.append(float(parts[0][1:-1]))
+            ids.append(int(can_id, 16) & 0x7FF)
+            lens.append(len(payload))
+            brs.append(is_brs)
+            fd.append(is_fd)
+            payloads.append(payload)
+
+            if len(ts) >= chunk_frames:
+                yield _make_chunk(ts, ids, lens, brs, fd, payloads)
+                ts, ids, lens, brs, fd, payloads = [], [], [], [], [], []
+    if ts:
+        yield _make_chunk(ts, ids, lens, brs, fd, payloads)
+
+
+def read_pcap(path: str, chunk_frames: int = 65_536) -> Iterator[FrameChunk]:
+    """
+    Stream frames from a pcap file with link type LINKTYPE_CAN_SOCKETCAN
+    (e.g. `tcpdump -i can0 -w capture.pcap`).
+    """
+    with open(path, "rb") as f:
+        header = f.read(24)
+        if len(header) < 24:
+            raise ValueError(f"{path}: truncated pcap header")
+        for endian in ("<", ">"):
+            magic = struct.unpack(endian + "I", header[:4])[0]
+            if magic in (_PCAP_MAGIC_US, _PCAP_MAGIC_NS):
+                break
+        else:
+            raise ValueError(f"{path}: not a pcap file")
+        frac_scale = 1e-9 if magic == _PCAP_MAGIC_NS else 1e-6
+        linktype = struct.unpack(endian + "I", header[20:24])[0] & 0x0FFFFFFF
+        if linktype != LINKTYPE_CAN_SOCKETCAN:
+            raise ValueError(f"{path}: link type {linktype} is not SocketCAN ({LINKTYPE_CAN_SOCKETCAN})")
+
+        rec_hdr = struct.Struct(endian + "IIII")
+        ts, ids, lens, brs, fd, payloads = [], [], [], [], [], []
+        while True:
+            hdr = f.read(rec_hdr.size)
+            if len(hdr) < rec_hdr.size:
+                break
+            sec, frac, incl_len, _orig_len = rec_hdr.unpack(hdr)
+            rec = f.read(incl_len)
+            if len(rec) < 8:
+                break
+            # SocketCAN pseudo-header: CAN ID is big endian on the wire.
+            can_id = struct.unpack(">I", rec[:4])[0]
+            length, flags = rec[4], rec[5]
+            payload = rec[8:8 + length]
+
+            ts.append(sec + frac * frac_scale)
+            ids.append(can_id & 0x7FF)
+            lens.append(len(payload))
+            is_fd = bool(flags & CANFD_FDF) or incl_len > 16 or length > 8
+            brs.append(is_fd and bool(flags & CANFD_BRS))
+            fd.append(is_fd)
+            payloads.append(payload)
+
+            if len(ts) >= chunk_frames:
+                yield _make_chunk(ts, ids, lens, brs, fd, payloads)
+                ts, ids, lens, brs, fd, payloads = [], [], [], [], [], []
+        if ts:
+            yield _make_chunk(ts, ids, lens, brs, fd, payloads)
+
+
+def chunks_from_arrays(timestamp, std_id, payloads, brs: bool = True,
+                       chunk_frames: int = 65_536) -> Iterator[FrameChunk]:
+    """
+    Wrap already-decoded arrays (e.g. `MerlinCanfdCodec.pack_*_frames` output) as chunks.
+
+    :param payloads: (N, L) uint8 array; L is used as every frame's length.
+    """
+    timestamp = np.asarray(timestamp, dtype=np.float64)
+    std_id = np.asarray(std_id, dtype=np.uint32)
+    payloads = np.asarray(payloads, dtype=np.uint8)
+    frame_len = payloads.shape[1]
+    for start in range(0, len(timestamp), chunk_frames):
+        stop = min(start + chunk_frames, len(timestamp))
+        n = stop - start
+        data = np.zeros((n, 64), dtype=np.uint8)
+        data[:, :frame_len] = payloads[start:stop]
+        yield FrameChunk(
+            timestamp[start:stop],
+            std_id[start:stop],
+            np.full(n, frame_len, dtype=np.uint8),
+            np.full(n, brs, dtype=bool),
+            np.ones(n, dtype=bool),
+            data,
+        )
+
+
+# ---- Bit timing model -----------------------------------------------------------
+
+def frame_phase_bits(length, fd, stuffing: str = "worst"):
+    """
+    Bits spent in the arbitration (nominal) and data phases for 11-bit ID frames.
+
+    CAN-FD (ISO 11898-1:2015):
+    - nominal: SOF..BRS (17 bits) + CRC delimiter, ACK, ACK delimiter, EOF, IFS (13 bits)
+    - data:    ESI + DLC (5) + payload + stuff count (4) + CRC (17/21) + fixed stuff bits
+    Classic CAN: 47 bits of overhead + payload, all nominal.
+
+    :param stuffing: 'worst' adds one dynamic stuff bit per 4 stuffable bits,
+                     'none' ignores dynamic stuffing.
+    :return: (nominal_bits, data_bits) float arrays.
+    """
+    length = np.asarray(length, dtype=np.float64)
+    fd = np.asarray(fd, dtype=bool)
+    stuff = 0.25 if stuffing == "worst" else 0.0
+
+    # CAN-FD
+    crc_bits = np.where(length <= 16, 17.0, 21.0)
+    fixed_stuff = np.where(length <= 16, 6.0, 7.0)
+    fd_nominal = 17.0 + 17.0 * stuff + 13.0
+    fd_data = (5.0 + 8.0 * length) * (1.0 + stuff) + 4.0 + crc_bits + fixed_stuff
+
+    # Classic CAN (stuffable: SOF..CRC = 34 + 8L bits)
+    classic_nominal = 47.0 + 8.0 * length + (34.0 + 8.0 * length - 1.0) * stuff
+
+    nominal = np.where(fd, fd_nominal, classic_nominal)
+    data = np.where(fd, fd_data, 0.0)
+    return nominal, data
+
+
+def frame_phase_times(length, fd, brs, nominal_bitrate: float, data_bitrate: float,
+                      stuffing: str = "worst"):
+    """
+    Seconds spent in the arbitration and data phases per frame.
+
+    Without BRS the data phase also runs at the nominal bit rate.
+
+    :return: (arbitration_s, data_s) float arrays.
+    """
+    nominal_bits, data_bits = frame_phase_bits(length, fd, stuffing)
+    data_rate = np.where(np.asarray(brs, dtype=bool), data_bitrate, nominal_bitrate)
+    return nominal_bits / nominal_bitrate, data_bits / data_rate
+
+
+def schedule_load(
+    rate_hz: float = SCHEDULE_RATE_HZ,
+    num_motors: int = NUM_MOTORS,
+    command_len: int = 24,
+    status_len: int = 48,
+    nominal_bitrate: float = 1e6,
+    data_bitrate: float = 5e6,
+    brs: bool = True,
+    stuffing: str = "worst",
+) -> float:
+    """
+    Predicted bus load (0..1) of the cyclic schedule: one command and one status
+    frame per motor per cycle.
+    """
+    arb, data = frame_phase_times([command_len, status_len], [True, True], [brs, brs],
+                                  nominal_bitrate, data_bitrate, stuffing)
+    return float((arb + data).sum() * num_motors * rate_hz)
+
+
+def max_schedule_rate(max_load: float = 1.0, **schedule) -> float:
+    """
+    Highest cycle rate (Hz) at which the cyclic schedule stays within `max_load`.
+
+    :param schedule: Any `schedule_load` parameter except `rate_hz`.
+    """
+    return max_load / schedule_load(rate_hz=1.0, **schedule)
+
+
+# ---- Streaming analyzer ---------------------------------------------------------
+
+class _IdStats:
+    __slots__ = ("count", "first_ts", "last_ts", "gap_sum", "gap_sq_sum", "gap_min", "gap_max", "gap_hist")
+
+    def __init__(self, num_bins: int) -> None:
+        self.count = 0
+        self.first_ts = None
+        self.last_ts = None
+        self.gap_sum = 0.0
+        self.gap_sq_sum = 0.0
+        self.gap_min = float("inf")
+        self.gap_max = 0.0
+        self.gap_hist = np.zeros(num_bins, dtype=np.int64)
+
+
+def _hist_percentile(counts: np.ndarray, edges: np.ndarray, q: float) -> float:
+    """Approximate percentile from a histogram (upper edge of the bin containing q)."""
+    total = counts.sum()
+    if total == 0:
+        return float("nan")
+    idx = int(np.searchsorted(np.cumsum(counts), q / 100.0 * total))
+    return float(edges[min(idx + 1, len(edges) - 1)])
+
+
+class CanfdBusAnalyzer:
+    """
+    Streaming CAN-FD capture analyzer.
+
+    Feed `FrameChunk`s (from `read_candump`, `read_pcap` or `chunks_from_arrays`)
+    in time order; memory stays bounded by per-StdID counters and fixed-size
+    histograms regardless of capture length.
+
+    Reports:
+    - per-StdID frame count, rate and inter-frame gap statistics
+    - bus load split into arbitration (nominal rate) and data (BRS) phases,
+      overall, and the peak, median and p99 over `window_s` windows
+    - command (0x300 + m) -> next status (0x200 + m) latency per motor
+    """
+
+    def __init__(
+        self,
+        nominal_bitrate: float = 1e6,
+        data_bitrate: float = 5e6,
+        window_s: float = 0.01,
+        stuffing: str = "worst",
+        num_motors: int = NUM_MOTORS,
+        hist_edges_s: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        :param nominal_bitrate: Arbitration bit rate (bit/s).
+        :param data_bitrate: Data bit rate used by BRS frames (bit/s).
+        :param window_s: Window length for the peak-load statistic.
+        :param stuffing: Bit-stuffing model ('worst' or 'none').
+        :param num_motors: Motors in the command/status StdID ranges.
+        :param hist_edges_s: Histogram bin edges (seconds) for gaps and latencies
+                             (default: log-spaced 1 µs .. 1 s).
+        """
+        self.nominal_bitrate = nominal_bitrate
+        self.data_bitrate = data_bitrate
+        self.window_s = window_s
+        self.stuffing = stuffing
+        self.num_motors = num_motors
+        self.hist_edges = hist_edges_s if hist_edges_s is not None else np.logspace(-6, 0, 121)
+        n_bins = len(self.hist_edges) - 1
+
+        self._ids: Dict[int, _IdStats] = {}
+        self._first_ts: Optional[float] = None
+        self._last_ts: Optional[float] = None
+        self._arb_time = 0.0
+        self._data_time = 0.0
+
+        self._window_idx: Optional[int] = None
+        self._window_busy = 0.0
+        self._peak_load = 0.0
+        # Windows per 1 % of load; the last bin collects >= 100 % (overload).
+        self._load_hist = np.zeros(101, dtype=np.int64)
+
+        self._pending_cmd_ts = np.full(num_motors, np.nan)
+        self._lat_hist = np.zeros((num_motors, n_bins), dtype=np.int64)
+        self._lat_count = np.zeros(num_motors, dtype=np.int64)
+        self._lat_sum = np.zeros(num_motors)
+        self._lat_min = np.full(num_motors, np.inf)
+        self._lat_max = np.zeros(num_motors)
+
+    # -------------------------------------------------------------------------
+    # Public API
+    # -------------------------------------------------------------------------
+
+    def feed(self, chunk: FrameChunk) -> None:
+        """Accumulate one chunk of frames (must be time-ordered across calls)."""
+        if len(chunk.timestamp) == 0:
+            return
+        ts = chunk.timestamp
+        if self._first_ts is None:
+            self._first_ts = float(ts[0])
+        self._last_ts = float(ts[-1])
+
+        arb, data = frame_phase_times(chunk.length, chunk.fd, chunk.brs,
+                                      self.nominal_bitrate, self.data_bitrate, self.stuffing)
+        self._arb_time += float(arb.sum())
+        self._data_time += float(data.sum())
+
+        self._feed_windows(ts, arb + data)
+        self._feed_ids(ts, chunk.std_id)
+        self._feed_latency(ts, chunk.std_id)
+
+    def feed_all(self, chunks) -> "CanfdBusAnalyzer":
+        for chunk in chunks:
+            self.feed(chunk)
+        return self
+
+    def report(self) -> dict:
+        """Summary statistics for everything fed so far."""
+        duration = (self._last_ts - self._first_ts) if self._first_ts is not None else 0.0
+        per_id = {}
+        for std_id, st in sorted(self._ids.items()):
+            n_gaps = st.count - 1
+            span = (st.last_ts - st.first_ts) if st.count > 1 else 0.0
+            mean_gap = st.gap_sum / n_gaps if n_gaps > 0 else float("nan")
+            var_gap = st.gap_sq_sum / n_gaps - mean_gap ** 2 if n_gaps > 0 else float("nan")
+            per_id[std_id] = {
+                "count": st.count,
+                "rate_hz": n_gaps / span if span > 0 else float("nan"),
+                "gap_mean_s": mean_gap,
+                "gap_std_s": float(np.sqrt(max(var_gap, 0.0))) if n_gaps > 0 else float("nan"),
+                "gap_min_s": st.gap_min if n_gaps > 0 else float("nan"),
+                "gap_max_s": st.gap_max if n_gaps > 0 else float("nan"),
+                "gap_p99_s": _hist_percentile(st.gap_hist, self.hist_edges, 99.0),
+            }
+
+        latency = {}
+        for m in range(self.num_motors):
+            n = int(self._lat_count[m])
+            if n == 0:
+                continue
+            latency[m] = {
+                "count": n,
+                "mean_s": float(self._lat_sum[m] / n),
+                "min_s": float(self._lat_min[m]),
+                "max_s": float(self._lat_max[m]),
+                "p50_s": _hist_percentile(self._lat_hist[m], self.hist_edges, 50.0),
+                "p99_s": _hist_percentile(self._lat_hist[m], self.hist_edges, 99.0),
+            }
+
+        load_hist = self._load_hist.copy()
+        if self._window_idx is not None:
+            load_hist[min(int(self._current_window_load() * 100), 100)] += 1
+        load_edges = np.append(np.arange(101) / 100.0, np.inf)
+        peak = max(self._peak_load, self._current_window_load())
+
+        busy = self._arb_time + self._data_time
+        return {
+            "duration_s": duration,
+            "frames": sum(st.count for st in self._ids.values()),
+            "bus_load": busy / duration if duration > 0 else float("nan"),
+            "arbitration_load": self._arb_time / duration if duration > 0 else float("nan"),
+            "data_load": self._data_time / duration if duration > 0 else float("nan"),
+            "peak_window_load": peak,
+            # Upper edge of the bin, capped at the peak (the overload bin has no upper edge).
+            "window_load_p50": min(_hist_percentile(load_hist, load_edges, 50.0), peak),
+            "window_load_p99": min(_hist_percentile(load_hist, load_edges, 99.0), peak),
+            # Window count per 1 % load bin (index 100: 100 % and above).
+            "window_load_hist": load_hist,
+            "per_id": per_id,
+            "latency": latency,
+        }
+
+    # -------------------------------------------------------------------------
+    # Internal helpers
+    # -------------------------------------------------------------------------
+
+    def _current_window_load(self) -> float:
+        return self._window_busy / self.window_s if self._window_idx is not None else 0.0
+
+    def _close_window(self, load: float) -> None:
+        self._peak_load = max(self._peak_load, load)
+        self._load_hist[min(int(load * 100), 100)] += 1
+
+    def _feed_windows(self, ts: np.ndarray, busy: np.ndarray) -> None:
+        win = np.floor(ts / self.window_s).astype(np.int64)
+        uniq, inverse = np.unique(win, return_inverse=True)
+        sums = np.bincount(inverse, weights=busy)
+        for w, s in zip(uniq.tolist(), sums.tolist()):
+            if w == self._window_idx:
+                self._window_busy += s
+                continue
+            if self._window_idx is not None:
+                self._close_window(self._window_busy / self.window_s)
+                # Windows without a single frame are idle, not missing.
+                self._load_hist[0] += w - self._window_idx - 1
+            self._window_idx = w
+            self._window_busy = s
+
+    def _feed_ids(self, ts: np.ndarray, std_id: np.ndarray) -> None:
+        order = np.argsort(std_id, kind="stable")
+        sorted_ids = std_id[order]
+        sorted_ts = ts[order]
+        uniq, starts = np.unique(sorted_ids, return_index=True)
+        bounds = np.append(starts, len(sorted_ids))
+        n_bins = len(self.hist_edges) - 1
+
+        for k, sid in enumerate(uniq.tolist()):
+            t = sorted_ts[bounds[k]:bounds[k + 1]]
+            st = self._ids.get(sid)
+            if st is None:
+                st = self._ids[sid] = _IdStats(n_bins)
+                st.first_ts = float(t[0])
+            else:
+                t = np.concatenate(([st.last_ts], t))
+            gaps = np.diff(t)
+            if len(gaps):
+                st.gap_sum += float(gaps.sum())
+                st.gap_sq_sum += float(np.dot(gaps, gaps))
+                st.gap_min = min(st.gap_min, float(gaps.min()))
+                st.gap_max = max(st.gap_max, float(gaps.max()))
+                bins = np.clip(np.searchsorted(self.hist_edges, gaps, side="right") - 1, 0, n_bins - 1)
+                st.gap_hist += np.bincount(bins, minlength=n_bins)
+            st.count += bounds[k + 1] - bounds[k]
+            st.last_ts = float(t[-1])
+
+    def _feed_latency(self, ts: np.ndarray, std_id: np.ndarray) -> None:
+        n_bins = len(self.hist_edges) - 1
+        sid = std_id.astype(np.int64)
+        for m in range(self.num_motors):
+            cmd_ts = ts[sid == RXPDO_BASE_STDID + m]
+            st_ts = ts[sid == TXPDO_BASE_STDID + m]
+            pending = self._pending_cmd_ts[m]
+            if not np.isnan(pending):
+                cmd_ts = np.concatenate(([pending], cmd_ts))
+            if len(cmd_ts) == 0:
+                continue
+
+            # First status at or after each command; only the last command before
+            # a given status is paired with it (earlier ones were superseded).
+            nxt = np.searchsorted(st_ts, cmd_ts, side="left")
+            answered = nxt < len(st_ts)
+            superseded = np.zeros(len(cmd_ts), dtype=bool)
+            superseded[:-1] = nxt[:-1] == nxt[1:]
+            use = answered & ~superseded
+            lat = st_ts[nxt[use]] - cmd_ts[use]
+
+            self._pending_cmd_ts[m] = cmd_ts[-1] if not answered[-1] else np.nan
+            if len(lat) == 0:
+                continue
+            self._lat_count[m] += len(lat)
+            self._lat_sum[m] += float(lat.sum())
+            self._lat_min[m] = min(self._lat_min[m], float(lat.min()))
+            self._lat_max[m] = max(self._lat_max[m], float(lat.max()))
+            bins = np.clip(np.searchsorted(self.hist_edges, lat, side="right") - 1, 0, n_bins - 1)
+            self._lat_hist[m] += np.bincount(bins, minlength=n_bins)
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"duration {report['duration_s']:.3f} s, {report['frames']} frames",
+        f"bus load {report['bus_load'] * 100:.1f} % "
+        f"(arbitration {report['arbitration_load'] * 100:.1f} %, data {report['data_load'] * 100:.1f} %), "
+        f"peak window {report['peak_window_load'] * 100:.1f} % "
+        f"(median {report['window_load_p50'] * 100:.0f} %, p99 {report['window_load_p99'] * 100:.0f} %)",
+        "StdID   count     rate[Hz]  gap mean[us]  gap std[us]  gap max[us]",
+    ]
+    for sid, s in report["per_id"].items():
+        lines.append(
+            f"0x{sid:03X} {s['count']:8d} {s['rate_hz']:12.1f} {s['gap_mean_s'] * 1e6:13.1f} "
+            f"{s['gap_std_s'] * 1e6:12.1f} {s['gap_max_s'] * 1e6:12.1f}"
+        )
+    if report["latency"]:
+        lines.append("motor  cmd->status latency mean/p50/p99/max [us]")
+        for m, s in report["latency"].items():
+            lines.append(
+                f"{m:5d}  {s['mean_s'] * 1e6:8.1f} {s['p50_s'] * 1e6:8.1f} "
+                f"{s['p99_s'] * 1e6:8.1f} {s['max_s'] * 1e6:8.1f}"
+            )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="CAN-FD bus load and latency analyzer.")
+    parser.add_argument("capture", help="candump -l log or SocketCAN pcap file")
+    parser.add_argument("--nominal", type=float, default=1e6, help="Nominal bit rate (bit/s)")
+    parser.add_argument("--data", type=float, default=5e6, help="Data-phase bit rate (bit/s)")
+    parser.add_argument("--window", type=float, default=0.01, help="Peak-load window (s)")
+    args = parser.parse_args(argv)
+
+    reader = read_pcap if args.capture.endswith((".pcap", ".cap")) else read_candump
+    analyzer = CanfdBusAnalyzer(args.nominal, args.data, args.window)
+    analyzer.feed_all(reader(args.capture))
+    print(format_report(analyzer.report()))
+    bitrates = dict(nominal_bitrate=args.nominal, data_bitrate=args.data)
+    print(
+        f"predicted {SCHEDULE_RATE_HZ:.0f} Hz x {NUM_MOTORS} schedule load: "
+        f"{schedule_load(**bitrates) * 100:.1f} % (fits up to {max_schedule_rate(**bitrates):.0f} Hz)"
+    )
+
+
+__all__ = [
+    "FrameChunk",
+    "CanfdBusAnalyzer",
+    "read_candump",
+    "read_pcap",
+    "chunks_from_arrays",
+    "frame_phase_bits",
+    "frame_phase_times",
+    "schedule_load",
+    "max_schedule_rate",
+    "SCHEDULE_RATE_HZ",
+    "format_report",
+]
+
+
+if __name__ == "__main__":
+    main()
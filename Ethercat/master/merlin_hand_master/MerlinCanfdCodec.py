@@ -0,0 +1,233 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Re-exported: decoded status records convert like the EtherCAT TxPDO ones.
+from .MerlinPdoLayout import records_to_motor_states
+
+
+# ---- Frame layout (must match Canfd/*/Core/Inc/canfd_utils.h) ----------------
+
+NUM_MOTORS = 15
+
+# Satellite (v1, motor side) -> motherboard/host: Motor_TxPDO_t on 0x200..0x20E.
+TXPDO_BASE_STDID = 0x200
+# Motherboard/host -> satellite (v1): Motor_RxPDO_t on 0x300..0x30E.
+RXPDO_BASE_STDID = 0x300
+
+# Motor_RxPDO_t (24 bytes, packed, little endian).
+CANFD_RXPDO_DTYPE = np.dtype([
+    ("motor_id", "<u4"),
+    ("torque_enable", "<u4"),
+    ("goal_id", "<f4"),
+    ("goal_iq", "<f4"),
+    ("goal_velocity", "<f4"),
+    ("goal_position", "<f4"),
+])
+
+# Motor_TxPDO_t (40 bytes, packed, little endian). Field names follow MotorState.
+CANFD_TXPDO_DTYPE = np.dtype([
+    ("motor_id", "<u4"),
+    ("present_id", "<f4"),
+    ("present_iq", "<f4"),
+    ("present_velocity", "<f4"),
+    ("present_position", "<f4"),
+    ("input_voltage", "<f4"),
+    ("winding_temperature", "<f4"),
+    ("powerstage_temperature", "<f4"),
+    ("ic_temperature", "<f4"),
+    ("error_status", "<f4"),
+])
+
+# Payload lengths representable by a CAN-FD DLC code (index == DLC).
+CANFD_DLC_LENGTHS = np.array([0, 1, 2, 3, 4, 5, 6, 7, 8, 12, 16, 20, 24, 32, 48, 64], dtype=np.uint8)
+
+# On-wire payload sizes used by the firmware.
+RXPDO_FRAME_LEN = 24   # FDCAN_DLC_BYTES_24
+TXPDO_FRAME_LEN = 48   # FDCAN_DLC_BYTES_48 (40 bytes + zero padding)
+
+
+# ---- DLC helpers ---------------------------------------------------------------
+
+def len_to_dlc(length) -> np.ndarray:
+    """Smallest DLC code whose payload length is >= `length` (vectorized)."""
+    length = np.asarray(length)
+    if np.any((length < 0) | (length > 64)):
+        raise ValueError("CAN-FD payloads are 0 to 64 bytes")
+    return np.searchsorted(CANFD_DLC_LENGTHS, length).astype(np.uint8)
+
+
+def dlc_to_len(dlc) -> np.ndarray:
+    """Payload length in bytes for a DLC code (vectorized)."""
+    return CANFD_DLC_LENGTHS[np.asarray(dlc, dtype=np.intp)]
+
+
+def padded_length(length: int) -> int:
+    """Frame payload length after padding `length` bytes up to the next valid DLC."""
+    return int(dlc_to_len(len_to_dlc(length)))
+
+
+# ---- StdID <-> motor index -----------------------------------------------------
+
+def std_id_to_motor(std_ids, base: int = TXPDO_BASE_STDID, num_motors: int = NUM_MOTORS) -> np.ndarray:
+    """Motor index for each StdID, or -1 where the ID is outside [base, base + num_motors)."""
+    idx = np.asarray(std_ids, dtype=np.int64) - base
+    return np.where((idx >= 0) & (idx < num_motors), idx, -1)
+
+
+def motor_to_std_id(motor_idx, base: int = RXPDO_BASE_STDID) -> np.ndarray:
+    """StdID carrying the given motor index(es). The firmware masks the index to 4 bits."""
+    return (base + (np.asarray(motor_idx, dtype=np.uint32) & 0xF)) & 0x7FF
+
+
+# ---- Batch pack / unpack -------------------------------------------------------
+
+def pack_frames(records: np.ndarray, frame_len: int) -> np.ndarray:
+    """
+    Serialize structured records into an (N, frame_len) uint8 payload array.
+
+    Bytes past the record size are zero (DLC padding).
+    """
+    records = np.ascontiguousarray(records)
+    rec_size = records.dtype.itemsize
+    if frame_len < rec_size:
+        raise ValueError(f"frame_len {frame_len} smaller than record size {rec_size}")
+    raw = records.view(np.uint8).reshape(len(records), rec_size)
+    if frame_len == rec_size:
+        return raw.copy()
+    out = np.zeros((len(records), frame_len), dtype=np.uint8)
+    out[:, :rec_size] = raw
+    return out
+
+
+def unpack_frames(payloads: np.ndarray, dtype: np.dtype) -> np.ndarray:
+    """
+    Deserialize an (N, L) uint8 payload array (L >= dtype.itemsize) into records.
+
+    Padding bytes beyond the record are ignored.
+    """
+    payloads = np.asarray(payloads, dtype=np.uint8)
+    if payloads.ndim != 2 or payloads.shape[1] < dtype.itemsize:
+        raise ValueError(f"payloads must be (N, >= {dtype.itemsize}) bytes")
+    body = np.ascontiguousarray(payloads[:, :dtype.itemsize])
+    return body.view(dtype).reshape(len(payloads))
+
+
+def pack_rxpdo_frames(
+    commands: np.ndarray,
+    motor_ids: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build command frames for a batch of motors.
+
+    :param commands: Structured array with CANFD_RXPDO_DTYPE fields (motor_id is
+                     overwritten when `motor_ids` is given).
+    :param motor_ids: Optional motor index per record.
+    :return: (std_ids uint32 (N,), payloads uint8 (N, 24)).
+    """
+    commands = np.asarray(commands)
+    if commands.dtype != CANFD_RXPDO_DTYPE:
+        converted = np.zeros(commands.shape, dtype=CANFD_RXPDO_DTYPE)
+        for name in commands.dtype.names:
+            converted[name] = commands[name]
+        commands = converted
+    elif motor_ids is not None:
+        commands = commands.copy()
+    if motor_ids is not None:
+        commands["motor_id"] = motor_ids
+    std_ids = motor_to_std_id(commands["motor_id"], RXPDO_BASE_STDID)
+    return std_ids, pack_frames(commands, RXPDO_FRAME_LEN)
+
+
+def unpack_rxpdo_frames(std_ids, payloads, num_motors: int = NUM_MOTORS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decode command frames (e.g. from a bus capture).
+
+    :param num_motors: Motors on the bus (StdIDs and motor_ids at or past it are not motors).
+
+    :return: (motor_idx int64 (M,), records CANFD_RXPDO_DTYPE (M,)) for frames in
+             the RxPDO StdID range; other frames are dropped.
+    """
+    return _decode(std_ids, payloads, RXPDO_BASE_STDID, CANFD_RXPDO_DTYPE, num_motors)
+
+
+def pack_txpdo_frames(states: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build status frames (what the satellite board sends), zero padded to 48 bytes.
+
+    :return: (std_ids uint32 (N,), payloads uint8 (N, 48)).
+    """
+    states = np.asarray(states, dtype=CANFD_TXPDO_DTYPE)
+    std_ids = motor_to_std_id(states["motor_id"], TXPDO_BASE_STDID)
+    return std_ids, pack_frames(states, TXPDO_FRAME_LEN)
+
+
+def unpack_txpdo_frames(std_ids, payloads, num_motors: int = NUM_MOTORS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decode status frames.
+
+    Like the motherboard ISR, the embedded `motor_id` takes precedence over the
+    StdID offset when it is a valid index (below `num_motors`).
+
+    :return: (motor_idx int64 (M,), records CANFD_TXPDO_DTYPE (M,)) for frames in
+             the TxPDO StdID range; other frames are dropped.
+    """
+    return _decode(std_ids, payloads, TXPDO_BASE_STDID, CANFD_TXPDO_DTYPE, num_motors)
+
+
+def latest_states(std_ids, payloads, num_motors: int = NUM_MOTORS,
+                  out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Reduce a batch of status frames to the most recent record per motor.
+
+    :param out: Optional (num_motors,) CANFD_TXPDO_DTYPE array updated in place;
+                motors without a frame in this batch keep their previous value.
+    """
+    if out is None:
+        out = np.zeros(num_motors, dtype=CANFD_TXPDO_DTYPE)
+    motor_idx, records = unpack_txpdo_frames(std_ids, payloads, num_motors)
+    if len(records):
+        # Last occurrence per motor: unique over the reversed sequence.
+        rev_idx = motor_idx[::-1]
+        motors, first_in_rev = np.unique(rev_idx, return_index=True)
+        keep = motors < num_motors
+        out[motors[keep]] = records[::-1][first_in_rev[keep]]
+    return out
+
+
+def _decode(std_ids, payloads, base: int, dtype: np.dtype, num_motors: int) -> Tuple[np.ndarray, np.ndarray]:
+    std_ids = np.asarray(std_ids)
+    motor_idx = std_id_to_motor(std_ids, base, num_motors)
+    mask = motor_idx >= 0
+    if not mask.all():
+        motor_idx = motor_idx[mask]
+        payloads = np.asarray(payloads)[mask]
+    records = unpack_frames(payloads, dtype)
+    embedded = records["motor_id"].astype(np.int64)
+    motor_idx = np.where((embedded >= 0) & (embedded < num_motors), embedded, motor_idx)
+    return motor_idx, records
+
+
+__all__ = [
+    "NUM_MOTORS",
+    "TXPDO_BASE_STDID",
+    "RXPDO_BASE_STDID",
+    "CANFD_RXPDO_DTYPE",
+    "CANFD_TXPDO_DTYPE",
+    "CANFD_DLC_LENGTHS",
+    "RXPDO_FRAME_LEN",
+    "TXPDO_FRAME_LEN",
+    "len_to_dlc",
+    "dlc_to_len",
+    "padded_length",
+    "std_id_to_motor",
+    "motor_to_std_id",
+    "pack_frames",
+    "unpack_frames",
+    "pack_rxpdo_frames",
+    "unpack_rxpdo_frames",
+    "pack_txpdo_frames",
+    "unpack_txpdo_frames",
+    "latest_states",
+    "records_to_motor_states",
+]
@@ -0,0 +1,328 @@
+import ctypes
+import ctypes.util
+import errno
+import select
+import socket
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from .MerlinCanfdCodec import (
+    CANFD_RXPDO_DTYPE,
+    CANFD_TXPDO_DTYPE,
+    RXPDO_BASE_STDID,
+    RXPDO_FRAME_LEN,
+    TXPDO_BASE_STDID,
+    latest_states,
+    motor_to_std_id,
+)
+from .MerlinPdoLayout import records_to_motor_states
+from .MerlinTypes import MotorState, MotorStateFrame
+
+
+# struct canfd_frame (linux/can.h): can_id, len, flags, res0, res1, data[64] = 72 bytes.
+CANFD_FRAME_DTYPE = np.dtype([
+    ("can_id", "=u4"),
+    ("len", "u1"),
+    ("flags", "u1"),
+    ("res0", "u1"),
+    ("res1", "u1"),
+    ("data", "u1", (64,)),
+])
+CANFD_MTU = CANFD_FRAME_DTYPE.itemsize
+CAN_MTU = 16
+CANFD_BRS = 0x01
+_CAN_RAW_FD_FRAMES = getattr(socket, "CAN_RAW_FD_FRAMES", 5)
+
+
+class _IOVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(_IOVec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _MsgHdr), ("msg_len", ctypes.c_uint)]
+
+
+def _load_sendmmsg():
+    """Return libc.sendmmsg or None when unavailable (non-Linux / no libc)."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fn = libc.sendmmsg
+    except (OSError, AttributeError):
+        return None
+    fn.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int]
+    fn.restype = ctypes.c_int
+    return fn
+
+
+class MerlinCanfdMaster_v1:
+    """
+    CAN-FD (SocketCAN) transport for the Merlin satellite board, exposing the
+    same command/state API as `MerlinMaster_v1`.
+
+    The host takes the place of the motherboard (v2):
+    - Sends one Motor_RxPDO_t (24 bytes, BRS) per motor on StdID 0x300 + idx.
+    - Receives Motor_TxPDO_t (40 bytes in a 48-byte frame) on StdID 0x200 + idx.
+
+    All command frames of a cycle live in one preallocated buffer and are
+    handed to the kernel with a single `sendmmsg()` call (falling back to one
+    `send()` per frame where sendmmsg is unavailable). Receive is non-blocking:
+    the loop drains the socket until the next cycle deadline and decodes all
+    status frames of the cycle as one batch.
+
+    For a bench without hardware:
+        sudo ip link add dev vcan0 type vcan
+        sudo ip link set vcan0 mtu 72 up
+    and run `MerlinSimSlave.SimCanfdSatellite("vcan0")` on the other end.
+    """
+
+    def __init__(
+        self,
+        ifname: str,
+        num_motors: int = 15,
+        cycle_time_s: float = 0.004,
+        use_sendmmsg: bool = True,
+    ) -> None:
+        """
+        Open the CAN-FD socket and start the background exchange loop.
+
+        :param ifname: SocketCAN interface name (e.g. 'can0', 'vcan0').
+        :param num_motors: Number of motors on the satellite board (default 15).
+        :param cycle_time_s: Command transmit period (250 Hz: the 15-motor schedule does
+                             not fit the 1 / 5 Mbit/s bus at 1 kHz, see `MerlinCanfdAnalyzer.schedule_load`).
+        :param use_sendmmsg: Batch the per-cycle frames through sendmmsg() when available.
+        """
+        self._ifname = ifname
+        self._num_motors = num_motors
+        self._cycle_time_s = cycle_time_s
+
+        self._commands = np.zeros(num_motors, dtype=CANFD_RXPDO_DTYPE)
+        self._commands["motor_id"] = np.arange(num_motors)
+        self._states = np.zeros(num_motors, dtype=CANFD_TXPDO_DTYPE)
+        self._states_lock = threading.Lock()
+
+        # Transmit buffer: one canfd_frame per motor, headers filled once.
+        self._tx_raw = (ctypes.c_uint8 * (num_motors * CANFD_MTU))()
+        self._tx_frames = np.frombuffer(self._tx_raw, dtype=CANFD_FRAME_DTYPE)
+        self._tx_frames["can_id"] = motor_to_std_id(np.arange(num_motors), RXPDO_BASE_STDID)
+        self._tx_frames["len"] = RXPDO_FRAME_LEN
+        self._tx_frames["flags"] = CANFD_BRS
+
+        # Receive buffer: room for several status frames per motor per cycle.
+        self._rx_capacity = 8 * num_motors
+        self._rx_frames = np.zeros(self._rx_capacity, dtype=CANFD_FRAME_DTYPE)
+        self._rx_view = memoryview(self._rx_frames.view(np.uint8))
+
+        self._sock = socket.socket(socket.AF_CAN, socket.SOCK_RAW, socket.CAN_RAW)
+        self._sock.setsockopt(socket.SOL_CAN_RAW, _CAN_RAW_FD_FRAMES, 1)
+        self._sock.bind((ifname,))
+        self._sock.setblocking(False)
+
+        self._sendmmsg = _load_sendmmsg() if use_sendmmsg else None
+        if self._sendmmsg is not None:
+            self._build_mmsghdrs()
+
+        self.tx_frames_sent = 0
+        self.tx_frames_dropped = 0
+        self.rx_frames_total = 0
+        self.rx_frames_txpdo = 0
+        self.rx_frames_other = 0
+        self.rx_buffer_overflows = 0   # cycles whose frames did not fit the buffer in one batch
+
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._exchange_thread, name="MerlinCANFD", daemon=True)
+        self._thread.start()
+
+    # -------------------------------------------------------------------------
+    # Public high-level API (same as MerlinMaster_v1)
+    # -------------------------------------------------------------------------
+
+    @property
+    def num_motors(self) -> int:
+        return self._num_motors
+
+    def close(self) -> None:
+        """Stop the background thread and close the socket."""
+        self._stop_event.set()
+        self._thread.join(timeout=1.0)
+        self._sock.close()
+
+    def set_motor_goals(
+        self,
+        motor_idx: int,
+        *,
+        torque_enable: Optional[int] = None,
+        goal_id: Optional[float] = None,
+        goal_iq: Optional[float] = None,
+        goal_velocity: Optional[float] = None,
+        goal_position: Optional[float] = None,
+    ) -> None:
+        """
+        Update command values for a single motor. Changes are sent on the next cycle.
+
+        :param motor_idx: Motor index [0 .. num_motors-1].
+        """
+        self._check_motor_index(motor_idx)
+        cmd = self._commands[motor_idx]
+
+        if torque_enable is not None:
+            cmd["torque_enable"] = int(torque_enable)
+        if goal_id is not None:
+            cmd["goal_id"] = float(goal_id)
+        if goal_iq is not None:
+            cmd["goal_iq"] = float(goal_iq)
+        if goal_velocity is not None:
+            cmd["goal_velocity"] = float(goal_velocity)
+        if goal_position is not None:
+            cmd["goal_position"] = float(goal_position)
+
+    def get_motor_state(self, motor_idx: int) -> MotorState:
+        """
+        Return the last received state for a single motor.
+        """
+        self._check_motor_index(motor_idx)
+        with self._states_lock:
+            record = self._states[motor_idx:motor_idx + 1].copy()
+        return records_to_motor_states(record)[0]
+
+    def get_all_states(self) -> MotorStateFrame:
+        """
+        Return the last received state for all motors.
+        """
+        with self._states_lock:
+            records = self._states.copy()
+        return records_to_motor_states(records)
+
+    # -------------------------------------------------------------------------
+    # Internal helpers
+    # -------------------------------------------------------------------------
+
+    def _check_motor_index(self, idx: int) -> None:
+        if not (0 <= idx < self._num_motors):
+            raise IndexError(f"motor_idx {idx} out of range [0, {self._num_motors - 1}]")
+
+    def _build_mmsghdrs(self) -> None:
+        n = self._num_motors
+        base = ctypes.addressof(self._tx_raw)
+        self._iovecs = (_IOVec * n)()
+        self._mmsghdrs = (_MMsgHdr * n)()
+        for i in range(n):
+            self._iovecs[i].iov_base = base + i * CANFD_MTU
+            self._iovecs[i].iov_len = CANFD_MTU
+            hdr = self._mmsghdrs[i].msg_hdr
+            hdr.msg_iov = ctypes.pointer(self._iovecs[i])
+            hdr.msg_iovlen = 1
+        self._mmsghdrs_addr = ctypes.addressof(self._mmsghdrs)
+
+    def _send_commands(self) -> None:
+        """Copy commands into the frame buffer and transmit all frames."""
+        payload = self._tx_frames["data"][:, :RXPDO_FRAME_LEN]
+        payload[...] = self._commands.view(np.uint8).reshape(self._num_motors, RXPDO_FRAME_LEN)
+
+        n = self._num_motors
+        if self._sendmmsg is not None:
+            fd = self._sock.fileno()
+            sent = 0
+            while sent < n:
+                rc = self._sendmmsg(fd, self._mmsghdrs_addr + sent * ctypes.sizeof(_MMsgHdr), n - sent, 0)
+                if rc < 0:
+                    err = ctypes.get_errno()
+                    if err in (errno.EAGAIN, errno.ENOBUFS):
+                        break
+                    raise OSError(err, f"sendmmsg failed on {self._ifname}")
+                sent += rc
+        else:
+            view = memoryview(self._tx_raw).cast("B")
+            sent = 0
+            for i in range(n):
+                try:
+                    self._sock.send(view[i * CANFD_MTU:(i + 1) * CANFD_MTU])
+                except (BlockingIOError, OSError) as exc:
+                    if getattr(exc, "errno", None) not in (errno.EAGAIN, errno.ENOBUFS):
+                        raise
+                    break
+                sent += 1
+
+        self.tx_frames_sent += sent
+        self.tx_frames_dropped += n - sent
+
+    def _drain_rx(self, count: int) -> int:
+        """Read all pending frames into the receive buffer starting at `count`."""
+        while count < self._rx_capacity:
+            try:
+                nbytes = self._sock.recv_into(self._rx_view[count * CANFD_MTU:(count + 1) * CANFD_MTU])
+            except BlockingIOError:
+                break
+            if nbytes == CAN_MTU:
+                # Classic CAN frame: clear the rest so stale data is not decoded.
+                self._rx_frames["data"][count, 8:] = 0
+            elif nbytes != CANFD_MTU:
+                continue
+            count += 1
+        return count
+
+    def _decode_rx(self, count: int) -> None:
+        if count == 0:
+            return
+        frames = self._rx_frames[:count]
+        std_ids = frames["can_id"] & 0x7FF
+        is_txpdo = (std_ids >= TXPDO_BASE_STDID) & (std_ids < TXPDO_BASE_STDID + self._num_motors)
+        n_txpdo = int(is_txpdo.sum())
+        self.rx_frames_total += count
+        self.rx_frames_txpdo += n_txpdo
+        self.rx_frames_other += count - n_txpdo
+        with self._states_lock:
+            latest_states(std_ids, frames["data"], self._num_motors, out=self._states)
+
+    def _exchange_thread(self) -> None:
+        """
+        Background thread:
+        - Sends all command frames at the start of each cycle
+        - Drains status frames until the next cycle deadline
+        - Decodes the cycle's status frames as one batch; if they do not fit
+          the receive buffer, the full buffer is decoded early (and counted in
+          `rx_buffer_overflows`) so no frame is left queued for the next cycle
+        """
+        next_deadline = time.perf_counter()
+        while not self._stop_event.is_set():
+            self._send_commands()
+            next_deadline += self._cycle_time_s
+
+            count = 0
+            overflowed = False
+            while True:
+                remaining = next_deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                readable, _, _ = select.select([self._sock], [], [], remaining)
+                if readable:
+                    count = self._drain_rx(count)
+                    if count >= self._rx_capacity:
+                        # Frames are decoded in arrival order, so the latest one per motor still wins.
+                        self._decode_rx(count)
+                        count = 0
+                        overflowed = True
+            self._decode_rx(count)
+            self.rx_buffer_overflows += overflowed
+
+            # Do not try to catch up after a long stall (e.g. GC pause).
+            now = time.perf_counter()
+            if now - next_deadline > self._cycle_time_s:
+                next_deadline = now
+
+
+__all__ = ["MerlinCanfdMaster_v1", "CANFD_FRAME_DTYPE", "CANFD_MTU"]
@@ -0,0 +1,375 @@
+import os
+import socket
+import struct
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from .MerlinPdoLayout import RXPDO_DTYPE, RXPDO_FIELDS
+from .MerlinSockets import claim_socket_path
+
+
+# ---- Wire format -----------------------------------------------------------------
+#
+# One Unix datagram per message:
+#   header  : msg_type u8, flags u8, priority u8, reserved u8, count u16,
+#             reserved u16, client_seq u32, send_time f64 (time.monotonic())
+#   entries : `count` x COMMAND_ENTRY_DTYPE (motor index, field mask, RxPDO record)
+#
+# Bit k of `field_mask` selects RXPDO_FIELDS[k]; unselected fields are ignored.
+
+MSG_COMMAND = 1
+MSG_ACQUIRE = 2
+MSG_RELEASE = 3
+
+FLAG_ACK = 0x01
+
+COMMAND_HEADER = struct.Struct("<BBBBHHId")
+COMMAND_ENTRY_DTYPE = np.dtype([
+    ("motor", "<u2"),
+    ("field_mask", "<u2"),
+    ("command", RXPDO_DTYPE),
+])
+# Reply to FLAG_ACK messages: client_seq u32, reserved u32, accepted-motor bitmask u64.
+ACK = struct.Struct("<IIQ")
+
+FIELD_BITS: Dict[str, int] = {name: 1 << k for k, name in enumerate(RXPDO_FIELDS)}
+ALL_FIELDS = (1 << len(RXPDO_FIELDS)) - 1
+
+_MAX_DATAGRAM = 65536
+
+
+class MerlinCommandServer:
+    """
+    Local command server: other processes send batched RxPDO updates over a
+    Unix datagram socket; they are applied to the outgoing frame of the next
+    PDO cycle.
+
+    Arbitration is per motor. A client owns the motors it last commanded; a
+    command for a motor owned by another client is rejected unless the sender
+    has a strictly higher priority (it then takes over) or the owner has been
+    silent for `lease_s`. RELEASE gives motors up, ACQUIRE takes them without
+    commanding. Messages of any other type are dropped and counted.
+
+    Fields set by clients keep their last value (they override
+    `set_motor_goals` for those fields) while the client owns the motor:
+    RELEASE, a lease running out, a takeover by another client or `clear()`
+    hands those fields back to `set_motor_goals`.
+
+    `apply()` runs as an output stage inside the PDO thread; the latency from
+    the client's send to the frame that carries the command is recorded.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        num_motors: int,
+        lease_s: float = 0.1,
+        latency_samples: int = 100_000,
+        replace: bool = False,
+    ) -> None:
+        """
+        :param path: Socket path to bind.
+        :param num_motors: Motors in the RxPDO.
+        :param lease_s: Ownership timeout of a silent client.
+        :param latency_samples: Size of the latency sample ring.
+        :param replace: Remove an existing socket at `path` first (never a non-socket file).
+        :raises FileExistsError: if `path` exists and `replace` is False or it is not a socket.
+        """
+        claim_socket_path(path, replace)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(path)
+        self._sock.setblocking(False)
+        self.path = path
+        self._num_motors = num_motors
+        self.lease_s = lease_s
+        # apply() runs in the PDO thread, clear() / owners() / latency_stats() in the caller's.
+        self._lock = threading.Lock()
+
+        self.commands = np.zeros(num_motors, dtype=RXPDO_DTYPE)
+        self._field_set = np.zeros((len(RXPDO_FIELDS), num_motors), dtype=bool)
+        self._owner = [None] * num_motors
+        self._owner_priority = np.zeros(num_motors, dtype=np.int16)
+        self._owner_seen = np.zeros(num_motors)
+        self._owned = np.zeros(num_motors, dtype=bool)
+        self._age = np.zeros(num_motors)
+        self._expired = np.zeros(num_motors, dtype=bool)
+
+        self._buf = bytearray(_MAX_DATAGRAM)
+        self._view = memoryview(self._buf)
+        # Send times of messages accepted since the last frame.
+        self._pending_send_times = []
+
+        self._latency = np.zeros(latency_samples)
+        self._latency_count = 0
+
+        self.messages = 0
+        self.malformed = 0
+        self.unknown_messages = 0
+        self.leases_expired = 0
+        self.entries_accepted = 0
+        self.entries_rejected = 0
+
+    @property
+    def num_motors(self) -> int:
+        return self._num_motors
+
+    def close(self) -> None:
+        self._sock.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        """Forget all client commands and ownership."""
+        with self._lock:
+            self._release(np.arange(self._num_motors))
+
+    def owners(self):
+        """Current owner address per motor (None = free)."""
+        with self._lock:
+            return list(self._owner)
+
+    def latency_stats(self) -> Dict[str, float]:
+        """Client-send to frame-transmit latency in microseconds (count, mean, p50, p99, max)."""
+        with self._lock:
+            count = self._latency_count
+            samples = self._latency[:min(count, len(self._latency))] * 1e6
+        if len(samples) == 0:
+            return {"count": 0, "mean_us": 0.0, "p50_us": 0.0, "p99_us": 0.0, "max_us": 0.0}
+        p50, p99 = np.percentile(samples, (50, 99))
+        return {
+            "count": count,
+            "mean_us": float(samples.mean()),
+            "p50_us": float(p50),
+            "p99_us": float(p99),
+            "max_us": float(samples.max()),
+        }
+
+    def apply(self, records: np.ndarray, now: float) -> int:
+        """
+        Output stage: drain pending messages and write the client-set fields
+        into `records`.
+
+        :return: Number of messages accepted this cycle.
+        """
+        with self._lock:
+            accepted = 0
+            while True:
+                try:
+                    nbytes, addr = self._sock.recvfrom_into(self._buf)
+                except (BlockingIOError, InterruptedError):
+                    break
+                accepted += self._handle(self._view[:nbytes], addr, now)
+            self._expire_leases(now)
+
+            field_set = self._field_set
+            for k, name in enumerate(RXPDO_FIELDS):
+                mask = field_set[k]
+                if mask.any():
+                    np.copyto(records[name], self.commands[name], where=mask)
+
+            if self._pending_send_times:
+                for sent in self._pending_send_times:
+                    self._latency[self._latency_count % len(self._latency)] = time.monotonic() - sent
+                    self._latency_count += 1
+                self._pending_send_times.clear()
+            return accepted
+
+    def _release(self, motors: np.ndarray) -> None:
+        """Free `motors` and hand their fields back to `set_motor_goals`."""
+        for m in motors:
+            self._owner[m] = None
+        self._owner_priority[motors] = 0
+        self._owned[motors] = False
+        self._field_set[:, motors] = False
+
+    def _expire_leases(self, now: float) -> None:
+        expired = self._expired
+        np.subtract(now, self._owner_seen, out=self._age)
+        np.greater(self._age, self.lease_s, out=expired)
+        expired &= self._owned
+        if expired.any():
+            self.leases_expired += int(np.count_nonzero(expired))
+            self._release(np.flatnonzero(expired))
+
+    def _handle(self, msg, addr, now: float) -> int:
+        self.messages += 1
+        if len(msg) < COMMAND_HEADER.size:
+            self.malformed += 1
+            return 0
+        msg_type, flags, priority, _, count, _, client_seq, send_time = COMMAND_HEADER.unpack_from(msg)
+        if len(msg) != COMMAND_HEADER.size + count * COMMAND_ENTRY_DTYPE.itemsize:
+            self.malformed += 1
+            return 0
+        if msg_type not in (MSG_COMMAND, MSG_ACQUIRE, MSG_RELEASE):
+            self.unknown_messages += 1
+            return 0
+        entries = np.frombuffer(msg, dtype=COMMAND_ENTRY_DTYPE, count=count, offset=COMMAND_HEADER.size)
+        motors = entries["motor"].astype(np.intp)
+        valid = motors < self._num_motors
+
+        # Arbitration over the entries of this message.
+        owners = self._owner
+        clamped = np.where(valid, motors, 0)
+        current = [owners[m] for m in clamped]
+        mine = np.array([o == addr for o in current], dtype=bool)
+        free = np.array([o is None for o in current], dtype=bool)
+        expired = now - self._owner_seen[clamped] > self.lease_s
+        outranks = priority > self._owner_priority[clamped]
+        ok = valid & (mine | free | expired | outranks)
+        if msg_type == MSG_RELEASE:
+            ok = valid & mine
+
+        ok_motors = motors[ok]
+        self.entries_accepted += len(ok_motors)
+        self.entries_rejected += count - len(ok_motors)
+
+        if msg_type == MSG_RELEASE:
+            self._release(ok_motors)
+        else:
+            # Fields left by a previous owner are not carried over to the new one.
+            taken = ok_motors[~mine[ok]]
+            if len(taken):
+                self._field_set[:, taken] = False
+            for m in ok_motors:
+                owners[m] = addr
+            self._owned[ok_motors] = True
+            self._owner_priority[ok_motors] = priority
+            self._owner_seen[ok_motors] = now
+            if msg_type == MSG_COMMAND and len(ok_motors):
+                ok_entries = entries[ok]
+                masks = ok_entries["field_mask"]
+                for k, name in enumerate(RXPDO_FIELDS):
+                    sel = (masks >> k) & 1 != 0
+                    if sel.any():
+                        self.commands[name][ok_motors[sel]] = ok_entries["command"][name][sel]
+                        self._field_set[k, ok_motors[sel]] = True
+                self._pending_send_times.append(send_time)
+
+        if flags & FLAG_ACK and addr:
+            bitmask = 0
+            for m in ok_motors:
+                bitmask |= 1 << int(m)
+            try:
+                self._sock.sendto(ACK.pack(client_seq, 0, bitmask & 0xFFFFFFFFFFFFFFFF), addr)
+            except OSError:
+                pass
+        return 1 if len(ok_motors) else 0
+
+
+class MerlinCommandClient:
+    """Sends command batches to a MerlinCommandServer."""
+
+    def __init__(self, server_path: str, priority: int = 0) -> None:
+        """
+        :param server_path: Path given to `MerlinMaster_v1.start_command_server()`.
+        :param priority: Arbitration priority 0..255 (higher preempts lower).
+        """
+        self._server_path = server_path
+        self._client_path = f"{server_path}.client.{os.getpid()}.{id(self):x}"
+        if os.path.exists(self._client_path):
+            os.unlink(self._client_path)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self._client_path)
+        self.priority = int(priority)
+        self._seq = 0
+
+    def close(self) -> None:
+        self._sock.close()
+        try:
+            os.unlink(self._client_path)
+        except FileNotFoundError:
+            pass
+
+    def send(
+        self,
+        motors: Sequence[int],
+        *,
+        torque_enable=None,
+        goal_id=None,
+        goal_iq=None,
+        goal_velocity=None,
+        goal_position=None,
+        ack: bool = False,
+        timeout: float = 0.1,
+    ) -> Optional[int]:
+        """
+        Send goals for `motors`; each goal is a scalar or one value per motor,
+        None leaves that field unchanged.
+
+        :param ack: Wait for the server reply.
+        :return: With `ack`, bitmask of the motors accepted; otherwise None.
+        """
+        motors = np.atleast_1d(np.asarray(motors, dtype=np.uint16))
+        entries = np.zeros(len(motors), dtype=COMMAND_ENTRY_DTYPE)
+        entries["motor"] = motors
+        mask = 0
+        for name, value in (
+            ("torque_enable", torque_enable),
+            ("goal_id", goal_id),
+            ("goal_iq", goal_iq),
+            ("goal_velocity", goal_velocity),
+            ("goal_position", goal_position),
+        ):
+            if value is not None:
+                entries["command"][name] = value
+                mask |= FIELD_BITS[name]
+        entries["field_mask"] = mask
+        return self._send(MSG_COMMAND, entries, ack, timeout)
+
+    def send_records(self, motors: Sequence[int], records: np.ndarray, field_mask: int = ALL_FIELDS,
+                     ack: bool = False, timeout: float = 0.1) -> Optional[int]:
+        """Send RXPDO_DTYPE `records` for `motors` (all fields by default)."""
+        entries = np.zeros(len(records), dtype=COMMAND_ENTRY_DTYPE)
+        entries["motor"] = motors
+        entries["field_mask"] = field_mask
+        entries["command"] = records
+        return self._send(MSG_COMMAND, entries, ack, timeout)
+
+    def acquire(self, motors: Sequence[int], timeout: float = 0.1) -> int:
+        """Take ownership of `motors`. :return: Bitmask of the motors now owned."""
+        return self._send(MSG_ACQUIRE, self._motor_entries(motors), True, timeout)
+
+    def release(self, motors: Sequence[int]) -> None:
+        """Give up ownership of `motors`."""
+        self._send(MSG_RELEASE, self._motor_entries(motors), False, 0.0)
+
+    @staticmethod
+    def _motor_entries(motors: Sequence[int]) -> np.ndarray:
+        entries = np.zeros(len(motors), dtype=COMMAND_ENTRY_DTYPE)
+        entries["motor"] = motors
+        return entries
+
+    def _send(self, msg_type: int, entries: np.ndarray, ack: bool, timeout: float) -> Optional[int]:
+        self._seq = (self._seq + 1) & 0xFFFFFFFF
+        header = COMMAND_HEADER.pack(
+            msg_type, FLAG_ACK if ack else 0, self.priority, 0, len(entries), 0, self._seq, time.monotonic()
+        )
+        self._sock.sendto(header + entries.tobytes(), self._server_path)
+        if not ack:
+            return None
+        self._sock.settimeout(timeout)
+        try:
+            while True:
+                reply = self._sock.recv(ACK.size)
+                seq, _, bitmask = ACK.unpack(reply)
+                if seq == self._seq:
+                    return bitmask
+        except socket.timeout:
+            raise RuntimeError(f"No reply from command server {self._server_path}") from None
+        finally:
+            self._sock.settimeout(None)
+
+
+__all__ = [
+    "COMMAND_HEADER",
+    "COMMAND_ENTRY_DTYPE",
+    "FIELD_BITS",
+    "ALL_FIELDS",
+    "MerlinCommandServer",
+    "MerlinCommandClient",
+]
@@ -0,0 +1,269 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .MerlinPdoLayout import RXPDO_DTYPE
+
+
+# ---- Layouts ---------------------------------------------------------------------
+
+GOAL_FIELDS = ("goal_id", "goal_iq", "goal_velocity", "goal_position")
+
+# Current RxPDO (esc_sheet.h Motor_RxPDO_t): 20 bytes per motor.
+FULL_RXPDO_DTYPE = RXPDO_DTYPE
+
+# Compact frame header: sequence counter + frame flags.
+COMPACT_HEADER_DTYPE = np.dtype([
+    ("sequence", "<u2"),
+    ("frame_flags", "u1"),     # bit0: keyframe (all fields valid)
+    ("encoding", "u1"),        # ENCODING_* value
+])
+
+# Compact per-motor record: 9 bytes per motor.
+#   flags bit0     : torque_enable
+#   flags bit1..4  : goal_id / goal_iq / goal_velocity / goal_position changed
+COMPACT_MOTOR_DTYPE = np.dtype([
+    ("flags", "u1"),
+    ("goal_id", "<i2"),
+    ("goal_iq", "<i2"),
+    ("goal_velocity", "<i2"),
+    ("goal_position", "<i2"),
+])
+
+FLAG_TORQUE_ENABLE = 0x01
+FLAG_CHANGED_SHIFT = 1
+FRAME_FLAG_KEYFRAME = 0x01
+
+ENCODING_FIXED = 0
+ENCODING_FLOAT16 = 1
+_ENCODINGS = {"fixed": ENCODING_FIXED, "float16": ENCODING_FLOAT16}
+
+# Fixed-point LSB per goal field (value = raw * scale). int16 range gives:
+#   goal_id / goal_iq : 1 mA      -> +-32.7 A
+#   goal_velocity     : 2 mrad/s  -> +-65.5 rad/s
+#   goal_position     : 1/4096 rad -> +-8.0 rad
+DEFAULT_FIXED_SCALES: Dict[str, float] = {
+    "goal_id": 1e-3,
+    "goal_iq": 1e-3,
+    "goal_velocity": 2e-3,
+    "goal_position": 1.0 / 4096.0,
+}
+
+_INT16_MIN, _INT16_MAX = -32768, 32767
+_FLOAT16_MAX = float(np.finfo(np.float16).max)
+
+
+def full_rxpdo_size(num_motors: int) -> int:
+    """SM2 size in bytes of the current (uncompressed) RxPDO."""
+    return num_motors * FULL_RXPDO_DTYPE.itemsize
+
+
+def compact_rxpdo_size(num_motors: int) -> int:
+    """SM2 size in bytes of the compact RxPDO (header + 9 bytes per motor)."""
+    return COMPACT_HEADER_DTYPE.itemsize + num_motors * COMPACT_MOTOR_DTYPE.itemsize
+
+
+def sm2_size(num_motors: int, compact: bool = False) -> int:
+    """SM2 (outputs) length to put in the SII/ESI, e.g. SM2_SIZE in generate_eeprom_*.py."""
+    return compact_rxpdo_size(num_motors) if compact else full_rxpdo_size(num_motors)
+
+
+def compact_pdo_entries(num_motors: int) -> List[Tuple[str, int]]:
+    """
+    (name, bit length) PDO entries of the compact RxPDO, in wire order, for the
+    slave's object dictionary / ESI.
+    """
+    entries = [("Sequence", 16), ("FrameFlags", 8), ("Encoding", 8)]
+    for i in range(num_motors):
+        entries.append((f"M{i}_Flags", 8))
+        entries.extend((f"M{i}_{name}", 16) for name in GOAL_FIELDS)
+    return entries
+
+
+class CompactCommandEncoder:
+    """
+    Master-side encoder for the compact RxPDO.
+
+    Each cycle the goals are quantized (int16 fixed point or IEEE float16) and
+    compared against the values last sent; only changed fields get their
+    "changed" bit set. Unchanged fields are transmitted as zero and the slave
+    keeps its previous value. Every `keyframe_interval` frames all fields are
+    flagged so a slave that missed a frame re-synchronizes; after a frame is
+    known to be lost (missed or short WKC), `request_keyframe()` makes the
+    next frame a keyframe instead of waiting for the interval.
+
+    Goals outside the 16-bit range are clipped to it; `saturated` flags the
+    clipped fields of the last frame and `saturated_fields` counts them.
+    """
+
+    def __init__(
+        self,
+        num_motors: int,
+        encoding: str = "fixed",
+        scales: Optional[Dict[str, float]] = None,
+        keyframe_interval: int = 100,
+    ) -> None:
+        """
+        :param num_motors: Motors in the frame.
+        :param encoding: 'fixed' (int16 * scale) or 'float16'.
+        :param scales: Per-field fixed-point LSB (default DEFAULT_FIXED_SCALES).
+        :param keyframe_interval: Frames between full refreshes (1 = always full).
+        """
+        if encoding not in _ENCODINGS:
+            raise ValueError(f"encoding must be one of {sorted(_ENCODINGS)}")
+        self._num_motors = num_motors
+        self._encoding = encoding
+        self._scales = dict(DEFAULT_FIXED_SCALES, **(scales or {}))
+        self._keyframe_interval = max(1, int(keyframe_interval))
+
+        self._buf = np.zeros(compact_rxpdo_size(num_motors), dtype=np.uint8)
+        self._header = self._buf[:COMPACT_HEADER_DTYPE.itemsize].view(COMPACT_HEADER_DTYPE)
+        self._header["encoding"] = _ENCODINGS[encoding]
+        # Strided views over the packed records so each cycle writes two arrays.
+        hdr, rec = COMPACT_HEADER_DTYPE.itemsize, COMPACT_MOTOR_DTYPE.itemsize
+        self._flags_view = np.ndarray((num_motors,), dtype=np.uint8, buffer=self._buf,
+                                      offset=hdr, strides=(rec,))
+        self._goal_view = np.ndarray((num_motors, len(GOAL_FIELDS)), dtype="<i2", buffer=self._buf,
+                                     offset=hdr + 1, strides=(rec, 2))
+        self._bit_weights = (1 << (np.arange(len(GOAL_FIELDS)) + FLAG_CHANGED_SHIFT)).astype(np.uint8)
+
+        self._goals = np.zeros((num_motors, len(GOAL_FIELDS)), dtype=np.float32)
+        self._torque = np.zeros(num_motors, dtype=np.uint32)
+        self._last_sent = np.zeros((num_motors, len(GOAL_FIELDS)), dtype=np.int16)
+        self._inv_scales = np.array([1.0 / self._scales[f] for f in GOAL_FIELDS], dtype=np.float32)
+        self._sequence = 0
+        self._force_keyframe = False
+        self.saturated = np.zeros((num_motors, len(GOAL_FIELDS)), dtype=bool)
+        self.saturated_fields = 0
+
+    @property
+    def frame_size(self) -> int:
+        return len(self._buf)
+
+    @property
+    def goals(self) -> np.ndarray:
+        """(num_motors, 4) float32 goals in GOAL_FIELDS order; write before `encode()`."""
+        return self._goals
+
+    @property
+    def torque_enable(self) -> np.ndarray:
+        """(num_motors,) torque enable flags; write before `encode()`."""
+        return self._torque
+
+    def load_commands(self, commands) -> None:
+        """Copy goals from a list of MotorCommand-like objects into the encoder."""
+        for i, cmd in enumerate(commands):
+            self._torque[i] = cmd.torque_enable
+            self._goals[i] = (cmd.goal_id, cmd.goal_iq, cmd.goal_velocity, cmd.goal_position)
+
+    def load_records(self, records: np.ndarray) -> None:
+        """Copy goals from a FULL_RXPDO_DTYPE-compatible structured array."""
+        self._torque[:] = records["torque_enable"]
+        for k, name in enumerate(GOAL_FIELDS):
+            self._goals[:, k] = records[name]
+
+    def quantize(self, goals: np.ndarray) -> np.ndarray:
+        """
+        Quantize float goals to the 16-bit wire representation (as int16 bits).
+        Out-of-range values are clipped and flagged in `saturated`.
+        """
+        if self._encoding == "float16":
+            np.greater(np.abs(goals), _FLOAT16_MAX, out=self.saturated)
+            return np.clip(goals, -_FLOAT16_MAX, _FLOAT16_MAX).astype(np.float16).view(np.int16)
+        scaled = np.rint(goals * self._inv_scales)
+        np.logical_or(scaled < _INT16_MIN, scaled > _INT16_MAX, out=self.saturated)
+        return np.clip(scaled, _INT16_MIN, _INT16_MAX).astype(np.int16)
+
+    def request_keyframe(self) -> None:
+        """Send all fields in the next frame (e.g. after the last frame was lost)."""
+        self._force_keyframe = True
+
+    def encode(self, keyframe: Optional[bool] = None) -> bytes:
+        """Encode the current goals into a compact frame and advance the sequence."""
+        return bytes(self.encode_into(keyframe))
+
+    def encode_into(self, keyframe: Optional[bool] = None) -> np.ndarray:
+        """Like `encode()` but returns the internal uint8 buffer (valid until the next call)."""
+        if keyframe is None:
+            keyframe = self._force_keyframe or self._sequence % self._keyframe_interval == 0
+        self._force_keyframe = False
+
+        q = self.quantize(self._goals)
+        self.saturated_fields += int(np.count_nonzero(self.saturated))
+        if keyframe:
+            changed_bits = int(self._bit_weights.sum())
+            self._goal_view[...] = q
+            self._last_sent[...] = q
+        else:
+            changed = q != self._last_sent
+            changed_bits = changed.astype(np.uint8) @ self._bit_weights
+            np.multiply(q, changed, out=self._goal_view, casting="unsafe")
+            np.copyto(self._last_sent, q, where=changed)
+        self._flags_view[...] = (self._torque != 0) | changed_bits
+
+        self._header["sequence"] = self._sequence & 0xFFFF
+        self._header["frame_flags"] = FRAME_FLAG_KEYFRAME if keyframe else 0
+        self._sequence += 1
+        return self._buf
+
+
+class CompactCommandDecoder:
+    """
+    Reference decoder for the compact RxPDO (what the slave firmware does).
+
+    Holds the last value per field and applies only flagged fields. Until the
+    first keyframe arrives, fields that were never flagged read as zero.
+    """
+
+    def __init__(self, num_motors: int, scales: Optional[Dict[str, float]] = None) -> None:
+        self._num_motors = num_motors
+        self._scales = np.array(
+            [dict(DEFAULT_FIXED_SCALES, **(scales or {}))[f] for f in GOAL_FIELDS], dtype=np.float32
+        )
+        self.records = np.zeros(num_motors, dtype=FULL_RXPDO_DTYPE)
+        self.last_sequence: Optional[int] = None
+        self.missed_frames = 0
+
+    def decode(self, frame) -> np.ndarray:
+        """Apply one compact frame; returns the full-layout records (internal array)."""
+        raw = np.frombuffer(bytes(frame), dtype=np.uint8)
+        header = raw[:COMPACT_HEADER_DTYPE.itemsize].view(COMPACT_HEADER_DTYPE)[0]
+        motors = raw[COMPACT_HEADER_DTYPE.itemsize:].view(COMPACT_MOTOR_DTYPE)
+
+        seq = int(header["sequence"])
+        if self.last_sequence is not None:
+            self.missed_frames += (seq - self.last_sequence - 1) & 0xFFFF
+        self.last_sequence = seq
+
+        flags = motors["flags"]
+        self.records["torque_enable"] = flags & FLAG_TORQUE_ENABLE
+        for k, name in enumerate(GOAL_FIELDS):
+            changed = (flags >> (FLAG_CHANGED_SHIFT + k)) & 1 != 0
+            raw_vals = motors[name]
+            if header["encoding"] == ENCODING_FLOAT16:
+                vals = raw_vals.view(np.float16).astype(np.float32)
+            else:
+                vals = raw_vals.astype(np.float32) * self._scales[k]
+            self.records[name] = np.where(changed, vals, self.records[name])
+        return self.records
+
+
+def pack_full_rxpdo(records: np.ndarray) -> bytes:
+    """Serialize FULL_RXPDO_DTYPE records into the current 20-byte-per-motor layout."""
+    return np.ascontiguousarray(records, dtype=FULL_RXPDO_DTYPE).tobytes()
+
+
+__all__ = [
+    "GOAL_FIELDS",
+    "FULL_RXPDO_DTYPE",
+    "COMPACT_HEADER_DTYPE",
+    "COMPACT_MOTOR_DTYPE",
+    "DEFAULT_FIXED_SCALES",
+    "full_rxpdo_size",
+    "compact_rxpdo_size",
+    "sm2_size",
+    "compact_pdo_entries",
+    "CompactCommandEncoder",
+    "CompactCommandDecoder",
+    "pack_full_rxpdo",
+]
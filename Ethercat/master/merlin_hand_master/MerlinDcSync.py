@@ -0,0 +1,139 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class DcSyncStats:
+    """Phase of the host frames relative to SYNC0, as seen by the DC reference clock."""
+
+    samples: int = 0
+    locked: bool = False
+    offset_ns: float = 0.0          # last phase error (+ = frame later than the target)
+    offset_mean_ns: float = 0.0
+    offset_jitter_ns: float = 0.0
+    offset_max_ns: float = 0.0      # largest |phase error| since lock
+    drift_ppm: float = 0.0          # DC clock rate relative to the host clock
+    correction_ns: float = 0.0      # last wake-up adjustment
+    phase_jumps: int = 0
+
+
+class DcSyncController:
+    """
+    PI controller that keeps the host cycle at a fixed phase to SYNC0.
+
+    SOEM starts SYNC0 at DC times `k * cycle + shift`. Each cycle the master
+    reads the reference clock time at which its frame passed (pysoem
+    `Master.dc_time`) and computes the phase error relative to
+    "`lead_ns` before the next SYNC0". The returned correction is added to the
+    next wake-up time. The integral term absorbs the rate difference between
+    the host clock and the DC clock; large errors (start-up) are removed with
+    a single phase jump, which also restarts the integral.
+
+    The correction is limited to a quarter cycle; while it is, the integral
+    is not advanced further in the saturated direction (anti-windup). A cycle
+    without a new DC time (lost frame) only applies the integral term, so the
+    host keeps following the clock-rate difference without re-applying the
+    last proportional step.
+    """
+
+    def __init__(
+        self,
+        cycle_time_ns: int,
+        lead_ns: int,
+        shift_ns: int = 0,
+        kp: float = 0.1,
+        ki: float = 0.01,
+        lock_threshold_ns: Optional[float] = None,
+        lock_cycles: int = 100,
+    ) -> None:
+        """
+        :param cycle_time_ns: SYNC0 period.
+        :param lead_ns: Target time from the frame passing the slave to the next SYNC0.
+        :param shift_ns: SYNC0 shift passed to `dc_sync`.
+        :param kp: Proportional gain (fraction of the error corrected per cycle).
+        :param ki: Integral gain.
+        :param lock_threshold_ns: |error| below which the loop counts as locked
+                                  (default 5 % of the cycle).
+        :param lock_cycles: Consecutive cycles inside the threshold to report `locked`.
+        """
+        self.cycle_time_ns = int(cycle_time_ns)
+        self.lead_ns = int(lead_ns)
+        self.shift_ns = int(shift_ns)
+        self.kp = kp
+        self.ki = ki
+        self.lock_threshold_ns = lock_threshold_ns if lock_threshold_ns is not None else 0.05 * cycle_time_ns
+        self.lock_cycles = lock_cycles
+
+        self._integral = 0.0
+        self._mean_correction = 0.0
+        self._in_lock = 0
+        self._last_dc_time = None
+        self.stats = DcSyncStats()
+
+    def phase_error(self, dc_time_ns: int) -> int:
+        """Phase error in ns, wrapped to [-cycle/2, cycle/2)."""
+        cycle = self.cycle_time_ns
+        err = (dc_time_ns + self.lead_ns - self.shift_ns) % cycle
+        if err >= cycle // 2:
+            err -= cycle
+        return err
+
+    def update(self, dc_time_ns: int) -> float:
+        """
+        Feed the DC time of this cycle's frame.
+
+        :return: Correction in seconds to add to the next wake-up time.
+        """
+        if not dc_time_ns or dc_time_ns == self._last_dc_time:
+            # No DC time (slave without DC / frame lost): keep compensating the drift.
+            return -self.ki * self._integral * 1e-9
+        self._last_dc_time = dc_time_ns
+        stats = self.stats
+        err = self.phase_error(dc_time_ns)
+        stats.samples += 1
+        stats.offset_ns = err
+
+        if abs(err) > self.cycle_time_ns / 4:
+            # Far off (start-up or after a stall): jump instead of slewing.
+            stats.phase_jumps += 1
+            self._integral = 0.0
+            self._in_lock = 0
+            stats.locked = False
+            stats.correction_ns = -err
+            return -err * 1e-9
+
+        integral = self._integral + err
+        correction = -(self.kp * err + self.ki * integral)
+        limit = self.cycle_time_ns / 4
+        if abs(correction) <= limit:
+            self._integral = integral
+        else:
+            # Saturated: only let the integral move back towards the linear range.
+            if abs(integral) < abs(self._integral):
+                self._integral = integral
+            correction = max(-limit, min(limit, correction))
+        stats.correction_ns = correction
+
+        # In steady state the mean correction per cycle cancels the rate difference.
+        self._mean_correction += (correction - self._mean_correction) / 1024
+        stats.drift_ppm = -self._mean_correction / self.cycle_time_ns * 1e6
+
+        if abs(err) <= self.lock_threshold_ns:
+            self._in_lock += 1
+        else:
+            self._in_lock = 0
+        was_locked = stats.locked
+        stats.locked = self._in_lock >= self.lock_cycles
+        if stats.locked and not was_locked:
+            stats.offset_mean_ns = err
+            stats.offset_jitter_ns = 0.0
+            stats.offset_max_ns = abs(err)
+        elif stats.locked:
+            delta = err - stats.offset_mean_ns
+            stats.offset_mean_ns += delta / 64
+            stats.offset_jitter_ns += (abs(delta) - stats.offset_jitter_ns) / 64
+            stats.offset_max_ns = max(stats.offset_max_ns, abs(err))
+        return correction * 1e-9
+
+
+__all__ = ["DcSyncController", "DcSyncStats"]
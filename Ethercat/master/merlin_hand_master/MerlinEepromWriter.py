@@ -0,0 +1,209 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+
+# SII header: CRC-8 (x^8 + x^2 + x + 1, init 0xFF) of words 0-6, stored in word 7's low byte.
+SII_CHECKSUM_BYTES = 14
+
+
+def sii_checksum(image: bytes) -> int:
+    """Checksum of an SII image's configuration area (ETG.2010), as the ESC checks it."""
+    crc = 0xFF
+    for byte in image[:SII_CHECKSUM_BYTES]:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+
+def sii_checksum_ok(image: bytes) -> bool:
+    """True if the image is long enough and byte 14 holds `sii_checksum`."""
+    return len(image) > SII_CHECKSUM_BYTES and image[SII_CHECKSUM_BYTES] == sii_checksum(image)
+
+
+@dataclass
+class EepromWriteResult:
+    """Outcome of programming one slave's SII EEPROM."""
+
+    slave_pos: int
+    words_total: int = 0
+    words_written: int = 0
+    words_skipped: int = 0
+    verified: bool = False
+    mismatched_words: List[int] = field(default_factory=list)
+    checksum_ok: bool = False       # SII header checksum of the read-back image
+    elapsed_s: float = 0.0
+
+
+class MerlinEepromWriter:
+    """
+    Program SII EEPROM images (e.g. the `.bin` files produced by
+    `eeprom_writer_failed/generate_eeprom_*.py`) into EtherCAT slaves.
+
+    Works on any `pysoem.Master`-compatible object that has been opened and
+    had `config_init()` run, including `MerlinSimSlave.SimMaster`.
+
+    Per slave:
+    - Read back the current EEPROM contents in bulk (4 bytes per read).
+    - Write only the words that differ from the image (one word per write).
+    - Read back again and compare against the image.
+
+    Several slaves can be programmed in parallel (one worker thread per slave).
+    """
+
+    def __init__(self, master, timeout_us: int = 20_000, max_workers: Optional[int] = None) -> None:
+        """
+        :param master: Opened pysoem.Master (or compatible) with slaves discovered.
+        :param timeout_us: Per-access EEPROM timeout passed to SOEM.
+        :param max_workers: Parallel slaves; defaults to one thread per slave.
+        """
+        self._master = master
+        self._timeout_us = timeout_us
+        self._max_workers = max_workers
+
+    # -------------------------------------------------------------------------
+    # Public API
+    # -------------------------------------------------------------------------
+
+    def read_image(self, slave_pos: int, num_bytes: int) -> bytes:
+        """
+        Read `num_bytes` (rounded up to whole words) from a slave's EEPROM.
+        """
+        slave = self._master.slaves[slave_pos]
+        num_words = (num_bytes + 1) // 2
+        data = bytearray()
+        for word_address in range(0, num_words, 2):
+            data += slave.eeprom_read(word_address, self._timeout_us)
+        return bytes(data[: num_words * 2])
+
+    def write_image(self, slave_pos: int, image: bytes, verify: bool = True) -> EepromWriteResult:
+        """
+        Program a single slave, skipping words that already match.
+
+        :raises RuntimeError: if `verify` is set and the read-back differs.
+        """
+        image = self._pad_to_words(image)
+        slave = self._master.slaves[slave_pos]
+        result = EepromWriteResult(slave_pos=slave_pos, words_total=len(image) // 2)
+        t0 = time.perf_counter()
+
+        current = self.read_image(slave_pos, len(image))
+        for word_address in self._diff_words(current, image):
+            start = word_address * 2
+            slave.eeprom_write(word_address, image[start:start + 2], self._timeout_us)
+            result.words_written += 1
+        result.words_skipped = result.words_total - result.words_written
+
+        if verify:
+            readback = self.read_image(slave_pos, len(image))
+            result.mismatched_words = self._diff_words(readback, image)
+            result.verified = not result.mismatched_words
+            result.checksum_ok = sii_checksum_ok(readback)
+
+        result.elapsed_s = time.perf_counter() - t0
+
+        if verify and not result.verified:
+            raise RuntimeError(
+                f"EEPROM verify failed on slave {slave_pos}: "
+                f"{len(result.mismatched_words)} word(s) differ, first at "
+                f"0x{result.mismatched_words[0]:04X}"
+            )
+        return result
+
+    def program(
+        self,
+        image: bytes,
+        slave_positions: Optional[Sequence[int]] = None,
+        verify: bool = True,
+    ) -> Dict[int, EepromWriteResult]:
+        """
+        Program the same image into several slaves in parallel.
+
+        :param slave_positions: Slaves to program (default: all discovered slaves).
+        :raises RuntimeError: if any slave fails verification (after all have finished).
+        """
+        if slave_positions is None:
+            slave_positions = range(len(self._master.slaves))
+        slave_positions = list(slave_positions)
+        for pos in slave_positions:
+            if not (0 <= pos < len(self._master.slaves)):
+                raise IndexError(f"slave_pos {pos} out of range [0, {len(self._master.slaves) - 1}]")
+
+        max_workers = self._max_workers or max(1, len(slave_positions))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="MerlinEEPROM") as pool:
+            futures = {
+                pos: pool.submit(self.write_image, pos, image, verify)
+                for pos in slave_positions
+            }
+
+        results: Dict[int, EepromWriteResult] = {}
+        errors: List[str] = []
+        for pos, fut in futures.items():
+            try:
+                results[pos] = fut.result()
+            except RuntimeError as exc:
+                errors.append(str(exc))
+        if errors:
+            raise RuntimeError("; ".join(errors))
+        return results
+
+    # -------------------------------------------------------------------------
+    # Internal helpers
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _pad_to_words(image: bytes) -> bytes:
+        if len(image) % 2:
+            image = bytes(image) + b"\x00"
+        return bytes(image)
+
+    @staticmethod
+    def _diff_words(current: bytes, target: bytes) -> List[int]:
+        """Word addresses where `current` differs from `target`."""
+        return [
+            i // 2
+            for i in range(0, len(target), 2)
+            if current[i:i + 2] != target[i:i + 2]
+        ]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Program SII EEPROM images over EtherCAT.")
+    parser.add_argument("ifname", help="Network interface (e.g. enp63s0)")
+    parser.add_argument("image", help="EEPROM .bin file")
+    parser.add_argument("--slave", type=int, action="append", dest="slaves",
+                        help="Slave position to program (repeatable, default: all)")
+    parser.add_argument("--no-verify", action="store_true", help="Skip read-back verification")
+    args = parser.parse_args(argv)
+
+    import pysoem
+
+    with open(args.image, "rb") as f:
+        image = f.read()
+
+    master = pysoem.Master()
+    master.open(args.ifname)
+    try:
+        if not master.config_init() > 0:
+            raise RuntimeError(f"No EtherCAT slaves found on interface {args.ifname}")
+        writer = MerlinEepromWriter(master)
+        results = writer.program(image, args.slaves, verify=not args.no_verify)
+        for pos, res in sorted(results.items()):
+            print(
+                f"slave {pos}: wrote {res.words_written}/{res.words_total} words "
+                f"({res.words_skipped} unchanged), verified={res.verified}, "
+                f"checksum_ok={res.checksum_ok}, "
+                f"{res.elapsed_s:.2f} s"
+            )
+    finally:
+        master.close()
+
+
+__all__ = ["MerlinEepromWriter", "EepromWriteResult", "sii_checksum", "sii_checksum_ok"]
+
+
+if __name__ == "__main__":
+    main()
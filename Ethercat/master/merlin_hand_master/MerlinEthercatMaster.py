@@ -1,36 +1,24 @@
+import logging
+import math
 import threading
 import struct
 import time
-from dataclasses import dataclass
-from typing import Optional, List
+from array import array
+from dataclasses import replace
+from typing import Callable, Dict, Optional, List, Sequence
 
-import pysoem
+from .MerlinEepromWriter import EepromWriteResult, MerlinEepromWriter
+from .MerlinTypes import (
+    CycleStats,
+    MotorCommand,
+    MotorState,
+    MotorStateFrame,
+    INIT_STATE,
+    OP_STATE,
+    SAFEOP_STATE,
+)
 
-
-@dataclass
-class MotorCommand:
-    """Command values sent from PC master to a single motor (RxPDO)."""
-
-    torque_enable: int = 0
-    goal_id: float = 0.0
-    goal_iq: float = 0.0
-    goal_velocity: float = 0.0
-    goal_position: float = 0.0
-
-
-@dataclass
-class MotorState:
-    """State values received from a single motor (TxPDO)."""
-
-    present_id: float = 0.0
-    present_iq: float = 0.0
-    present_velocity: float = 0.0
-    present_position: float = 0.0
-    input_voltage: float = 0.0
-    winding_temperature: float = 0.0
-    powerstage_temperature: float = 0.0
-    ic_temperature: float = 0.0
-    error_status: float = 0.0
+_log = logging.getLogger(__name__)
 
 
 class MerlinMaster_v1:
@@ -60,6 +48,11 @@ class MerlinMaster_v1:
     _RXPDO_STRUCT = struct.Struct("<Iffff")          # 1x uint32 + 4x float32 = 20 bytes
     _TXPDO_STRUCT = struct.Struct("<fffffffff")      # 9x float32 = 36 bytes
 
+    # Lower bound for the adaptive receive timeout.
+    _RX_TIMEOUT_MIN_US = 100
+    # Floor of the timeout margin over the smoothed RTT (RFC 6298 clock granularity G).
+    _RX_TIMEOUT_GRANULARITY_US = 10
+
     def __init__(
         self,
         ifname: str,
@@ -67,9 +60,18 @@ class MerlinMaster_v1:
         ifname_red: Optional[str] = None,
         num_motors: int = 18,
         cycle_time_s: float = 0.001,
+        master=None,
+        compact_rxpdo: bool = False,
+        rx_timeout_us: Optional[int] = None,
+        pipelined: bool = False,
+        dc_sync_control: bool = True,
+        dc_lead_us: Optional[float] = None,
+        auto_connect: bool = True,
+        lockstep: bool = False,
     ) -> None:
         """
-        Create and fully initialize the EtherCAT master.
+        Create the EtherCAT master and, unless `auto_connect` is False, bring
+        the network up right away (see `connect()`):
 
         - Opens the adapter
         - Finds and configures slaves
@@ -77,11 +79,34 @@ class MerlinMaster_v1:
         - Brings network into OP state
         - Starts background process-data loop
 
+        With `auto_connect=False` nothing touches the network (and pysoem is
+        not imported) until `connect()` or `with master:`; commands, features
+        and output stages can be set up before the first cycle.
+
         :param ifname: Network interface name (e.g. 'enx000ec676fcd0').
         :param slave_pos: Position of the STM32/ESC slave in the EtherCAT ring.
-        :param ifname_red: Optional second interface for redundant topology.
+        :param ifname_red: Optional second interface for redundant topology
+                           (ring health and failover time in `get_cycle_stats()`).
         :param num_motors: Number of motors controlled by this slave (default 18).
         :param cycle_time_s: PDO update cycle time for the background thread.
+        :param master: Optional pysoem.Master-compatible backend to use instead of
+                       a fresh `pysoem.Master()` created by `connect()`
+                       (e.g. `MerlinSimSlave.SimMaster`).
+        :param compact_rxpdo: Send goals in the compact delta-encoded RxPDO layout
+                              (see MerlinCompactPdo). The slave firmware and SII
+                              SM2 size must be built for the same layout.
+        :param rx_timeout_us: Fixed receive timeout. By default the timeout adapts to
+                              the measured round trip (smoothed RTT + 4x jitter),
+                              bounded by the cycle time.
+        :param pipelined: Send the next frame before decoding the current one.
+        :param dc_sync_control: Lock the host cycle to SYNC0 using the DC reference
+                                clock time of each frame (see MerlinDcSync).
+        :param dc_lead_us: Target time from the frame passing the slave to the next
+                           SYNC0 (default: half a cycle).
+        :param auto_connect: Call `connect()` from the constructor.
+        :param lockstep: Do not start the PDO thread; cycles run only when `step()` is
+                         called, on a virtual clock shared with the simulated backend
+                         (default: a seeded `MerlinSimSlave.SimMaster`). See `step()`.
         """
         self._ifname = ifname
         self._ifname_red = ifname_red
@@ -89,24 +114,91 @@ class MerlinMaster_v1:
         self._num_motors = num_motors
         self._cycle_time_s = cycle_time_s
 
-        self._master = pysoem.Master()
-        self._master.in_op = False
-        self._master.do_check_state = False
+        # Packed RxPDO image, reused every cycle. `_out_records` is a NumPy view
+        # of it, created on demand by features that edit the outputs as arrays.
+        self._out_buf = bytearray(num_motors * self._RXPDO_STRUCT.size)
+        self._out_records = None
+        self._output_stages: List[Callable] = []
+        # NumPy view of the state buffer, created when a feature needs it.
+        self._in_records = None
+        self._in_records_ro = None
+
+        self._compact_encoder = None
+        if compact_rxpdo:
+            from .MerlinCompactPdo import CompactCommandEncoder
+            self._compact_encoder = CompactCommandEncoder(num_motors)
+            self._ensure_out_records()
+
+        self._interpolator = None
+        self._interp_ff_velocity = False
+
+        self._controller: Optional[Callable] = None
+        self._controller_budget_s = 0.0
+        self._controller_max_overruns: Optional[int] = None
+        self._controller_consecutive_overruns = 0
+        self._controller_error: Optional[BaseException] = None
+        self._ctrl_primed = False
+
+        self._safety = None
+        self._filters = None
+        self._calibration = None
+        self._calibrated = None
+        self._state_ring = None
+        self._state_dgram = None
+        self._broadcast_seq = 0
+        self._command_server = None
+        self._metrics = None
+        self._metrics_outputs: List = []
+        self._recorder = None
+        self._fault_events = None
+        self._latency_probe = None
+        self._hook_errors: Dict[str, BaseException] = {}
+
+        # Backend; a pysoem.Master is only created (and pysoem imported) on connect().
+        self._master = master
+        self._pd_thread: Optional[threading.Thread] = None
+        self._connected = False
+
+        # Time sources of the PDO loop; both follow the virtual clock in lockstep mode.
+        self._lockstep = lockstep
+        self._virtual_clock = None
+        self._now: Callable[[], float] = time.monotonic
+        self._perf: Callable[[], float] = time.perf_counter
+        self._next_deadline = 0.0
+        self._dc_correction_s = 0.0
 
         self._pd_thread_stop_event = threading.Event()
+        # Held by the PDO loop for each cycle; see `_wait_for_cycle`.
+        self._cycle_lock = threading.RLock()
         self._actual_wkc = 0
+        self._pipelined = pipelined
+        self._dc_sync_control = dc_sync_control
+        self._dc_lead_us = dc_lead_us
+        self._dc_controller = None
+        self._ring_monitor = None
+        self._scheduler = None
+        self._fixed_rx_timeout_us = rx_timeout_us
+        self._rx_timeout_max_us = max(int(cycle_time_s * 1e6), 2 * self._RX_TIMEOUT_MIN_US)
+        self._cycle_stats = CycleStats(
+            rx_timeout_us=rx_timeout_us if rx_timeout_us is not None else self._rx_timeout_max_us
+        )
 
-        # Command and state buffers (one entry per motor)
+        # Command and state buffers in process-image layout; `_commands` and
+        # `_states` are per-motor views into them.
+        self._cmd_buf = bytearray(num_motors * self._RXPDO_STRUCT.size)
+        cmd_u32 = memoryview(self._cmd_buf).cast("I")
+        cmd_f32 = memoryview(self._cmd_buf).cast("f")
         self._commands: List[MotorCommand] = [
-            MotorCommand() for _ in range(self._num_motors)
+            MotorCommand.view(cmd_u32, cmd_f32, i) for i in range(self._num_motors)
         ]
+        self._state_buf = array("f", bytes(num_motors * self._TXPDO_STRUCT.size))
+        self._state_bytes = memoryview(self._state_buf).cast("B")
         self._states: List[MotorState] = [
-            MotorState() for _ in range(self._num_motors)
+            MotorState.view(self._state_buf, i) for i in range(self._num_motors)
         ]
 
-        # Master/slave initialization
-        self._open_and_configure()
-        self._start_processdata_loop()
+        if auto_connect:
+            self.connect()
 
     # -------------------------------------------------------------------------
     # Public high-level API
@@ -116,14 +208,119 @@ class MerlinMaster_v1:
     def num_motors(self) -> int:
         return self._num_motors
 
+    @property
+    def connected(self) -> bool:
+        """True while the network is in OP and the PDO loop is running (or steppable)."""
+        return self._connected
+
+    def connect(self) -> "MerlinMaster_v1":
+        """
+        Open the adapter, bring the slave to OP and start the PDO loop.
+        Does nothing if already connected.
+        """
+        if self._connected:
+            return self
+        if self._lockstep:
+            self._setup_lockstep()
+        elif self._master is None:
+            import pysoem
+
+            self._master = pysoem.Master()
+        self._master.in_op = False
+        self._master.do_check_state = False
+        self._pd_thread_stop_event.clear()
+
+        self._open_and_configure()
+        if self._lockstep:
+            self._prime_processdata(self._master.slaves[self._slave_pos])
+            self._next_deadline = self._perf()
+        else:
+            self._start_processdata_loop()
+        self._connected = True
+        return self
+
+    def now(self) -> float:
+        """
+        Current time of the master's clock: `time.monotonic()`, or the virtual
+        time in lockstep mode. Interpolator waypoints, controller and output
+        stage timestamps use this clock.
+        """
+        return self._now()
+
+    def step(self, cycles: int = 1) -> int:
+        """
+        Lockstep mode: run `cycles` PDO cycles back to back in the calling thread.
+
+        Each cycle does exactly what the background thread does (pack, exchange
+        with the simulated slave, decode, filters, controller, metrics), then
+        moves the virtual clock to the next cycle deadline, shifted by the DC
+        sync correction like the thread's wake-up, so a drifting simulated DC
+        clock is tracked the same way. Runs are reproducible for a seeded
+        backend. The controller time budget is not enforced (the virtual clock
+        does not advance while it runs); exceptions still are.
+
+        :return: Number of frames received.
+        """
+        if not self._lockstep:
+            raise RuntimeError("step() requires lockstep=True")
+        if not self._connected:
+            raise RuntimeError("Master is not connected; call connect() first")
+        slave = self._master.slaves[self._slave_pos]
+        clock = self._virtual_clock
+        received = 0
+        for _ in range(cycles):
+            with self._cycle_lock:
+                received += self._run_cycle(slave)
+            self._next_deadline += self._cycle_time_s + self._dc_correction_s
+            if self._scheduler is not None and clock.now() < self._next_deadline:
+                self._scheduler.run(self._now(), self._next_deadline)
+            if clock.now() > self._next_deadline:
+                self._next_deadline = self._late_deadline(clock.now(), self._next_deadline)
+            clock.advance_to(self._next_deadline)
+        return received
+
+    def __enter__(self) -> "MerlinMaster_v1":
+        return self.connect()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
     def close(self) -> None:
         """Stop background threads and close the master."""
-        self._pd_thread_stop_event.set()
+        self.stop_broadcast()
+        self.stop_command_server()
+        self.disable_metrics()
+        self.stop_recording()
+        if not self._connected:
+            return
+        self._connected = False
+        if self._pd_thread is not None:
+            self._pd_thread_stop_event.set()
+            # The receive timeout is bounded, so the loop exits within a cycle or two.
+            self._pd_thread.join(timeout=1.0)
+            self._pd_thread = None
         if self._master.in_op:
-            self._master.state = pysoem.INIT_STATE
+            self._master.state = INIT_STATE
             self._master.write_state()
         self._master.close()
 
+    def get_dc_stats(self):
+        """
+        Return a snapshot of the SYNC0 phase statistics (MerlinDcSync.DcSyncStats),
+        or None if DC sync control is disabled.
+        """
+        if self._dc_controller is None:
+            return None
+        return replace(self._dc_controller.stats)
+
+    def get_cycle_stats(self) -> CycleStats:
+        """
+        Return a snapshot of the PDO loop statistics (missed frames, WKC errors,
+        round-trip estimate, current receive timeout, worst cycle time, ring
+        health and failover timing).
+        """
+        return replace(self._cycle_stats)
+
     # -------------------- Motor command / state API --------------------------
 
     def set_motor_goals(
@@ -154,6 +351,8 @@ class MerlinMaster_v1:
             cmd.goal_velocity = float(goal_velocity)
         if goal_position is not None:
             cmd.goal_position = float(goal_position)
+        if self._safety is not None:
+            self._safety.feed()
 
     def get_motor_state(self, motor_idx: int) -> MotorState:
         """
@@ -161,14 +360,596 @@ class MerlinMaster_v1:
         """
         self._check_motor_index(motor_idx)
         # Return a copy to avoid accidental modification.
-        state = self._states[motor_idx]
-        return MotorState(**vars(state))
+        n = len(MotorState.FIELDS)
+        return MotorState.view(self._state_buf[motor_idx * n:(motor_idx + 1) * n], 0)
+
+    def get_all_states(self) -> MotorStateFrame:
+        """
+        Return the last received state for all motors: a sequence of MotorState
+        views over one copied float32 buffer (all from the same frame).
+        """
+        return MotorStateFrame(self._state_buf[:])
+
+    # -------------------- State broadcast ----------------------------------
 
-    def get_all_states(self) -> List[MotorState]:
+    def start_broadcast(
+        self,
+        shm_name: Optional[str] = "merlin_hand_states",
+        socket_path: Optional[str] = None,
+        capacity: int = 1024,
+        replace: bool = False,
+    ) -> None:
+        """
+        Publish every received frame for other local processes (see
+        MerlinStateBroadcast.MerlinStateClient):
+
+        - into a shared-memory ring `shm_name` (zero-copy NumPy readers), and/or
+        - as Unix datagrams to clients subscribed on `socket_path`.
+
+        :param capacity: Frames kept in the shared-memory ring.
+        :param replace: Take over a shared-memory segment / socket of the same
+                        name left behind by another (crashed) master; otherwise
+                        an existing one raises FileExistsError.
+        """
+        from .MerlinStateBroadcast import StateDatagramPublisher, StateRingWriter
+
+        self.stop_broadcast()
+        ring = StateRingWriter(shm_name, self._num_motors, capacity, replace=replace) if shm_name else None
+        try:
+            dgram = StateDatagramPublisher(socket_path, replace=replace) if socket_path else None
+        except BaseException:
+            if ring is not None:
+                ring.close()
+            raise
+        self._broadcast_seq = 0
+        self._state_dgram = dgram
+        self._state_ring = ring
+
+    def stop_broadcast(self) -> None:
+        """Stop publishing and remove the shared memory / socket."""
+        ring, dgram = self._state_ring, self._state_dgram
+        self._state_ring = None
+        self._state_dgram = None
+        if ring is not None or dgram is not None:
+            self._wait_for_cycle()
+        if ring is not None:
+            ring.close()
+        if dgram is not None:
+            dgram.close()
+
+    # -------------------- Command server -----------------------------------
+
+    def start_command_server(self, path: str = "/tmp/merlin_hand_cmd.sock", lease_s: float = 0.1,
+                             replace: bool = False):
+        """
+        Accept command batches from other local processes
+        (MerlinCommandServer.MerlinCommandClient) on a Unix datagram socket;
+        accepted commands go out in the next frame.
+
+        :param lease_s: Time after which a silent client loses its motors.
+        :param replace: Take over a socket left behind by another (crashed)
+                        master; otherwise an existing one raises FileExistsError.
+        :return: The server (ownership, counters, `latency_stats()`).
         """
-        Return the last received state for all motors.
+        from .MerlinCommandServer import MerlinCommandServer
+
+        self.stop_command_server()
+        server = MerlinCommandServer(path, self._num_motors, lease_s=lease_s, replace=replace)
+        self._command_server = server
+        self._add_output_stage(self._command_server_stage)
+        return server
+
+    def stop_command_server(self) -> None:
+        server = self._command_server
+        if server is None:
+            return
+        self._remove_output_stage(self._command_server_stage)
+        self._command_server = None
+        self._wait_for_cycle()
+        server.close()
+
+    # -------------------- Metrics ------------------------------------------
+
+    def enable_metrics(
+        self,
+        window_s: float = 1.0,
+        http_port: Optional[int] = None,
+        jsonl_path: Optional[str] = None,
+        http_host: str = "127.0.0.1",
+    ):
+        """
+        Aggregate cycle health and motor telemetry into `window_s` summaries
+        (see MerlinMetrics) and export them.
+
+        :param http_port: Serve Prometheus text format on http://http_host:http_port/metrics.
+        :param jsonl_path: Append one JSON line per window to this file.
+        :return: The MetricsAggregator (`latest` holds the last summary).
+        """
+        from .MerlinMetrics import JsonLinesSink, MetricsAggregator, PrometheusServer
+
+        self.disable_metrics()
+        aggregator = MetricsAggregator(self._num_motors, window_s=window_s, cycle_time_s=self._cycle_time_s)
+        outputs: List = []
+        if jsonl_path is not None:
+            sink = JsonLinesSink(jsonl_path)
+            aggregator.sinks.append(sink)
+            outputs.append(sink)
+        if http_port is not None:
+            outputs.append(PrometheusServer(aggregator, http_port, http_host))
+        self._ensure_in_records()
+        self._metrics_outputs = outputs
+        self._metrics = aggregator
+        return aggregator
+
+    def disable_metrics(self) -> None:
+        aggregator, outputs = self._metrics, self._metrics_outputs
+        self._metrics = None
+        self._metrics_outputs = []
+        if aggregator is not None:
+            aggregator.close()
+        for output in outputs:
+            output.close()
+
+    # -------------------- Latency probe ------------------------------------
+
+    def start_latency_probe(self, **kwargs):
+        """
+        Measure "command issued -> effect visible in the TxPDO" with tagged
+        command values (see MerlinLatency). Only run it with the slave in echo
+        mode (or a SimSlave(echo=True)): the probed goal field is overwritten.
+
+        :param kwargs: LatencyProbe options (motors, field, echo_field, interval_cycles, ...).
+        :return: The LatencyProbe; `summary()` gives the distribution.
+        """
+        from .MerlinLatency import LatencyProbe
+
+        self.stop_latency_probe()
+        probe = LatencyProbe(self._num_motors, **kwargs)
+        self._ensure_in_records()
+        self._latency_probe = probe
+        self._add_output_stage(self._latency_probe_stage)
+        return probe
+
+    def stop_latency_probe(self):
+        """Remove the probe; returns it (or None) for a final `summary()`."""
+        probe = self._latency_probe
+        if probe is not None:
+            self._remove_output_stage(self._latency_probe_stage)
+            self._latency_probe = None
+        return probe
+
+    # -------------------- Recording ----------------------------------------
+
+    def start_recording(self, path: str, chunk_cycles: int = 1000, codec: str = "zlib", level: int = 1):
+        """
+        Record every received cycle (timestamp, cycle number, WKC, the RxPDO
+        image of the last packed frame and the TxPDO) into a chunked, compressed
+        file (see MerlinRecording; read it back with RecordingReader).
+
+        Compression and file writes run on a worker thread.
+
+        :return: The RecordingWriter (`dropped_cycles` counts cycles lost to a slow disk).
+        """
+        from .MerlinRecording import RecordingWriter
+
+        self.stop_recording()
+        self._recorder = RecordingWriter(path, self._num_motors, chunk_cycles=chunk_cycles,
+                                         codec=codec, level=level)
+        return self._recorder
+
+    def stop_recording(self) -> None:
+        """Finish the recording (flushes the last chunk and writes the index)."""
+        recorder = self._recorder
+        self._recorder = None
+        if recorder is not None:
+            self._wait_for_cycle()
+            recorder.close()
+
+    # -------------------- Fault events -------------------------------------
+
+    def enable_fault_events(self, **params):
+        """
+        Extract fault events (error_status bits, over-temperature, undervoltage,
+        WKC loss) from every cycle; see MerlinFaults.
+
+        :param params: FaultEventExtractor thresholds (`expected_wkc` defaults to the bus's).
+        :return: The FaultEventExtractor; `index()` returns the events so far.
+        """
+        from .MerlinFaults import FaultEventExtractor
+
+        if self._connected:
+            params.setdefault("expected_wkc", self._master.expected_wkc)
+        self._ensure_in_records()
+        self._fault_events = FaultEventExtractor(self._num_motors, **params)
+        return self._fault_events
+
+    def disable_fault_events(self) -> None:
+        self._fault_events = None
+
+    def get_fault_index(self):
+        """Snapshot of the events extracted so far (a MerlinFaults.FaultIndex)."""
+        if self._fault_events is None:
+            raise RuntimeError("Fault events are not enabled; call enable_fault_events() first")
+        return self._fault_events.index()
+
+    # -------------------- Filtered / derived states -------------------------
+
+    def enable_filters(self, bank=None):
+        """
+        Evaluate a `MerlinFilters.FilterBank` on every received frame.
+
+        A filter that raises detaches the bank (the exception is logged and
+        kept in `hook_errors['filters']`); the PDO loop keeps running.
+
+        :param bank: Bank to use; a new empty one is created if omitted.
+        :return: The active bank; add filters to it with `bank.add(...)`.
+        """
+        from .MerlinFilters import FilterBank
+
+        if bank is None:
+            bank = FilterBank(self._num_motors)
+        self._ensure_in_records()
+        self._filters = bank
+        return bank
+
+    def disable_filters(self) -> None:
+        self._filters = None
+
+    @property
+    def filters(self):
+        """Active FilterBank, or None. The in-loop controller may read `filters.outputs`."""
+        return self._filters
+
+    def get_filtered_states(self) -> Dict:
+        """
+        Return a copy of all filter outputs ({name: per-motor array}), updated
+        in the same cycle as `get_all_states()`.
+        """
+        if self._filters is None:
+            raise RuntimeError("Filters are not enabled; call enable_filters() first")
+        return self._filters.snapshot()
+
+    # -------------------- Calibration ----------------------------------------
+
+    def enable_calibration(self, table):
+        """
+        Convert between raw motor values and joint values every cycle with a
+        per-motor `MerlinCalibration.CalibrationTable` (offset, sign, gear
+        scale, torque constant, joint limits).
+
+        Each received frame's present_iq / present_velocity / present_position
+        are converted in one array operation right after decoding, so filters,
+        the controller and `get_calibrated_states()` see the same frame. Goals
+        set with `set_joint_goals()` are converted back when the outputs are
+        packed. Raw values stay available through `get_all_states()` and
+        `set_motor_goals()`.
+
+        :param table: CalibrationTable, or the path of a CSV table (see `CalibrationTable.load`).
+        :return: The active table.
+        """
+        import numpy as np
+        from .MerlinCalibration import CalibrationTable, raw_command_view, raw_state_view
+
+        if not isinstance(table, CalibrationTable):
+            table = CalibrationTable.load(table, num_motors=self._num_motors)
+        if table.num_motors != self._num_motors:
+            raise ValueError(f"calibration table has {table.num_motors} motors, master has {self._num_motors}")
+        self.disable_calibration()
+        self._calib_raw_states = raw_state_view(self._state_buf, self._num_motors)
+        self._calib_raw_commands = raw_command_view(self._out_buf, self._num_motors)
+        calibrated = np.zeros((self._num_motors, 3), dtype=np.float32)
+        table.decode_into(self._calib_raw_states, calibrated)
+        self._calibrated = calibrated
+        self._joint_goals = np.zeros((self._num_motors, 3), dtype=np.float32)
+        self._joint_goal_mask = np.zeros((self._num_motors, 3), dtype=bool)
+        self._calibration = table
+        self._add_output_stage(self._calibration_stage)
+        return table
+
+    def disable_calibration(self) -> None:
+        """Stop converting; joint goals are dropped and raw goals apply again."""
+        if self._calibration is None:
+            return
+        self._remove_output_stage(self._calibration_stage)
+        self._calibration = None
+
+    @property
+    def calibration(self):
+        """Active CalibrationTable, or None."""
+        return self._calibration
+
+    @property
+    def calibrated_states(self):
+        """
+        (num_motors, 3) float32 joint torque / velocity / position of the frame
+        being processed, for the in-loop controller (read it, do not keep it).
+        """
+        return self._calibrated
+
+    def get_calibrated_states(self):
+        """
+        Copy of the joint values of the last received frame as a (num_motors,)
+        JOINT_DTYPE array (torque, velocity, position).
+        """
+        from .MerlinCalibration import JOINT_DTYPE
+
+        if self._calibration is None:
+            raise RuntimeError("Calibration is not enabled; call enable_calibration() first")
+        return self._calibrated.copy().view(JOINT_DTYPE).reshape(self._num_motors)
+
+    def set_joint_goals(
+        self,
+        motor_idx: Optional[int] = None,
+        *,
+        torque: Optional[float] = None,
+        velocity: Optional[float] = None,
+        position: Optional[float] = None,
+    ) -> None:
         """
-        return [MotorState(**vars(s)) for s in self._states]
+        Set goals in joint units; they are converted through the calibration
+        table (positions clipped to the joint limits) and override the raw
+        goal_iq / goal_velocity / goal_position of that motor from the next cycle.
+
+        :param motor_idx: Motor index, or None to pass one value per motor in each argument.
+        """
+        if self._calibration is None:
+            raise RuntimeError("Calibration is not enabled; call enable_calibration() first")
+        if motor_idx is None:
+            motors = slice(None)
+        else:
+            self._check_motor_index(motor_idx)
+            motors = motor_idx
+        for column, value in enumerate((torque, velocity, position)):
+            if value is not None:
+                self._joint_goals[motors, column] = value
+                self._joint_goal_mask[motors, column] = True
+        if self._safety is not None:
+            self._safety.feed()
+
+    def _calibration_stage(self, records, now: float) -> None:
+        calibration = self._calibration
+        if calibration is not None:
+            calibration.encode_into(self._joint_goals, self._joint_goal_mask, self._calib_raw_commands)
+
+    # -------------------- Trajectory interpolation ---------------------------
+
+    def enable_interpolation(self, order: int = 3, feedforward_velocity: bool = False) -> None:
+        """
+        Generate `goal_position` for all motors every cycle from waypoints pushed
+        with `push_waypoints()` (cubic or quintic splines, see MerlinInterpolator).
+
+        Starts by holding the currently commanded positions. While enabled,
+        `goal_position` passed to `set_motor_goals` is ignored.
+
+        :param order: 3 (cubic) or 5 (quintic).
+        :param feedforward_velocity: Also write the spline velocity to `goal_velocity`.
+        """
+        from .MerlinInterpolator import TrajectoryInterpolator
+
+        interp = TrajectoryInterpolator(self._num_motors, order)
+        interp.reset(self._now(), [cmd.goal_position for cmd in self._commands])
+        self._interp_ff_velocity = feedforward_velocity
+        self._interpolator = interp
+        self._add_output_stage(self._interpolation_stage)
+
+    def disable_interpolation(self) -> None:
+        """Stop interpolating; the last interpolated positions become the goals."""
+        if self._interpolator is None:
+            return
+        # Goals first, then the stage: the PDO thread may pack a frame in
+        # between, and must never send the goals from before interpolation.
+        positions = [cmd.goal_position for cmd in self._commands]
+        self._interpolator.evaluate(self._now(), positions)
+        for cmd, pos in zip(self._commands, positions):
+            cmd.goal_position = float(pos)
+        self._remove_output_stage(self._interpolation_stage)
+        self._interpolator = None
+
+    def push_waypoints(self, t: float, positions: Sequence[float],
+                       velocities: Optional[Sequence[float]] = None) -> None:
+        """
+        Queue a waypoint for all motors.
+
+        :param t: Time the positions should be reached (`now()` seconds, i.e. `time.monotonic()`).
+        :param positions: One position per motor; NaN keeps a motor's previous waypoint.
+        :param velocities: Optional velocity per motor at the waypoint.
+        """
+        if self._interpolator is None:
+            raise RuntimeError("Interpolation is not enabled; call enable_interpolation() first")
+        self._interpolator.push_waypoints(t, positions, velocities)
+        if self._safety is not None:
+            self._safety.feed()
+
+    # -------------------- In-loop controller ---------------------------------
+
+    def set_controller(
+        self,
+        controller: Callable,
+        budget_us: Optional[float] = None,
+        max_consecutive_overruns: Optional[int] = 10,
+    ) -> None:
+        """
+        Run `controller(t, states, commands)` inside the PDO thread, right after
+        each received frame is decoded, so its output goes out in the next frame.
+
+        - `t`: `now()` at the call.
+        - `states`: (num_motors,) TXPDO_DTYPE array of the frame just received (read only).
+        - `commands`: (num_motors,) RXPDO_DTYPE array prefilled with the goals from
+          `set_motor_goals` (and interpolation); edit it in place.
+
+        A call that raises or takes longer than the budget is discarded and the
+        previous accepted commands are re-sent (hold last command). After
+        `max_consecutive_overruns` such cycles in a row the controller is
+        detached and its last accepted commands become the regular goals.
+
+        The budget is checked after the call returns: a slow controller is not
+        interrupted, so it still delays that cycle (and can push the loop into
+        an overrun); only its output is dropped.
+
+        In pipelined mode the commands are sent one cycle later, because the
+        next frame is already on the wire when the inputs are decoded.
+
+        :param budget_us: Per-cycle time budget (default: 25 % of the cycle time).
+        :param max_consecutive_overruns: Detach limit, or None to never detach.
+        """
+        import numpy as np
+        from .MerlinPdoLayout import RXPDO_DTYPE
+
+        self._ensure_out_records()
+        self._ensure_in_records()
+        self.clear_controller()
+        self._ctrl_commands = np.zeros(self._num_motors, dtype=RXPDO_DTYPE)
+        # Filled with the current outputs by the PDO thread before the first call.
+        self._ctrl_hold = np.zeros(self._num_motors, dtype=RXPDO_DTYPE)
+        self._ctrl_primed = False
+
+        if budget_us is None:
+            budget_us = 0.25 * self._cycle_time_s * 1e6
+        self._controller_budget_s = budget_us * 1e-6
+        self._controller_max_overruns = max_consecutive_overruns
+        self._controller_consecutive_overruns = 0
+        self._controller_error = None
+        self._cycle_stats.controller_detached = False
+        self._controller = controller
+
+    def clear_controller(self) -> None:
+        """Remove the in-loop controller; its last accepted commands become the goals."""
+        if self._controller is None:
+            return
+        # Goals first: once `_controller` is None the next frame is packed from `_cmd_buf`.
+        if self._ctrl_primed:
+            self._cmd_buf[:] = self._ctrl_hold.tobytes()
+        self._controller = None
+
+    @property
+    def controller_error(self) -> Optional[BaseException]:
+        """Last exception raised by the in-loop controller, if any."""
+        return self._controller_error
+
+    @property
+    def hook_errors(self) -> Dict[str, BaseException]:
+        """
+        Exceptions that disabled a feature on the PDO thread, by feature
+        ('filters': the filter bank was detached; 'processdata': the loop stopped).
+        """
+        return dict(self._hook_errors)
+
+    # -------------------- Slow tasks ---------------------------------------
+
+    def add_task(
+        self,
+        name: str,
+        fn: Callable[[float], None],
+        period_s: float,
+        budget_us: Optional[float] = None,
+        priority: int = 0,
+        max_consecutive_overruns: Optional[int] = 10,
+    ):
+        """
+        Run `fn(now)` every `period_s` on the PDO thread, in the slack between
+        the end of a cycle and the next deadline (see MerlinScheduler). Meant
+        for 10-100 Hz diagnostics: temperature and voltage checks, logging,
+        config read-backs split into short steps. The task sees the state
+        buffers between two cycles, so nothing changes under it.
+
+        A task starts only if its budget fits before the deadline; otherwise
+        it is deferred to the next cycle. In lockstep mode tasks run after
+        every `step()` cycle, and their budgets are not enforced.
+
+        :param budget_us: Worst-case run time (default: 10 % of the cycle time).
+        :param priority: Higher runs first when several tasks are due.
+        :param max_consecutive_overruns: Detach after this many runs over budget in a row, or None.
+        :return: The task's live TaskStats.
+        """
+        from .MerlinScheduler import SlackScheduler
+
+        if self._scheduler is None:
+            # Through the attribute: lockstep replaces `_perf` at connect().
+            self._scheduler = SlackScheduler(clock=lambda: self._perf())
+        if budget_us is None:
+            budget_us = 0.1 * self._cycle_time_s * 1e6
+        return self._scheduler.add(name, fn, period_s, budget_us, priority, max_consecutive_overruns)
+
+    def remove_task(self, name: str) -> None:
+        """Unregister a task added with `add_task`."""
+        if self._scheduler is None:
+            raise KeyError(name)
+        self._scheduler.remove(name)
+
+    def get_task_stats(self) -> Dict:
+        """Snapshot of the TaskStats of every task, by name."""
+        if self._scheduler is None:
+            return {}
+        return {name: replace(stats) for name, stats in self._scheduler.stats().items()}
+
+    # -------------------- Safety stage -------------------------------------
+
+    def enable_safety(self, limiter=None, **limits):
+        """
+        Apply a `MerlinSafety.SafetyLimiter` to the outgoing commands every cycle,
+        after interpolation and the in-loop controller.
+
+        `set_motor_goals`, `push_waypoints` and accepted controller cycles feed its
+        watchdog.
+
+        :param limiter: Limiter to use; if omitted one is built from `limits`
+                        (keyword arguments of `SafetyLimiter`).
+        :return: The active limiter (its limit tables can be edited in place).
+        """
+        from .MerlinSafety import SafetyLimiter
+
+        if limiter is None:
+            limiter = SafetyLimiter(self._num_motors, **limits)
+        elif limits:
+            raise ValueError("pass either a limiter or limit keyword arguments, not both")
+        self._ensure_out_records()
+        self._ensure_in_records()
+        limiter.reset([state.present_position for state in self._states])
+        limiter.feed()
+        self._safety = limiter
+        return limiter
+
+    def disable_safety(self) -> None:
+        """Stop limiting the outgoing commands."""
+        self._safety = None
+
+    @property
+    def safety(self):
+        """Active SafetyLimiter, or None."""
+        return self._safety
+
+    # -------------------- EEPROM programming ---------------------------------
+
+    def program_eeprom(
+        self,
+        image: bytes,
+        slave_positions: Optional[Sequence[int]] = None,
+        verify: bool = True,
+    ) -> Dict[int, EepromWriteResult]:
+        """
+        Write an SII EEPROM image into one or more slaves on this connection.
+
+        Unchanged words are skipped and the result is verified by read-back
+        (`checksum_ok` reports the SII header checksum of what was read back).
+        The new image only takes effect after the slave is power-cycled.
+
+        EEPROM access and process data must not share the bus: the PDO loop is
+        stopped while programming and restarted afterwards, so the slave's
+        process-data watchdog may trip in between.
+
+        :param slave_positions: Slaves to program (default: this master's `slave_pos`).
+        :raises RuntimeError: The PDO thread did not stop.
+        """
+        if slave_positions is None:
+            slave_positions = [self._slave_pos]
+        self._connected_slave()
+        writer = MerlinEepromWriter(self._master)
+        resume = self._pause_processdata_loop()
+        try:
+            return writer.program(image, slave_positions, verify=verify)
+        finally:
+            if resume:
+                self._start_processdata_loop()
 
     # -------------------- Generic SDO access (configuration) -----------------
 
@@ -176,7 +957,7 @@ class MerlinMaster_v1:
         """
         Read an unsigned 32‑bit configuration value via SDO.
         """
-        slave = self._master.slaves[self._slave_pos]
+        slave = self._connected_slave()
         data = slave.sdo_read(index=index, subindex=subindex)
         return struct.unpack("<I", data)[0]
 
@@ -184,7 +965,7 @@ class MerlinMaster_v1:
         """
         Write an unsigned 32‑bit configuration value via SDO.
         """
-        slave = self._master.slaves[self._slave_pos]
+        slave = self._connected_slave()
         data = struct.pack("<I", int(value))
         slave.sdo_write(index=index, subindex=subindex, data=data, ca=complete_access)
 
@@ -192,7 +973,7 @@ class MerlinMaster_v1:
         """
         Read a 32‑bit float configuration value via SDO.
         """
-        slave = self._master.slaves[self._slave_pos]
+        slave = self._connected_slave()
         data = slave.sdo_read(index=index, subindex=subindex)
         return struct.unpack("<f", data)[0]
 
@@ -200,7 +981,7 @@ class MerlinMaster_v1:
         """
         Write a 32‑bit float configuration value via SDO.
         """
-        slave = self._master.slaves[self._slave_pos]
+        slave = self._connected_slave()
         data = struct.pack("<f", float(value))
         slave.sdo_write(index=index, subindex=subindex, data=data, ca=complete_access)
 
@@ -212,11 +993,20 @@ class MerlinMaster_v1:
         if not (0 <= idx < self._num_motors):
             raise IndexError(f"motor_idx {idx} out of range [0, {self._num_motors - 1}]")
 
+    def _connected_slave(self):
+        if not self._connected:
+            raise RuntimeError("Master is not connected; call connect() first")
+        return self._master.slaves[self._slave_pos]
+
     def _open_and_configure(self) -> None:
         """
         Open the adapter, discover and configure slaves, map PDOs, and go to OP state.
         """
         self._master.open(self._ifname, self._ifname_red)
+        if self._ifname_red is not None or hasattr(self._master, "rx_path"):
+            from .MerlinRedundancy import RingMonitor
+
+            self._ring_monitor = RingMonitor(redundant=self._ifname_red is not None)
 
         # Discover/config slaves.
         if not self._master.config_init() > 0:
@@ -239,7 +1029,7 @@ class MerlinMaster_v1:
         # PREOP -> SAFEOP, apply any config_func hooks.
         self._master.config_map()
 
-        if self._master.state_check(pysoem.SAFEOP_STATE, timeout=50_000) != pysoem.SAFEOP_STATE:
+        if self._master.state_check(SAFEOP_STATE, timeout=50_000) != SAFEOP_STATE:
             self._master.close()
             raise RuntimeError("Not all slaves reached SAFEOP state")
 
@@ -248,17 +1038,52 @@ class MerlinMaster_v1:
         # sync0_cycle_time is in ns; approximate from cycle_time_s.
         sync0_cycle_time_ns = int(self._cycle_time_s * 1e9)
         slave.dc_sync(act=True, sync0_cycle_time=sync0_cycle_time_ns)
+        if self._dc_sync_control:
+            from .MerlinDcSync import DcSyncController
+
+            lead_ns = sync0_cycle_time_ns // 2 if self._dc_lead_us is None else int(self._dc_lead_us * 1e3)
+            self._dc_controller = DcSyncController(sync0_cycle_time_ns, lead_ns)
 
         # SAFEOP -> OP
-        self._master.state = pysoem.OP_STATE
+        self._master.state = OP_STATE
         self._master.write_state()
 
-        if self._master.state_check(pysoem.OP_STATE, timeout=50_000) != pysoem.OP_STATE:
+        if self._master.state_check(OP_STATE, timeout=50_000) != OP_STATE:
             self._master.close()
             raise RuntimeError("Not all slaves reached OP state")
 
         self._master.in_op = True
 
+    def _setup_lockstep(self) -> None:
+        """Create the simulated backend if needed and put it on a virtual clock."""
+        from .MerlinLockstep import VirtualClock
+
+        if self._master is None:
+            from .MerlinSimSlave import SimMaster
+
+            self._master = SimMaster(num_motors=self._num_motors, seed=0)
+        if not hasattr(self._master, "set_clock"):
+            raise RuntimeError("lockstep mode needs a simulated backend with set_clock() "
+                               "(e.g. MerlinSimSlave.SimMaster)")
+        clock = VirtualClock()
+        self._master.set_clock(clock)
+        self._virtual_clock = clock
+        self._now = clock.now
+        self._perf = clock.now
+
+    def _pause_processdata_loop(self) -> bool:
+        """Stop the background PDO thread, if running; True if it was."""
+        thread = self._pd_thread
+        if thread is None:
+            return False
+        self._pd_thread_stop_event.set()
+        thread.join(timeout=1.0)
+        if thread.is_alive():
+            raise RuntimeError("PDO thread did not stop; EEPROM access refused")
+        self._pd_thread = None
+        self._pd_thread_stop_event.clear()
+        return True
+
     def _start_processdata_loop(self) -> None:
         """Start background thread for continuous PDO exchange."""
         self._pd_thread = threading.Thread(
@@ -266,73 +1091,316 @@ class MerlinMaster_v1:
         )
         self._pd_thread.start()
 
+    def _ensure_out_records(self):
+        """NumPy structured view (RXPDO_DTYPE) of the packed output image."""
+        if self._out_records is None:
+            import numpy as np
+            from .MerlinPdoLayout import RXPDO_DTYPE
+
+            self._out_records = np.frombuffer(self._out_buf, dtype=RXPDO_DTYPE)
+        return self._out_records
+
+    def _ensure_in_records(self):
+        """NumPy structured view (TXPDO_DTYPE) of the last received inputs."""
+        if self._in_records is None:
+            import numpy as np
+            from .MerlinPdoLayout import TXPDO_DTYPE
+
+            records = np.frombuffer(self._state_buf, dtype=TXPDO_DTYPE)
+            self._in_records_ro = records.view()
+            self._in_records_ro.flags.writeable = False
+            self._in_records = records
+        return self._in_records
+
+    def _add_output_stage(self, stage: Callable) -> None:
+        """
+        Register `stage(records, now)`, called every cycle after packing with the
+        RxPDO records (NumPy view, edited in place) and `now()`.
+        """
+        self._ensure_out_records()
+        if stage not in self._output_stages:
+            self._output_stages = self._output_stages + [stage]
+
+    def _remove_output_stage(self, stage: Callable) -> None:
+        self._output_stages = [s for s in self._output_stages if s != stage]
+
+    def _command_server_stage(self, records, now: float) -> None:
+        server = self._command_server
+        if server is not None and server.apply(records, now) and self._safety is not None:
+            self._safety.feed()
+
+    def _latency_probe_stage(self, records, now: float) -> None:
+        probe = self._latency_probe
+        if probe is not None:
+            # Outputs packed now go out with the next cycle's frame.
+            probe.on_outputs(records, now, self._cycle_stats.cycles + 1)
+
+    def _interpolation_stage(self, records, now: float) -> None:
+        interp = self._interpolator
+        if interp is not None:
+            velocity = records["goal_velocity"] if self._interp_ff_velocity else None
+            interp.evaluate(now, records["goal_position"], velocity)
+
+    def _pack_outputs(self, slave) -> None:
+        """Pack the current commands into the slave RxPDO (output buffer)."""
+        # With a controller attached, `_run_controller` has already written the outputs
+        # (once it has run).
+        if self._controller is None or not self._ctrl_primed:
+            self._fill_outputs()
+        if self._safety is not None:
+            self._safety.apply(self._out_records, self._in_records_ro, self._now())
+
+        if self._compact_encoder is not None:
+            self._compact_encoder.load_records(self._out_records)
+            slave.output = self._compact_encoder.encode()
+            self._cycle_stats.compact_saturated_fields = self._compact_encoder.saturated_fields
+        else:
+            slave.output = bytes(self._out_buf)
+
+    def _fill_outputs(self) -> None:
+        """Copy the command image into `_out_buf` and apply the output stages."""
+        self._out_buf[:] = self._cmd_buf
+
+        stages = self._output_stages
+        if stages:
+            now = self._now()
+            for stage in stages:
+                stage(self._out_records, now)
+
+    def _run_controller(self) -> None:
+        """Run the in-loop controller on the inputs just received (see `set_controller`)."""
+        controller = self._controller
+        stats = self._cycle_stats
+        self._fill_outputs()
+        if not self._ctrl_primed:
+            self._ctrl_hold[...] = self._out_records
+            self._ctrl_primed = True
+        commands = self._ctrl_commands
+        commands[...] = self._out_records
+
+        t0 = self._perf()
+        try:
+            controller(self._now(), self._in_records_ro, commands)
+            ok = True
+        except Exception as exc:
+            self._controller_error = exc
+            stats.controller_errors += 1
+            ok = False
+        elapsed = self._perf() - t0
+
+        stats.controller_runs += 1
+        stats.controller_time_us = elapsed * 1e6
+        stats.controller_time_max_us = max(stats.controller_time_max_us, stats.controller_time_us)
+        if ok and elapsed > self._controller_budget_s:
+            stats.controller_overruns += 1
+            ok = False
+
+        if ok:
+            self._ctrl_hold[...] = commands
+            self._controller_consecutive_overruns = 0
+            if self._safety is not None:
+                self._safety.feed()
+        else:
+            self._controller_consecutive_overruns += 1
+        self._out_records[...] = self._ctrl_hold
+
+        limit = self._controller_max_overruns
+        if limit is not None and self._controller_consecutive_overruns >= limit:
+            stats.controller_detached = True
+            self.clear_controller()
+
+    def _unpack_inputs(self, slave) -> None:
+        """Copy the slave TxPDO (input buffer) into the state buffer."""
+        in_buf = slave.input
+        nbytes = len(self._state_bytes)
+        if len(in_buf) < nbytes:
+            return
+        self._state_bytes[:] = memoryview(in_buf)[:nbytes]
+
+    def _publish_states(self, in_buf) -> None:
+        if len(in_buf) < self._num_motors * self._TXPDO_STRUCT.size:
+            return
+        in_buf = memoryview(in_buf)[: self._num_motors * self._TXPDO_STRUCT.size]
+        now = self._now()
+        self._broadcast_seq += 1
+        ring, dgram = self._state_ring, self._state_dgram
+        if ring is not None:
+            ring.publish(in_buf, now, self._actual_wkc)
+        if dgram is not None:
+            dgram.publish(in_buf, self._broadcast_seq, now, self._actual_wkc)
+
+    def _wait_for_cycle(self) -> None:
+        """
+        Return once no PDO cycle is in progress. A feature detached (attribute
+        set to None / stage removed) before this call is not used afterwards,
+        so it can be closed. Re-entrant from the PDO thread itself.
+        """
+        with self._cycle_lock:
+            pass
+
+    def _hook_failed(self, name: str, exc: BaseException, consequence: str) -> None:
+        """Record and log an exception raised on the PDO thread by `name`."""
+        self._hook_errors[name] = exc
+        self._cycle_stats.hook_errors += 1
+        _log.error("PDO thread: %s raised; %s", name, consequence, exc_info=exc)
+
+    def _account_rx(self, wkc: int, rx_wait_s: float) -> bool:
+        """
+        Update cycle statistics and the adaptive receive timeout.
+
+        :return: True if the frame came back and the inputs should be decoded.
+        """
+        stats = self._cycle_stats
+        stats.cycles += 1
+        if wkc <= 0:
+            # No frame within the timeout: count it and move on to the next cycle.
+            stats.missed_frames += 1
+            if self._fixed_rx_timeout_us is None:
+                # Back off (RFC 6298): a timeout that became too short would
+                # otherwise miss every frame, and misses never update the RTT.
+                stats.rx_timeout_us = min(2 * stats.rx_timeout_us, self._rx_timeout_max_us)
+            return False
+        if wkc != self._master.expected_wkc:
+            stats.wkc_errors += 1
+
+        rtt_us = rx_wait_s * 1e6
+        stats.rtt_max_us = max(stats.rtt_max_us, rtt_us)
+        if stats.rtt_mean_us == 0.0:
+            stats.rtt_mean_us = rtt_us
+            stats.rtt_jitter_us = rtt_us / 2
+        else:
+            # RFC 6298-style smoothed RTT and mean deviation.
+            err = rtt_us - stats.rtt_mean_us
+            stats.rtt_mean_us += err / 8
+            stats.rtt_jitter_us += (abs(err) - stats.rtt_jitter_us) / 4
+
+        if self._fixed_rx_timeout_us is None:
+            timeout = stats.rtt_mean_us + max(4 * stats.rtt_jitter_us, self._RX_TIMEOUT_GRANULARITY_US)
+            stats.rx_timeout_us = int(min(max(timeout, self._RX_TIMEOUT_MIN_US), self._rx_timeout_max_us))
+        return True
+
+    def _prime_processdata(self, slave) -> None:
+        """Pipelined mode: put the first frame on the wire before the first cycle."""
+        if self._pipelined:
+            self._pack_outputs(slave)
+            self._master.send_processdata()
+
+    def _run_cycle(self, slave) -> bool:
+        """
+        One PDO cycle:
+        - Packs commands and sends the frame
+        - Receives with a bounded (adaptive) timeout; a late or lost frame is
+          counted as a miss instead of stalling the loop
+        - Copies the inputs into the state buffer and updates the filter bank
+        - Runs the in-loop controller, if any, to compute the next outputs
+
+        In pipelined mode the frame for cycle N+1 is sent right after frame N
+        is received, before N is decoded, so decoding overlaps the wire time.
+
+        :return: True if the frame came back.
+        """
+        stats = self._cycle_stats
+        perf = self._perf
+        cycle_start = perf()
+
+        if not self._pipelined:
+            self._pack_outputs(slave)
+            self._master.send_processdata()
+
+        rx_start = perf()
+        self._actual_wkc = self._master.receive_processdata(timeout=stats.rx_timeout_us)
+        rx_wait_s = perf() - rx_start
+
+        if self._pipelined:
+            self._pack_outputs(slave)
+            self._master.send_processdata()
+
+        received = self._account_rx(self._actual_wkc, rx_wait_s)
+        if self._compact_encoder is not None and self._actual_wkc != self._master.expected_wkc:
+            # The slave may have missed a delta: resynchronize with the next frame.
+            self._compact_encoder.request_keyframe()
+        if self._ring_monitor is not None:
+            self._ring_monitor.update(stats, self._now(), self._actual_wkc, self._master.expected_wkc,
+                                      getattr(self._master, "rx_path", None))
+        self._dc_correction_s = 0.0
+        if received and self._dc_controller is not None:
+            self._dc_correction_s = self._dc_controller.update(getattr(self._master, "dc_time", 0))
+        if received:
+            self._unpack_inputs(slave)
+            if self._calibration is not None:
+                self._calibration.decode_into(self._calib_raw_states, self._calibrated)
+            if self._state_ring is not None or self._state_dgram is not None:
+                self._publish_states(slave.input)
+            if self._recorder is not None:
+                self._recorder.append(self._now(), stats.cycles, self._actual_wkc, self._out_buf, slave.input)
+            if self._filters is not None:
+                try:
+                    self._filters.update(self._in_records_ro, self._now())
+                except Exception as exc:
+                    # User filter code must not stop the bus: drop the bank instead.
+                    self._filters = None
+                    self._hook_failed("filters", exc, "filter bank detached")
+            if self._controller is not None:
+                self._run_controller()
+
+        probe = self._latency_probe
+        if probe is not None:
+            probe.on_inputs(self._in_records_ro if received else None, self._now(), stats.cycles)
+        faults = self._fault_events
+        if faults is not None:
+            faults.update(self._now(), stats.cycles, self._actual_wkc, self._in_records_ro if received else None)
+
+        cycle_us = (perf() - cycle_start) * 1e6
+        stats.last_cycle_time_us = cycle_us
+        stats.cycle_time_max_us = max(stats.cycle_time_max_us, cycle_us)
+        metrics = self._metrics
+        if metrics is not None:
+            if received:
+                metrics.record(self._in_records_ro, cycle_us, rx_wait_s * 1e6, stats, self._now(),
+                               cycle_start=cycle_start)
+            else:
+                metrics.record(None, cycle_us, None, stats, self._now(), cycle_start=cycle_start)
+        return received
+
     def _processdata_thread(self) -> None:
         """
-        Background thread:
-        - Packs current MotorCommand list into the slave RxPDO (output buffer)
-        - Exchanges process data
-        - Unpacks slave TxPDO (input buffer) into MotorState list
+        Background thread: runs `_run_cycle` and sleeps until the next cycle
+        deadline, shifted by the DC sync controller to keep a fixed phase to SYNC0.
         """
         slave = self._master.slaves[self._slave_pos]
-
-        # Pre-allocate buffers.
-        rxpdo_len = self._num_motors * self._RXPDO_STRUCT.size
-        txpdo_len = self._num_motors * self._TXPDO_STRUCT.size
+        next_deadline = time.perf_counter()
+        with self._cycle_lock:
+            self._prime_processdata(slave)
 
         while not self._pd_thread_stop_event.is_set():
-            # Pack commands -> output bytes
-            out_buf = bytearray(rxpdo_len)
-            offset = 0
-            for cmd in self._commands:
-                out_buf[offset: offset + self._RXPDO_STRUCT.size] = self._RXPDO_STRUCT.pack(
-                    cmd.torque_enable,
-                    cmd.goal_id,
-                    cmd.goal_iq,
-                    cmd.goal_velocity,
-                    cmd.goal_position,
-                )
-                offset += self._RXPDO_STRUCT.size
-            slave.output = bytes(out_buf)
-
-            # Exchange process data
-            self._master.send_processdata()
-            self._actual_wkc = self._master.receive_processdata(timeout=100_000)
-            if self._actual_wkc != self._master.expected_wkc:
-                # You may want to log or handle WKC mismatch here.
-                pass
-
-            # Unpack input bytes -> states
-            in_buf = slave.input
-            if len(in_buf) >= txpdo_len:
-                offset = 0
-                for i in range(self._num_motors):
-                    (
-                        present_id,
-                        present_iq,
-                        present_velocity,
-                        present_position,
-                        input_voltage,
-                        winding_temperature,
-                        powerstage_temperature,
-                        ic_temperature,
-                        error_status,
-                    ) = self._TXPDO_STRUCT.unpack_from(in_buf, offset)
-                    self._states[i] = MotorState(
-                        present_id=present_id,
-                        present_iq=present_iq,
-                        present_velocity=present_velocity,
-                        present_position=present_position,
-                        input_voltage=input_voltage,
-                        winding_temperature=winding_temperature,
-                        powerstage_temperature=powerstage_temperature,
-                        ic_temperature=ic_temperature,
-                        error_status=error_status,
-                    )
-                    offset += self._TXPDO_STRUCT.size
-
-            time.sleep(self._cycle_time_s)
-
-
-__all__ = ["MerlinMaster_v1", "MotorCommand", "MotorState"]
+            try:
+                with self._cycle_lock:
+                    self._run_cycle(slave)
+            except Exception as exc:
+                self._hook_failed("processdata", exc, "PDO loop stopped, outputs are no longer refreshed")
+                return
+
+            now = time.perf_counter()
+            next_deadline += self._cycle_time_s + self._dc_correction_s
+            scheduler = self._scheduler
+            if scheduler is not None and now < next_deadline:
+                scheduler.run(self._now(), next_deadline)
+                now = time.perf_counter()
+            if now > next_deadline:
+                next_deadline = self._late_deadline(now, next_deadline)
+            time.sleep(max(next_deadline - now, 0.0))
+
+    def _late_deadline(self, now: float, deadline: float) -> float:
+        """Count an overrun (`now` past `deadline`) and return the deadline to wait for instead."""
+        self._cycle_stats.overruns += 1
+        if self._dc_controller is not None:
+            # Skip the missed slots but stay on the SYNC0 grid.
+            late_cycles = math.ceil((now - deadline) / self._cycle_time_s)
+            return deadline + late_cycles * self._cycle_time_s
+        # Do not try to catch up with a burst of back-to-back cycles.
+        return now
+
+
+__all__ = ["MerlinMaster_v1", "MotorCommand", "MotorState", "CycleStats"]
 
 
@@ -0,0 +1,389 @@
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+# ---- error_status bitfield ----------------------------------------------------------
+#
+# The slave reports `error_status` as a float32 holding the integer value of a
+# bitfield (0.0 = healthy). Bits the table does not know decode as "bit<N>".
+
+ERROR_BITS: Dict[int, str] = {
+    0x01: "over_temperature",
+    0x02: "undervoltage",
+    0x04: "overvoltage",
+    0x08: "overcurrent",
+    0x10: "encoder",
+    0x20: "driver",
+}
+
+
+def error_bits(error_status) -> np.ndarray:
+    """Integer bitfield(s) of float `error_status` value(s) (NaN and negatives read as 0)."""
+    values = np.nan_to_num(np.asarray(error_status, dtype=np.float64), nan=0.0)
+    return np.clip(values, 0, 0xFFFFFFFF).astype(np.uint32)
+
+
+def decode_error_status(error_status) -> List[str]:
+    """Names of the bits set in one `error_status` value."""
+    bits = int(error_bits(error_status))
+    names = []
+    for k in range(32):
+        mask = 1 << k
+        if bits & mask:
+            names.append(ERROR_BITS.get(mask, f"bit{k}"))
+    return names
+
+
+# ---- Events -------------------------------------------------------------------------
+
+EVENT_FAULT = 0             # one error_status bit set (`code` = the bit)
+EVENT_OVER_TEMPERATURE = 1  # winding_temperature above the limit (`peak` = max)
+EVENT_UNDERVOLTAGE = 2      # input_voltage below the limit (`peak` = min)
+EVENT_WKC_LOSS = 3          # lost frame or wrong working counter (motor -1, `peak` = min WKC, 0 if lost)
+EVENT_KINDS = {
+    EVENT_FAULT: "fault",
+    EVENT_OVER_TEMPERATURE: "over_temperature",
+    EVENT_UNDERVOLTAGE: "undervoltage",
+    EVENT_WKC_LOSS: "wkc_loss",
+}
+
+# One row per event. `first_cycle` / `t_start` are the first cycle with the
+# condition, `last_cycle` / `t_end` the cycle that cleared it; events still
+# active have t_end = inf and last_cycle = 2**64 - 1.
+EVENT_DTYPE = np.dtype([
+    ("kind", "u1"),
+    ("motor", "<i2"),
+    ("code", "<u4"),
+    ("first_cycle", "<u8"),
+    ("last_cycle", "<u8"),
+    ("t_start", "<f8"),
+    ("t_end", "<f8"),
+    ("peak", "<f4"),
+])
+_ONGOING_CYCLE = np.iinfo(np.uint64).max
+
+
+class FaultIndex:
+    """
+    Events sorted by start time, with overlap queries by time window, motor,
+    kind and error bit in O(log n + matches).
+    """
+
+    def __init__(self, events: np.ndarray, params: Optional[dict] = None, source: Optional[list] = None) -> None:
+        """
+        :param events: EVENT_DTYPE array (any order).
+        :param params: Extractor thresholds the events were built with (kept on save).
+        :param source: [size, mtime_ns] of the recording the events came from (kept on save).
+        """
+        events = np.asarray(events, dtype=EVENT_DTYPE)
+        self.events = events[np.argsort(events["t_start"], kind="stable")]
+        self.params = dict(params or {})
+        self.source = source
+        # Running max of t_end: the first event that can overlap a window
+        # starting at t is found by binary search.
+        self._end_max = np.maximum.accumulate(self.events["t_end"]) if len(self.events) else self.events["t_end"]
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def query(
+        self,
+        t_start: Optional[float] = None,
+        t_end: Optional[float] = None,
+        motor: Optional[int] = None,
+        kind: Optional[int] = None,
+        code: Optional[int] = None,
+    ) -> np.ndarray:
+        """
+        Events overlapping `[t_start, t_end]` (open ends by default).
+
+        :param motor: Only this motor (-1 for bus events).
+        :param kind: Only this EVENT_* kind.
+        :param code: Only faults with any of these error bits set.
+        """
+        ev = self.events
+        lo = 0 if t_start is None else int(np.searchsorted(self._end_max, t_start, side="left"))
+        hi = len(ev) if t_end is None else int(np.searchsorted(ev["t_start"], t_end, side="right"))
+        ev = ev[lo:hi]
+        mask = np.ones(len(ev), dtype=bool)
+        if t_start is not None:
+            mask &= ev["t_end"] >= t_start
+        if motor is not None:
+            mask &= ev["motor"] == motor
+        if kind is not None:
+            mask &= ev["kind"] == kind
+        if code is not None:
+            mask &= (ev["code"] & code) != 0
+        return ev[mask]
+
+    def ongoing(self) -> np.ndarray:
+        """Events not cleared by the end of the data."""
+        return self.events[np.isinf(self.events["t_end"])]
+
+    def describe(self, events: Optional[np.ndarray] = None) -> List[str]:
+        """One human readable line per event (all events by default)."""
+        lines = []
+        for ev in self.events if events is None else events:
+            name = EVENT_KINDS[int(ev["kind"])]
+            if ev["kind"] == EVENT_FAULT:
+                name += ":" + ",".join(decode_error_status(float(ev["code"])))
+            where = "bus" if ev["motor"] < 0 else f"motor {int(ev['motor'])}"
+            end = "ongoing" if np.isinf(ev["t_end"]) else f"{ev['t_end'] - ev['t_start']:.3f} s"
+            peak = "" if np.isnan(ev["peak"]) else f", peak {ev['peak']:g}"
+            lines.append(f"{ev['t_start']:.3f} s  {where:8s} {name} ({end}{peak})")
+        return lines
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as f:
+            np.savez(f, events=self.events, params=np.array(json.dumps(self.params)),
+                     source=np.array(json.dumps(self.source)))
+
+    @classmethod
+    def load(cls, path: str) -> "FaultIndex":
+        with np.load(path) as data:
+            source = json.loads(str(data["source"])) if "source" in data.files else None
+            return cls(data["events"], json.loads(str(data["params"])), source)
+
+    @classmethod
+    def from_recording(cls, path: str, cache: bool = True, **params) -> "FaultIndex":
+        """
+        Extract the events of a MerlinRecording file. Only the cycle, WKC and
+        error / temperature / voltage columns are decompressed.
+
+        :param cache: Reuse (or write) `<path>.events.npz`; rebuilt when the
+                      recording's size or modification time changed or `params` differ.
+        :param params: FaultEventExtractor thresholds.
+        """
+        from .MerlinRecording import RecordingReader
+
+        sidecar = path + ".events.npz"
+        stat = os.stat(path)
+        source = [stat.st_size, stat.st_mtime_ns]
+        if cache and os.path.exists(sidecar):
+            index = cls.load(sidecar)
+            if index.source == source and index.params == FaultEventExtractor.resolve_params(params):
+                return index
+        with RecordingReader(path) as reader:
+            extractor = FaultEventExtractor(reader.num_motors, **params)
+            for block in reader.iter_chunks(fields=_RECORDING_FIELDS):
+                extractor.update_block(block["timestamp"], block["cycle"], block["wkc"], block)
+        index = extractor.index()
+        index.source = source
+        if cache:
+            index.save(sidecar)
+        return index
+
+
+_RECORDING_FIELDS = ("cycle", "wkc", "error_status", "winding_temperature", "input_voltage")
+
+
+class FaultEventExtractor:
+    """
+    Turns the per-cycle telemetry stream into events: onset and clear of every
+    error_status bit, over-temperature, undervoltage (both with hysteresis)
+    and WKC loss.
+
+    Blocks of cycles (`update_block`, e.g. recording chunks) are processed
+    with array operations; only transitions reach Python code. `update()`
+    handles one live cycle and returns early while nothing is or was active.
+    """
+
+    _DEFAULTS = {
+        "over_temperature": 80.0,
+        "temperature_hysteresis": 2.0,
+        "undervoltage": 18.0,
+        "voltage_hysteresis": 0.5,
+        "expected_wkc": None,
+    }
+
+    def __init__(self, num_motors: int, **params) -> None:
+        """
+        :param num_motors: Motors per frame.
+        :param over_temperature: Winding temperature (degC) that starts an event;
+                                 it clears below `over_temperature - temperature_hysteresis`.
+        :param undervoltage: Input voltage that starts an event; it clears above
+                             `undervoltage + voltage_hysteresis`.
+        :param expected_wkc: Working counter of a good frame; default: the most
+                             common value of the first block.
+        """
+        self.params = self.resolve_params(params)
+        self._num_motors = num_motors
+        self._bits = np.zeros(num_motors, dtype=np.uint32)
+        self._hot = np.zeros(num_motors, dtype=bool)
+        self._low = np.zeros(num_motors, dtype=bool)
+        self._wkc_lost = np.zeros(1, dtype=bool)
+        self._expected_wkc = self.params["expected_wkc"]
+        self._last_cycle: Optional[int] = None
+        self._last_t = 0.0
+        # (kind, motor, code) -> [first_cycle, t_start, peak]
+        self._open: Dict[tuple, list] = {}
+        self._closed: List[tuple] = []
+        self.cycles = 0
+
+    @classmethod
+    def resolve_params(cls, params: dict) -> dict:
+        unknown = set(params) - set(cls._DEFAULTS)
+        if unknown:
+            raise TypeError(f"unknown extractor parameter(s): {sorted(unknown)}")
+        return {**cls._DEFAULTS, **params}
+
+    @property
+    def num_motors(self) -> int:
+        return self._num_motors
+
+    @property
+    def active(self) -> bool:
+        """True while any event is open."""
+        return bool(self._open)
+
+    def index(self) -> FaultIndex:
+        """Snapshot of all events so far (open ones as ongoing)."""
+        rows = list(self._closed)
+        for (kind, motor, code), (first_cycle, t_start, peak) in list(self._open.items()):
+            rows.append((kind, motor, code, first_cycle, _ONGOING_CYCLE, t_start, np.inf, peak))
+        return FaultIndex(np.array(rows, dtype=EVENT_DTYPE), self.params)
+
+    def update(self, timestamp: float, cycle: int, wkc: int, states: Optional[np.ndarray]) -> None:
+        """
+        One cycle.
+
+        :param states: (num_motors,) TXPDO_DTYPE records, or None for a lost
+                       frame (only the WKC is evaluated).
+        """
+        if states is None:
+            self._update_wkc(np.array([timestamp]), np.array([cycle], dtype=np.uint64), np.array([max(wkc, 0)]))
+            return
+        if (not self._open and wkc == self._expected_wkc
+                and not states["error_status"].any()
+                and states["winding_temperature"].max() <= self.params["over_temperature"]
+                and states["input_voltage"].min() >= self.params["undervoltage"]):
+            self.cycles += 1
+            self._last_cycle, self._last_t = cycle, timestamp
+            return
+        self.update_block(np.array([timestamp]), np.array([cycle], dtype=np.uint64), np.array([wkc]), states[None])
+
+    def update_block(self, timestamps, cycles, wkc, states) -> None:
+        """
+        Consecutive cycles: (n,) timestamps, cycle numbers and WKCs, and
+        `states` with (n, num_motors) 'error_status', 'winding_temperature'
+        and 'input_voltage' (TXPDO_DTYPE records or a RecordingReader block).
+        Gaps in the cycle numbers are lost frames.
+        """
+        n = len(timestamps)
+        if n == 0:
+            return
+        ts = np.asarray(timestamps, dtype=np.float64)
+        cycles = np.asarray(cycles, dtype=np.uint64)
+        p = self.params
+
+        bits = error_bits(states["error_status"])
+        seen = int(np.bitwise_or.reduce(bits, axis=None)) | int(np.bitwise_or.reduce(self._bits))
+        for k in range(32):
+            mask = 1 << k
+            if seen & mask:
+                self._transitions(EVENT_FAULT, mask, (bits & mask) != 0, (self._bits & mask) != 0,
+                                  ts, cycles, None, None)
+        self._bits = bits[-1].copy()
+
+        temperature = np.asarray(states["winding_temperature"])
+        hot = _hysteresis(temperature > p["over_temperature"],
+                          temperature < p["over_temperature"] - p["temperature_hysteresis"], self._hot)
+        self._transitions(EVENT_OVER_TEMPERATURE, 0, hot, self._hot, ts, cycles, temperature, np.max)
+        self._hot = hot[-1].copy()
+
+        voltage = np.asarray(states["input_voltage"])
+        low = _hysteresis(voltage < p["undervoltage"],
+                          voltage > p["undervoltage"] + p["voltage_hysteresis"], self._low)
+        self._transitions(EVENT_UNDERVOLTAGE, 0, low, self._low, ts, cycles, voltage, np.min)
+        self._low = low[-1].copy()
+
+        self._update_wkc(ts, cycles, np.asarray(wkc))
+
+    # ---- Internals -----------------------------------------------------------------
+
+    def _update_wkc(self, ts: np.ndarray, cycles: np.ndarray, wkc: np.ndarray) -> None:
+        if self._expected_wkc is None:
+            good = wkc[wkc > 0]
+            if len(good) == 0:
+                return
+            values, counts = np.unique(good, return_counts=True)
+            self._expected_wkc = int(values[np.argmax(counts)])
+        # Cycles missing from the stream never came back: closed events of their own.
+        if self._last_cycle is not None:
+            prev = np.concatenate(([self._last_cycle], cycles[:-1])).astype(np.uint64)
+            prev_t = np.concatenate(([self._last_t], ts[:-1]))
+        else:
+            prev = np.concatenate((cycles[:1], cycles[:-1]))
+            prev_t = np.concatenate((ts[:1], ts[:-1]))
+        for k in np.nonzero(cycles > prev + 1)[0]:
+            # Start time of the first missing cycle, interpolated.
+            t_start = prev_t[k] + (ts[k] - prev_t[k]) / float(cycles[k] - prev[k])
+            self._closed.append((EVENT_WKC_LOSS, -1, 0, int(prev[k]) + 1, int(cycles[k]),
+                                 float(t_start), float(ts[k]), 0.0))
+        lost = (wkc != self._expected_wkc)[:, None]
+        self._transitions(EVENT_WKC_LOSS, 0, lost, self._wkc_lost, ts, cycles, wkc[:, None].astype(np.float32), np.min)
+        self._wkc_lost = lost[-1].copy()
+        self._last_cycle, self._last_t = int(cycles[-1]), float(ts[-1])
+        self.cycles += len(cycles)
+
+    def _transitions(self, kind, code, active, prev, ts, cycles, values, reduce) -> None:
+        """Open / close events from the (n, m) condition `active` given the previous row `prev`."""
+        bus = kind == EVENT_WKC_LOSS
+        change = np.diff(np.vstack([prev[None], active]).astype(np.int8), axis=0)
+        starts: Dict[tuple, int] = {}
+        # Column-major, so each motor's transitions come in time order.
+        for m, row in zip(*np.nonzero(change.T)):
+            key = (kind, -1 if bus else int(m), code)
+            if change[row, m] > 0:
+                self._open[key] = [int(cycles[row]), float(ts[row]), np.nan]
+                starts[key] = row
+            else:
+                event = self._open.pop(key, None)
+                if event is None:
+                    continue
+                first_cycle, t_start, peak = event
+                start = starts.pop(key, 0)
+                if values is not None and row > start:
+                    peak = _merge_peak(peak, reduce(values[start:row, m]), reduce)
+                self._closed.append((kind, key[1], code, first_cycle, int(cycles[row]), t_start,
+                                     float(ts[row]), peak))
+        if values is None:
+            return
+        # Events still open at the end of the block: fold this block into the peak.
+        for key, event in self._open.items():
+            if key[0] == kind and key[2] == code:
+                m = 0 if bus else key[1]
+                event[2] = _merge_peak(event[2], reduce(values[starts.get(key, 0):, m]), reduce)
+
+
+def _hysteresis(on: np.ndarray, off: np.ndarray, prev: np.ndarray) -> np.ndarray:
+    """Schmitt trigger along axis 0: set where `on`, cleared where `off`, else hold."""
+    n = len(on)
+    decided = on | off
+    rows = np.where(decided, np.arange(n)[:, None], -1)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    cols = np.arange(on.shape[1])
+    return np.where(rows >= 0, on[np.maximum(rows, 0), cols], prev)
+
+
+def _merge_peak(peak: float, value, reduce) -> float:
+    value = float(value)
+    return value if np.isnan(peak) else float(reduce([peak, value]))
+
+
+__all__ = [
+    "FaultEventExtractor",
+    "FaultIndex",
+    "ERROR_BITS",
+    "EVENT_DTYPE",
+    "EVENT_KINDS",
+    "EVENT_FAULT",
+    "EVENT_OVER_TEMPERATURE",
+    "EVENT_UNDERVOLTAGE",
+    "EVENT_WKC_LOSS",
+    "decode_error_status",
+    "error_bits",
+]
@@ -0,0 +1,204 @@
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .MerlinPdoLayout import TXPDO_DTYPE
+
+
+# ---- Filters ---------------------------------------------------------------------
+#
+# Each filter works on one (num_motors,) signal, keeps its state in arrays
+# allocated by `bind()` and writes its result(s) into preallocated arrays in
+# `outputs` (suffix -> array; '' is the main output).
+
+class LowPass:
+    """
+    First-order IIR low-pass. The coefficient is derived from the measured
+    sample interval, so missed frames do not change the cutoff.
+    """
+
+    def __init__(self, cutoff_hz: float) -> None:
+        self.cutoff_hz = float(cutoff_hz)
+
+    def bind(self, num_motors: int) -> Dict[str, np.ndarray]:
+        self._y = np.zeros(num_motors)
+        self._primed = False
+        return {"": self._y}
+
+    def update(self, x: np.ndarray, dt: float) -> None:
+        if not self._primed:
+            self._y[...] = x
+            self._primed = True
+            return
+        alpha = 1.0 - math.exp(-2.0 * math.pi * self.cutoff_hz * dt)
+        self._y += alpha * (x - self._y)
+
+
+class MovingAverage:
+    """Mean of the last `window` samples (running sum over a ring buffer)."""
+
+    # Recompute the running sum from the ring this often to bound rounding drift.
+    _RESUM_INTERVAL = 10000
+
+    def __init__(self, window: int) -> None:
+        if window < 1:
+            raise ValueError("window must be >= 1")
+        self.window = int(window)
+
+    def bind(self, num_motors: int) -> Dict[str, np.ndarray]:
+        self._ring = np.zeros((self.window, num_motors))
+        self._sum = np.zeros(num_motors)
+        self._y = np.zeros(num_motors)
+        self._count = 0
+        return {"": self._y}
+
+    def update(self, x: np.ndarray, dt: float) -> None:
+        k = self._count % self.window
+        self._sum += x
+        self._sum -= self._ring[k]
+        self._ring[k] = x
+        self._count += 1
+        if self._count % self._RESUM_INTERVAL == 0:
+            self._ring.sum(axis=0, out=self._sum)
+        np.divide(self._sum, min(self._count, self.window), out=self._y)
+
+
+class Derivative:
+    """
+    Finite-difference time derivative (e.g. acceleration from
+    present_velocity), optionally smoothed by a first-order low-pass.
+    """
+
+    def __init__(self, cutoff_hz: Optional[float] = None) -> None:
+        self.cutoff_hz = cutoff_hz
+
+    def bind(self, num_motors: int) -> Dict[str, np.ndarray]:
+        self._prev = np.zeros(num_motors)
+        self._y = np.zeros(num_motors)
+        self._d = np.zeros(num_motors)
+        self._primed = False
+        return {"": self._y}
+
+    def update(self, x: np.ndarray, dt: float) -> None:
+        if not self._primed or dt <= 0.0:
+            self._prev[...] = x
+            self._primed = True
+            return
+        np.subtract(x, self._prev, out=self._d)
+        self._d /= dt
+        self._prev[...] = x
+        if self.cutoff_hz is None:
+            self._y[...] = self._d
+        else:
+            alpha = 1.0 - math.exp(-2.0 * math.pi * self.cutoff_hz * dt)
+            self._y += alpha * (self._d - self._y)
+
+
+class WindowStats:
+    """Min / max / mean over the last `window` samples (outputs '_min', '_max', '_mean')."""
+
+    def __init__(self, window: int) -> None:
+        if window < 1:
+            raise ValueError("window must be >= 1")
+        self.window = int(window)
+
+    def bind(self, num_motors: int) -> Dict[str, np.ndarray]:
+        self._ring = np.zeros((self.window, num_motors))
+        self._min = np.zeros(num_motors)
+        self._max = np.zeros(num_motors)
+        self._mean = np.zeros(num_motors)
+        self._count = 0
+        return {"_min": self._min, "_max": self._max, "_mean": self._mean}
+
+    def update(self, x: np.ndarray, dt: float) -> None:
+        self._ring[self._count % self.window] = x
+        self._count += 1
+        filled = self._ring[: min(self._count, self.window)]
+        filled.min(axis=0, out=self._min)
+        filled.max(axis=0, out=self._max)
+        filled.mean(axis=0, out=self._mean)
+
+
+# ---- Filter bank -----------------------------------------------------------------
+
+class FilterBank:
+    """
+    Set of filters evaluated once per received cycle on the decoded TxPDO
+    arrays, so every consumer reads the same filtered / derived signals.
+
+        bank = FilterBank(15)
+        bank.add("velocity_lp", "present_velocity", LowPass(cutoff_hz=50))
+        bank.add("acceleration", "present_velocity", Derivative(cutoff_hz=100))
+        bank.add("iq_avg", "present_iq", MovingAverage(20))
+        bank.add("temperature", "winding_temperature", WindowStats(1000))
+
+    The source may be a TxPDO field or the name of an earlier output, so
+    filters can be chained. `outputs` holds the live arrays (for use inside the
+    PDO thread, e.g. from an in-loop controller); other threads should use
+    `snapshot()`.
+    """
+
+    def __init__(self, num_motors: int) -> None:
+        self._num_motors = num_motors
+        self._filters: List[Tuple[str, str, object]] = []
+        self.outputs: Dict[str, np.ndarray] = {}
+        self._x = np.zeros(num_motors)
+        self._last_t: Optional[float] = None
+        self._lock = threading.Lock()
+        self.updates = 0
+
+    @property
+    def num_motors(self) -> int:
+        return self._num_motors
+
+    def names(self) -> List[str]:
+        return list(self.outputs)
+
+    def add(self, name: str, source: str, filt) -> "FilterBank":
+        """
+        Register `filt` on `source`; its outputs appear as `name` + suffix.
+
+        :param name: Output name (must be unique).
+        :param source: TxPDO field name (e.g. 'present_velocity') or earlier output name.
+        :param filt: LowPass, MovingAverage, Derivative, WindowStats or compatible object.
+        :raises ValueError: if `source` is neither, or an output name is taken.
+        """
+        if source not in TXPDO_DTYPE.names and source not in self.outputs:
+            raise ValueError(f"unknown filter source {source!r}: not a TxPDO field or an earlier filter output")
+        outputs = filt.bind(self._num_motors)
+        with self._lock:
+            for suffix in outputs:
+                if name + suffix in self.outputs:
+                    raise ValueError(f"filter output {name + suffix!r} already exists")
+            self._filters.append((name, source, filt))
+            for suffix, array in outputs.items():
+                self.outputs[name + suffix] = array
+        return self
+
+    def update(self, states: np.ndarray, now: float) -> None:
+        """
+        Run all filters on one cycle of states.
+
+        :param states: (num_motors,) TXPDO_DTYPE records.
+        :param now: Sample time in seconds.
+        """
+        dt = 0.0 if self._last_t is None else now - self._last_t
+        self._last_t = now
+        with self._lock:
+            for name, source, filt in self._filters:
+                src = self.outputs.get(source)
+                if src is None:
+                    self._x[...] = states[source]
+                    src = self._x
+                filt.update(src, dt)
+            self.updates += 1
+
+    def snapshot(self) -> Dict[str, np.ndarray]:
+        """Consistent copy of all outputs."""
+        with self._lock:
+            return {name: array.copy() for name, array in self.outputs.items()}
+
+
+__all__ = ["FilterBank", "LowPass", "MovingAverage", "Derivative", "WindowStats"]
@@ -0,0 +1,167 @@
+import threading
+from typing import Optional
+
+import numpy as np
+
+
+class TrajectoryInterpolator:
+    """
+    Vectorized spline interpolation of position waypoints for all motors.
+
+    The planner pushes timestamped waypoints (one position per motor) at its
+    own rate; each call to `push_waypoints()` precomputes the polynomial
+    coefficients of the segment from the previous waypoint, so evaluating a
+    cycle is one (num_motors, order + 1) x (order + 1,) product.
+
+    - order 3: cubic Hermite (position + velocity continuous)
+    - order 5: quintic (position + velocity + acceleration continuous)
+
+    The end velocity of a segment is the mean slope of that segment (the next
+    waypoint is not known yet); quintic segments end with zero acceleration.
+    After the last waypoint the trajectory holds its final position.
+
+    Timestamps are `time.monotonic()` seconds.
+    """
+
+    def __init__(self, num_motors: int, order: int = 3, max_segments: int = 256) -> None:
+        """
+        :param num_motors: Motors per waypoint.
+        :param order: Polynomial order, 3 (cubic) or 5 (quintic).
+        :param max_segments: Queued segments kept ahead of the current time.
+        """
+        if order not in (3, 5):
+            raise ValueError("order must be 3 (cubic) or 5 (quintic)")
+        self._num_motors = num_motors
+        self._order = order
+        self._capacity = max_segments
+
+        self._t0 = np.zeros(max_segments)
+        self._dur = np.ones(max_segments)
+        self._coef = np.zeros((max_segments, num_motors, order + 1))
+        self._head = 0      # index of the active segment
+        self._count = 0     # queued segments (including the active one)
+
+        # End state of the last queued waypoint.
+        self._end_t: Optional[float] = None
+        self._end_pos = np.zeros(num_motors)
+        self._end_vel = np.zeros(num_motors)
+        self._end_acc = np.zeros(num_motors)
+        self._last_eval_t = float("-inf")
+
+        self._powers = np.arange(order + 1, dtype=np.float64)
+        self._lock = threading.Lock()
+
+    @property
+    def num_motors(self) -> int:
+        return self._num_motors
+
+    @property
+    def order(self) -> int:
+        return self._order
+
+    @property
+    def queued_segments(self) -> int:
+        return self._count
+
+    def reset(self, t: float, positions) -> None:
+        """Drop all segments and hold `positions` from time `t`."""
+        with self._lock:
+            self._head = 0
+            self._count = 0
+            self._end_t = float(t)
+            self._end_pos[:] = positions
+            self._end_vel[:] = 0.0
+            self._end_acc[:] = 0.0
+
+    def push_waypoints(self, t: float, positions, velocities=None) -> None:
+        """
+        Append a waypoint for all motors at time `t`.
+
+        :param positions: (num_motors,) goal positions; NaN holds that motor's
+                          previous waypoint position.
+        :param velocities: Optional (num_motors,) velocities at the waypoint
+                           (default: mean slope of the new segment).
+        """
+        positions = np.asarray(positions, dtype=np.float64)
+        with self._lock:
+            if self._end_t is None:
+                self._end_t = float(t)
+                self._end_pos[:] = np.where(np.isnan(positions), 0.0, positions)
+                return
+            if self._count == 0 and self._last_eval_t > self._end_t:
+                # Holding since the last waypoint: start the new segment from rest, now.
+                self._end_t = self._last_eval_t
+                self._end_vel = np.zeros(self._num_motors)
+                self._end_acc = np.zeros(self._num_motors)
+            T = float(t) - self._end_t
+            if T <= 0.0:
+                raise ValueError(f"waypoint time {t} is not after the previous one ({self._end_t})")
+            if self._count == self._capacity:
+                raise RuntimeError("interpolator segment queue is full")
+
+            p0, v0, a0 = self._end_pos, self._end_vel, self._end_acc
+            p1 = np.where(np.isnan(positions), p0, positions)
+            v1 = (p1 - p0) / T if velocities is None else np.asarray(velocities, dtype=np.float64)
+            coef = self._coefficients(p0, v0, a0, p1, v1, T)
+
+            k = (self._head + self._count) % self._capacity
+            self._t0[k] = self._end_t
+            self._dur[k] = T
+            self._coef[k] = coef
+            self._count += 1
+
+            self._end_t = float(t)
+            self._end_pos = p1.copy()
+            self._end_vel = v1.copy()
+            self._end_acc = np.zeros(self._num_motors)
+
+    def evaluate(self, t: float, out_pos: np.ndarray, out_vel: Optional[np.ndarray] = None) -> bool:
+        """
+        Write the interpolated positions (and velocities) at time `t`.
+
+        :return: False if no waypoint has been pushed yet (outputs untouched).
+        """
+        with self._lock:
+            if self._end_t is None:
+                return False
+            self._last_eval_t = t
+            if self._count == 0 or t >= self._end_t:
+                # Before the first segment or past the last waypoint: hold.
+                self._count = 0
+                out_pos[:] = self._end_pos
+                if out_vel is not None:
+                    out_vel[:] = 0.0
+                return True
+
+            # Retire finished segments; t < _end_t so one always remains.
+            while t >= self._t0[self._head] + self._dur[self._head]:
+                self._head = (self._head + 1) % self._capacity
+                self._count -= 1
+
+            k = self._head
+            tau = min(max(t - self._t0[k], 0.0), self._dur[k])
+            coef = self._coef[k]
+            tau_pow = tau ** self._powers
+            out_pos[:] = coef @ tau_pow
+            if out_vel is not None:
+                out_vel[:] = coef[:, 1:] @ (self._powers[1:] * tau_pow[:-1])
+            return True
+
+    def _coefficients(self, p0, v0, a0, p1, v1, T: float) -> np.ndarray:
+        coef = np.zeros((self._num_motors, self._order + 1))
+        dp = p1 - p0
+        coef[:, 0] = p0
+        coef[:, 1] = v0
+        if self._order == 3:
+            coef[:, 2] = (3.0 * dp / T - 2.0 * v0 - v1) / T
+            coef[:, 3] = (-2.0 * dp / T + v0 + v1) / T ** 2
+        else:
+            a1 = 0.0
+            coef[:, 2] = a0 / 2.0
+            coef[:, 3] = (20.0 * dp - (8.0 * v1 + 12.0 * v0) * T - (3.0 * a0 - a1) * T ** 2) / (2.0 * T ** 3)
+            coef[:, 4] = (-30.0 * dp + (14.0 * v1 + 16.0 * v0) * T + (3.0 * a0 - 2.0 * a1) * T ** 2) / (2.0 * T ** 4)
+            coef[:, 5] = (12.0 * dp - 6.0 * (v1 + v0) * T - (a0 - a1) * T ** 2) / (2.0 * T ** 5)
+        return coef
+
+
+__all__ = ["TrajectoryInterpolator"]
@@ -0,0 +1,155 @@
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+
+# Tags are small integers, exact in float32, far from any physical goal.
+_TAG_BASE = 1000.0
+_TAG_RANGE = 1_000_000
+
+
+class LatencyProbe:
+    """
+    Round-trip latency of "command issued -> effect visible in the TxPDO".
+
+    Every `interval_cycles` each probed motor gets a new tag value in the
+    command `field`. The tag is held there until the slave reports it back
+    in `echo_field`; the distance between the frame that carried it and the
+    frame whose inputs showed it is the latency in cycles, and the time between
+    packing and decoding those frames the latency in microseconds. Tags not
+    seen within `timeout_cycles` frames are counted as lost.
+
+    The probe overwrites `field` of the probed motors: run it against the
+    slave in echo mode (firmware PDO_ECHO_MODE, `SimSlave(echo=True)`), never
+    with motors under torque.
+
+    Install with `MerlinMaster_v1.start_latency_probe()`; the master calls
+    `on_outputs()` when packing each frame and `on_inputs()` for each received
+    (or lost) frame, both with the frame's number in the PDO loop.
+    """
+
+    def __init__(
+        self,
+        num_motors: int,
+        motors: Optional[Sequence[int]] = None,
+        field: str = "goal_position",
+        echo_field: str = "present_position",
+        interval_cycles: int = 10,
+        timeout_cycles: int = 100,
+        capacity: int = 100_000,
+    ) -> None:
+        """
+        :param num_motors: Motors per frame.
+        :param motors: Motors to probe (default: all). Their start is staggered
+                       over the interval so tags do not all change in the same frame.
+        :param field: RxPDO field the tags are written to.
+        :param echo_field: TxPDO field the slave echoes `field` into.
+        :param interval_cycles: Frames between two tags on the same motor (after the echo).
+        :param timeout_cycles: Frames after which an unseen tag counts as lost.
+        :param capacity: Samples kept (a ring; the oldest are overwritten).
+        """
+        self._num_motors = num_motors
+        self.motors = np.arange(num_motors) if motors is None else np.asarray(motors, dtype=np.intp)
+        if len(self.motors) and not (0 <= self.motors.min() and self.motors.max() < num_motors):
+            raise IndexError(f"motors out of range [0, {num_motors - 1}]")
+        self.field = field
+        self.echo_field = echo_field
+        self.interval_cycles = interval_cycles
+        self.timeout_cycles = timeout_cycles
+
+        n = len(self.motors)
+        self._tags = np.zeros(n)
+        self._pending = np.zeros(n, dtype=bool)
+        self._sent_frame = np.zeros(n, dtype=np.int64)
+        self._sent_at = np.zeros(n)
+        # Staggered start, relative to the first frame seen.
+        self._next_frame = np.arange(n) % max(1, interval_cycles)
+        self._seq = 0
+        self._last_frame = 0
+
+        self._cycles = np.zeros(capacity, dtype=np.int32)
+        self._us = np.zeros(capacity)
+        self._motor = np.zeros(capacity, dtype=np.int16)
+        self._capacity = capacity
+        self.samples = 0
+        self.lost = 0
+
+    @property
+    def num_motors(self) -> int:
+        return self._num_motors
+
+    def on_outputs(self, records, now: float, frame: int) -> None:
+        """Start due tags and write the current tags into the RxPDO records of `frame`."""
+        if self._last_frame == 0:
+            self._next_frame += frame
+        self._last_frame = frame
+        due = ~self._pending & (self._next_frame <= frame)
+        if due.any():
+            k = int(due.sum())
+            seq = self._seq + np.arange(k)
+            self._seq += k
+            self._tags[due] = _TAG_BASE + seq % _TAG_RANGE
+            self._pending[due] = True
+            self._sent_frame[due] = frame
+            self._sent_at[due] = now
+        records[self.field][self.motors] = self._tags
+
+    def on_inputs(self, states, now: float, frame: int) -> None:
+        """Match the echoed tags in the inputs of `frame`; `states` is None for a lost frame."""
+        pending = self._pending
+        if not pending.any():
+            return
+        # Expire first: an echo arriving after the timeout is a loss, not a sample.
+        expired = pending & (frame - self._sent_frame > self.timeout_cycles)
+        if expired.any():
+            self.lost += int(expired.sum())
+            pending[expired] = False
+            self._next_frame[expired] = self._last_frame + 1
+        if states is not None:
+            seen = pending & (states[self.echo_field][self.motors] == self._tags)
+            if seen.any():
+                idx = np.nonzero(seen)[0]
+                self._add(idx, frame - self._sent_frame[idx], (now - self._sent_at[idx]) * 1e6)
+                pending[idx] = False
+                self._next_frame[idx] = self._last_frame + self.interval_cycles
+
+    def _add(self, idx: np.ndarray, cycles: np.ndarray, us: np.ndarray) -> None:
+        pos = (self.samples + np.arange(len(idx))) % self._capacity
+        self._cycles[pos] = cycles
+        self._us[pos] = us
+        self._motor[pos] = self.motors[idx]
+        self.samples += len(idx)
+
+    def reset(self) -> None:
+        """Drop the samples (e.g. after warm-up); tags in flight stay valid."""
+        self.samples = 0
+        self.lost = 0
+
+    def latencies(self, motor: Optional[int] = None):
+        """(cycles, microseconds) arrays of the kept samples, optionally of one motor."""
+        n = min(self.samples, self._capacity)
+        cycles, us = self._cycles[:n], self._us[:n]
+        if motor is not None:
+            mask = self._motor[:n] == motor
+            cycles, us = cycles[mask], us[mask]
+        return cycles.copy(), us.copy()
+
+    def summary(self, quantiles: Sequence[float] = (0.5, 0.9, 0.99, 0.999)) -> Dict:
+        """
+        Latency distribution: sample and loss counts, a histogram in cycles
+        ({cycles: count}) and mean / quantiles / max in microseconds.
+        """
+        cycles, us = self.latencies()
+        out: Dict = {"samples": len(cycles), "lost": self.lost}
+        if len(cycles) == 0:
+            return out
+        values, counts = np.unique(cycles, return_counts=True)
+        out["cycles"] = {int(v): int(c) for v, c in zip(values, counts)}
+        out["us_mean"] = float(us.mean())
+        for q, v in zip(quantiles, np.quantile(us, quantiles)):
+            out[f"us_p{q * 100:g}"] = float(v)
+        out["us_max"] = float(us.max())
+        return out
+
+
+__all__ = ["LatencyProbe"]
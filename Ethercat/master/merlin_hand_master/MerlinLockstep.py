@@ -0,0 +1,56 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+class VirtualClock:
+    """
+    Simulated time for lockstep runs: only advances when something sleeps on it
+    (the simulated frame latency, the master waiting for the next cycle).
+    """
+
+    def __init__(self, start: float = 0.0) -> None:
+        self._now = float(start)
+
+    def now(self) -> float:
+        return self._now
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            self._now += seconds
+
+    def advance_to(self, t: float) -> None:
+        """Move to time `t` (no-op if `t` is in the past)."""
+        if t > self._now:
+            self._now = t
+
+
+def sweep(
+    scenario: Callable[..., Any],
+    params: Sequence[Dict[str, Any]],
+    processes: Optional[int] = None,
+) -> List[Any]:
+    """
+    Run `scenario(**p)` for every parameter set in a process pool and return
+    the results in order.
+
+    `scenario` must be a module-level function (it is pickled) that builds its
+    own lockstep master, e.g.
+
+        def track(gain, cycles=10_000):
+            master = MerlinMaster_v1("sim", num_motors=15, lockstep=True)
+            master.set_controller(make_controller(gain))
+            master.step(cycles)
+            return master.get_motor_state(0).present_position
+
+        results = sweep(track, [{"gain": g} for g in (0.5, 1.0, 2.0)])
+
+    :param processes: Pool size (default: CPU count); 1 runs serially in this process.
+    """
+    if processes == 1:
+        return [scenario(**p) for p in params]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(scenario, **p) for p in params]
+        return [f.result() for f in futures]
+
+
+__all__ = ["VirtualClock", "sweep"]
@@ -0,0 +1,315 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .MerlinPdoLayout import TXPDO_FIELDS
+
+
+_COUNTERS = ("cycles", "missed_frames", "wkc_errors", "overruns")
+# Upper bounds of the |period - nominal| histogram buckets (a +Inf bucket follows).
+JITTER_BUCKETS_US = (5.0, 10.0, 20.0, 50.0, 100.0, 200.0, 500.0, 1000.0)
+
+
+class _Window:
+    """Preallocated samples of one aggregation window."""
+
+    def __init__(self, capacity: int, num_motors: int) -> None:
+        self.states = np.zeros((capacity, num_motors, len(TXPDO_FIELDS)), dtype=np.float32)
+        self.cycle_us = np.zeros(capacity)
+        self.period_us = np.zeros(capacity)
+        self.rtt_us = np.zeros(capacity)
+        self.reset(0.0)
+
+    def reset(self, start: float) -> None:
+        self.start = start
+        self.n_states = 0
+        self.n_cycles = 0
+        self.n_periods = 0
+        self.n_rtt = 0
+        self.dropped = 0
+        self.counters: Dict[str, int] = {}
+
+
+class MetricsAggregator:
+    """
+    Aggregates per-cycle PDO data into fixed-length summaries (default 1 s):
+    min / max / mean / quantiles of cycle time, round trip and every TxPDO field
+    per motor, plus the loop counters.
+
+    Cycle timing is reported twice: `cycle_time_us` is the work done inside a
+    cycle, `period_us` the start-to-start interval, whose deviation from the
+    nominal cycle time (`jitter_us`) is also kept as a histogram of |jitter|
+    (`jitter_histogram`, cumulative since the aggregator was created).
+
+    `record()` is called from the PDO thread and only copies into preallocated
+    arrays. At the end of a window the buffers are swapped and the summary is
+    computed on a worker thread, which then calls the registered sinks
+    (e.g. JsonLinesSink) and updates `latest`.
+    """
+
+    def __init__(
+        self,
+        num_motors: int,
+        window_s: float = 1.0,
+        cycle_time_s: float = 0.001,
+        quantiles: Sequence[float] = (0.5, 0.9, 0.99),
+        jitter_buckets_us: Sequence[float] = JITTER_BUCKETS_US,
+    ) -> None:
+        """
+        :param num_motors: Motors per frame.
+        :param window_s: Summary period.
+        :param cycle_time_s: Nominal cycle time: the jitter reference, also used
+                             to size the buffers (2x headroom).
+        :param quantiles: Quantiles reported in addition to min/max/mean.
+        :param jitter_buckets_us: Increasing upper bounds of the jitter histogram buckets.
+        """
+        self._num_motors = num_motors
+        self.window_s = window_s
+        self.cycle_time_s = cycle_time_s
+        self.quantiles = tuple(quantiles)
+        self.jitter_buckets_us = tuple(float(b) for b in jitter_buckets_us)
+        if any(b <= a for a, b in zip(self.jitter_buckets_us, self.jitter_buckets_us[1:])):
+            raise ValueError("jitter_buckets_us must be strictly increasing")
+        self._last_start: Optional[float] = None
+        self._jitter_counts = np.zeros(len(self.jitter_buckets_us) + 1, dtype=np.int64)
+        self._jitter_sum_us = 0.0
+        capacity = max(16, int(2 * window_s / cycle_time_s))
+        self._active = _Window(capacity, num_motors)
+        self._spare = _Window(capacity, num_motors)
+        self._capacity = capacity
+
+        self.sinks: List[Callable[[dict], None]] = []
+        self.latest: Optional[dict] = None
+        self.windows = 0
+        self.summarize_time_us = 0.0
+
+        self._ready = threading.Event()
+        self._ready.set()
+        self._pending: Optional[_Window] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._worker = threading.Thread(target=self._worker_thread, name="MerlinMetrics", daemon=True)
+        self._worker.start()
+
+    @property
+    def num_motors(self) -> int:
+        return self._num_motors
+
+    def close(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        self._worker.join(timeout=1.0)
+
+    def record(self, states: Optional[np.ndarray], cycle_time_us: float, rtt_us: Optional[float],
+               counters, now: float, cycle_start: Optional[float] = None) -> None:
+        """
+        Add one cycle.
+
+        :param states: (num_motors,) TXPDO_DTYPE records received this cycle, or None on a miss.
+        :param cycle_time_us: Work time of the cycle.
+        :param rtt_us: Frame round trip, or None on a miss.
+        :param counters: Object with cumulative `cycles`, `missed_frames`, `wkc_errors`,
+                         `overruns` attributes (CycleStats).
+        :param now: `time.monotonic()`.
+        :param cycle_start: Start time of the cycle in seconds (any clock, the same
+                            every call); the period is measured between consecutive
+                            starts. Defaults to `now`.
+        """
+        w = self._active
+        if w.n_cycles == 0 and w.start == 0.0:
+            w.start = now
+        start = now if cycle_start is None else cycle_start
+        last_start, self._last_start = self._last_start, start
+        if w.n_cycles < self._capacity:
+            w.cycle_us[w.n_cycles] = cycle_time_us
+            w.n_cycles += 1
+            if last_start is not None:
+                w.period_us[w.n_periods] = (start - last_start) * 1e6
+                w.n_periods += 1
+            if rtt_us is not None:
+                w.rtt_us[w.n_rtt] = rtt_us
+                w.n_rtt += 1
+            if states is not None:
+                w.states[w.n_states] = states.view(np.float32).reshape(self._num_motors, -1)
+                w.n_states += 1
+        else:
+            w.dropped += 1
+
+        if now - w.start >= self.window_s and self._ready.is_set():
+            w.counters = {name: int(getattr(counters, name)) for name in _COUNTERS}
+            self._ready.clear()
+            self._pending = w
+            self._active, self._spare = self._spare, w
+            self._active.reset(now)
+            self._wake.set()
+
+    def summarize(self, w: _Window, end: Optional[float] = None) -> dict:
+        """Summary dict of one window (also used for the JSON lines output)."""
+        stats = ["min", "max", "mean"] + [f"p{round(q * 100):d}" for q in self.quantiles]
+
+        def describe(samples: np.ndarray) -> Dict[str, float]:
+            if len(samples) == 0:
+                return {name: 0.0 for name in stats}
+            values = [samples.min(), samples.max(), samples.mean()]
+            values += list(np.quantile(samples, self.quantiles))
+            return {name: float(v) for name, v in zip(stats, values)}
+
+        # All motors and fields at once: (stat, motor, field).
+        states = w.states[: w.n_states]
+        if len(states):
+            per_motor = np.concatenate((
+                states.min(axis=0)[None],
+                states.max(axis=0)[None],
+                states.mean(axis=0)[None],
+                np.quantile(states, self.quantiles, axis=0),
+            )).astype(float).round(6)
+        else:
+            per_motor = np.zeros((len(stats), self._num_motors, len(TXPDO_FIELDS)))
+        per_field = per_motor.transpose(2, 0, 1).tolist()
+
+        period = w.period_us[: w.n_periods]
+        jitter = period - self.cycle_time_s * 1e6
+        abs_jitter = np.abs(jitter)
+        # Bucket k counts bounds[k-1] < |jitter| <= bounds[k]; the last one is +Inf.
+        buckets = np.searchsorted(self.jitter_buckets_us, abs_jitter, side="left")
+        counts = np.bincount(buckets, minlength=len(self.jitter_buckets_us) + 1)
+
+        return {
+            "timestamp": time.time(),
+            "window_s": (end if end is not None else time.monotonic()) - w.start,
+            "samples": w.n_cycles,
+            "dropped_samples": w.dropped,
+            "counters": dict(w.counters),
+            "cycle_time_us": describe(w.cycle_us[: w.n_cycles]),
+            "period_us": describe(period),
+            "jitter_us": describe(jitter),
+            "rtt_us": describe(w.rtt_us[: w.n_rtt]),
+            "jitter_histogram": {
+                "le_us": list(self.jitter_buckets_us),
+                "counts": counts.tolist(),
+                "sum_us": float(abs_jitter.sum()),
+            },
+            "motors": {
+                name: dict(zip(stats, per_field[k])) for k, name in enumerate(TXPDO_FIELDS)
+            },
+        }
+
+    def _worker_thread(self) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            w = self._pending
+            if w is None:
+                continue
+            t0 = time.perf_counter()
+            summary = self.summarize(w, end=self._active.start)
+            # Prometheus histograms are cumulative: carry the totals across windows.
+            histogram = summary["jitter_histogram"]
+            self._jitter_counts += histogram["counts"]
+            self._jitter_sum_us += histogram["sum_us"]
+            histogram["total_counts"] = self._jitter_counts.tolist()
+            histogram["total_sum_us"] = self._jitter_sum_us
+            self.summarize_time_us = (time.perf_counter() - t0) * 1e6
+            self.latest = summary
+            self.windows += 1
+            self._pending = None
+            self._ready.set()
+            for sink in list(self.sinks):
+                sink(summary)
+
+
+# ---- Outputs ---------------------------------------------------------------------
+
+class JsonLinesSink:
+    """Appends one JSON object per summary window to a file."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = open(path, "a", buffering=1)
+
+    def __call__(self, summary: dict) -> None:
+        self._file.write(json.dumps(summary, separators=(",", ":")) + "\n")
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def format_prometheus(summary: Optional[dict], prefix: str = "merlin") -> str:
+    """Render a summary in the Prometheus text exposition format."""
+    if summary is None:
+        return ""
+    lines = []
+    for name, value in summary["counters"].items():
+        metric = f"{prefix}_{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+
+    for group in ("cycle_time_us", "period_us", "jitter_us", "rtt_us"):
+        metric = f"{prefix}_{group}"
+        lines.append(f"# TYPE {metric} gauge")
+        for stat, value in summary[group].items():
+            lines.append(f'{metric}{{stat="{stat}"}} {value:.6g}')
+
+    histogram = summary["jitter_histogram"]
+    counts = histogram.get("total_counts", histogram["counts"])
+    metric = f"{prefix}_cycle_jitter_us"
+    lines.append(f"# TYPE {metric} histogram")
+    cumulative = 0
+    for bound, count in zip(list(histogram["le_us"]) + ["+Inf"], counts):
+        cumulative += count
+        le = bound if bound == "+Inf" else f"{bound:g}"
+        lines.append(f'{metric}_bucket{{le="{le}"}} {cumulative}')
+    lines.append(f"{metric}_sum {histogram.get('total_sum_us', histogram['sum_us']):.6g}")
+    lines.append(f"{metric}_count {cumulative}")
+
+    for field, per_stat in summary["motors"].items():
+        metric = f"{prefix}_motor_{field}"
+        lines.append(f"# TYPE {metric} gauge")
+        for stat, values in per_stat.items():
+            for motor, value in enumerate(values):
+                lines.append(f'{metric}{{motor="{motor}",stat="{stat}"}} {value:.6g}')
+
+    metric = f"{prefix}_metrics_window_seconds"
+    lines.append(f"# TYPE {metric} gauge")
+    lines.append(f"{metric} {summary['window_s']:.6g}")
+    return "\n".join(lines) + "\n"
+
+
+class PrometheusServer:
+    """Serves the latest summary of an aggregator at http://host:port/metrics."""
+
+    def __init__(self, aggregator: MetricsAggregator, port: int = 9105, host: str = "127.0.0.1") -> None:
+        agg = aggregator
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = format_prometheus(agg.latest).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args) -> None:
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self.address = self._httpd.server_address
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="MerlinMetricsHTTP", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+__all__ = ["JITTER_BUCKETS_US", "MetricsAggregator", "JsonLinesSink", "PrometheusServer", "format_prometheus"]
@@ -0,0 +1,397 @@
+import argparse
+import mmap
+import struct
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .MerlinPdoLayout import RXPDO_DTYPE, TXPDO_DTYPE
+
+
+ETHERTYPE_ETHERCAT = 0x88A4
+LINKTYPE_ETHERNET = 1
+
+# Datagram commands (ETG.1000.4); the logical ones carry process data.
+CMD_LRD = 10
+CMD_LWR = 11
+CMD_LRW = 12
+CMD_FRMW = 14
+
+_PCAP_MAGIC_US = 0xA1B2C3D4
+_PCAP_MAGIC_NS = 0xA1B23C4D
+_PCAPNG_MAGIC = 0x0A0D0D0A
+
+_ETH_HEADER = 14
+_ECAT_HEADER = 2
+_DATAGRAM = struct.Struct("<BBIHH")     # cmd, index, address, length | flags, irq
+_WKC_SIZE = 2
+_MORE_FOLLOWS = 0x8000
+
+# SOEM sends from 01:01:01:01:01:01 and the first ESC sets bit 1 of the first
+# source address byte, so returned frames read 03:01:01:01:01:01.
+SOEM_MAC = b"\x01\x01\x01\x01\x01\x01"
+_RETURNED_MAC_BIT = 0x02
+
+# Adjacent records shorter than this are gathered instead of strided.
+_MIN_STRIDED_RUN = 32
+
+
+class PdoChunk(NamedTuple):
+    """Decoded process-data cycles, one row per frame that came back."""
+
+    timestamp: np.ndarray       # float64 capture time of the returned frame
+    timestamp_tx: np.ndarray    # float64 capture time of its outgoing frame (NaN if not captured)
+    wkc: np.ndarray             # int32 working counter (sum over the logical datagrams)
+    index: np.ndarray           # uint8 datagram index
+    commands: np.ndarray        # (n, num_motors) RXPDO_DTYPE
+    states: np.ndarray          # (n, num_motors) TXPDO_DTYPE
+    lost_tx: np.ndarray         # float64 capture times of outgoing frames that never came back
+    other: int                  # packets that were not process data (mailbox, state changes, ...)
+
+
+# ---- Frames ---------------------------------------------------------------------
+
+def parse_datagrams(frame) -> List[Tuple[int, int, int, int]]:
+    """
+    Datagrams of one EtherCAT Ethernet frame.
+
+    :return: (command, header offset in the frame, address, data length) per datagram.
+    :raises ValueError: Not a well-formed EtherCAT frame.
+    """
+    mv = memoryview(frame)
+    if len(mv) < _ETH_HEADER + _ECAT_HEADER or struct.unpack_from(">H", mv, 12)[0] != ETHERTYPE_ETHERCAT:
+        raise ValueError("not an EtherCAT frame")
+    header = struct.unpack_from("<H", mv, _ETH_HEADER)[0]
+    if header >> 12 != 1:
+        raise ValueError(f"EtherCAT frame type {header >> 12} is not datagrams (1)")
+    end = _ETH_HEADER + _ECAT_HEADER + (header & 0x7FF)
+    if end > len(mv):
+        raise ValueError("truncated EtherCAT frame")
+    datagrams = []
+    pos = _ETH_HEADER + _ECAT_HEADER
+    while True:
+        if pos + _DATAGRAM.size + _WKC_SIZE > end:
+            raise ValueError("truncated datagram")
+        cmd, _index, address, len_flags, _irq = _DATAGRAM.unpack_from(mv, pos)
+        length = len_flags & 0x7FF
+        if pos + _DATAGRAM.size + length + _WKC_SIZE > end:
+            raise ValueError("truncated datagram")
+        datagrams.append((cmd, pos, address, length))
+        pos += _DATAGRAM.size + length + _WKC_SIZE
+        if not len_flags & _MORE_FOLLOWS:
+            return datagrams
+
+
+def ethercat_frame(datagrams: Sequence[Tuple[int, int, int, bytes, int]], src_mac: bytes = SOEM_MAC) -> bytes:
+    """
+    Build a broadcast EtherCAT frame.
+
+    :param datagrams: (command, index, address, data, wkc) per datagram.
+    """
+    body = bytearray()
+    for k, (cmd, index, address, data, wkc) in enumerate(datagrams):
+        more = _MORE_FOLLOWS if k + 1 < len(datagrams) else 0
+        body += _DATAGRAM.pack(cmd, index, address, len(data) | more, 0)
+        body += data
+        body += struct.pack("<H", wkc)
+    frame = b"\xff" * 6 + src_mac + struct.pack(">H", ETHERTYPE_ETHERCAT) \
+        + struct.pack("<H", len(body) | 0x1000) + bytes(body)
+    return frame.ljust(60, b"\x00")
+
+
+class PcapWriter:
+    """Classic pcap file of Ethernet frames (nanosecond timestamps)."""
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "wb")
+        self._file.write(struct.pack("<IHHiIII", _PCAP_MAGIC_NS, 2, 4, 0, 0, 65535, LINKTYPE_ETHERNET))
+        self.packets = 0
+
+    def write(self, timestamp: float, frame: bytes) -> None:
+        ns = int(round(timestamp * 1e9))
+        self._file.write(struct.pack("<IIII", ns // 1_000_000_000, ns % 1_000_000_000, len(frame), len(frame)))
+        self._file.write(frame)
+        self.packets += 1
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "PcapWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+# ---- Reader ---------------------------------------------------------------------
+
+def read_pcap(
+    path: str,
+    num_motors: int = 15,
+    outputs_offset: int = 0,
+    inputs_offset: Optional[int] = None,
+    chunk_packets: int = 262_144,
+) -> Iterator[PdoChunk]:
+    """
+    Stream the Merlin process data of an EtherCAT capture (`tcpdump -i eth0
+    -w capture.pcap ether proto 0x88a4`), memory mapped, `chunk_packets`
+    records at a time.
+
+    LRW / LWR / LRD datagrams are mapped onto the logical process image: the
+    Merlin RxPDO at `outputs_offset`, the TxPDO at `inputs_offset`. This is
+    SOEM's layout for a single slave: outputs at logical address 0, inputs
+    right after them. Packets with the same datagram layout are decoded
+    together with array operations; only the record headers are walked in
+    Python.
+
+    Returned frames are recognised by the source MAC bit ESCs set. The decoder
+    falls back to a non-zero WKC for captures that do not carry that mark.
+    Each is paired with the preceding outgoing frame of the same datagram
+    index. Outgoing frames without a return are reported in `lost_tx`.
+
+    :param outputs_offset: Logical address of motor 0's RxPDO.
+    :param inputs_offset: Logical address of motor 0's TxPDO (default: right after the RxPDOs).
+    """
+    if inputs_offset is None:
+        inputs_offset = outputs_offset + num_motors * RXPDO_DTYPE.itemsize
+    decoder = _PdoDecoder(num_motors, outputs_offset, inputs_offset)
+    with open(path, "rb") as f:
+        size = f.seek(0, 2)
+        if size < 24:
+            raise ValueError(f"{path}: truncated pcap header")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            endian, frac_scale = _pcap_header(path, mm)
+            buf = np.frombuffer(mm, dtype=np.uint8)
+            try:
+                length_at = struct.Struct(endian + "I").unpack_from
+                pos = 24
+                while pos < size:
+                    offsets = []
+                    while pos + 16 <= size and len(offsets) < chunk_packets:
+                        incl = length_at(mm, pos + 8)[0]
+                        if pos + 16 + incl > size:
+                            pos = size    # truncated last record (capture still running)
+                            break
+                        offsets.append(pos + 16)
+                        pos += 16 + incl
+                    if not offsets:
+                        break
+                    yield decoder.decode(buf, np.array(offsets, dtype=np.int64), endian, frac_scale)
+            finally:
+                del buf
+
+
+def read_pcap_all(path: str, **kwargs) -> PdoChunk:
+    """All cycles of a capture as one PdoChunk (see `read_pcap`)."""
+    chunks = list(read_pcap(path, **kwargs))
+    if not chunks:
+        m = kwargs.get("num_motors", 15)
+        return _empty_chunk(m, 0)
+    return PdoChunk(*(np.concatenate([getattr(c, name) for c in chunks]) for name in PdoChunk._fields[:-1]),
+                    sum(c.other for c in chunks))
+
+
+def _pcap_header(path: str, mm) -> Tuple[str, float]:
+    for endian in ("<", ">"):
+        magic = struct.unpack_from(endian + "I", mm, 0)[0]
+        if magic in (_PCAP_MAGIC_US, _PCAP_MAGIC_NS):
+            break
+        if magic == _PCAPNG_MAGIC:
+            raise ValueError(f"{path}: pcapng is not supported; convert with `editcap -F pcap`")
+    else:
+        raise ValueError(f"{path}: not a pcap file")
+    linktype = struct.unpack_from(endian + "I", mm, 20)[0] & 0x0FFFFFFF
+    if linktype != LINKTYPE_ETHERNET:
+        raise ValueError(f"{path}: link type {linktype} is not Ethernet ({LINKTYPE_ETHERNET})")
+    return endian, 1e-9 if magic == _PCAP_MAGIC_NS else 1e-6
+
+
+def _empty_chunk(num_motors: int, other: int) -> PdoChunk:
+    return PdoChunk(np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.uint8),
+                    np.zeros((0, num_motors), dtype=RXPDO_DTYPE), np.zeros((0, num_motors), dtype=TXPDO_DTYPE),
+                    np.zeros(0), other)
+
+
+def _packet_rows(buf: np.ndarray, offsets: np.ndarray, length: int) -> np.ndarray:
+    """(n, length) bytes of the packets at `offsets`: a strided view if they are adjacent records."""
+    if len(offsets) > 1 and (np.diff(offsets) == length + 16).all():
+        return np.lib.stride_tricks.as_strided(buf[offsets[0]:], shape=(len(offsets), length),
+                                               strides=(length + 16, 1), writeable=False)
+    return buf[offsets[:, None] + np.arange(length)]
+
+
+def _copy_overlap(rows, data_pos: int, address: int, length: int, image: np.ndarray, start: int) -> None:
+    """Copy the part of a datagram's data that falls into the logical range of `image`."""
+    lo = max(address, start)
+    hi = min(address + length, start + image.shape[1])
+    if lo < hi:
+        image[:, lo - start:hi - start] = rows[:, data_pos + lo - address:data_pos + hi - address]
+
+
+class _PdoDecoder:
+    """Per-stream state of `read_pcap`: layouts, image geometry and the frame still in flight."""
+
+    def __init__(self, num_motors: int, outputs_offset: int, inputs_offset: int) -> None:
+        self.num_motors = num_motors
+        self.outputs_offset = outputs_offset
+        self.inputs_offset = inputs_offset
+        self.out_len = num_motors * RXPDO_DTYPE.itemsize
+        self.in_len = num_motors * TXPDO_DTYPE.itemsize
+        # Outgoing frame after the last returned one: (timestamp, index), may return in the next chunk.
+        self._in_flight: Optional[Tuple[float, int]] = None
+
+    def decode(self, buf: np.ndarray, offsets: np.ndarray, endian: str, frac_scale: float) -> PdoChunk:
+        header = buf[(offsets - 16)[:, None] + np.arange(12)].view(endian + "u4")
+        timestamps = header[:, 0] + header[:, 1] * frac_scale
+        lengths = header[:, 2].astype(np.int64)
+        ethertype = (buf[offsets + 12].astype(np.uint16) << 8) | buf[offsets + 13]
+        remaining = np.nonzero((ethertype == ETHERTYPE_ETHERCAT) & (lengths >= 60))[0]
+        other = len(offsets) - len(remaining)
+
+        parts = []
+        while len(remaining):
+            first = remaining[0]
+            length = int(lengths[first])
+            start = int(offsets[first])
+            try:
+                layout = parse_datagrams(buf[start:start + length])
+            except ValueError:
+                other += 1
+                remaining = remaining[1:]
+                continue
+            # Every packet with the same length, EtherCAT header and datagram
+            # commands / addresses / lengths shares the layout (indices and WKCs differ).
+            signature = [12, 13, 14, 15]
+            for _cmd, pos, _address, _length in layout:
+                signature += [pos, pos + 2, pos + 3, pos + 4, pos + 5, pos + 6, pos + 7]
+            signature = np.array(signature)
+            same = remaining[lengths[remaining] == length]
+            sig = buf[offsets[same][:, None] + signature]
+            members = same[(sig == sig[0]).all(axis=1)]
+            remaining = np.setdiff1d(remaining, members, assume_unique=True)
+            logical = [d for d in layout if d[0] in (CMD_LRD, CMD_LWR, CMD_LRW)]
+            if not logical:
+                other += len(members)
+                continue
+            parts.extend(self._decode_layout(buf, offsets, members, length, logical))
+
+        if not parts:
+            return _empty_chunk(self.num_motors, other)
+        packet = np.concatenate([p[0] for p in parts])
+        order = np.argsort(packet, kind="stable")
+        packet = packet[order]
+        returned, index, wkc, out_img, in_img = (np.concatenate([p[k] for p in parts])[order] for k in range(1, 6))
+        if not returned.any():
+            returned = wkc > 0
+        return self._pair(packet, timestamps[packet], returned, index, wkc, out_img, in_img, other)
+
+    def _decode_layout(self, buf, offsets, members, length, logical):
+        """Decode the packets `members` (same layout) in runs of adjacent records."""
+        cuts = np.nonzero(np.diff(offsets[members]) != length + 16)[0] + 1
+        runs = np.split(members, cuts)
+        long_runs = [r for r in runs if len(r) >= _MIN_STRIDED_RUN]
+        short = [r for r in runs if len(r) < _MIN_STRIDED_RUN]
+        if short:
+            long_runs.append(np.concatenate(short))
+        for run in long_runs:
+            rows = _packet_rows(buf, offsets[run], length)
+            n = len(run)
+            out_img = np.zeros((n, self.out_len), dtype=np.uint8)
+            in_img = np.zeros((n, self.in_len), dtype=np.uint8)
+            wkc = np.zeros(n, dtype=np.int32)
+            for cmd, pos, address, dg_length in logical:
+                data = pos + _DATAGRAM.size
+                if cmd != CMD_LRD:
+                    _copy_overlap(rows, data, address, dg_length, out_img, self.outputs_offset)
+                if cmd != CMD_LWR:
+                    _copy_overlap(rows, data, address, dg_length, in_img, self.inputs_offset)
+                wkc += rows[:, data + dg_length].astype(np.int32) | (rows[:, data + dg_length + 1].astype(np.int32) << 8)
+            returned = (rows[:, 6] & _RETURNED_MAC_BIT) != 0
+            index = rows[:, logical[0][1] + 1].copy()
+            yield run, returned, index, wkc, out_img, in_img
+
+    def _pair(self, packet, ts, returned, index, wkc, out_img, in_img, other) -> PdoChunk:
+        tx = np.nonzero(~returned)[0]
+        rx = np.nonzero(returned)[0]
+        tx_pos, tx_ts, tx_index = packet[tx], ts[tx], index[tx]
+        if self._in_flight is not None:
+            tx_pos = np.concatenate(([-1], tx_pos))
+            tx_ts = np.concatenate(([self._in_flight[0]], tx_ts))
+            tx_index = np.concatenate(([self._in_flight[1]], tx_index)).astype(np.uint8)
+
+        # Each returned frame belongs to the last outgoing frame before it, if the index matches.
+        j = np.searchsorted(tx_pos, packet[rx]) - 1
+        ok = j >= 0
+        ok[ok] = tx_index[j[ok]] == index[rx][ok]
+        timestamp_tx = np.full(len(rx), np.nan)
+        timestamp_tx[ok] = tx_ts[j[ok]]
+        matched = np.zeros(len(tx_pos), dtype=bool)
+        matched[j[ok]] = True
+
+        last_rx = packet[rx[-1]] if len(rx) else -2
+        pending = ~matched & (tx_pos > last_rx)
+        self._in_flight = None
+        if pending.any():
+            k = np.nonzero(pending)[0][-1]
+            self._in_flight = (float(tx_ts[k]), int(tx_index[k]))
+            pending[k] = False      # may still return in the next chunk
+        lost = ~matched & ~(tx_pos > last_rx) | pending
+
+        m = self.num_motors
+        return PdoChunk(
+            ts[rx],
+            timestamp_tx,
+            wkc[rx],
+            index[rx],
+            np.ascontiguousarray(out_img[rx]).view(RXPDO_DTYPE).reshape(-1, m),
+            np.ascontiguousarray(in_img[rx]).view(TXPDO_DTYPE).reshape(-1, m),
+            tx_ts[lost],
+            other,
+        )
+
+
+# ---- Command line -----------------------------------------------------------------
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Decode Merlin process data from an EtherCAT pcap capture.")
+    parser.add_argument("capture", help="pcap file (tcpdump -w, Ethernet link type)")
+    parser.add_argument("--motors", type=int, default=15, help="Motors in the process image")
+    parser.add_argument("--outputs-offset", type=int, default=0, help="Logical address of the RxPDO")
+    parser.add_argument("--inputs-offset", type=int, default=None, help="Logical address of the TxPDO")
+    parser.add_argument("--npz", help="Save timestamp, wkc, commands and states to this .npz file")
+    args = parser.parse_args(argv)
+
+    data = read_pcap_all(args.capture, num_motors=args.motors, outputs_offset=args.outputs_offset,
+                         inputs_offset=args.inputs_offset)
+    n = len(data.timestamp)
+    print(f"{n} cycles, {len(data.lost_tx)} frames lost, {data.other} other packets")
+    if n:
+        span = data.timestamp[-1] - data.timestamp[0]
+        print(f"  span {span:.3f} s ({(n - 1) / span if span > 0 else 0:.1f} Hz)")
+        values, counts = np.unique(data.wkc, return_counts=True)
+        print("  WKC " + ", ".join(f"{v}: {c}" for v, c in zip(values, counts)))
+        rtt = (data.timestamp - data.timestamp_tx)[~np.isnan(data.timestamp_tx)] * 1e6
+        if len(rtt):
+            print(f"  RTT p50 {np.median(rtt):.1f} us, p99 {np.quantile(rtt, 0.99):.1f} us, max {rtt.max():.1f} us")
+    if args.npz:
+        np.savez(args.npz, timestamp=data.timestamp, timestamp_tx=data.timestamp_tx, wkc=data.wkc,
+                 commands=data.commands, states=data.states, lost_tx=data.lost_tx)
+
+
+__all__ = [
+    "PdoChunk",
+    "PcapWriter",
+    "read_pcap",
+    "read_pcap_all",
+    "parse_datagrams",
+    "ethercat_frame",
+    "ETHERTYPE_ETHERCAT",
+    "CMD_LRD",
+    "CMD_LWR",
+    "CMD_LRW",
+    "CMD_FRMW",
+]
+
+
+if __name__ == "__main__":
+    main()
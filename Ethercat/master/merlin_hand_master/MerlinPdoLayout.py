@@ -0,0 +1,48 @@
+import numpy as np
+
+from .MerlinTypes import MotorStateFrame
+
+
+# NumPy views of the EtherCAT process image. Must match esc_sheet.h and
+# MerlinMaster_v1._RXPDO_STRUCT / _TXPDO_STRUCT.
+
+# Motor_RxPDO_t (master -> slave): 20 bytes per motor.
+RXPDO_DTYPE = np.dtype([
+    ("torque_enable", "<u4"),
+    ("goal_id", "<f4"),
+    ("goal_iq", "<f4"),
+    ("goal_velocity", "<f4"),
+    ("goal_position", "<f4"),
+])
+
+# Motor_TxPDO_t (slave -> master): 36 bytes per motor. Field names follow MotorState.
+TXPDO_DTYPE = np.dtype([
+    ("present_id", "<f4"),
+    ("present_iq", "<f4"),
+    ("present_velocity", "<f4"),
+    ("present_position", "<f4"),
+    ("input_voltage", "<f4"),
+    ("winding_temperature", "<f4"),
+    ("powerstage_temperature", "<f4"),
+    ("ic_temperature", "<f4"),
+    ("error_status", "<f4"),
+])
+
+RXPDO_FIELDS = RXPDO_DTYPE.names
+TXPDO_FIELDS = TXPDO_DTYPE.names
+
+
+def records_to_motor_states(records: np.ndarray) -> MotorStateFrame:
+    """
+    Convert TxPDO records to the MotorStateFrame returned by `get_all_states`.
+
+    Any structured array with the TXPDO_FIELDS works (e.g. CAN-FD status
+    records, whose extra `motor_id` is dropped).
+    """
+    values = np.empty((len(records), len(TXPDO_FIELDS)), dtype="<f4")
+    for k, name in enumerate(TXPDO_FIELDS):
+        values[:, k] = records[name]
+    return MotorStateFrame.frombytes(values.tobytes())
+
+
+__all__ = ["RXPDO_DTYPE", "TXPDO_DTYPE", "RXPDO_FIELDS", "TXPDO_FIELDS", "records_to_motor_states"]
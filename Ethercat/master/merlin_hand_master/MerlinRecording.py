@@ -0,0 +1,438 @@
+import lzma
+import os
+import queue
+import struct
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .MerlinPdoLayout import RXPDO_DTYPE, RXPDO_FIELDS, TXPDO_DTYPE, TXPDO_FIELDS
+
+
+# ---- File layout -----------------------------------------------------------------
+#
+#   file header | chunk | chunk | ... | chunk index | footer
+#
+# A chunk holds up to `chunk_cycles` consecutive recorded cycles, column by
+# column: timestamp, cycle, wkc, then every RxPDO and TxPDO field as a
+# (num_motors, n) array (one time series per motor). Each column is
+# optionally byte-shuffled and compressed on its own, so a reader can
+# decompress only the fields it asks for.
+#
+#   chunk : CHUNK_HEADER, NUM_COLUMNS x u32 compressed column sizes, column data
+#
+# The index (INDEX_DTYPE per chunk) and footer are written on close; a file
+# without them (writer crashed) is indexed by scanning the chunk headers.
+
+RECORDING_MAGIC = b"MRLR"
+RECORDING_VERSION = 1
+FILE_HEADER = struct.Struct("<4sHHIBBBx")      # magic, version, num_motors, chunk_cycles, codec, level, shuffle
+CHUNK_MAGIC = b"CHNK"
+CHUNK_HEADER = struct.Struct("<4sIQQdd")       # magic, n, first_cycle, last_cycle, t_first, t_last
+FOOTER_MAGIC = b"MRLI"
+FOOTER = struct.Struct("<QI4s")                # index offset, chunk count, magic
+
+INDEX_DTYPE = np.dtype([
+    ("offset", "<u8"),
+    ("size", "<u8"),
+    ("n", "<u4"),
+    ("reserved", "<u4"),
+    ("first_cycle", "<u8"),
+    ("last_cycle", "<u8"),
+    ("t_first", "<f8"),
+    ("t_last", "<f8"),
+])
+
+CODECS = {"none": 0, "zlib": 1, "lzma": 2}
+
+# Column name -> dtype; RxPDO / TxPDO fields are (num_motors, n) per chunk.
+COLUMNS: Dict[str, np.dtype] = {
+    "timestamp": np.dtype("<f8"),
+    "cycle": np.dtype("<u8"),
+    "wkc": np.dtype("<i4"),
+}
+COLUMNS.update({name: RXPDO_DTYPE[name] for name in RXPDO_FIELDS})
+COLUMNS.update({name: TXPDO_DTYPE[name] for name in TXPDO_FIELDS})
+NUM_COLUMNS = len(COLUMNS)
+_PER_MOTOR = frozenset(RXPDO_FIELDS) | frozenset(TXPDO_FIELDS)
+
+
+def _compress(data: bytes, codec: int, level: int) -> bytes:
+    if codec == CODECS["zlib"]:
+        return zlib.compress(data, level)
+    if codec == CODECS["lzma"]:
+        return lzma.compress(data, preset=level)
+    return data
+
+
+def _decompress(data: bytes, codec: int) -> bytes:
+    if codec == CODECS["zlib"]:
+        return zlib.decompress(data)
+    if codec == CODECS["lzma"]:
+        return lzma.decompress(data)
+    return data
+
+
+class _ChunkBuffer:
+    """Raw cycles of one chunk, filled by `RecordingWriter.append`."""
+
+    def __init__(self, chunk_cycles: int, num_motors: int) -> None:
+        self.timestamp = np.zeros(chunk_cycles)
+        self.cycle = np.zeros(chunk_cycles, dtype=np.uint64)
+        self.wkc = np.zeros(chunk_cycles, dtype=np.int32)
+        self.cmd_row = num_motors * RXPDO_DTYPE.itemsize
+        self.state_row = num_motors * TXPDO_DTYPE.itemsize
+        self.commands = bytearray(chunk_cycles * self.cmd_row)
+        self.states = bytearray(chunk_cycles * self.state_row)
+        self.n = 0
+
+
+class RecordingWriter:
+    """
+    Writes cycles to a chunked, column-oriented, compressed recording.
+
+    `append()` only copies into a preallocated chunk buffer (safe to call from
+    the PDO thread); full chunks are compressed and written by a worker
+    thread. If the worker falls `buffers` chunks behind, cycles are dropped
+    and counted in `dropped_cycles` instead of blocking the caller.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        num_motors: int,
+        chunk_cycles: int = 1000,
+        codec: str = "zlib",
+        level: int = 1,
+        shuffle: bool = True,
+        buffers: int = 4,
+    ) -> None:
+        """
+        :param path: Output file (overwritten).
+        :param num_motors: Motors per frame.
+        :param chunk_cycles: Cycles per chunk (the seek granularity).
+        :param codec: 'zlib', 'lzma' or 'none'.
+        :param level: zlib level / lzma preset.
+        :param shuffle: Byte-shuffle each column before compressing (groups the
+                        exponent bytes of float samples; usually compresses better).
+        :param buffers: Chunk buffers in flight between `append()` and the worker.
+        """
+        if codec not in CODECS:
+            raise ValueError(f"unknown codec {codec!r} (expected one of {sorted(CODECS)})")
+        self.path = path
+        self._num_motors = num_motors
+        self.chunk_cycles = chunk_cycles
+        self._codec = CODECS[codec]
+        self._level = level
+        self._shuffle = shuffle
+
+        self._file = open(path, "wb")
+        self._file.write(FILE_HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION, num_motors, chunk_cycles,
+                                          self._codec, level, int(shuffle)))
+        self._offset = FILE_HEADER.size
+        self._index: List[tuple] = []
+
+        self._free: "queue.Queue[_ChunkBuffer]" = queue.Queue()
+        for _ in range(max(2, buffers)):
+            self._free.put(_ChunkBuffer(chunk_cycles, num_motors))
+        self._full: "queue.Queue[Optional[_ChunkBuffer]]" = queue.Queue()
+        self._active: Optional[_ChunkBuffer] = self._free.get()
+        self.cycles_written = 0
+        self.dropped_cycles = 0
+        self.bytes_written = FILE_HEADER.size
+        self._closed = False
+
+        self._worker = threading.Thread(target=self._worker_thread, name="MerlinRecording", daemon=True)
+        self._worker.start()
+
+    @property
+    def num_motors(self) -> int:
+        return self._num_motors
+
+    def append(self, timestamp: float, cycle: int, wkc: int, commands, states) -> None:
+        """
+        Add one cycle.
+
+        :param commands: Raw RxPDO image (bytes-like, 20 bytes per motor).
+        :param states: Raw TxPDO image (bytes-like, 36 bytes per motor).
+        """
+        chunk = self._active
+        if chunk is None:
+            try:
+                chunk = self._active = self._free.get_nowait()
+            except queue.Empty:
+                self.dropped_cycles += 1
+                return
+        k = chunk.n
+        chunk.timestamp[k] = timestamp
+        chunk.cycle[k] = cycle
+        chunk.wkc[k] = wkc
+        row = chunk.cmd_row
+        chunk.commands[k * row:(k + 1) * row] = memoryview(commands)[:row]
+        row = chunk.state_row
+        chunk.states[k * row:(k + 1) * row] = memoryview(states)[:row]
+        chunk.n = k + 1
+        if chunk.n == self.chunk_cycles:
+            self._full.put(chunk)
+            try:
+                self._active = self._free.get_nowait()
+            except queue.Empty:
+                self._active = None
+
+    def append_block(self, timestamps, cycles, wkc, commands: np.ndarray, states: np.ndarray) -> None:
+        """Add many cycles: (n,) columns and (n, num_motors) RXPDO / TXPDO records."""
+        commands = np.ascontiguousarray(commands, dtype=RXPDO_DTYPE)
+        states = np.ascontiguousarray(states, dtype=TXPDO_DTYPE)
+        for k in range(len(timestamps)):
+            self.append(float(timestamps[k]), int(cycles[k]), int(wkc[k]), commands[k], states[k])
+
+    def close(self) -> None:
+        """Flush the last partial chunk, write the index and close the file."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._active is not None and self._active.n:
+            self._full.put(self._active)
+        self._active = None
+        self._full.put(None)
+        self._worker.join()
+
+        index = np.array(self._index, dtype=INDEX_DTYPE)
+        self._file.write(index.tobytes())
+        self._file.write(FOOTER.pack(self._offset, len(index), FOOTER_MAGIC))
+        self._file.close()
+        self.bytes_written = self._offset + index.nbytes + FOOTER.size
+
+    def __enter__(self) -> "RecordingWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _encode(self, chunk: _ChunkBuffer) -> bytes:
+        n, m = chunk.n, self._num_motors
+        commands = np.frombuffer(chunk.commands, dtype=RXPDO_DTYPE, count=n * m).reshape(n, m)
+        states = np.frombuffer(chunk.states, dtype=TXPDO_DTYPE, count=n * m).reshape(n, m)
+        columns = [chunk.timestamp[:n], chunk.cycle[:n], chunk.wkc[:n]]
+        columns += [commands[name].T for name in RXPDO_FIELDS]
+        columns += [states[name].T for name in TXPDO_FIELDS]
+
+        blobs = []
+        for column in columns:
+            column = np.ascontiguousarray(column)
+            if self._shuffle and column.itemsize > 1:
+                raw = column.view(np.uint8).reshape(-1, column.itemsize).T.tobytes()
+            else:
+                raw = column.tobytes()
+            blobs.append(_compress(raw, self._codec, self._level))
+        header = CHUNK_HEADER.pack(CHUNK_MAGIC, n, int(chunk.cycle[0]), int(chunk.cycle[n - 1]),
+                                   float(chunk.timestamp[0]), float(chunk.timestamp[n - 1]))
+        sizes = struct.pack(f"<{NUM_COLUMNS}I", *(len(b) for b in blobs))
+        return b"".join([header, sizes] + blobs)
+
+    def _worker_thread(self) -> None:
+        while True:
+            chunk = self._full.get()
+            if chunk is None:
+                return
+            data = self._encode(chunk)
+            self._file.write(data)
+            n = chunk.n
+            self._index.append((self._offset, len(data), n, 0, int(chunk.cycle[0]), int(chunk.cycle[n - 1]),
+                                float(chunk.timestamp[0]), float(chunk.timestamp[n - 1])))
+            self._offset += len(data)
+            self.cycles_written += n
+            chunk.n = 0
+            self._free.put(chunk)
+
+
+class RecordingReader:
+    """
+    Random access to a recording: the chunk index is loaded on open, reads
+    locate the chunks of a time or cycle window by binary search and
+    decompress only those chunks and the requested columns, in parallel
+    (zlib and lzma release the GIL).
+    """
+
+    def __init__(self, path: str, workers: Optional[int] = None) -> None:
+        """
+        :param workers: Decoder threads (default: CPU count); 1 decodes serially.
+        """
+        self.path = path
+        self._fd = os.open(path, os.O_RDONLY)
+        header = os.pread(self._fd, FILE_HEADER.size, 0)
+        magic, version, num_motors, chunk_cycles, codec, level, shuffle = FILE_HEADER.unpack(header)
+        if magic != RECORDING_MAGIC or version != RECORDING_VERSION:
+            os.close(self._fd)
+            raise ValueError(f"{path} is not a Merlin recording (v{RECORDING_VERSION})")
+        self._num_motors = num_motors
+        self.chunk_cycles = chunk_cycles
+        self.codec = {v: k for k, v in CODECS.items()}[codec]
+        self._codec = codec
+        self._shuffle = bool(shuffle)
+        self.index = self._load_index()
+        self._workers = workers if workers is not None else (os.cpu_count() or 1)
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def num_motors(self) -> int:
+        return self._num_motors
+
+    @property
+    def num_cycles(self) -> int:
+        return int(self.index["n"].sum())
+
+    @property
+    def time_range(self):
+        if len(self.index) == 0:
+            return (0.0, 0.0)
+        return (float(self.index["t_first"][0]), float(self.index["t_last"][-1]))
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        os.close(self._fd)
+
+    def __enter__(self) -> "RecordingReader":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def read(
+        self,
+        t_start: Optional[float] = None,
+        t_end: Optional[float] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Cycles with `t_start <= timestamp <= t_end` (open ends by default).
+
+        :param fields: Columns to decode (default: all); 'timestamp' is always included.
+        :return: Column name -> array; (n,) for timestamp/cycle/wkc, (n, num_motors)
+                 for the PDO fields.
+        """
+        t = self.index
+        lo = 0 if t_start is None else int(np.searchsorted(t["t_last"], t_start, side="left"))
+        hi = len(t) if t_end is None else int(np.searchsorted(t["t_first"], t_end, side="right"))
+        data = self._read_chunks(range(lo, hi), fields, "timestamp")
+        ts = data["timestamp"]
+        mask = np.ones(len(ts), dtype=bool)
+        if t_start is not None:
+            mask &= ts >= t_start
+        if t_end is not None:
+            mask &= ts <= t_end
+        return data if mask.all() else {name: column[mask] for name, column in data.items()}
+
+    def read_cycles(
+        self,
+        first: Optional[int] = None,
+        last: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """Cycles numbered `first..last` (inclusive); see `read()`."""
+        t = self.index
+        lo = 0 if first is None else int(np.searchsorted(t["last_cycle"], first, side="left"))
+        hi = len(t) if last is None else int(np.searchsorted(t["first_cycle"], last, side="right"))
+        data = self._read_chunks(range(lo, hi), fields, "cycle")
+        cycles = data["cycle"]
+        mask = np.ones(len(cycles), dtype=bool)
+        if first is not None:
+            mask &= cycles >= first
+        if last is not None:
+            mask &= cycles <= last
+        return data if mask.all() else {name: column[mask] for name, column in data.items()}
+
+    def read_states(self, t_start: Optional[float] = None, t_end: Optional[float] = None):
+        """(timestamps (n,), states (n, num_motors) TXPDO_DTYPE) of a time window."""
+        data = self.read(t_start, t_end, fields=TXPDO_FIELDS)
+        states = np.zeros(data["timestamp"].shape + (self._num_motors,), dtype=TXPDO_DTYPE)
+        for name in TXPDO_FIELDS:
+            states[name] = data[name]
+        return data["timestamp"], states
+
+    def iter_chunks(self, fields: Optional[Sequence[str]] = None, batch: Optional[int] = None):
+        """
+        Walk the whole recording in time order with bounded memory: yields
+        `read()`-style dicts of `batch` chunks each (default: one per decoder thread).
+        """
+        batch = batch or self._workers
+        for lo in range(0, len(self.index), batch):
+            yield self._read_chunks(range(lo, min(lo + batch, len(self.index))), fields, "timestamp")
+
+    # ---- Internals -----------------------------------------------------------------
+
+    def _load_index(self) -> np.ndarray:
+        size = os.fstat(self._fd).st_size
+        if size >= FILE_HEADER.size + FOOTER.size:
+            offset, count, magic = FOOTER.unpack(os.pread(self._fd, FOOTER.size, size - FOOTER.size))
+            if magic == FOOTER_MAGIC and offset + count * INDEX_DTYPE.itemsize + FOOTER.size == size:
+                return np.frombuffer(os.pread(self._fd, count * INDEX_DTYPE.itemsize, offset), dtype=INDEX_DTYPE)
+        return self._scan_index(size)
+
+    def _scan_index(self, size: int) -> np.ndarray:
+        """Rebuild the index from the chunk headers (file without footer)."""
+        entries = []
+        offset = FILE_HEADER.size
+        prefix = CHUNK_HEADER.size + 4 * NUM_COLUMNS
+        while offset + prefix <= size:
+            head = os.pread(self._fd, prefix, offset)
+            magic, n, first_cycle, last_cycle, t_first, t_last = CHUNK_HEADER.unpack_from(head)
+            if magic != CHUNK_MAGIC:
+                break
+            chunk_size = prefix + sum(struct.unpack_from(f"<{NUM_COLUMNS}I", head, CHUNK_HEADER.size))
+            if offset + chunk_size > size:
+                break   # truncated last chunk
+            entries.append((offset, chunk_size, n, 0, first_cycle, last_cycle, t_first, t_last))
+            offset += chunk_size
+        return np.array(entries, dtype=INDEX_DTYPE)
+
+    def _read_chunks(self, chunks, fields, required: str) -> Dict[str, np.ndarray]:
+        names = list(COLUMNS) if fields is None else list(dict.fromkeys([required, *fields]))
+        for name in names:
+            if name not in COLUMNS:
+                raise KeyError(f"unknown field {name!r}")
+        entries = [self.index[k] for k in chunks]
+        if len(entries) > 1 and self._workers > 1:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="MerlinRecording")
+            decoded = list(self._pool.map(lambda e: self._decode_chunk(e, names), entries))
+        else:
+            decoded = [self._decode_chunk(e, names) for e in entries]
+        if not decoded:
+            m = self._num_motors
+            return {name: np.zeros((0, m) if name in _PER_MOTOR else 0, dtype=COLUMNS[name]) for name in names}
+        return {name: np.concatenate([d[name] for d in decoded]) for name in names}
+
+    def _decode_chunk(self, entry, names: List[str]) -> Dict[str, np.ndarray]:
+        data = os.pread(self._fd, int(entry["size"]), int(entry["offset"]))
+        n = int(entry["n"])
+        sizes = struct.unpack_from(f"<{NUM_COLUMNS}I", data, CHUNK_HEADER.size)
+        starts = np.cumsum((CHUNK_HEADER.size + 4 * NUM_COLUMNS,) + sizes[:-1])
+        wanted = set(names)
+        out = {}
+        for k, (name, dtype) in enumerate(COLUMNS.items()):
+            if name not in wanted:
+                continue
+            raw = _decompress(data[starts[k]:starts[k] + sizes[k]], self._codec)
+            column = np.frombuffer(raw, dtype=np.uint8)
+            if self._shuffle and dtype.itemsize > 1:
+                column = np.ascontiguousarray(column.reshape(dtype.itemsize, -1).T).reshape(-1)
+            column = column.view(dtype)
+            if name in _PER_MOTOR:
+                column = column.reshape(self._num_motors, n).T
+            out[name] = column
+        return out
+
+
+__all__ = [
+    "RecordingWriter",
+    "RecordingReader",
+    "INDEX_DTYPE",
+    "COLUMNS",
+    "CODECS",
+]
@@ -0,0 +1,88 @@
+from typing import Optional
+
+
+# Path of the last process-data frame, as reported by a backend's `rx_path`
+# (None: nothing came back, or the backend cannot tell).
+RX_PATH_RING = "ring"            # through every slave: the ring (or line) is intact
+RX_PATH_SPLIT = "split"          # ring broken; each port's frame served its half
+RX_PATH_PRIMARY = "primary"      # only the slaves behind the primary port answered
+RX_PATH_SECONDARY = "secondary"  # only the slaves behind the redundant port answered
+
+
+class RingMonitor:
+    """
+    Ring health of a (redundant) EtherCAT bus, written into CycleStats.
+
+    In a redundant ring SOEM sends each frame out of both ports. While the
+    ring is intact the primary frame passes every slave and comes back on the
+    redundant port. After a cable break the ESCs next to the break close
+    their ports, each frame loops back to the port it left, and SOEM merges
+    the two halves. A backend that knows which way the frame went sets
+    `rx_path` after `receive_processdata()` (SimMaster does; pysoem does not
+    expose it). Only the failover timing is available from the WKC alone: as
+    long as the backend has never reported a path, any cycle without full
+    process data starts the failover timing and the next good cycle ends it.
+    Once paths are reported, the timing is started by a ring break instead,
+    so a single lost frame on an intact ring is not counted as a failover.
+
+    Updated fields:
+    - `rx_path`, `primary_frames`, `secondary_frames`: path of the last frame
+      and frames that came back per sending port
+    - `ring_intact`, `ring_breaks`, `ring_restores`: topology changes
+    - `failover_cycles_last` / `_max`, `failover_us_last`: cycles (and time)
+      without full process data (missed or short WKC) between the last good
+      cycle before a break and the first good cycle after it
+    """
+
+    def __init__(self, redundant: bool) -> None:
+        """
+        :param redundant: The master opened a redundant port (`ifname_red`).
+        """
+        self.redundant = redundant
+        self._last_good_cycle = 0
+        self._bad_since_t: Optional[float] = None
+        self._failing_over = False
+        self._paths_reported = False
+
+    def update(self, stats, now: float, wkc: int, expected_wkc: int, path: Optional[str]) -> None:
+        """Account the cycle `stats.cycles` (already counted by the PDO loop)."""
+        if path is not None:
+            self._paths_reported = True
+            stats.rx_path = path
+            if path != RX_PATH_SECONDARY:
+                stats.primary_frames += 1
+            if self.redundant and path != RX_PATH_PRIMARY:
+                stats.secondary_frames += 1
+            intact = path == RX_PATH_RING
+            if intact != stats.ring_intact:
+                stats.ring_intact = intact
+                if intact:
+                    stats.ring_restores += 1
+                else:
+                    stats.ring_breaks += 1
+                    self._failing_over = True
+
+        if wkc == expected_wkc:
+            if self._failing_over:
+                self._failing_over = False
+                cycles = stats.cycles - self._last_good_cycle - 1
+                stats.failover_cycles_last = cycles
+                stats.failover_cycles_max = max(stats.failover_cycles_max, cycles)
+                stats.failover_us_last = 0.0 if self._bad_since_t is None else (now - self._bad_since_t) * 1e6
+            self._last_good_cycle = stats.cycles
+            self._bad_since_t = None
+        else:
+            if self._bad_since_t is None:
+                self._bad_since_t = now
+            if not self._paths_reported:
+                # WKC only: a missed frame or short WKC is all a break looks like.
+                self._failing_over = True
+
+
+__all__ = [
+    "RingMonitor",
+    "RX_PATH_RING",
+    "RX_PATH_SPLIT",
+    "RX_PATH_PRIMARY",
+    "RX_PATH_SECONDARY",
+]
@@ -0,0 +1,277 @@
+import math
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from .MerlinPdoLayout import RXPDO_DTYPE
+
+_GOAL_FIELDS = ("goal_id", "goal_iq", "goal_velocity", "goal_position")
+
+
+@dataclass
+class SafetyStatus:
+    """Snapshot of the safety stage state."""
+
+    tripped: List[bool]
+    stale: bool
+    ramp: float
+    fault_trips: int
+    watchdog_timeouts: int
+    nonfinite_goals: int
+
+
+class SafetyLimiter:
+    """
+    Safety stage applied to the whole RxPDO command array every cycle.
+
+    - Non-finite goals (NaN / inf): replaced before any other check by the
+      last limited value (goal_position, goal_iq) or zero, counted, and the
+      motor is tripped, so NaN never reaches the slave or the rate limiter.
+    - Per-motor limit tables: |goal_id|, |goal_iq|, |goal_velocity| and a
+      goal_position window.
+    - Rate limits on goal_position (rad/s) and goal_iq (A/s).
+    - Fault trip: a motor reporting a non-zero `error_status` or a temperature
+      above its limit gets torque disabled and zero goals until
+      `clear_faults()` is called (latched).
+    - Watchdog: if `feed()` is not called for `watchdog_cycles` cycles the
+      current/velocity goals ramp to zero over `ramp_time_s` while the
+      position goal holds, then torque is disabled.
+
+    The limit tables are public float32 arrays (one entry per motor) and may be
+    edited in place, e.g. `limiter.max_iq[3] = 1.5`. `inf` means no limit.
+    """
+
+    def __init__(
+        self,
+        num_motors: int,
+        *,
+        max_id=np.inf,
+        max_iq=np.inf,
+        max_velocity=np.inf,
+        min_position=-np.inf,
+        max_position=np.inf,
+        max_position_rate=np.inf,
+        max_iq_rate=np.inf,
+        max_winding_temperature=np.inf,
+        max_powerstage_temperature=np.inf,
+        max_ic_temperature=np.inf,
+        trip_on_error: bool = True,
+        trip_on_nonfinite: bool = True,
+        watchdog_cycles: Optional[int] = None,
+        ramp_time_s: float = 0.2,
+        disable_after_ramp: bool = True,
+    ) -> None:
+        """
+        :param num_motors: Motors in the command array.
+        :param max_id, max_iq, max_velocity: Absolute goal limits (scalar or per motor).
+        :param min_position, max_position: Goal position window (scalar or per motor).
+        :param max_position_rate: Max goal_position change per second.
+        :param max_iq_rate: Max goal_iq change per second.
+        :param max_*_temperature: Trip thresholds on the reported temperatures.
+        :param trip_on_error: Trip a motor whose `error_status` is non-zero.
+        :param trip_on_nonfinite: Trip a motor that is sent a NaN or infinite goal.
+        :param watchdog_cycles: Cycles without `feed()` before ramping to safe (None = off).
+        :param ramp_time_s: Duration of the ramp to zero current/velocity.
+        :param disable_after_ramp: Clear torque_enable once the ramp has finished.
+        """
+        self._num_motors = num_motors
+
+        def table(value) -> np.ndarray:
+            return np.broadcast_to(np.asarray(value, dtype=np.float32), (num_motors,)).copy()
+
+        self.max_id = table(max_id)
+        self.max_iq = table(max_iq)
+        self.max_velocity = table(max_velocity)
+        self.min_position = table(min_position)
+        self.max_position = table(max_position)
+        self.max_position_rate = table(max_position_rate)
+        self.max_iq_rate = table(max_iq_rate)
+        self.max_winding_temperature = table(max_winding_temperature)
+        self.max_powerstage_temperature = table(max_powerstage_temperature)
+        self.max_ic_temperature = table(max_ic_temperature)
+        self.trip_on_error = trip_on_error
+        self.trip_on_nonfinite = trip_on_nonfinite
+        self.watchdog_cycles = watchdog_cycles
+        self.ramp_time_s = ramp_time_s
+        self.disable_after_ramp = disable_after_ramp
+
+        self.tripped = np.zeros(num_motors, dtype=bool)
+        self._fault = np.zeros(num_motors, dtype=bool)
+        self._nonfinite = np.zeros(num_motors, dtype=bool)
+        # Weights of one dot product over the float32 image: 1 per goal field,
+        # 0 for torque_enable. Its result is finite iff every goal is (or overflowed).
+        weights = np.array([name in _GOAL_FIELDS for name in RXPDO_DTYPE.names], dtype=np.float32)
+        self._goal_weights = np.tile(weights, num_motors)
+        self._last_position = np.zeros(num_motors, dtype=np.float32)
+        self._last_iq = np.zeros(num_motors, dtype=np.float32)
+        self._step = np.zeros(num_motors, dtype=np.float32)
+        self._lo = np.zeros(num_motors, dtype=np.float32)
+        self._hi = np.zeros(num_motors, dtype=np.float32)
+        self._last_t: Optional[float] = None
+        self._seeded = False
+
+        self._stale_cycles = 0
+        self._ramp = 1.0
+        self.fault_trips = 0
+        self.watchdog_timeouts = 0
+        self.nonfinite_goals = 0
+
+    @property
+    def num_motors(self) -> int:
+        return self._num_motors
+
+    def feed(self) -> None:
+        """Mark the application commands as fresh (resets the watchdog)."""
+        self._stale_cycles = 0
+
+    def reset(self, positions=None) -> None:
+        """
+        Restart rate limiting from `positions` (e.g. the measured positions) and
+        zero current; without positions the first commands seen are taken as is.
+        """
+        if positions is not None and not np.all(np.isfinite(positions)):
+            raise ValueError("reset positions must be finite")
+        self._last_t = None
+        self._seeded = positions is not None
+        if positions is not None:
+            self._last_position[...] = positions
+        self._last_iq[...] = 0.0
+
+    def clear_faults(self, motors=None) -> None:
+        """Re-arm tripped motors (all, or the given indices / boolean mask)."""
+        if motors is None:
+            self.tripped[:] = False
+        else:
+            self.tripped[motors] = False
+
+    def status(self) -> SafetyStatus:
+        return SafetyStatus(
+            tripped=self.tripped.tolist(),
+            stale=self._ramp < 1.0,
+            ramp=self._ramp,
+            fault_trips=self.fault_trips,
+            watchdog_timeouts=self.watchdog_timeouts,
+            nonfinite_goals=self.nonfinite_goals,
+        )
+
+    def apply(self, records: np.ndarray, states: Optional[np.ndarray], now: float) -> None:
+        """
+        Limit RxPDO `records` (RXPDO_DTYPE, edited in place) for this cycle.
+
+        :param states: Latest TXPDO_DTYPE states for the fault checks, or None.
+        :param now: Cycle time in seconds (`time.monotonic()`).
+        """
+        position = records["goal_position"]
+        iq = records["goal_iq"]
+        first = self._last_t is None and not self._seeded
+        dt = 0.0 if self._last_t is None else min(max(now - self._last_t, 0.0), 0.1)
+        self._last_t = now
+
+        # -- Non-finite goals --
+        if not self._goals_finite(records):
+            self._replace_nonfinite(records, first)
+
+        # -- Faults (latched) --
+        if states is not None:
+            fault = self._fault
+            np.greater(states["winding_temperature"], self.max_winding_temperature, out=fault)
+            fault |= states["powerstage_temperature"] > self.max_powerstage_temperature
+            fault |= states["ic_temperature"] > self.max_ic_temperature
+            if self.trip_on_error:
+                fault |= states["error_status"] != 0
+            if np.count_nonzero(fault):
+                self.fault_trips += int(np.count_nonzero(fault & ~self.tripped))
+                self.tripped |= fault
+
+        # -- Absolute limits --
+        _clamp_abs(records["goal_id"], self.max_id, self._lo)
+        _clamp_abs(iq, self.max_iq, self._lo)
+        _clamp_abs(records["goal_velocity"], self.max_velocity, self._lo)
+        np.maximum(position, self.min_position, out=position)
+        np.minimum(position, self.max_position, out=position)
+
+        # -- Rate limits --
+        if not first:
+            self._rate_limit(position, self._last_position, self.max_position_rate, dt)
+            self._rate_limit(iq, self._last_iq, self.max_iq_rate, dt)
+
+        # -- Watchdog --
+        if self.watchdog_cycles is not None:
+            self._stale_cycles += 1
+            if self._stale_cycles > self.watchdog_cycles:
+                if self._ramp == 1.0:
+                    self.watchdog_timeouts += 1
+                ramp_step = dt / self.ramp_time_s if self.ramp_time_s > 0 else 1.0
+                self._ramp = max(0.0, self._ramp - ramp_step)
+            else:
+                self._ramp = 1.0
+        if self._ramp < 1.0:
+            records["goal_id"] *= self._ramp
+            iq *= self._ramp
+            records["goal_velocity"] *= self._ramp
+            if not first:
+                position[...] = self._last_position
+            if self._ramp == 0.0 and self.disable_after_ramp:
+                records["torque_enable"] = 0
+
+        # -- Tripped motors: torque off, zero goals, hold position --
+        if np.count_nonzero(self.tripped):
+            tripped = self.tripped
+            records["torque_enable"][tripped] = 0
+            records["goal_id"][tripped] = 0.0
+            iq[tripped] = 0.0
+            records["goal_velocity"][tripped] = 0.0
+            if not first:
+                position[tripped] = self._last_position[tripped]
+
+        self._last_position[...] = position
+        self._last_iq[...] = iq
+
+    def _goals_finite(self, records: np.ndarray) -> bool:
+        """Fast check; False may also mean a float32 overflow (the slow path then finds nothing)."""
+        if records.dtype == RXPDO_DTYPE and records.flags.c_contiguous and len(records) == self._num_motors:
+            return math.isfinite(float(np.dot(records.view(np.float32), self._goal_weights)))
+        return all(np.isfinite(records[name]).all() for name in _GOAL_FIELDS)
+
+    def _replace_nonfinite(self, records: np.ndarray, first: bool) -> None:
+        bad = self._nonfinite
+        bad[:] = False
+        for name in _GOAL_FIELDS:
+            values = records[name]
+            mask = ~np.isfinite(values)
+            if not mask.any():
+                continue
+            bad |= mask
+            if name == "goal_position" and not first:
+                values[mask] = self._last_position[mask]
+            elif name == "goal_iq":
+                values[mask] = self._last_iq[mask]
+            else:
+                values[mask] = 0.0
+        count = int(np.count_nonzero(bad))
+        self.nonfinite_goals += count
+        if count and self.trip_on_nonfinite:
+            self.fault_trips += int(np.count_nonzero(bad & ~self.tripped))
+            self.tripped |= bad
+
+    def _rate_limit(self, values: np.ndarray, last: np.ndarray, max_rate: np.ndarray, dt: float) -> None:
+        step = self._step
+        if dt == 0.0:
+            np.copyto(step, np.where(np.isinf(max_rate), np.inf, 0.0))
+        else:
+            np.multiply(max_rate, dt, out=step)
+        np.subtract(last, step, out=self._lo)
+        np.add(last, step, out=self._hi)
+        np.maximum(values, self._lo, out=values)
+        np.minimum(values, self._hi, out=values)
+
+
+def _clamp_abs(values: np.ndarray, limit: np.ndarray, scratch: np.ndarray) -> None:
+    """values = clip(values, -limit, limit), in place (ufuncs; np.clip is slower here)."""
+    np.minimum(values, limit, out=values)
+    np.negative(limit, out=scratch)
+    np.maximum(values, scratch, out=values)
+
+
+__all__ = ["SafetyLimiter", "SafetyStatus"]
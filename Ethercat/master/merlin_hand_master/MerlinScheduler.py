@@ -0,0 +1,167 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+
+@dataclass
+class TaskStats:
+    """Counters of one scheduled task."""
+
+    runs: int = 0
+    deferred: int = 0        # ticks the task was due but did not fit into the slack
+    skipped: int = 0         # whole periods lost because the task fell that far behind
+    overruns: int = 0        # runs longer than the budget
+    errors: int = 0
+    time_us: float = 0.0     # last run
+    time_max_us: float = 0.0
+    detached: bool = False
+    error: Optional[BaseException] = None
+
+
+class _Task:
+    __slots__ = ("name", "fn", "period_s", "budget_s", "priority", "max_overruns",
+                 "consecutive_overruns", "next_due", "stats")
+
+    def __init__(self, name, fn, period_s, budget_s, priority, max_overruns, first_due) -> None:
+        self.name = name
+        self.fn = fn
+        self.period_s = period_s
+        self.budget_s = budget_s
+        self.priority = priority
+        self.max_overruns = max_overruns
+        self.consecutive_overruns = 0
+        self.next_due = first_due
+        self.stats = TaskStats()
+
+
+class SlackScheduler:
+    """
+    Multi-rate tasks run in the slack of a cyclic loop.
+
+    After each PDO exchange the loop calls `run(now, deadline)`. Due tasks run
+    in priority order (then the most overdue first), but a task only starts
+    if its budget still fits before `deadline` minus `guard_us`. A task that
+    does not fit is deferred to the next tick instead of delaying the next
+    frame. Tasks cannot be preempted: a run that exceeds its budget is
+    counted as an overrun, and after `max_consecutive_overruns` in a row the
+    task is detached. Split long jobs (e.g. several SDO reads) into short
+    steps.
+
+    `now` (the master's clock) drives the periods; elapsed times and the
+    deadline use `clock` (the loop's `perf_counter`, virtual in lockstep mode).
+
+    `add()` / `remove()` may be called from other threads while the loop runs:
+    they swap in a new task list instead of editing the one `run()` iterates,
+    and the next due time is only recomputed under a lock.
+    """
+
+    def __init__(self, guard_us: float = 50.0, clock: Callable[[], float] = time.perf_counter) -> None:
+        """
+        :param guard_us: Margin kept free before the deadline (wake-up jitter of the loop).
+        :param clock: Clock of `deadline`, used to time the tasks.
+        """
+        self.guard_s = guard_us * 1e-6
+        self._clock = clock
+        self._tasks: List[_Task] = []
+        self._lock = threading.Lock()
+        self._next_due = float("inf")
+        self._last_now: Optional[float] = None
+        self.deadline_misses = 0    # ticks whose tasks ended past the deadline
+
+    def add(
+        self,
+        name: str,
+        fn: Callable[[float], None],
+        period_s: float,
+        budget_us: float,
+        priority: int = 0,
+        max_consecutive_overruns: Optional[int] = 10,
+    ) -> TaskStats:
+        """
+        Register `fn(now)` to run every `period_s`.
+
+        :param budget_us: Worst-case run time; the task starts only if this much slack is left.
+        :param priority: Higher runs first when several tasks are due.
+        :param max_consecutive_overruns: Detach limit, or None to never detach.
+        :return: The task's live counters.
+        """
+        if period_s <= 0:
+            raise ValueError("period_s must be positive")
+        with self._lock:
+            if any(t.name == name for t in self._tasks):
+                raise ValueError(f"task {name!r} already exists")
+            first_due = self._last_now if self._last_now is not None else float("-inf")
+            task = _Task(name, fn, period_s, budget_us * 1e-6, priority, max_consecutive_overruns, first_due)
+            self._tasks = sorted(self._tasks + [task], key=lambda t: -t.priority)
+            self._update_next_due()
+        return task.stats
+
+    def remove(self, name: str) -> None:
+        with self._lock:
+            tasks = [t for t in self._tasks if t.name != name]
+            if len(tasks) == len(self._tasks):
+                raise KeyError(name)
+            self._tasks = tasks
+            self._update_next_due()
+
+    def stats(self) -> Dict[str, TaskStats]:
+        """Live counters per task name."""
+        return {t.name: t.stats for t in self._tasks}
+
+    def run(self, now: float, deadline: float) -> None:
+        """Run the tasks due at `now` that fit before `deadline` (`clock` time)."""
+        self._last_now = now
+        if now < self._next_due:
+            return
+        clock = self._clock
+        latest_start = deadline - self.guard_s
+        due = [t for t in self._tasks if t.next_due <= now and not t.stats.detached]
+        if len(due) > 1:
+            # Stable: equal priorities keep registration order after the most overdue.
+            due.sort(key=lambda t: t.next_due)
+            due.sort(key=lambda t: -t.priority)
+        ran = False
+        for task in due:
+            stats = task.stats
+            t0 = clock()
+            if t0 + task.budget_s > latest_start:
+                stats.deferred += 1
+                continue
+            ran = True
+            try:
+                task.fn(now)
+            except Exception as exc:
+                stats.errors += 1
+                stats.error = exc
+            elapsed = clock() - t0
+            stats.runs += 1
+            stats.time_us = elapsed * 1e6
+            stats.time_max_us = max(stats.time_max_us, stats.time_us)
+            if elapsed > task.budget_s:
+                stats.overruns += 1
+                task.consecutive_overruns += 1
+                if task.max_overruns is not None and task.consecutive_overruns >= task.max_overruns:
+                    stats.detached = True
+            else:
+                task.consecutive_overruns = 0
+
+            if task.next_due == float("-inf"):
+                task.next_due = now
+            task.next_due += task.period_s
+            if task.next_due <= now:
+                # Fell behind by whole periods: drop them instead of running back to back.
+                missed = int((now - task.next_due) // task.period_s) + 1
+                stats.skipped += missed
+                task.next_due += missed * task.period_s
+        if ran and clock() > deadline:
+            self.deadline_misses += 1
+        with self._lock:
+            # From the current list: tasks added while this tick ran count too.
+            self._update_next_due()
+
+    def _update_next_due(self) -> None:
+        self._next_due = min((t.next_due for t in self._tasks if not t.stats.detached), default=float("inf"))
+
+
+__all__ = ["SlackScheduler", "TaskStats"]
@@ -0,0 +1,521 @@
+import random
+import select
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from .MerlinRedundancy import RX_PATH_PRIMARY, RX_PATH_RING, RX_PATH_SECONDARY, RX_PATH_SPLIT
+from .MerlinTypes import INIT_STATE, OP_STATE, PREOP_STATE, SAFEOP_STATE
+
+
+class SimSlave:
+    """
+    Simulated Merlin STM32/LAN9252 slave.
+
+    Mimics the subset of `pysoem.CdefSlave` that the master code uses
+    (`output`, `input`, `state`, `dc_sync`, SDO and EEPROM access) and runs a
+    very small motor model so that closed-loop code sees plausible states.
+
+    Process-data layouts match `esc_sheet.h`:
+    - RxPDO (per motor): uint32 torque_enable + 4x float32 goals  (20 bytes)
+    - TxPDO (per motor): 9x float32 states                        (36 bytes)
+    """
+
+    _RXPDO_STRUCT = struct.Struct("<Iffff")
+    _TXPDO_STRUCT = struct.Struct("<fffffffff")
+
+    def __init__(
+        self,
+        num_motors: int = 15,
+        name: str = "RobotHand",
+        man: int = 0x000004D8,
+        product_id: int = 0x00000001,
+        rev: int = 0x00000001,
+        eeprom_size: int = 2048,
+        compact_rxpdo: bool = False,
+        echo: bool = False,
+        echo_delay_frames: int = 1,
+    ) -> None:
+        """
+        :param num_motors: Number of motors mapped into the process image.
+        :param name: Slave name reported after config_init().
+        :param man: Vendor ID (matches the generated SII images).
+        :param product_id: Product code.
+        :param rev: Revision number.
+        :param eeprom_size: Emulated SII EEPROM size in bytes (LAN9252 default: 2 KiB).
+        :param compact_rxpdo: Accept the compact delta-encoded RxPDO (MerlinCompactPdo).
+        :param echo: Echo mode (firmware PDO_ECHO_MODE): report the goals as the present
+                     id / iq / velocity / position instead of running the motor model.
+        :param echo_delay_frames: Frames before an echo is visible. The firmware writes the
+                                  TxPDO after the frame that carried the outputs, so 1 is
+                                  the minimum on hardware.
+        """
+        self.name = name
+        self.man = man
+        self.id = product_id
+        self.rev = rev
+        self.state = INIT_STATE
+
+        self.num_motors = num_motors
+        self._compact_decoder = None
+        if compact_rxpdo:
+            from .MerlinCompactPdo import CompactCommandDecoder, compact_rxpdo_size
+            self._compact_decoder = CompactCommandDecoder(num_motors)
+            self.output = bytes(compact_rxpdo_size(num_motors))
+        else:
+            self.output = bytes(num_motors * self._RXPDO_STRUCT.size)
+        self.input = bytes(num_motors * self._TXPDO_STRUCT.size)
+        self.echo = echo
+        self._echo_pipeline = deque([self.input] * echo_delay_frames)
+
+        # EEPROM emulation (word addressed, little endian like the real ESC).
+        self.eeprom = bytearray(b"\xFF" * eeprom_size)
+        self.eeprom_reads = 0
+        self.eeprom_writes = 0
+        self._eeprom_lock = threading.Lock()
+
+        # CoE object dictionary: (index, subindex) -> raw bytes.
+        self.sdo: Dict[Tuple[int, int], bytes] = {}
+
+        self.dc_active = False
+        self.sync0_cycle_time_ns = 0
+        self.sync0_shift_ns = 0
+        # SYNC0 accounting: periods that latched no new frame, and frames
+        # replaced by the next one before any SYNC0 latched them.
+        self.sync0_stale = 0
+        self.sync0_overwritten = 0
+        self._last_sync0: Optional[int] = None
+
+        self._positions = [0.0] * num_motors
+        self._velocities = [0.0] * num_motors
+        # Reported per motor; edit to inject over-temperature or error faults.
+        self.winding_temperature = [30.0] * num_motors
+        self.error_status = [0.0] * num_motors
+
+    # -------------------- pysoem.CdefSlave-compatible API --------------------
+
+    def dc_sync(self, act: bool, sync0_cycle_time: int, sync0_shift_time: int = 0,
+                sync1_cycle_time: Optional[int] = None) -> None:
+        self.dc_active = bool(act)
+        self.sync0_cycle_time_ns = int(sync0_cycle_time)
+        self.sync0_shift_ns = int(sync0_shift_time)
+        self._last_sync0 = None
+
+    def sdo_read(self, index: int, subindex: int, size: int = 0, release_gil: Optional[bool] = None) -> bytes:
+        try:
+            return self.sdo[(index, subindex)]
+        except KeyError:
+            raise RuntimeError(f"SDO 0x{index:04X}:{subindex} does not exist") from None
+
+    def sdo_write(self, index: int, subindex: int, data: bytes, ca: bool = False,
+                  release_gil: Optional[bool] = None) -> None:
+        self.sdo[(index, subindex)] = bytes(data)
+
+    def eeprom_read(self, word_address: int, timeout: int = 20000) -> bytes:
+        """Read 4 bytes (two words) starting at `word_address`, like SOEM."""
+        start = word_address * 2
+        if start >= len(self.eeprom):
+            raise RuntimeError(f"EEPROM read beyond end (word 0x{word_address:04X})")
+        with self._eeprom_lock:
+            self.eeprom_reads += 1
+            data = bytes(self.eeprom[start:start + 4])
+        return data.ljust(4, b"\xFF")
+
+    def eeprom_write(self, word_address: int, data: bytes, timeout: int = 20000) -> None:
+        """Write exactly one word (2 bytes) at `word_address`."""
+        if len(data) != 2:
+            raise ValueError("EEPROM writes are one word (2 bytes)")
+        start = word_address * 2
+        if start + 2 > len(self.eeprom):
+            raise RuntimeError(f"EEPROM write beyond end (word 0x{word_address:04X})")
+        with self._eeprom_lock:
+            self.eeprom_writes += 1
+            self.eeprom[start:start + 2] = data
+
+    # -------------------- Simulation -----------------------------------------
+
+    def frame_at(self, dc_time_ns: int) -> None:
+        """Account a process-data frame passing this slave at DC time `dc_time_ns`."""
+        if not self.dc_active or self.sync0_cycle_time_ns <= 0:
+            return
+        idx = (dc_time_ns - self.sync0_shift_ns) // self.sync0_cycle_time_ns
+        if self._last_sync0 is not None:
+            if idx == self._last_sync0:
+                self.sync0_overwritten += 1
+            elif idx > self._last_sync0 + 1:
+                self.sync0_stale += idx - self._last_sync0 - 1
+        self._last_sync0 = idx
+
+    def process(self, dt: float) -> None:
+        """Consume the current RxPDO and produce the next TxPDO."""
+        out = self.output
+        if self._compact_decoder is not None:
+            out = self._compact_decoder.decode(out).tobytes()
+        in_buf = bytearray(len(self.input))
+        if self.echo:
+            self._process_echo(out, in_buf)
+            return
+        alpha = min(1.0, dt / 0.02)  # first-order position tracking, 20 ms time constant
+
+        for i in range(self.num_motors):
+            torque_enable, goal_id, goal_iq, _goal_velocity, goal_position = \
+                self._RXPDO_STRUCT.unpack_from(out, i * self._RXPDO_STRUCT.size)
+
+            pos = self._positions[i]
+            if torque_enable:
+                new_pos = pos + alpha * (goal_position - pos)
+            else:
+                new_pos = pos
+            vel = (new_pos - pos) / dt if dt > 0 else 0.0
+            self._positions[i] = new_pos
+            self._velocities[i] = vel
+
+            self._TXPDO_STRUCT.pack_into(
+                in_buf,
+                i * self._TXPDO_STRUCT.size,
+                goal_id if torque_enable else 0.0,
+                goal_iq if torque_enable else 0.0,
+                vel,
+                new_pos,
+                24.0,   # input_voltage
+                self.winding_temperature[i],
+                30.0,   # powerstage_temperature
+                35.0,   # ic_temperature
+                self.error_status[i],
+            )
+        self.input = bytes(in_buf)
+
+    def _process_echo(self, out: bytes, in_buf: bytearray) -> None:
+        for i in range(self.num_motors):
+            _torque_enable, goal_id, goal_iq, goal_velocity, goal_position = \
+                self._RXPDO_STRUCT.unpack_from(out, i * self._RXPDO_STRUCT.size)
+            self._TXPDO_STRUCT.pack_into(
+                in_buf,
+                i * self._TXPDO_STRUCT.size,
+                goal_id,
+                goal_iq,
+                goal_velocity,
+                goal_position,
+                24.0,
+                self.winding_temperature[i],
+                30.0,
+                35.0,
+                self.error_status[i],
+            )
+        self._echo_pipeline.append(bytes(in_buf))
+        self.input = self._echo_pipeline.popleft()
+
+
+class SimMaster:
+    """
+    Fake backend implementing the subset of `pysoem.Master` used by `MerlinMaster_v1`.
+
+    Pass an instance as `MerlinMaster_v1(..., master=SimMaster())` to run the
+    full open/configure/OP sequence and PDO loop without a NIC.
+
+    By default frame latency and timeouts are real waits on the host clock.
+    After `set_clock(clock)` (MerlinLockstep.VirtualClock, used by lockstep
+    masters) they advance the virtual clock instead, so runs are reproducible
+    and as fast as the CPU allows.
+    """
+
+    def __init__(
+        self,
+        slaves: Optional[List[SimSlave]] = None,
+        num_motors: int = 15,
+        loss_rate: float = 0.0,
+        latency_s: float = 0.0,
+        seed: Optional[int] = None,
+        dc_drift_ppm: float = 0.0,
+    ) -> None:
+        """
+        :param slaves: Simulated slaves on the ring (default: one Merlin slave).
+        :param num_motors: Motor count for the default slave.
+        :param loss_rate: Probability that a sent frame never comes back.
+        :param latency_s: Simulated round-trip time of a frame.
+        :param seed: Seed for the loss generator (reproducible runs).
+        :param dc_drift_ppm: Rate of the simulated DC reference clock relative to
+                             the host clock (e.g. 50 = DC runs 50 ppm fast).
+        """
+        self._sim_slaves = slaves if slaves is not None else [SimSlave(num_motors=num_motors)]
+        self.slaves: List[SimSlave] = []
+        self.in_op = False
+        self.do_check_state = False
+        self.state = INIT_STATE
+        self.expected_wkc = 0
+        self.cycle_dt_s = 0.001
+        self.loss_rate = loss_rate
+        self.latency_s = latency_s
+        self.frames_sent = 0
+        self.frames_lost = 0
+        self._rng = random.Random(seed)
+        self._in_flight: Optional[Tuple[float, bool, Optional[str], int]] = None
+        self._opened = False
+        self._capture = None
+
+        # Topology: a redundant port after open(..., ifname_red), an optional cable break.
+        self.redundant = False
+        self.rx_path: Optional[str] = None
+        self._break_after: Optional[int] = None
+        self._link_down_frames = 0
+
+        # Simulated DC reference clock (ns), latched when a frame passes the ring.
+        self.dc_drift_ppm = dc_drift_ppm
+        self.dc_time = 0
+        self._dc_epoch_ns = self._rng.randrange(10**9, 10**12)
+        self._clock = time.perf_counter
+        self._sleep = time.sleep
+        self._dc_t0 = self._clock()
+
+    def set_clock(self, clock) -> None:
+        """Run on `clock` (object with `now()` and `sleep(seconds)`) instead of the host clock."""
+        self._clock = clock.now
+        self._sleep = clock.sleep
+        self._dc_t0 = self._clock()
+
+    def dc_clock(self, t: Optional[float] = None) -> int:
+        """DC reference time in ns at host time `t` (`self._clock()` or the set clock, default now)."""
+        if t is None:
+            t = self._clock()
+        return self._dc_epoch_ns + int((t - self._dc_t0) * 1e9 * (1.0 + self.dc_drift_ppm * 1e-6))
+
+    def open(self, ifname: str, ifname_red: Optional[str] = None) -> None:
+        self._opened = True
+        self.redundant = ifname_red is not None
+
+    def break_ring(self, after_slave: int, link_down_frames: int = 3) -> None:
+        """
+        Cut the cable behind slave `after_slave` (0-based; -1: between the
+        master's primary port and the first slave).
+
+        The next `link_down_frames` frames are lost while the ports next to
+        the break detect the link loss. After that, with a redundant port
+        every slave is served again from both sides; without one only the
+        slaves in front of the break answer (short WKC).
+        """
+        if not -1 <= after_slave < len(self._sim_slaves):
+            raise IndexError(f"after_slave out of range [-1, {len(self._sim_slaves) - 1}]")
+        self._break_after = after_slave + 1
+        self._link_down_frames = link_down_frames
+
+    def restore_ring(self) -> None:
+        """Reconnect the cable cut by `break_ring()`."""
+        self._break_after = None
+        self._link_down_frames = 0
+
+    def _route(self) -> Tuple[Optional[str], int]:
+        """Path of the next frame and how many slaves (from the primary side) it reaches; None if lost."""
+        n = len(self.slaves)
+        reached = self._break_after
+        if reached is None:
+            return RX_PATH_RING, n
+        if self._link_down_frames > 0:
+            self._link_down_frames -= 1
+            return None, 0
+        if not self.redundant:
+            return (RX_PATH_PRIMARY, reached) if reached > 0 else (None, 0)
+        if reached == 0:
+            return RX_PATH_SECONDARY, n
+        return (RX_PATH_SPLIT if reached < n else RX_PATH_PRIMARY), n
+
+    def start_capture(self, path: str) -> None:
+        """
+        Write the process-data frames to a pcap file as a tap on the master's
+        port would see them: the outgoing LRW (plus the DC FRMW once DC is
+        active) and, unless lost, the returned frame with the slaves' inputs.
+        """
+        from .MerlinPcap import PcapWriter
+
+        self.stop_capture()
+        self._capture = PcapWriter(path)
+
+    def stop_capture(self) -> None:
+        if self._capture is not None:
+            self._capture.close()
+            self._capture = None
+
+    def _capture_frame(self, t: float, wkc: int) -> None:
+        from .MerlinPcap import CMD_FRMW, CMD_LRW, SOEM_MAC, ethercat_frame
+
+        image = b"".join(s.output for s in self.slaves) + b"".join(s.input for s in self.slaves)
+        index = self.frames_sent & 0xFF
+        returned = wkc > 0
+        datagrams = [(CMD_LRW, index, 0, image, wkc)]
+        if any(s.dc_active for s in self.slaves):
+            dc = self.dc_time.to_bytes(8, "little") if returned else bytes(8)
+            datagrams.append((CMD_FRMW, index, (0x0910 << 16) | 0x1001, dc, len(self.slaves) if returned else 0))
+        src = bytes([SOEM_MAC[0] | 0x02]) + SOEM_MAC[1:] if returned else SOEM_MAC
+        self._capture.write(t, ethercat_frame(datagrams, src))
+
+    def close(self) -> None:
+        self._opened = False
+
+    def config_init(self, usetable: bool = False) -> int:
+        self.slaves = list(self._sim_slaves)
+        for s in self.slaves:
+            s.state = PREOP_STATE
+        return len(self.slaves)
+
+    def config_map(self) -> int:
+        for s in self.slaves:
+            s.state = SAFEOP_STATE
+        # SOEM: expectedWKC = outputsWKC * 2 + inputsWKC
+        self.expected_wkc = 3 * len(self.slaves)
+        return sum(len(s.output) + len(s.input) for s in self.slaves)
+
+    def state_check(self, expected_state: int, timeout: int = 50_000) -> int:
+        return min((s.state for s in self.slaves), default=INIT_STATE)
+
+    def read_state(self) -> int:
+        return self.state_check(self.state)
+
+    def write_state(self) -> int:
+        for s in self.slaves:
+            s.state = self.state
+        return 1
+
+    def send_processdata(self) -> int:
+        lost = self.loss_rate > 0.0 and self._rng.random() < self.loss_rate
+        path, reached = self._route()
+        lost = lost or path is None
+        self.frames_sent += 1
+        self.frames_lost += lost
+        self._in_flight = (self._clock(), lost, path, reached)
+        if self._capture is not None:
+            self._capture_frame(self._in_flight[0], 0)
+        return 1
+
+    def receive_processdata(self, timeout: int = 2000) -> int:
+        """
+        Like SOEM: wait up to `timeout` µs for the frame; -1 (EC_NOFRAME) if it
+        was lost or arrives later than the timeout.
+        """
+        if self._in_flight is None:
+            self._sleep(timeout * 1e-6)
+            return -1
+        sent_at, lost, path, reached = self._in_flight
+        self._in_flight = None
+        self.rx_path = None
+
+        # The timeout runs from this call, as in SOEM (a pipelined master
+        # receives a frame sent one cycle earlier).
+        deadline = self._clock() + timeout * 1e-6
+        if lost or sent_at + self.latency_s > deadline:
+            remaining = deadline - self._clock()
+            if remaining > 0:
+                self._sleep(remaining)
+            return -1
+        remaining = sent_at + self.latency_s - self._clock()
+        if remaining > 0:
+            self._sleep(remaining)
+
+        self.dc_time = self.dc_clock(sent_at + self.latency_s / 2)
+        for s in self.slaves[:reached]:
+            if s.state == OP_STATE:
+                s.frame_at(self.dc_time)
+                s.process(self.cycle_dt_s)
+        self.rx_path = path
+        wkc = self.expected_wkc if reached == len(self.slaves) else 3 * reached
+        if self._capture is not None:
+            self._capture_frame(sent_at + self.latency_s, wkc)
+        return wkc
+
+
+class SimCanfdSatellite:
+    """
+    Simulated satellite board (v1) on a SocketCAN interface, for benching
+    `MerlinCanfdMaster_v1` on `vcan`.
+
+    Receives Motor_RxPDO_t command frames (StdID 0x300 + idx), feeds them to a
+    `SimSlave` motor model and replies every cycle with one 48-byte
+    Motor_TxPDO_t frame per motor (StdID 0x200 + idx), like the firmware.
+    """
+
+    _CANFD_FRAME = struct.Struct("=IBBBB64s")
+    _CMD_STRUCT = struct.Struct("<IIffff")     # Motor_RxPDO_t (24 bytes)
+    _CANFD_BRS = 0x01
+
+    def __init__(
+        self,
+        ifname: str,
+        num_motors: int = 15,
+        cycle_time_s: float = 0.004,
+        rxpdo_base: int = 0x300,
+        txpdo_base: int = 0x200,
+    ) -> None:
+        """
+        :param ifname: SocketCAN interface (e.g. 'vcan0').
+        :param num_motors: Motors on the simulated board.
+        :param cycle_time_s: Status frame period.
+        :param rxpdo_base: StdID of motor 0's command frame.
+        :param txpdo_base: StdID of motor 0's status frame.
+        """
+        self.slave = SimSlave(num_motors=num_motors)
+        self.slave.state = OP_STATE
+        self._num_motors = num_motors
+        self._cycle_time_s = cycle_time_s
+        self._rxpdo_base = rxpdo_base
+        self._txpdo_base = txpdo_base
+        self.rx_commands = 0
+
+        self._sock = socket.socket(socket.AF_CAN, socket.SOCK_RAW, socket.CAN_RAW)
+        self._sock.setsockopt(socket.SOL_CAN_RAW, getattr(socket, "CAN_RAW_FD_FRAMES", 5), 1)
+        self._sock.bind((ifname,))
+
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="SimCanfdSatellite", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._stop_event.set()
+        self._thread.join(timeout=1.0)
+        self._sock.close()
+
+    def _run(self) -> None:
+        rx_size = self.slave._RXPDO_STRUCT.size
+        tx_size = self.slave._TXPDO_STRUCT.size
+        output = bytearray(self.slave.output)
+        next_deadline = time.perf_counter()
+
+        while not self._stop_event.is_set():
+            next_deadline += self._cycle_time_s
+            while True:
+                remaining = next_deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                readable, _, _ = select.select([self._sock], [], [], remaining)
+                if not readable:
+                    continue
+                frame = self._sock.recv(self._CANFD_FRAME.size)
+                if len(frame) != self._CANFD_FRAME.size:
+                    continue
+                can_id, _length, _flags, _r0, _r1, data = self._CANFD_FRAME.unpack(frame)
+                idx = (can_id & 0x7FF) - self._rxpdo_base
+                if not (0 <= idx < self._num_motors):
+                    continue
+                _motor_id, *goals = self._CMD_STRUCT.unpack_from(data)
+                self.slave._RXPDO_STRUCT.pack_into(output, idx * rx_size, *goals)
+                self.rx_commands += 1
+
+            self.slave.output = bytes(output)
+            self.slave.process(self._cycle_time_s)
+            state = self.slave.input
+            for i in range(self._num_motors):
+                payload = struct.pack("<I", i) + state[i * tx_size:(i + 1) * tx_size]
+                self._sock.send(self._CANFD_FRAME.pack(
+                    (self._txpdo_base + i) & 0x7FF, 48, self._CANFD_BRS, 0, 0, payload
+                ))
+
+
+__all__ = [
+    "SimMaster",
+    "SimSlave",
+    "SimCanfdSatellite",
+    "INIT_STATE",
+    "PREOP_STATE",
+    "SAFEOP_STATE",
+    "OP_STATE",
+]
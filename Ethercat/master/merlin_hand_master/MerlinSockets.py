@@ -0,0 +1,26 @@
+import os
+import stat
+
+
+# Helpers shared by the Unix-socket endpoints of the master (state broadcast,
+# command server).
+
+def claim_socket_path(path: str, replace: bool) -> None:
+    """
+    Make `path` free for bind(): an existing socket is removed only if `replace` is set.
+
+    :raises FileExistsError: if `path` is not a socket, or is one and `replace` is False.
+    """
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{path!r} exists and is not a socket")
+    if not replace:
+        raise FileExistsError(f"Socket {path!r} already exists (another master running?); "
+                              f"pass replace=True to take it over")
+    os.unlink(path)
+
+
+__all__ = ["claim_socket_path"]
@@ -0,0 +1,428 @@
+import errno
+import os
+import select
+import socket
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .MerlinTypes import MotorState, MotorStateFrame
+from .MerlinPdoLayout import TXPDO_DTYPE, records_to_motor_states
+from .MerlinSockets import claim_socket_path
+
+
+# ---- Shared-memory ring layout ---------------------------------------------------
+#
+#   header | slot[0] | slot[1] | ... | slot[capacity - 1]
+#
+# Frame `seq` (1, 2, 3, ...) lives in slot `seq % capacity`. The writer clears
+# the slot's `seq` before copying and sets it afterwards, so a reader that sees
+# the same `seq` before and after its copy got a consistent frame.
+
+RING_MAGIC = 0x4D524C53   # 'MRLS'
+RING_VERSION = 1
+
+RING_HEADER_DTYPE = np.dtype([
+    ("magic", "<u4"),
+    ("version", "<u2"),
+    ("num_motors", "<u2"),
+    ("capacity", "<u4"),
+    ("slot_size", "<u4"),
+    ("write_seq", "<u8"),
+])
+
+
+def ring_slot_dtype(num_motors: int) -> np.dtype:
+    """One published cycle: sequence, host timestamp, working counter and the TxPDO records."""
+    return np.dtype([
+        ("seq", "<u8"),
+        ("timestamp", "<f8"),
+        ("wkc", "<i4"),
+        ("reserved", "<u4"),
+        ("states", TXPDO_DTYPE, (num_motors,)),
+    ])
+
+
+def ring_size(num_motors: int, capacity: int) -> int:
+    return RING_HEADER_DTYPE.itemsize + capacity * ring_slot_dtype(num_motors).itemsize
+
+
+# Datagram: seq u64, timestamp f64, wkc i32, then the raw TxPDO records.
+DATAGRAM_HEADER = struct.Struct("<Qdi")
+SUBSCRIBE_MSG = b"SUB"
+UNSUBSCRIBE_MSG = b"UNSUB"
+
+
+class _Ring:
+    """NumPy views over a shared-memory ring."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, num_motors: int, capacity: int) -> None:
+        self.shm = shm
+        buf = shm.buf
+        self.header = np.ndarray((), dtype=RING_HEADER_DTYPE, buffer=buf)
+        self.slots = np.ndarray((capacity,), dtype=ring_slot_dtype(num_motors), buffer=buf,
+                                offset=RING_HEADER_DTYPE.itemsize)
+        self.seqs = self.slots["seq"]
+        self.raw_states = self.slots["states"].reshape(capacity, -1).view(np.uint8)
+        self.capacity = capacity
+        self.num_motors = num_motors
+
+    def release(self) -> None:
+        # Views must go before the mapping can be closed.
+        del self.header, self.slots, self.seqs, self.raw_states
+        self.shm.close()
+
+
+class StateRingWriter:
+    """Publishes decoded cycles into a named shared-memory ring (writer side)."""
+
+    def __init__(self, name: str, num_motors: int, capacity: int = 1024, replace: bool = False) -> None:
+        """
+        :param name: Shared-memory name (appears as /dev/shm/<name> on Linux).
+        :param num_motors: Motors per frame.
+        :param capacity: Frames kept in the ring.
+        :param replace: Take over an existing segment of that name (e.g. left
+                        behind by a crashed master). Readers still attached to
+                        it keep the old mapping and see no new frames.
+        :raises FileExistsError: if the segment exists and `replace` is False.
+        """
+        size = ring_size(num_motors, capacity)
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            if not replace:
+                raise FileExistsError(
+                    f"Shared memory {name!r} already exists (another master running?); "
+                    f"pass replace=True to take it over"
+                ) from None
+            old = shared_memory.SharedMemory(name=name)
+            old.unlink()
+            old.close()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self._ring = _Ring(shm, num_motors, capacity)
+        header = self._ring.header
+        header["num_motors"] = num_motors
+        header["capacity"] = capacity
+        header["slot_size"] = self._ring.slots.dtype.itemsize
+        header["write_seq"] = 0
+        header["version"] = RING_VERSION
+        header["magic"] = RING_MAGIC
+        self._seq = 0
+        self.name = name
+
+    @property
+    def sequence(self) -> int:
+        return self._seq
+
+    def publish(self, states, timestamp: float, wkc: int = 0) -> int:
+        """
+        Copy one cycle into the ring.
+
+        :param states: Raw TxPDO bytes (e.g. `slave.input`) or TXPDO_DTYPE records.
+        :return: The frame's sequence number.
+        """
+        ring = self._ring
+        seq = self._seq + 1
+        k = seq % ring.capacity
+        ring.seqs[k] = 0
+        raw = ring.raw_states[k]
+        raw[:] = np.frombuffer(states, dtype=np.uint8, count=len(raw))
+        slot = ring.slots[k:k + 1]
+        slot["timestamp"] = timestamp
+        slot["wkc"] = wkc
+        ring.seqs[k] = seq
+        ring.header["write_seq"] = seq
+        self._seq = seq
+        return seq
+
+    def close(self) -> None:
+        """Release and remove the shared memory."""
+        shm = self._ring.shm
+        self._ring.release()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class StateRingReader:
+    """Attaches to a StateRingWriter's ring by name (reader side, any process)."""
+
+    def __init__(self, name: str) -> None:
+        shm = shared_memory.SharedMemory(name=name)
+        # The writer owns the segment; keep this process's resource tracker
+        # from unlinking it when the reader exits.
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        header = np.ndarray((), dtype=RING_HEADER_DTYPE, buffer=shm.buf)
+        if int(header["magic"]) != RING_MAGIC or int(header["version"]) != RING_VERSION:
+            del header
+            shm.close()
+            raise RuntimeError(f"Shared memory {name!r} is not a Merlin state ring")
+        num_motors, capacity = int(header["num_motors"]), int(header["capacity"])
+        del header
+        self._ring = _Ring(shm, num_motors, capacity)
+        self.name = name
+
+    @property
+    def num_motors(self) -> int:
+        return self._ring.num_motors
+
+    @property
+    def capacity(self) -> int:
+        return self._ring.capacity
+
+    @property
+    def write_sequence(self) -> int:
+        """Sequence number of the newest published frame (0 = none yet)."""
+        return int(self._ring.header["write_seq"])
+
+    @property
+    def slots(self) -> np.ndarray:
+        """
+        Zero-copy view of all ring slots (fields seq, timestamp, wkc, states).
+        Slots are overwritten while you read them; check `seq` or use `read()`.
+        """
+        return self._ring.slots
+
+    def read(self, seq: Optional[int] = None) -> Optional[np.ndarray]:
+        """
+        Consistent copy of frame `seq` (default: newest), or None if it is not
+        available (not yet written or already overwritten).
+        """
+        if seq is None:
+            seq = self.write_sequence
+        if seq <= 0:
+            return None
+        k = seq % self._ring.capacity
+        seqs = self._ring.seqs
+        for _ in range(3):
+            if int(seqs[k]) != seq:
+                return None
+            frame = self._ring.slots[k].copy()
+            if int(seqs[k]) == seq:
+                return frame
+        return None
+
+    def read_since(self, last_seq: int) -> Tuple[np.ndarray, int]:
+        """
+        All frames after `last_seq` still in the ring, oldest first.
+
+        :return: (frames, newest seq); frames lost to overwrite are skipped.
+        """
+        newest = self.write_sequence
+        first = max(last_seq + 1, newest - self._ring.capacity + 1, 1)
+        frames = [self.read(seq) for seq in range(first, newest + 1)]
+        frames = [f for f in frames if f is not None]
+        return np.array(frames, dtype=self._ring.slots.dtype), newest
+
+    def close(self) -> None:
+        self._ring.release()
+
+
+class StateDatagramPublisher:
+    """
+    Sends each cycle as one Unix datagram to every subscribed client.
+
+    Clients bind their own socket and send SUBSCRIBE_MSG to `path`; a client
+    whose socket is gone is dropped. Sends never block the PDO loop: a full
+    client queue just loses that frame.
+    """
+
+    def __init__(self, path: str, replace: bool = False) -> None:
+        """
+        :param path: Socket path clients subscribe to.
+        :param replace: Remove an existing socket at `path` first (never a non-socket file).
+        :raises FileExistsError: if `path` exists and `replace` is False or it is not a socket.
+        """
+        claim_socket_path(path, replace)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(path)
+        self._sock.setblocking(False)
+        self._subscribers: List[str] = []
+        self._buf = bytearray()
+        self.path = path
+        self.frames_dropped = 0
+
+    @property
+    def subscribers(self) -> List[str]:
+        return list(self._subscribers)
+
+    def publish(self, states, seq: int, timestamp: float, wkc: int = 0) -> None:
+        self._poll_subscriptions()
+        if not self._subscribers:
+            return
+        payload = memoryview(states).cast("B")
+        size = DATAGRAM_HEADER.size + len(payload)
+        if len(self._buf) != size:
+            self._buf = bytearray(size)
+        DATAGRAM_HEADER.pack_into(self._buf, 0, seq, timestamp, wkc)
+        self._buf[DATAGRAM_HEADER.size:] = payload
+        for addr in list(self._subscribers):
+            try:
+                self._sock.sendto(self._buf, addr)
+            except (BlockingIOError, InterruptedError):
+                self.frames_dropped += 1
+            except OSError as exc:
+                if exc.errno in (errno.ECONNREFUSED, errno.ENOENT):
+                    self._subscribers.remove(addr)
+                elif exc.errno == errno.ENOBUFS:
+                    self.frames_dropped += 1
+                else:
+                    raise
+
+    def close(self) -> None:
+        self._sock.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _poll_subscriptions(self) -> None:
+        while True:
+            try:
+                msg, addr = self._sock.recvfrom(64)
+            except (BlockingIOError, InterruptedError):
+                return
+            if not addr:
+                continue
+            if msg == SUBSCRIBE_MSG and addr not in self._subscribers:
+                self._subscribers.append(addr)
+            elif msg == UNSUBSCRIBE_MSG and addr in self._subscribers:
+                self._subscribers.remove(addr)
+
+
+class MerlinStateClient:
+    """
+    Read-only view of a running `MerlinMaster_v1` from another process, with the
+    same `get_motor_state` / `get_all_states` API.
+
+    Attach to the shared-memory ring (`shm_name`, lowest overhead, no syscalls)
+    or subscribe to the Unix datagram socket (`socket_path`), as enabled with
+    `MerlinMaster_v1.start_broadcast()`.
+    """
+
+    def __init__(self, shm_name: Optional[str] = None, socket_path: Optional[str] = None) -> None:
+        if (shm_name is None) == (socket_path is None):
+            raise ValueError("pass exactly one of shm_name or socket_path")
+        self._reader: Optional[StateRingReader] = None
+        self._sock: Optional[socket.socket] = None
+        self._frame: Optional[np.ndarray] = None
+
+        if shm_name is not None:
+            self._reader = StateRingReader(shm_name)
+            self._num_motors = self._reader.num_motors
+        else:
+            self._server_path = socket_path
+            self._client_path = f"{socket_path}.{os.getpid()}.{id(self):x}"
+            if os.path.exists(self._client_path):
+                os.unlink(self._client_path)
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._sock.bind(self._client_path)
+            self._sock.sendto(SUBSCRIBE_MSG, socket_path)
+            self._num_motors = None
+            self._dgram = bytearray(65536)
+
+    @property
+    def num_motors(self) -> Optional[int]:
+        """Motor count (known after the first frame when using the socket)."""
+        return self._num_motors
+
+    @property
+    def sequence(self) -> int:
+        """Sequence number of the last frame read (0 = none yet)."""
+        return 0 if self._frame is None else int(self._frame["seq"])
+
+    @property
+    def timestamp(self) -> float:
+        """Master-side `time.monotonic()` of the last frame read."""
+        return 0.0 if self._frame is None else float(self._frame["timestamp"])
+
+    def close(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+        if self._sock is not None:
+            try:
+                self._sock.sendto(UNSUBSCRIBE_MSG, self._server_path)
+            except OSError:
+                pass
+            self._sock.close()
+            os.unlink(self._client_path)
+
+    def poll(self) -> bool:
+        """Fetch the newest frame without blocking. :return: True if it is new."""
+        if self._reader is not None:
+            frame = self._reader.read()
+        else:
+            frame = self._drain_socket()
+        if frame is None or (self._frame is not None and frame["seq"] == self._frame["seq"]):
+            return False
+        self._frame = frame
+        return True
+
+    def wait_next(self, timeout: float = 1.0) -> bool:
+        """Wait for a frame newer than the last one read. :return: False on timeout."""
+        deadline = time.monotonic() + timeout
+        while not self.poll():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if self._sock is not None:
+                select.select([self._sock], [], [], remaining)
+            else:
+                time.sleep(min(remaining, 100e-6))
+        return True
+
+    def get_states_array(self) -> np.ndarray:
+        """Newest states as a (num_motors,) TXPDO_DTYPE array (a copy)."""
+        self.poll()
+        if self._frame is None:
+            return np.zeros(self._num_motors or 0, dtype=TXPDO_DTYPE)
+        return self._frame["states"].copy()
+
+    def get_motor_state(self, motor_idx: int) -> MotorState:
+        states = self.get_states_array()
+        if not (0 <= motor_idx < len(states)):
+            raise IndexError(f"motor_idx {motor_idx} out of range [0, {len(states) - 1}]")
+        return records_to_motor_states(states[motor_idx:motor_idx + 1])[0]
+
+    def get_all_states(self) -> MotorStateFrame:
+        return records_to_motor_states(self.get_states_array())
+
+    def _drain_socket(self) -> Optional[np.ndarray]:
+        latest = None
+        while True:
+            try:
+                nbytes = self._sock.recv_into(self._dgram, flags=socket.MSG_DONTWAIT)
+            except (BlockingIOError, InterruptedError):
+                break
+            if nbytes >= DATAGRAM_HEADER.size:
+                latest = bytes(self._dgram[:nbytes])
+        if latest is None:
+            return self._frame
+        seq, timestamp, wkc = DATAGRAM_HEADER.unpack_from(latest)
+        num_motors = (len(latest) - DATAGRAM_HEADER.size) // TXPDO_DTYPE.itemsize
+        self._num_motors = num_motors
+        frame = np.zeros((), dtype=ring_slot_dtype(num_motors))
+        frame["seq"] = seq
+        frame["timestamp"] = timestamp
+        frame["wkc"] = wkc
+        frame["states"] = np.frombuffer(latest, dtype=TXPDO_DTYPE, count=num_motors,
+                                        offset=DATAGRAM_HEADER.size)
+        return frame
+
+
+__all__ = [
+    "RING_HEADER_DTYPE",
+    "ring_slot_dtype",
+    "ring_size",
+    "StateRingWriter",
+    "StateRingReader",
+    "StateDatagramPublisher",
+    "MerlinStateClient",
+]
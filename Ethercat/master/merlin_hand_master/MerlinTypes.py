@@ -0,0 +1,256 @@
+from array import array
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+
+# EtherCAT AL states (same numeric values as pysoem.*_STATE).
+INIT_STATE = 0x01
+PREOP_STATE = 0x02
+SAFEOP_STATE = 0x04
+OP_STATE = 0x08
+
+
+# ---- Motor records ---------------------------------------------------------------
+#
+# MotorCommand and MotorState are slotted views into flat buffers laid out
+# exactly like the process image (native byte order; every supported host is
+# little endian), so the master copies whole frames instead of building one
+# object per motor. Constructed directly they own a one-motor buffer.
+
+# Motor_RxPDO_t: torque_enable u32, then 4x f32 (20 bytes).
+MOTOR_COMMAND_FIELDS = ("torque_enable", "goal_id", "goal_iq", "goal_velocity", "goal_position")
+# Motor_TxPDO_t: 9x f32 (36 bytes).
+MOTOR_STATE_FIELDS = (
+    "present_id",
+    "present_iq",
+    "present_velocity",
+    "present_position",
+    "input_voltage",
+    "winding_temperature",
+    "powerstage_temperature",
+    "ic_temperature",
+    "error_status",
+)
+
+
+def _initial_values(cls_name: str, fields, args, kwargs) -> list:
+    if len(args) > len(fields):
+        raise TypeError(f"{cls_name}() takes at most {len(fields)} positional arguments")
+    values = list(args) + [0] * (len(fields) - len(args))
+    for name, value in kwargs.items():
+        try:
+            k = fields.index(name)
+        except ValueError:
+            raise TypeError(f"{cls_name}() got an unexpected keyword argument {name!r}") from None
+        if k < len(args):
+            raise TypeError(f"{cls_name}() got multiple values for argument {name!r}")
+        values[k] = value
+    return values
+
+
+class _Record:
+    __slots__ = ()
+    FIELDS = ()
+    __hash__ = None
+
+    def astuple(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.FIELDS)
+
+    def asdict(self) -> dict:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def copy(self):
+        """Copy with its own buffer."""
+        return type(self)(*self.astuple())
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.astuple() == other.astuple()
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS)
+        return f"{type(self).__name__}({values})"
+
+
+def _state_field(k: int) -> property:
+    def get(self):
+        return self._buf[self._base + k]
+
+    def set(self, value):
+        self._buf[self._base + k] = value
+
+    return property(get, set)
+
+
+def _command_field(k: int) -> property:
+    def get(self):
+        return self._f32[self._base + k]
+
+    def set(self, value):
+        self._f32[self._base + k] = value
+
+    return property(get, set)
+
+
+class MotorCommand(_Record):
+    """Command values sent from PC master to a single motor (RxPDO)."""
+
+    __slots__ = ("_u32", "_f32", "_base")
+    FIELDS = MOTOR_COMMAND_FIELDS
+    SIZE = 20
+
+    def __init__(self, *args, **kwargs) -> None:
+        values = _initial_values("MotorCommand", self.FIELDS, args, kwargs)
+        buf = bytearray(self.SIZE)
+        self._u32 = memoryview(buf).cast("I")
+        self._f32 = memoryview(buf).cast("f")
+        self._base = 0
+        for name, value in zip(self.FIELDS, values):
+            setattr(self, name, value)
+
+    @classmethod
+    def view(cls, u32: memoryview, f32: memoryview, index: int) -> "MotorCommand":
+        """
+        Proxy for motor `index` of a packed RxPDO image.
+
+        :param u32: memoryview of the image cast to 'I'.
+        :param f32: memoryview of the same image cast to 'f'.
+        """
+        cmd = cls.__new__(cls)
+        cmd._u32 = u32
+        cmd._f32 = f32
+        cmd._base = index * len(cls.FIELDS)
+        return cmd
+
+    @property
+    def torque_enable(self) -> int:
+        return self._u32[self._base]
+
+    @torque_enable.setter
+    def torque_enable(self, value: int) -> None:
+        self._u32[self._base] = int(value)
+
+    goal_id = _command_field(1)
+    goal_iq = _command_field(2)
+    goal_velocity = _command_field(3)
+    goal_position = _command_field(4)
+
+
+class MotorState(_Record):
+    """State values received from a single motor (TxPDO)."""
+
+    __slots__ = ("_buf", "_base")
+    FIELDS = MOTOR_STATE_FIELDS
+    SIZE = 36
+
+    def __init__(self, *args, **kwargs) -> None:
+        self._buf = array("f", _initial_values("MotorState", self.FIELDS, args, kwargs))
+        self._base = 0
+
+    @classmethod
+    def view(cls, buf: array, index: int) -> "MotorState":
+        """Proxy for motor `index` of a flat array('f') with 9 values per motor."""
+        state = cls.__new__(cls)
+        state._buf = buf
+        state._base = index * len(cls.FIELDS)
+        return state
+
+
+for _k, _name in enumerate(MOTOR_STATE_FIELDS):
+    setattr(MotorState, _name, _state_field(_k))
+del _k, _name
+
+
+class MotorStateFrame(Sequence):
+    """
+    Snapshot of all motors' states: one array('f') (9 values per motor, TxPDO
+    order) indexed by MotorState views. Returned by `get_all_states()`.
+    """
+
+    __slots__ = ("buffer", "_num_motors")
+
+    def __init__(self, buffer: array) -> None:
+        """:param buffer: array('f') of 9 * num_motors values; used without copying."""
+        self.buffer = buffer
+        self._num_motors = len(buffer) // len(MOTOR_STATE_FIELDS)
+
+    @classmethod
+    def frombytes(cls, data) -> "MotorStateFrame":
+        """Frame from a raw TxPDO image (36 bytes per motor)."""
+        buf = array("f")
+        buf.frombytes(data)
+        return cls(buf)
+
+    def __len__(self) -> int:
+        return self._num_motors
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [MotorState.view(self.buffer, i) for i in range(*index.indices(self._num_motors))]
+        if index < 0:
+            index += self._num_motors
+        if not (0 <= index < self._num_motors):
+            raise IndexError(f"motor_idx {index} out of range [0, {self._num_motors - 1}]")
+        return MotorState.view(self.buffer, index)
+
+    def __iter__(self):
+        view, buf = MotorState.view, self.buffer
+        return (view(buf, i) for i in range(self._num_motors))
+
+    def column(self, name: str) -> array:
+        """Values of one field for all motors (a copy)."""
+        k = MOTOR_STATE_FIELDS.index(name)
+        return self.buffer[k::len(MOTOR_STATE_FIELDS)]
+
+    def __repr__(self) -> str:
+        return f"MotorStateFrame({list(self)!r})"
+
+
+@dataclass
+class CycleStats:
+    """Health counters of the background PDO loop."""
+
+    cycles: int = 0
+    missed_frames: int = 0
+    wkc_errors: int = 0
+    overruns: int = 0
+    rx_timeout_us: int = 0
+    rtt_mean_us: float = 0.0
+    rtt_jitter_us: float = 0.0
+    rtt_max_us: float = 0.0
+    last_cycle_time_us: float = 0.0
+    cycle_time_max_us: float = 0.0
+    controller_runs: int = 0
+    controller_overruns: int = 0
+    controller_errors: int = 0
+    controller_time_us: float = 0.0
+    controller_time_max_us: float = 0.0
+    controller_detached: bool = False
+    hook_errors: int = 0            # features disabled after raising on the PDO thread
+    # Compact RxPDO (compact_rxpdo=True): goal fields clipped to the 16-bit wire range.
+    compact_saturated_fields: int = 0
+    # Ring health (MerlinRedundancy.RingMonitor); port fields need a backend reporting `rx_path`.
+    rx_path: str = ""
+    primary_frames: int = 0
+    secondary_frames: int = 0
+    ring_intact: bool = True
+    ring_breaks: int = 0
+    ring_restores: int = 0
+    failover_cycles_last: int = 0
+    failover_cycles_max: int = 0
+    failover_us_last: float = 0.0
+
+
+__all__ = [
+    "MotorCommand",
+    "MotorState",
+    "MotorStateFrame",
+    "CycleStats",
+    "MOTOR_COMMAND_FIELDS",
+    "MOTOR_STATE_FIELDS",
+    "INIT_STATE",
+    "PREOP_STATE",
+    "SAFEOP_STATE",
+    "OP_STATE",
+]
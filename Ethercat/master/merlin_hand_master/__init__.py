@@ -0,0 +1,68 @@
+"""
+Host-side tooling for the Merlin hand.
+
+Submodules are imported on first attribute access, so `import
+merlin_hand_master` (or a light submodule such as MerlinTypes) does not pull
+in NumPy, pysoem or the network backends:
+
+    from merlin_hand_master import MotorState          # dataclasses only
+    from merlin_hand_master import MerlinMaster_v1     # master, no pysoem yet
+"""
+import importlib
+from typing import Dict
+
+
+# Public name -> defining submodule.
+_EXPORTS: Dict[str, str] = {
+    "MotorCommand": "MerlinTypes",
+    "MotorState": "MerlinTypes",
+    "MotorStateFrame": "MerlinTypes",
+    "CycleStats": "MerlinTypes",
+    "MerlinMaster_v1": "MerlinEthercatMaster",
+    "MerlinCanfdMaster_v1": "MerlinCanfdMaster",
+    "MerlinEepromWriter": "MerlinEepromWriter",
+    "EepromWriteResult": "MerlinEepromWriter",
+    "RXPDO_DTYPE": "MerlinPdoLayout",
+    "TXPDO_DTYPE": "MerlinPdoLayout",
+    "CompactCommandEncoder": "MerlinCompactPdo",
+    "CompactCommandDecoder": "MerlinCompactPdo",
+    "CanfdBusAnalyzer": "MerlinCanfdAnalyzer",
+    "TrajectoryInterpolator": "MerlinInterpolator",
+    "SafetyLimiter": "MerlinSafety",
+    "FilterBank": "MerlinFilters",
+    "MerlinStateClient": "MerlinStateBroadcast",
+    "MerlinCommandClient": "MerlinCommandServer",
+    "MetricsAggregator": "MerlinMetrics",
+    "DcSyncController": "MerlinDcSync",
+    "SimMaster": "MerlinSimSlave",
+    "VirtualClock": "MerlinLockstep",
+    "SimHandBatch": "MerlinBatchSim",
+    "ShardedSimHands": "MerlinBatchSim",
+    "RecordingWriter": "MerlinRecording",
+    "RecordingReader": "MerlinRecording",
+    "FaultEventExtractor": "MerlinFaults",
+    "FaultIndex": "MerlinFaults",
+    "LatencyProbe": "MerlinLatency",
+    "PdoChunk": "MerlinPcap",
+    "PcapWriter": "MerlinPcap",
+    "RingMonitor": "MerlinRedundancy",
+    "SlackScheduler": "MerlinScheduler",
+    "TaskStats": "MerlinScheduler",
+    "CalibrationTable": "MerlinCalibration",
+}
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
+
+
+__all__ = list(_EXPORTS)
@@ -0,0 +1,936 @@
+"""
+Micro-benchmarks for the host-side Merlin tooling.
+
+Run from `Ethercat/master`:
+
+    python -m merlin_hand_master.benchmark_master            # all benchmarks
+    python -m merlin_hand_master.benchmark_master canfd_codec
+"""
+import sys
+import time
+
+import numpy as np
+
+
+def _timeit(fn, repeat: int = 5, number: int = 10) -> float:
+    """Best-of-`repeat` seconds per call of `fn`."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - t0) / number)
+    return best
+
+
+def bench_canfd_codec(num_frames: int = 150_000) -> None:
+    from .MerlinCanfdCodec import (
+        CANFD_RXPDO_DTYPE,
+        CANFD_TXPDO_DTYPE,
+        latest_states,
+        pack_rxpdo_frames,
+        pack_txpdo_frames,
+        unpack_txpdo_frames,
+    )
+
+    rng = np.random.default_rng(0)
+    states = np.zeros(num_frames, dtype=CANFD_TXPDO_DTYPE)
+    states["motor_id"] = np.arange(num_frames) % 15
+    states["present_position"] = rng.standard_normal(num_frames)
+    std_ids, payloads = pack_txpdo_frames(states)
+
+    commands = np.zeros(num_frames, dtype=CANFD_RXPDO_DTYPE)
+    commands["motor_id"] = np.arange(num_frames) % 15
+
+    t_pack = _timeit(lambda: pack_rxpdo_frames(commands))
+    t_unpack = _timeit(lambda: unpack_txpdo_frames(std_ids, payloads))
+    t_latest = _timeit(lambda: latest_states(std_ids, payloads))
+
+    print(f"canfd_codec ({num_frames} frames)")
+    print(f"  pack RxPDO    : {num_frames / t_pack / 1e6:8.2f} Mframes/s")
+    print(f"  unpack TxPDO  : {num_frames / t_unpack / 1e6:8.2f} Mframes/s")
+    print(f"  latest_states : {num_frames / t_latest / 1e6:8.2f} Mframes/s")
+
+
+def bench_canfd_analyzer(num_cycles: int = 20_000) -> None:
+    from .MerlinCanfdAnalyzer import (
+        SCHEDULE_RATE_HZ,
+        CanfdBusAnalyzer,
+        FrameChunk,
+        frame_phase_times,
+        schedule_load,
+    )
+
+    # Default schedule: 15 commands (24 bytes) then 15 status frames (48 bytes)
+    # per cycle, back to back, each frame starting when the previous one ends.
+    lengths = np.array([24] * 15 + [48] * 15, dtype=np.uint8)
+    arb, data = frame_phase_times(lengths, True, True, 1e6, 5e6)
+    slot = np.concatenate(([0.0], np.cumsum(arb + data)[:-1]))
+    timestamp = (np.arange(num_cycles)[:, None] / SCHEDULE_RATE_HZ + slot).ravel()
+    std_id = np.tile(np.concatenate((0x300 + np.arange(15), 0x200 + np.arange(15))), num_cycles).astype(np.uint32)
+    n = len(timestamp)
+    chunk = FrameChunk(timestamp, std_id, np.tile(lengths, num_cycles), np.ones(n, dtype=bool),
+                       np.ones(n, dtype=bool), np.zeros((n, 64), dtype=np.uint8))
+
+    t0 = time.perf_counter()
+    analyzer = CanfdBusAnalyzer().feed_all([chunk])
+    elapsed = time.perf_counter() - t0
+    report = analyzer.report()
+
+    print(f"canfd_analyzer ({n} frames, {SCHEDULE_RATE_HZ:.0f} Hz x 15 motors)")
+    print(f"  throughput    : {n / elapsed / 1e6:8.2f} Mframes/s")
+    print(f"  bus load      : {report['bus_load'] * 100:8.1f} % (1 Mbit/s nominal, 5 Mbit/s data)")
+    print(f"  predicted     : {schedule_load() * 100:8.1f} %")
+
+
+def bench_compact_rxpdo(num_motors: int = 15) -> None:
+    import struct
+
+    from .MerlinCompactPdo import CompactCommandEncoder, compact_rxpdo_size, full_rxpdo_size
+
+    rxpdo_struct = struct.Struct("<Iffff")
+    rng = np.random.default_rng(0)
+    goals = rng.uniform(-1.0, 1.0, size=(num_motors, 4)).tolist()
+
+    def pack_full() -> bytes:
+        out = bytearray(num_motors * rxpdo_struct.size)
+        for i, g in enumerate(goals):
+            rxpdo_struct.pack_into(out, i * rxpdo_struct.size, 1, *g)
+        return bytes(out)
+
+    encoder = CompactCommandEncoder(num_motors)
+    encoder.goals[:] = goals
+    encoder.torque_enable[:] = 1
+
+    def pack_compact_one_change() -> bytes:
+        encoder.goals[0, 3] += 1e-3
+        return encoder.encode()
+
+    t_full = _timeit(pack_full, number=1000)
+    t_compact = _timeit(pack_compact_one_change, number=1000)
+
+    print(f"compact_rxpdo ({num_motors} motors)")
+    print(f"  frame size    : full {full_rxpdo_size(num_motors)} B, compact {compact_rxpdo_size(num_motors)} B")
+    print(f"  pack time     : full {t_full * 1e6:6.1f} us, compact {t_compact * 1e6:6.1f} us")
+
+
+def bench_cycle_loss(duration_s: float = 2.0, loss_rate: float = 0.01) -> None:
+    from .MerlinEthercatMaster import MerlinMaster_v1
+    from .MerlinSimSlave import SimMaster
+
+    print(f"cycle_loss ({loss_rate * 100:.0f} % injected frame loss, {duration_s:.0f} s at 1 kHz)")
+    modes = {
+        "fixed 100 ms": dict(rx_timeout_us=100_000),
+        "adaptive": dict(),
+        "adaptive+pipe": dict(pipelined=True),
+    }
+    for label, kwargs in modes.items():
+        sim = SimMaster(loss_rate=loss_rate, latency_s=80e-6, seed=0)
+        master = MerlinMaster_v1("sim", num_motors=15, master=sim, **kwargs)
+        time.sleep(duration_s)
+        stats = master.get_cycle_stats()
+        master.close()
+        print(
+            f"  {label:14s}: {stats.cycles:5d} cycles, {stats.missed_frames:3d} missed, "
+            f"worst cycle {stats.cycle_time_max_us / 1e3:7.2f} ms, timeout {stats.rx_timeout_us} us"
+        )
+
+
+def bench_interpolator(num_motors: int = 15) -> None:
+    from .MerlinInterpolator import TrajectoryInterpolator
+
+    rng = np.random.default_rng(0)
+    out_pos = np.zeros(num_motors, dtype=np.float32)
+    out_vel = np.zeros(num_motors, dtype=np.float32)
+
+    print(f"interpolator ({num_motors} motors, 100 Hz waypoints)")
+    for order in (3, 5):
+        interp = TrajectoryInterpolator(num_motors, order)
+        interp.reset(0.0, np.zeros(num_motors))
+        t0 = time.perf_counter()
+        for k in range(1, 201):
+            interp.push_waypoints(k * 0.01, rng.uniform(-1.0, 1.0, num_motors))
+        t_push = (time.perf_counter() - t0) / 200
+        t = [0.0]
+
+        def evaluate() -> None:
+            t[0] += 1e-3
+            interp.evaluate(t[0], out_pos, out_vel)
+
+        t_eval = _timeit(evaluate, repeat=1, number=1500)
+        print(f"  order {order}       : push {t_push * 1e6:6.1f} us/waypoint, evaluate {t_eval * 1e6:6.1f} us/cycle")
+
+
+def bench_safety(num_motors: int = 15) -> None:
+    from .MerlinPdoLayout import RXPDO_DTYPE, TXPDO_DTYPE
+    from .MerlinSafety import SafetyLimiter
+
+    rng = np.random.default_rng(0)
+    records = np.zeros(num_motors, dtype=RXPDO_DTYPE)
+    states = np.zeros(num_motors, dtype=TXPDO_DTYPE)
+    states["winding_temperature"] = 30.0
+    limiter = SafetyLimiter(
+        num_motors, max_iq=2.0, max_velocity=10.0, min_position=-1.0, max_position=1.0,
+        max_position_rate=5.0, max_iq_rate=200.0, max_winding_temperature=80.0, watchdog_cycles=50,
+    )
+    goals = rng.uniform(-2.0, 2.0, size=(1000, num_motors)).astype(np.float32)
+    t = [0.0]
+
+    def apply() -> None:
+        t[0] += 1e-3
+        k = int(t[0] * 1e3) % len(goals)
+        records["goal_position"] = goals[k]
+        records["goal_iq"] = goals[k]
+        limiter.feed()
+        limiter.apply(records, states, t[0])
+
+    t_apply = _timeit(apply, number=1000)
+    print(f"safety ({num_motors} motors, all limits + watchdog)")
+    print(f"  apply         : {t_apply * 1e6:6.1f} us/cycle")
+
+
+def bench_filters(num_motors: int = 15) -> None:
+    from .MerlinFilters import Derivative, FilterBank, LowPass, MovingAverage, WindowStats
+    from .MerlinPdoLayout import TXPDO_DTYPE
+
+    states = np.zeros(num_motors, dtype=TXPDO_DTYPE)
+    bank = FilterBank(num_motors)
+    bank.add("velocity_lp", "present_velocity", LowPass(cutoff_hz=50))
+    bank.add("acceleration", "present_velocity", Derivative(cutoff_hz=100))
+    bank.add("iq_avg", "present_iq", MovingAverage(20))
+    bank.add("temperature", "winding_temperature", WindowStats(100))
+    t = [0.0]
+
+    def update() -> None:
+        t[0] += 1e-3
+        bank.update(states, t[0])
+
+    t_update = _timeit(update, number=1000)
+    print(f"filters ({num_motors} motors, low-pass + derivative + average + 100-sample stats)")
+    print(f"  update        : {t_update * 1e6:6.1f} us/cycle")
+
+
+def bench_command_latency(duration_s: float = 2.0, rate_hz: float = 200.0) -> None:
+    import os
+    import tempfile
+
+    from .MerlinCommandServer import MerlinCommandClient
+    from .MerlinEthercatMaster import MerlinMaster_v1
+    from .MerlinSimSlave import SimMaster
+
+    path = os.path.join(tempfile.gettempdir(), f"merlin_bench_cmd_{os.getpid()}.sock")
+    master = MerlinMaster_v1("sim", num_motors=15, master=SimMaster(latency_s=80e-6, seed=0))
+    server = master.start_command_server(path)
+    client = MerlinCommandClient(path, priority=1)
+    motors = np.arange(15)
+    t_end = time.monotonic() + duration_s
+    k = 0
+    while time.monotonic() < t_end:
+        client.send(motors, torque_enable=1, goal_position=np.sin(k * 1e-2) * np.ones(15))
+        k += 1
+        time.sleep(1.0 / rate_hz)
+    time.sleep(0.01)
+    stats = server.latency_stats()
+    client.close()
+    master.close()
+
+    print(f"command_latency ({k} batches of 15 motors, client send -> frame transmit, 1 kHz cycle)")
+    print(
+        f"  latency       : mean {stats['mean_us']:6.0f} us, p50 {stats['p50_us']:6.0f} us, "
+        f"p99 {stats['p99_us']:6.0f} us, max {stats['max_us']:6.0f} us"
+    )
+
+
+def bench_metrics(num_motors: int = 15, window_s: float = 1.0) -> None:
+    from types import SimpleNamespace
+
+    from .MerlinMetrics import MetricsAggregator
+    from .MerlinPdoLayout import TXPDO_DTYPE
+
+    rng = np.random.default_rng(0)
+    states = np.zeros(num_motors, dtype=TXPDO_DTYPE)
+    for name in TXPDO_DTYPE.names:
+        states[name] = rng.standard_normal(num_motors)
+    counters = SimpleNamespace(cycles=0, missed_frames=0, wkc_errors=0, overruns=0)
+    # Long window so the timed loop never swaps buffers.
+    aggregator = MetricsAggregator(num_motors, window_s=3600.0)
+    t = [0.0]
+
+    def record() -> None:
+        t[0] += 1e-3
+        aggregator.record(states, 50.0, 20.0, counters, t[0])
+
+    t_record = _timeit(record, repeat=3, number=1000)
+    window = aggregator._active
+    window.n_states = window.n_cycles = window.n_periods = window.n_rtt = int(window_s * 1000)
+    t_summary = _timeit(lambda: aggregator.summarize(window), repeat=3, number=3)
+    aggregator.close()
+
+    print(f"metrics ({num_motors} motors x {len(TXPDO_DTYPE.names)} fields, {window_s:.0f} s windows at 1 kHz)")
+    print(f"  record        : {t_record * 1e6:6.1f} us/cycle (PDO thread)")
+    print(f"  summarize     : {t_summary * 1e3:6.1f} ms/window (worker thread)")
+
+
+def bench_dc_sync(duration_s: float = 3.0, drift_ppm: float = 500.0) -> None:
+    from .MerlinEthercatMaster import MerlinMaster_v1
+    from .MerlinSimSlave import SimMaster
+
+    print(f"dc_sync ({drift_ppm:.0f} ppm simulated DC drift, {duration_s:.0f} s at 1 kHz)")
+    for label, control in (("free running", False), ("PI locked", True)):
+        sim = SimMaster(latency_s=50e-6, dc_drift_ppm=drift_ppm, seed=0)
+        master = MerlinMaster_v1("sim", num_motors=15, master=sim, dc_sync_control=control)
+        time.sleep(duration_s)
+        dc = master.get_dc_stats()
+        master.close()
+        slave = sim.slaves[0]
+        line = f"  {label:13s}: {slave.sync0_stale:4d} stale SYNC0, {slave.sync0_overwritten:4d} overwritten frames"
+        if dc is not None:
+            line += (
+                f", phase jitter {dc.offset_jitter_ns / 1e3:5.1f} us, "
+                f"drift estimate {dc.drift_ppm:6.1f} ppm"
+            )
+        print(line)
+
+
+def bench_motor_records(num_motors: int = 15, snapshots: int = 1000) -> None:
+    import struct
+    import tracemalloc
+    from array import array
+    from dataclasses import dataclass
+
+    from .MerlinTypes import MOTOR_STATE_FIELDS, MotorState, MotorStateFrame
+
+    @dataclass
+    class DataclassState:
+        present_id: float = 0.0
+        present_iq: float = 0.0
+        present_velocity: float = 0.0
+        present_position: float = 0.0
+        input_voltage: float = 0.0
+        winding_temperature: float = 0.0
+        powerstage_temperature: float = 0.0
+        ic_temperature: float = 0.0
+        error_status: float = 0.0
+
+    txpdo = struct.Struct("<9f")
+    frame = bytes(np.random.default_rng(0).standard_normal(num_motors * 9).astype("<f4"))
+
+    # Previous scheme: one dataclass per motor, rebuilt per frame and copied per call.
+    old_states = [DataclassState() for _ in range(num_motors)]
+
+    def old_unpack():
+        for i in range(num_motors):
+            old_states[i] = DataclassState(*txpdo.unpack_from(frame, i * txpdo.size))
+
+    def old_snapshot():
+        return [DataclassState(**vars(s)) for s in old_states]
+
+    buf = array("f", bytes(len(frame)))
+    buf_bytes = memoryview(buf).cast("B")
+
+    def new_unpack():
+        buf_bytes[:] = frame
+
+    def new_snapshot():
+        return MotorStateFrame(buf[:])
+
+    old_unpack()
+    new_unpack()
+    k = MOTOR_STATE_FIELDS.index("present_position")
+
+    def old_read():
+        return sum(s.present_position for s in old_snapshot())
+
+    def new_read():
+        return sum(s.present_position for s in new_snapshot())
+
+    def footprint(make) -> float:
+        tracemalloc.start()
+        kept = [make() for _ in range(snapshots)]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del kept
+        return size / snapshots
+
+    assert abs(old_read() - new_read()) < 1e-6 and MotorState.view(buf, 0).present_position == buf[k]
+    print(f"motor_records ({num_motors} motors)")
+    for label, old, new in (
+        ("unpack frame", old_unpack, new_unpack),
+        ("get_all_states", old_snapshot, new_snapshot),
+        ("snapshot + read", old_read, new_read),
+    ):
+        t_old = _timeit(old, number=2000)
+        t_new = _timeit(new, number=2000)
+        print(f"  {label:15s}: dataclass {t_old * 1e6:7.2f} us, array-backed {t_new * 1e6:7.2f} us")
+    print(f"  snapshot memory: dataclass {footprint(old_snapshot):7.0f} B, "
+          f"array-backed {footprint(new_snapshot):7.0f} B")
+
+
+def _lockstep_tracking(gain: float, cycles: int = 5000) -> float:
+    """Lockstep scenario for `bench_lockstep`: RMS error of a P loop tracking a 2 Hz sine."""
+    from .MerlinEthercatMaster import MerlinMaster_v1
+    from .MerlinSimSlave import SimMaster
+
+    master = MerlinMaster_v1("sim", num_motors=15, master=SimMaster(latency_s=50e-6, loss_rate=0.01, seed=0),
+                             lockstep=True)
+    phase = np.linspace(0.0, np.pi, 15)
+    sq_error = [0.0]
+
+    def controller(t, states, commands):
+        target = np.sin(2 * np.pi * 2.0 * t + phase)
+        error = target - states["present_position"]
+        sq_error[0] += float(error @ error)
+        commands["torque_enable"] = 1
+        commands["goal_position"] = states["present_position"] + gain * error
+
+    master.set_controller(controller)
+    master.step(cycles)
+    runs = master.get_cycle_stats().controller_runs
+    master.close()
+    return float(np.sqrt(sq_error[0] / (15 * runs)))
+
+
+def bench_lockstep(cycles: int = 10_000) -> None:
+    import os
+
+    from .MerlinEthercatMaster import MerlinMaster_v1
+    from .MerlinLockstep import sweep
+
+    master = MerlinMaster_v1("sim", num_motors=15, lockstep=True)
+    master.enable_filters()
+    master.set_controller(lambda t, states, commands: None)
+    t0 = time.perf_counter()
+    master.step(cycles)
+    elapsed = time.perf_counter() - t0
+    simulated = master.now()
+    master.close()
+
+    gains = [0.5 * k for k in range(1, 17)]
+    t0 = time.perf_counter()
+    serial = sweep(_lockstep_tracking, [{"gain": g} for g in gains], processes=1)
+    t_serial = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    pooled = sweep(_lockstep_tracking, [{"gain": g} for g in gains])
+    t_pool = time.perf_counter() - t0
+
+    print(f"lockstep ({cycles} cycles at 1 kHz, 15 motors)")
+    print(f"  step rate     : {cycles / elapsed / 1e3:8.1f} kcycles/s "
+          f"({simulated / elapsed:5.1f}x real time)")
+    print(f"  sweep serial  : {t_serial:8.2f} s for {len(gains)} runs")
+    print(f"  sweep pool    : {t_pool:8.2f} s on {os.cpu_count()} CPUs, "
+          f"identical results: {serial == pooled}")
+    best = min(range(len(gains)), key=serial.__getitem__)
+    print(f"  best gain     : {gains[best]:8.2f} (RMS error {serial[best]:.2e})")
+
+
+def bench_batch_sim(num_hands: int = 64, ticks: int = 2000) -> None:
+    import os
+
+    from .MerlinBatchSim import ShardedSimHands, SimHandBatch
+    from .MerlinSimSlave import SimSlave
+
+    # Baseline: one scalar SimSlave per hand.
+    slaves = [SimSlave(num_motors=15) for _ in range(num_hands)]
+    t_scalar = _timeit(lambda: [s.process(0.001) for s in slaves], repeat=3, number=20)
+
+    batch = SimHandBatch(num_hands)
+    batch.commands["torque_enable"] = 1
+    batch.commands["goal_position"] = 1.0
+    t_batch = _timeit(lambda: batch.tick(), repeat=3, number=ticks)
+
+    print(f"batch_sim ({num_hands} hands x 15 motors)")
+    print(f"  scalar SimSlave : {num_hands / t_scalar / 1e3:8.1f} k hand-cycles/s")
+    print(f"  SimHandBatch    : {num_hands / t_batch / 1e3:8.1f} k hand-cycles/s")
+    with ShardedSimHands(num_hands * 4) as sharded:
+        sharded.commands["torque_enable"] = 1
+        for per_call in (1, 100):
+            t = _timeit(lambda: sharded.tick(ticks=per_call), repeat=3, number=max(1, ticks // per_call // 4))
+            print(f"  sharded x{sharded.num_workers:<2d}     : "
+                  f"{sharded.num_hands * per_call / t / 1e3:8.1f} k hand-cycles/s "
+                  f"({sharded.num_hands} hands, {per_call} ticks per call, {os.cpu_count()} CPUs)")
+
+
+def bench_recording(num_motors: int = 15, cycles: int = 100_000) -> None:
+    import os
+    import tempfile
+
+    import numpy as np
+
+    from .MerlinPdoLayout import RXPDO_DTYPE, TXPDO_DTYPE
+    from .MerlinRecording import RecordingReader, RecordingWriter
+
+    # Synthetic 1 kHz session: sine goals, noisy tracking, slow temperature drift.
+    rng = np.random.default_rng(0)
+    t = np.arange(cycles) * 0.001
+    phase = np.linspace(0, np.pi, num_motors)
+    goal = np.sin(2 * np.pi * 0.5 * t[:, None] + phase).astype(np.float32)
+    commands = np.zeros((cycles, num_motors), dtype=RXPDO_DTYPE)
+    commands["torque_enable"] = 1
+    commands["goal_position"] = goal
+    states = np.zeros((cycles, num_motors), dtype=TXPDO_DTYPE)
+    states["present_position"] = goal + rng.normal(0, 1e-3, goal.shape)
+    states["present_velocity"] = np.gradient(goal, axis=0) * 1e3
+    states["present_iq"] = rng.normal(0.2, 0.01, goal.shape)
+    states["input_voltage"] = 24.0
+    states["winding_temperature"] = 30.0 + t[:, None] / 60.0
+    states["powerstage_temperature"] = 30.0
+    states["ic_temperature"] = 35.0
+    cmd_image = memoryview(commands.reshape(-1).view(np.uint8))
+    state_image = memoryview(states.reshape(-1).view(np.uint8))
+    cmd_row, state_row = commands[0].nbytes, states[0].nbytes
+    raw = cycles * (8 + 8 + 4 + num_motors * (RXPDO_DTYPE.itemsize + TXPDO_DTYPE.itemsize))
+
+    print(f"recording ({cycles} cycles x {num_motors} motors, {raw / 1e6:.1f} MB raw)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for codec, level in (("zlib", 1), ("zlib", 6), ("lzma", 0)):
+            path = os.path.join(tmp, f"{codec}{level}.mrl")
+            t0 = time.perf_counter()
+            # Enough chunk buffers that a 1-CPU host does not drop cycles while compressing.
+            writer = RecordingWriter(path, num_motors, codec=codec, level=level, buffers=cycles // 1000 + 1)
+            for k in range(cycles):
+                writer.append(t[k], k, 3, cmd_image[k * cmd_row:(k + 1) * cmd_row],
+                              state_image[k * state_row:(k + 1) * state_row])
+            t_append = time.perf_counter() - t0
+            writer.close()
+            t_total = time.perf_counter() - t0
+            size = os.path.getsize(path)
+            assert writer.dropped_cycles == 0
+            print(f"  {codec} {level}: append {t_append / cycles * 1e6:5.2f} us/cycle, "
+                  f"{raw / t_total / 1e6:6.1f} MB/s end to end, "
+                  f"{size / 1e6:6.2f} MB on disk (ratio {raw / size:4.1f}x)")
+
+        path = os.path.join(tmp, "zlib1.mrl")
+        mid = cycles * 0.001 / 2
+        for workers in (1, 4):
+            def seek():
+                with RecordingReader(path, workers=workers) as reader:
+                    reader.read(mid, mid + 0.1, fields=["present_position"])
+            t_seek = _timeit(seek, repeat=5, number=20)
+            t_full = _timeit(lambda: RecordingReader(path, workers=workers).read_states(), repeat=3, number=1)
+            print(f"  workers={workers}: open + 100 ms window {t_seek * 1e3:6.2f} ms, "
+                  f"full read_states {t_full * 1e3:7.1f} ms")
+
+
+def bench_fault_index(num_motors: int = 15, cycles: int = 100_000) -> None:
+    import os
+    import tempfile
+
+    import numpy as np
+
+    from .MerlinFaults import FaultEventExtractor, FaultIndex
+    from .MerlinPdoLayout import RXPDO_DTYPE, TXPDO_DTYPE
+    from .MerlinRecording import RecordingReader, RecordingWriter
+
+    # Quiet telemetry with a few faults, temperature excursions and lost frames.
+    rng = np.random.default_rng(0)
+    t = np.arange(cycles) * 0.001
+    states = np.zeros((cycles, num_motors), dtype=TXPDO_DTYPE)
+    states["input_voltage"] = 24.0 + rng.normal(0, 0.05, states.shape)
+    states["winding_temperature"] = 40.0 + rng.normal(0, 0.2, states.shape)
+    for start in rng.integers(0, cycles - 2000, 20):
+        motor = rng.integers(num_motors)
+        states["error_status"][start:start + rng.integers(10, 2000), motor] = float(1 << rng.integers(6))
+        states["winding_temperature"][start:start + 1500, (motor + 1) % num_motors] = 85.0
+    kept = np.ones(cycles, dtype=bool)
+    kept[rng.integers(0, cycles, 50)] = False
+    commands = np.zeros(num_motors, dtype=RXPDO_DTYPE).tobytes()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "faults.mrl")
+        with RecordingWriter(path, num_motors, buffers=cycles // 1000 + 1) as writer:
+            for k in np.nonzero(kept)[0]:
+                writer.append(t[k], k, 3, commands, states[k])
+
+        def scan():
+            # Baseline: walk every recorded cycle and motor in Python.
+            _, recorded = RecordingReader(path).read_states()
+            faults = 0
+            prev = [0.0] * num_motors
+            for frame in recorded["error_status"].tolist():
+                for m, value in enumerate(frame):
+                    if value != prev[m] and value:
+                        faults += 1
+                prev = frame
+            return faults
+
+        t_scan = _timeit(scan, repeat=1, number=1)
+        t_build = _timeit(lambda: FaultIndex.from_recording(path, cache=False), repeat=3, number=1)
+        index = FaultIndex.from_recording(path)
+        t_cached = _timeit(lambda: FaultIndex.from_recording(path), repeat=3, number=10)
+        t_query = _timeit(lambda: index.query(40.0, 60.0, motor=3), repeat=5, number=1000)
+
+    quiet = states[:1].copy()
+    quiet["error_status"] = 0.0
+    quiet["winding_temperature"] = 40.0
+    live = FaultEventExtractor(num_motors, expected_wkc=3)
+    n = iter(range(10 ** 9))
+    t_live = _timeit(lambda: live.update(0.0, next(n), 3, quiet[0]), repeat=5, number=10_000)
+
+    hour = 3_600_000 / cycles
+    print(f"fault_index ({cycles} cycles x {num_motors} motors, {len(index)} events)")
+    print(f"  per-cycle Python scan : {t_scan * 1e3:8.1f} ms  (~{t_scan * hour:6.1f} s per hour of data)")
+    print(f"  build index           : {t_build * 1e3:8.1f} ms  (~{t_build * hour:6.1f} s per hour of data)")
+    print(f"  load cached index     : {t_cached * 1e3:8.2f} ms")
+    print(f"  query 20 s x 1 motor  : {t_query * 1e6:8.2f} us")
+    print(f"  live update (quiet)   : {t_live * 1e6:8.2f} us/cycle")
+
+
+def bench_latency(duration_s: float = 2.0, cycles: int = 5000) -> None:
+    from .MerlinEthercatMaster import MerlinMaster_v1
+    from .MerlinSimSlave import SimMaster, SimSlave
+
+    def show(label, summary):
+        hist = ", ".join(f"{c}: {n}" for c, n in summary.get("cycles", {}).items())
+        print(f"  {label:34s}: cycles {{{hist}}}  p50 {summary.get('us_p50', 0):7.1f} us  "
+              f"p99 {summary.get('us_p99', 0):7.1f} us  max {summary.get('us_max', 0):7.1f} us  "
+              f"lost {summary['lost']}")
+
+    print("latency (echo slave, all motors probed)")
+    for delay, loss, pipelined in ((1, 0.0, False), (1, 0.0, True), (2, 0.01, False)):
+        sim = SimMaster(slaves=[SimSlave(echo=True, echo_delay_frames=delay)], latency_s=200e-6,
+                        loss_rate=loss, seed=0)
+        master = MerlinMaster_v1("sim", master=sim, num_motors=15, lockstep=True, pipelined=pipelined)
+        probe = master.start_latency_probe()
+        master.step(cycles)
+        master.close()
+        show(f"lockstep, echo +{delay}, loss {loss:.0%}{', pipelined' if pipelined else ''}", probe.summary())
+
+    sim = SimMaster(slaves=[SimSlave(echo=True)], latency_s=200e-6)
+    master = MerlinMaster_v1("sim", master=sim, num_motors=15)
+    probe = master.start_latency_probe()
+    time.sleep(0.2)
+    probe.reset()
+    time.sleep(duration_s)
+    master.close()
+    show("real time, echo +1", probe.summary())
+
+
+def bench_pcap(cycles: int = 20_000, synthetic_cycles: int = 100_000) -> None:
+    import os
+    import tempfile
+
+    import numpy as np
+
+    from .MerlinEthercatMaster import MerlinMaster_v1
+    from .MerlinPcap import CMD_LRW, SOEM_MAC, ethercat_frame, read_pcap, read_pcap_all
+    from .MerlinPdoLayout import RXPDO_DTYPE, TXPDO_DTYPE
+    from .MerlinRecording import RecordingReader
+    from .MerlinSimSlave import SimMaster
+
+    num_motors = 15
+    print("pcap")
+    with tempfile.TemporaryDirectory() as tmp:
+        # Capture a lossy lockstep session and check it against the master's own recording.
+        capture, recording = os.path.join(tmp, "sim.pcap"), os.path.join(tmp, "sim.mrl")
+        sim = SimMaster(num_motors=num_motors, latency_s=200e-6, loss_rate=0.01, seed=0)
+        master = MerlinMaster_v1("sim", master=sim, num_motors=num_motors, lockstep=True)
+        sim.start_capture(capture)
+        master.start_recording(recording)
+        for motor in range(num_motors):
+            master.set_motor_goals(motor, torque_enable=1, goal_position=motor / num_motors)
+        master.step(cycles)
+        master.stop_recording()
+        sim.stop_capture()
+        master.close()
+        data = read_pcap_all(capture, num_motors=num_motors)
+        with RecordingReader(recording) as reader:
+            recorded = reader.read()
+        n = min(len(data.timestamp), len(recorded["timestamp"]))
+        same = all(np.array_equal(data.states[name][:n], recorded[name][:n]) for name in TXPDO_DTYPE.names)
+        same &= all(np.array_equal(data.commands[name][:n], recorded[name][:n]) for name in RXPDO_DTYPE.names)
+        rtt = (data.timestamp - data.timestamp_tx) * 1e6
+        print(f"  sim capture: {len(data.timestamp)} cycles (recorded {len(recorded['timestamp'])}), "
+              f"{len(data.lost_tx)} lost (sim {sim.frames_lost}), RTT {np.nanmedian(rtt):.0f} us, "
+              f"matches recording: {same}")
+
+        # Throughput: a synthetic capture of outgoing + returned frames, 1 kHz.
+        image = bytes(num_motors * (RXPDO_DTYPE.itemsize + TXPDO_DTYPE.itemsize))
+        tx = np.frombuffer(ethercat_frame([(CMD_LRW, 0, 0, image, 0)]), dtype=np.uint8)
+        rx = np.frombuffer(ethercat_frame([(CMD_LRW, 0, 0, image, 3)], bytes([SOEM_MAC[0] | 2]) + SOEM_MAC[1:]),
+                           dtype=np.uint8)
+        rng = np.random.default_rng(0)
+        path = os.path.join(tmp, "synthetic.pcap")
+        with open(path, "wb") as f:
+            f.write(open(capture, "rb").read(24))
+            for start in range(0, synthetic_cycles, 10_000):
+                k = min(10_000, synthetic_cycles - start)
+                records = np.zeros((k, 2, 16 + len(tx)), dtype=np.uint8)
+                t = (start + np.arange(k)) * 1_000_000
+                for d, (frame, offset_ns) in enumerate(((tx, 0), (rx, 150_000))):
+                    ns = t + offset_ns
+                    header = np.stack([ns // 10**9, ns % 10**9, np.full(k, len(frame)), np.full(k, len(frame))], 1)
+                    records[:, d, :16] = header.astype("<u4").view(np.uint8)
+                    records[:, d, 16:] = frame
+                    records[:, d, 16 + 17] = (start + np.arange(k)) & 0xFF
+                records[:, 1, 16 + 26:16 + 26 + len(image)] = rng.integers(0, 256, (k, len(image)), dtype=np.uint8)
+                f.write(records.tobytes())
+        size = os.path.getsize(path)
+        best = float("inf")
+        for _ in range(3):
+            t0 = time.perf_counter()
+            n = sum(len(chunk.timestamp) for chunk in read_pcap(path, num_motors=num_motors))
+            best = min(best, time.perf_counter() - t0)
+        assert n == synthetic_cycles
+        print(f"  decode: {size / 1e6:.0f} MB, {n} cycles in {best * 1e3:.0f} ms "
+              f"({size / best / 1e6:.0f} MB/s, {best / n * 1e6:.2f} us/cycle)")
+
+
+def bench_redundancy(cycles: int = 2000) -> None:
+    from .MerlinEthercatMaster import MerlinMaster_v1
+    from .MerlinSimSlave import SimMaster, SimSlave
+
+    print("redundancy (3 slaves, lockstep, 1 kHz)")
+    cases = (
+        ("redundant, break behind slave 0", "sim-red", 0, 3),
+        ("redundant, break at primary port", "sim-red", -1, 3),
+        ("redundant, instant link detect", "sim-red", 1, 0),
+        ("no redundant port, break behind 0", None, 0, 3),
+    )
+    for label, ifname_red, after_slave, link_down in cases:
+        sim = SimMaster(slaves=[SimSlave() for _ in range(3)], latency_s=100e-6)
+        master = MerlinMaster_v1("sim", ifname_red=ifname_red, master=sim, num_motors=15, lockstep=True)
+        master.step(cycles)
+        sim.break_ring(after_slave, link_down_frames=link_down)
+        master.step(cycles)
+        broken = master.get_cycle_stats()
+        sim.restore_ring()
+        t0 = time.perf_counter()
+        master.step(cycles)
+        per_cycle_us = (time.perf_counter() - t0) / cycles * 1e6
+        stats = master.get_cycle_stats()
+        master.close()
+        print(f"  {label:34s}: path {broken.rx_path:9s} breaks {stats.ring_breaks} restores {stats.ring_restores}  "
+              f"failover {broken.failover_cycles_last} cycles ({broken.failover_us_last:6.0f} us)  "
+              f"missed {stats.missed_frames} wkc errors {stats.wkc_errors}  "
+              f"frames primary/secondary {stats.primary_frames}/{stats.secondary_frames}  "
+              f"{per_cycle_us:.1f} us/cycle")
+
+
+def bench_scheduler(duration_s: float = 2.0) -> None:
+    import threading
+
+    from .MerlinEthercatMaster import MerlinMaster_v1
+    from .MerlinScheduler import SlackScheduler
+    from .MerlinSimSlave import SimMaster
+
+    def busy(us):
+        def work(now=None):
+            end = time.perf_counter() + us * 1e-6
+            while time.perf_counter() < end:
+                pass
+        return work
+
+    # Slow work: a 100 Hz temperature check (50 us), a 10 Hz read-back (300 us).
+    jobs = (("temperature", 0.01, 50.0), ("readback", 0.1, 300.0))
+    print(f"scheduler (1 kHz, simulated slave, {duration_s:.0f} s)")
+    for mode in ("none", "thread", "scheduler"):
+        master = MerlinMaster_v1("sim", master=SimMaster(latency_s=200e-6), num_motors=15)
+        stop = threading.Event()
+        threads = []
+        if mode == "scheduler":
+            for name, period, us in jobs:
+                master.add_task(name, busy(us), period, budget_us=1.5 * us)
+        elif mode == "thread":
+            def loop(period, work):
+                while not stop.wait(period):
+                    work()
+            threads = [threading.Thread(target=loop, args=(period, busy(us)), daemon=True) for _, period, us in jobs]
+        master.connect()
+        for t in threads:
+            t.start()
+        # Warm up, then measure from a clean worst-cycle figure.
+        time.sleep(0.5)
+        base = master.get_cycle_stats()
+        master._cycle_stats.cycle_time_max_us = 0.0
+        scheduler = master._scheduler
+        base_misses = scheduler.deadline_misses if scheduler is not None else 0
+        base_tasks = master.get_task_stats()
+        time.sleep(duration_s)
+        stats = master.get_cycle_stats()
+        tasks = master.get_task_stats()
+        misses = f"{scheduler.deadline_misses - base_misses:4d}" if scheduler is not None else "   -"
+        stop.set()
+        master.close()
+        runs = ", ".join(f"{name} {t.runs - base_tasks[name].runs} runs / "
+                         f"{t.deferred - base_tasks[name].deferred} deferred" for name, t in tasks.items())
+        print(f"  {mode:10s}: {stats.cycles - base.cycles} cycles, overruns {stats.overruns - base.overruns:4d}, "
+              f"deadline misses {misses}, missed frames {stats.missed_frames - base.missed_frames}, "
+              f"worst cycle {stats.cycle_time_max_us:6.0f} us" + (f"  ({runs})" if runs else ""))
+
+    scheduler = SlackScheduler()
+    scheduler.add("idle", lambda now: None, 0.1, 10.0)
+    n = 100_000
+    t0 = time.perf_counter()
+    for k in range(n):
+        scheduler.run(k * 1e-3, time.perf_counter() + 1e-3)
+    print(f"  run() overhead: {(time.perf_counter() - t0) / n * 1e6:.2f} us/tick "
+          f"({scheduler.stats()['idle'].runs} runs of a 10 Hz task)")
+
+
+def bench_calibration(repeat: int = 20_000, cycles: int = 5000) -> None:
+    import os
+    import tempfile
+
+    import numpy as np
+
+    from .MerlinCalibration import CalibrationTable, raw_command_view, raw_state_view
+    from .MerlinEthercatMaster import MerlinMaster_v1
+    from .MerlinPdoLayout import RXPDO_DTYPE, TXPDO_DTYPE
+    from .MerlinSimSlave import SimMaster, SimSlave
+
+    def timed(fn, n):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        return (time.perf_counter() - t0) / n * 1e6
+
+    print("calibration")
+    rng = np.random.default_rng(0)
+    for num_motors in (15, 30):
+        offset = rng.uniform(-1, 1, num_motors)
+        sign = rng.choice([-1.0, 1.0], num_motors)
+        scale = rng.uniform(5, 50, num_motors)
+        kt = rng.uniform(0.01, 0.05, num_motors)
+        table = CalibrationTable(num_motors, offset=offset, sign=sign, scale=scale, torque_constant=kt,
+                                 lower=-1.5, upper=1.5)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "calibration.csv")
+            table.save(path)
+            table = CalibrationTable.load(path)
+
+        states = np.zeros(num_motors, dtype=TXPDO_DTYPE)
+        states["present_position"] = rng.uniform(-10, 10, num_motors)
+        states["present_velocity"] = rng.uniform(-5, 5, num_motors)
+        states["present_iq"] = rng.uniform(-2, 2, num_motors)
+        raw = raw_state_view(states, num_motors)
+        joint = np.zeros((num_motors, 3), dtype=np.float32)
+        commands = np.zeros(num_motors, dtype=RXPDO_DTYPE)
+        raw_cmd = raw_command_view(commands, num_motors)
+        mask = np.ones((num_motors, 3), dtype=bool)
+
+        # What each consumer does today: a Python loop over the motors.
+        def per_motor():
+            out = []
+            for i in range(num_motors):
+                s = states[i]
+                out.append((sign[i] * float(s["present_iq"]) * kt[i] * scale[i],
+                            sign[i] * float(s["present_velocity"]) / scale[i],
+                            sign[i] * (float(s["present_position"]) - offset[i]) / scale[i]))
+            return out
+
+        table.decode_into(raw, joint)
+        reference = np.array(per_motor())
+        error = np.abs(joint - reference).max()
+        goals = joint.copy()
+        np.clip(goals[:, 2], -1.5, 1.5, out=goals[:, 2])
+        table.encode_into(goals, mask, raw_cmd)
+        echoed = np.zeros(num_motors, dtype=TXPDO_DTYPE)
+        for field in ("iq", "velocity", "position"):
+            echoed[f"present_{field}"] = commands[f"goal_{field}"]
+        back = table.decode(echoed)
+        round_trip = max(np.abs(back[name] - goals[:, k]).max() for k, name in enumerate(back.dtype.names))
+
+        t_loop = timed(per_motor, repeat // 10)
+        t_decode = timed(lambda: table.decode_into(raw, joint), repeat)
+        t_encode = timed(lambda: table.encode_into(goals, mask, raw_cmd), repeat)
+        print(f"  {num_motors} motors: decode {t_decode:5.2f} us, encode {t_encode:5.2f} us per frame "
+              f"(per-motor Python loop {t_loop:6.1f} us); max error vs loop {error:.1e}, round trip {round_trip:.1e}")
+
+        per_cycle = []
+        for calibrated in (False, True):
+            sim = SimMaster(slaves=[SimSlave(num_motors=num_motors)])
+            master = MerlinMaster_v1("sim", master=sim, num_motors=num_motors, lockstep=True)
+            if calibrated:
+                master.enable_calibration(table)
+                master.set_joint_goals(position=np.zeros(num_motors))
+            master.step(100)
+            t0 = time.perf_counter()
+            master.step(cycles)
+            per_cycle.append((time.perf_counter() - t0) / cycles * 1e6)
+            master.close()
+        print(f"  {num_motors} motors: lockstep cycle {per_cycle[0]:5.1f} us raw, {per_cycle[1]:5.1f} us calibrated")
+
+
+def bench_import_time(repeat: int = 5) -> None:
+    import subprocess
+
+    modules = (
+        "merlin_hand_master",
+        "merlin_hand_master.MerlinTypes",
+        "merlin_hand_master.MerlinEthercatMaster",
+        "merlin_hand_master.MerlinCanfdCodec",
+        "merlin_hand_master.MerlinStateBroadcast",
+        "merlin_hand_master.MerlinSimSlave",
+    )
+    code = (
+        "import sys, time; t0 = time.perf_counter(); import {0}; "
+        "print(time.perf_counter() - t0, 'pysoem' in sys.modules, 'numpy' in sys.modules)"
+    )
+    print(f"import_time (fresh interpreter, best of {repeat})")
+    for module in modules:
+        best = float("inf")
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, "-c", code.format(module)],
+                                 capture_output=True, text=True, check=True).stdout.split()
+            best = min(best, float(out[0]))
+        loaded = [name for name, flag in (("pysoem", out[1]), ("numpy", out[2])) if flag == "True"]
+        print(f"  {module:40s}: {best * 1e3:7.2f} ms  (loads: {', '.join(loaded) or '-'})")
+
+
+def bench_first_cycle(repeat: int = 5) -> None:
+    from .MerlinEthercatMaster import MerlinMaster_v1
+    from .MerlinSimSlave import SimMaster
+
+    print(f"first_cycle (simulated slave, best of {repeat})")
+    t_create = t_connect = t_first = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        master = MerlinMaster_v1("sim", num_motors=15, master=SimMaster(latency_s=50e-6),
+                                 auto_connect=False)
+        t1 = time.perf_counter()
+        master.connect()
+        t2 = time.perf_counter()
+        while master.get_cycle_stats().cycles == 0:
+            time.sleep(20e-6)
+        t3 = time.perf_counter()
+        master.close()
+        t_create, t_connect, t_first = min(t_create, t1 - t0), min(t_connect, t2 - t1), min(t_first, t3 - t0)
+    print(f"  construct     : {t_create * 1e3:8.3f} ms")
+    print(f"  connect       : {t_connect * 1e3:8.3f} ms")
+    print(f"  first cycle   : {t_first * 1e3:8.3f} ms after construction")
+
+
+BENCHMARKS = {
+    "canfd_codec": bench_canfd_codec,
+    "canfd_analyzer": bench_canfd_analyzer,
+    "compact_rxpdo": bench_compact_rxpdo,
+    "cycle_loss": bench_cycle_loss,
+    "interpolator": bench_interpolator,
+    "safety": bench_safety,
+    "filters": bench_filters,
+    "command_latency": bench_command_latency,
+    "metrics": bench_metrics,
+    "dc_sync": bench_dc_sync,
+    "motor_records": bench_motor_records,
+    "lockstep": bench_lockstep,
+    "batch_sim": bench_batch_sim,
+    "recording": bench_recording,
+    "fault_index": bench_fault_index,
+    "latency": bench_latency,
+    "pcap": bench_pcap,
+    "redundancy": bench_redundancy,
+    "scheduler": bench_scheduler,
+    "calibration": bench_calibration,
+    "import_time": bench_import_time,
+    "first_cycle": bench_first_cycle,
+}
+
+
+def main(argv=None) -> None:
+    names = (argv if argv is not None else sys.argv[1:]) or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
 from merlin_hand_master.MerlinEthercatMaster import MerlinMaster_v1
 import time 
 
-master = MerlinMaster_v1(ifname="enp63s0", slave_pos=0, num_motors=18)
-# master = MerlinMaster_v1(ifname="enx000ec676fcd0", slave_pos=0, num_motors=18)
+master = MerlinMaster_v1(ifname="enp63s0", slave_pos=0, num_motors=18, auto_connect=False)
+# master = MerlinMaster_v1(ifname="enx000ec676fcd0", slave_pos=0, num_motors=18, auto_connect=False)
+
+# Bring the network up (pysoem is imported here); `with master:` also works.
+master.connect()
 
 # Enable torque and set a position goal for motor 0
 master.set_motor_goals(
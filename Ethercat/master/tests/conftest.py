@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Run from a checkout: make `merlin_hand_master` importable without installing it.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
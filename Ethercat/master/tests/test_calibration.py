@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from merlin_hand_master.MerlinCalibration import (
+    CALIBRATION_COLUMNS,
+    JOINT_DTYPE,
+    CalibrationTable,
+    raw_command_view,
+)
+from merlin_hand_master.MerlinPdoLayout import RXPDO_DTYPE, TXPDO_DTYPE
+
+NUM_MOTORS = 4
+
+
+def _table(**overrides):
+    params = dict(
+        offset=[0.5, -1.0, 0.0, 2.0],
+        sign=[1, -1, 1, -1],
+        scale=[2.0, 10.0, 1.0, 0.5],
+        torque_constant=[0.1, 0.2, 1.0, 0.05],
+        lower=[-1.0, -np.inf, -2.0, 0.0],
+        upper=[1.5, 3.0, np.inf, 1.0],
+    )
+    params.update(overrides)
+    return CalibrationTable(NUM_MOTORS, **params)
+
+
+def test_save_load_round_trip(tmp_path):
+    table = _table()
+    path = str(tmp_path / "calibration.csv")
+    table.save(path)
+    loaded = CalibrationTable.load(path)
+    assert loaded.num_motors == NUM_MOTORS
+    for name in CALIBRATION_COLUMNS:
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(table, name))
+
+
+def test_load_keeps_defaults_for_missing_columns_and_motors(tmp_path):
+    path = tmp_path / "partial.csv"
+    path.write_text("motor,offset,sign\n1,0.25,-1\n3,-0.5,1\n")
+    table = CalibrationTable.load(str(path), num_motors=5)
+    np.testing.assert_array_equal(table.offset, [0.0, 0.25, 0.0, -0.5, 0.0])
+    np.testing.assert_array_equal(table.sign, [1, -1, 1, 1, 1])
+    np.testing.assert_array_equal(table.scale, np.ones(5))
+    np.testing.assert_array_equal(table.lower, np.full(5, -np.inf))
+
+    assert CalibrationTable.load(str(path)).num_motors == 4
+    with pytest.raises(IndexError):
+        CalibrationTable.load(str(path), num_motors=3)
+    path.write_text("motor,gain\n0,1\n")
+    with pytest.raises(ValueError):
+        CalibrationTable.load(str(path))
+
+
+def test_encode_inverts_decode():
+    table = _table(lower=-np.inf, upper=np.inf)
+    rng = np.random.default_rng(0)
+    states = np.zeros((8, NUM_MOTORS), dtype=TXPDO_DTYPE)
+    for name in ("present_iq", "present_velocity", "present_position"):
+        states[name] = rng.uniform(-3, 3, states.shape)
+
+    joint = table.decode(states)
+    assert joint.dtype == JOINT_DTYPE and joint.shape == states.shape
+    np.testing.assert_allclose(joint["position"], table.sign * (states["present_position"] - table.offset) / table.scale,
+                               rtol=1e-6)
+    raw = table.encode(joint)
+    np.testing.assert_allclose(raw[..., 0], states["present_iq"], rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(raw[..., 1], states["present_velocity"], rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(raw[..., 2], states["present_position"], rtol=1e-5, atol=1e-6)
+
+
+def test_limits_follow_the_sign():
+    table = CalibrationTable(1, offset=0.5, sign=-1, scale=2.0, lower=-1.0, upper=2.0)
+    goals = np.zeros(3, dtype=JOINT_DTYPE)
+    goals["position"] = [5.0, -5.0, 0.5]
+    raw = table.encode(goals[:, None])[:, 0, 2]
+    # Joint +2 is raw 0.5 - 4 = -3.5, joint -1 is raw 0.5 + 2 = 2.5.
+    np.testing.assert_allclose(raw, [-3.5, 2.5, -0.5])
+    states = np.zeros((3, 1), dtype=TXPDO_DTYPE)
+    states["present_position"][:, 0] = raw
+    np.testing.assert_allclose(table.decode(states)["position"][:, 0], [2.0, -1.0, 0.5])
+
+
+def test_encode_into_only_writes_masked_goals():
+    table = _table()
+    records = np.zeros(NUM_MOTORS, dtype=RXPDO_DTYPE)
+    records["torque_enable"] = 1
+    records["goal_id"] = 7.0
+    records["goal_iq"] = -9.0
+    records["goal_velocity"] = -9.0
+    records["goal_position"] = -9.0
+    before = records.copy()
+    joint = np.full((NUM_MOTORS, 3), 0.5, dtype=np.float32)
+    mask = np.zeros((NUM_MOTORS, 3), dtype=bool)
+    mask[0, 2] = True       # motor 0 position
+    mask[2, 0] = True       # motor 2 torque
+
+    table.encode_into(joint, mask, raw_command_view(records, NUM_MOTORS))
+
+    assert records["goal_position"][0] == pytest.approx(0.5 + 0.5 * 2.0)
+    assert records["goal_iq"][2] == pytest.approx(0.5)
+    for name in ("torque_enable", "goal_id", "goal_velocity"):
+        np.testing.assert_array_equal(records[name], before[name])
+    np.testing.assert_array_equal(records["goal_position"][1:], before["goal_position"][1:])
+    np.testing.assert_array_equal(records["goal_iq"][[0, 1, 3]], before["goal_iq"][[0, 1, 3]])
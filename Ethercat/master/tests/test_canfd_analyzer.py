@@ -0,0 +1,57 @@
+import inspect
+
+import numpy as np
+
+from merlin_hand_master.MerlinCanfdAnalyzer import (
+    SCHEDULE_RATE_HZ,
+    CanfdBusAnalyzer,
+    FrameChunk,
+    frame_phase_times,
+    max_schedule_rate,
+    schedule_load,
+)
+from merlin_hand_master.MerlinCanfdMaster import MerlinCanfdMaster_v1
+
+
+def test_shipped_schedule_fits_the_bus():
+    assert schedule_load() <= 1.0
+    assert SCHEDULE_RATE_HZ <= max_schedule_rate()
+    default_cycle = inspect.signature(MerlinCanfdMaster_v1).parameters["cycle_time_s"].default
+    assert schedule_load(rate_hz=1.0 / default_cycle) <= 1.0
+
+
+def test_max_schedule_rate_is_full_load():
+    assert np.isclose(schedule_load(rate_hz=max_schedule_rate()), 1.0)
+
+
+def test_measured_load_of_back_to_back_schedule_matches_prediction():
+    num_cycles = 200
+    lengths = np.array([24] * 15 + [48] * 15, dtype=np.uint8)
+    arb, data = frame_phase_times(lengths, True, True, 1e6, 5e6)
+    slot = np.concatenate(([0.0], np.cumsum(arb + data)[:-1]))
+    timestamp = (np.arange(num_cycles)[:, None] / SCHEDULE_RATE_HZ + slot).ravel()
+    std_id = np.tile(np.concatenate((0x300 + np.arange(15), 0x200 + np.arange(15))), num_cycles).astype(np.uint32)
+    n = len(timestamp)
+    chunk = FrameChunk(timestamp, std_id, np.tile(lengths, num_cycles), np.ones(n, dtype=bool),
+                       np.ones(n, dtype=bool), np.zeros((n, 64), dtype=np.uint8))
+
+    report = CanfdBusAnalyzer().feed_all([chunk]).report()
+    assert report["bus_load"] <= 1.0
+    assert np.isclose(report["bus_load"], schedule_load(), rtol=0.01)
+
+
+def test_window_load_distribution_counts_idle_windows():
+    # 1 ms windows: a burst of 20 frames in window 0, nothing for 8 windows, 1 frame in window 9.
+    timestamp = np.concatenate((np.arange(20) * 40e-6, [9.5e-3]))
+    n = len(timestamp)
+    chunk = FrameChunk(timestamp, np.full(n, 0x300, dtype=np.uint32), np.full(n, 24, dtype=np.uint8),
+                       np.ones(n, dtype=bool), np.ones(n, dtype=bool), np.zeros((n, 64), dtype=np.uint8))
+    report = CanfdBusAnalyzer(window_s=1e-3).feed_all([chunk]).report()
+
+    hist = report["window_load_hist"]
+    assert hist.sum() == 10
+    assert hist[0] == 8             # idle windows
+    assert hist[8] == 1             # one 24-byte frame is ~8 % of 1 ms
+    assert hist[100] == 1           # the burst overloads its window
+    assert report["window_load_p50"] == 0.01
+    assert report["window_load_p99"] == report["peak_window_load"] > 1.0
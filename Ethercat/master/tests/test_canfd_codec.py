@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from merlin_hand_master.MerlinCanfdCodec import (
+    CANFD_DLC_LENGTHS,
+    CANFD_RXPDO_DTYPE,
+    CANFD_TXPDO_DTYPE,
+    RXPDO_BASE_STDID,
+    TXPDO_BASE_STDID,
+    TXPDO_FRAME_LEN,
+    dlc_to_len,
+    latest_states,
+    len_to_dlc,
+    pack_rxpdo_frames,
+    pack_txpdo_frames,
+    padded_length,
+    records_to_motor_states,
+    unpack_rxpdo_frames,
+    unpack_txpdo_frames,
+)
+
+
+def _states(motor_ids):
+    states = np.zeros(len(motor_ids), dtype=CANFD_TXPDO_DTYPE)
+    states["motor_id"] = motor_ids
+    for k, name in enumerate(CANFD_TXPDO_DTYPE.names[1:]):
+        states[name] = np.arange(len(motor_ids)) + 0.25 * k
+    return states
+
+
+def test_command_round_trip():
+    commands = np.zeros(4, dtype=CANFD_RXPDO_DTYPE)
+    commands["torque_enable"] = [1, 0, 1, 1]
+    commands["goal_position"] = [0.5, -1.0, 2.0, 3.5]
+    commands["goal_iq"] = [0.1, 0.2, 0.3, 0.4]
+    std_ids, payloads = pack_rxpdo_frames(commands, motor_ids=[3, 0, 14, 7])
+    assert std_ids.tolist() == [RXPDO_BASE_STDID + m for m in (3, 0, 14, 7)]
+    assert payloads.shape == (4, CANFD_RXPDO_DTYPE.itemsize)
+    # The caller's records are left alone.
+    assert commands["motor_id"].tolist() == [0, 0, 0, 0]
+
+    motor_idx, records = unpack_rxpdo_frames(std_ids, payloads)
+    assert motor_idx.tolist() == [3, 0, 14, 7]
+    for name in ("torque_enable", "goal_iq", "goal_position"):
+        np.testing.assert_array_equal(records[name], commands[name])
+
+
+def test_status_frames_are_padded_to_48_bytes():
+    states = _states([0, 5, 9])
+    std_ids, payloads = pack_txpdo_frames(states)
+    assert CANFD_TXPDO_DTYPE.itemsize == 40
+    assert payloads.shape == (3, TXPDO_FRAME_LEN) == (3, padded_length(40))
+    assert not payloads[:, 40:].any()
+
+    motor_idx, records = unpack_txpdo_frames(std_ids, payloads)
+    assert motor_idx.tolist() == [0, 5, 9]
+    assert records.tobytes() == states.tobytes()
+
+
+def test_embedded_motor_id_takes_precedence_over_the_std_id():
+    states = _states([4, 2, 40])
+    std_ids = np.array([TXPDO_BASE_STDID + 1, TXPDO_BASE_STDID + 2, TXPDO_BASE_STDID + 6, 0x123])
+    payloads = np.vstack([pack_txpdo_frames(states)[1], np.zeros((1, TXPDO_FRAME_LEN), dtype=np.uint8)])
+
+    motor_idx, records = unpack_txpdo_frames(std_ids, payloads)
+    # 0x123 is not a status frame; motor_id 40 is not a motor, so the StdID decides.
+    assert motor_idx.tolist() == [4, 2, 6]
+    assert len(records) == 3
+
+    out = latest_states(std_ids[:3], payloads[:3], num_motors=15)
+    assert out["present_id"][4] == states["present_id"][0]
+    assert out["present_id"][6] == states["present_id"][2]
+
+
+def test_latest_states_keeps_the_last_frame_per_motor():
+    states = _states([1, 2, 1])
+    std_ids, payloads = pack_txpdo_frames(states)
+    previous = np.zeros(15, dtype=CANFD_TXPDO_DTYPE)
+    previous["present_position"] = -7.0
+    out = latest_states(std_ids, payloads, out=previous)
+    assert out is previous
+    assert out["present_id"][1] == states["present_id"][2]
+    assert out["present_position"][0] == -7.0
+
+
+def test_status_records_convert_to_motor_states():
+    states = _states([0, 1])
+    frame = records_to_motor_states(states)
+    assert len(frame) == 2
+    assert frame[1].present_iq == states["present_iq"][1]
+    assert frame[1].error_status == states["error_status"][1]
+
+
+def test_dlc_lengths():
+    assert len_to_dlc(np.arange(9)).tolist() == list(range(9))
+    assert len_to_dlc([9, 12, 13, 24, 25, 40, 48, 49, 64]).tolist() == [9, 9, 10, 12, 13, 14, 14, 15, 15]
+    np.testing.assert_array_equal(dlc_to_len(np.arange(16)), CANFD_DLC_LENGTHS)
+    assert [padded_length(n) for n in (0, 8, 9, 24, 40, 64)] == [0, 8, 12, 24, 48, 64]
+    for length in (-1, 65, [8, 70]):
+        with pytest.raises(ValueError):
+            len_to_dlc(length)
@@ -0,0 +1,77 @@
+import socket
+import time
+
+import numpy as np
+import pytest
+
+from merlin_hand_master.MerlinCanfdCodec import CANFD_TXPDO_DTYPE, pack_txpdo_frames
+
+VCAN = "vcan0"
+
+
+def _vcan_available() -> bool:
+    if not hasattr(socket, "AF_CAN"):
+        return False
+    try:
+        with socket.socket(socket.AF_CAN, socket.SOCK_RAW, socket.CAN_RAW) as sock:
+            sock.bind((VCAN,))
+    except OSError:
+        return False
+    return True
+
+
+pytestmark = pytest.mark.skipif(not _vcan_available(), reason=f"SocketCAN interface {VCAN} not available")
+
+
+def _wait_for(predicate, timeout_s: float = 2.0) -> bool:
+    deadline = time.perf_counter() + timeout_s
+    while time.perf_counter() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_exchange_with_sim_satellite():
+    from merlin_hand_master.MerlinCanfdMaster import MerlinCanfdMaster_v1
+    from merlin_hand_master.MerlinSimSlave import SimCanfdSatellite
+
+    satellite = SimCanfdSatellite(VCAN)
+    master = MerlinCanfdMaster_v1(VCAN)
+    try:
+        master.set_motor_goals(3, torque_enable=1, goal_position=0.5)
+        assert _wait_for(lambda: satellite.rx_commands > 0 and master.rx_frames_txpdo >= master.num_motors)
+        assert master.tx_frames_sent > 0
+    finally:
+        master.close()
+        satellite.close()
+
+
+def test_burst_larger_than_rx_buffer_is_fully_consumed():
+    from merlin_hand_master.MerlinCanfdMaster import CANFD_FRAME_DTYPE, MerlinCanfdMaster_v1
+
+    master = MerlinCanfdMaster_v1(VCAN, num_motors=2, cycle_time_s=0.05)
+    sender = socket.socket(socket.AF_CAN, socket.SOCK_RAW, socket.CAN_RAW)
+    sender.setsockopt(socket.SOL_CAN_RAW, getattr(socket, "CAN_RAW_FD_FRAMES", 5), 1)
+    sender.bind((VCAN,))
+    try:
+        burst = 3 * master._rx_capacity
+        states = np.zeros(burst, dtype=CANFD_TXPDO_DTYPE)
+        states["motor_id"] = np.arange(burst) % 2
+        states["present_position"] = np.arange(burst)
+        std_ids, payloads = pack_txpdo_frames(states)
+        frames = np.zeros(burst, dtype=CANFD_FRAME_DTYPE)
+        frames["can_id"] = std_ids
+        frames["len"] = payloads.shape[1]
+        frames["data"][:, :payloads.shape[1]] = payloads
+        for frame in frames:
+            sender.send(frame.tobytes())
+
+        assert _wait_for(lambda: master.rx_frames_txpdo >= burst)
+        assert master.rx_buffer_overflows >= 1
+        positions = master.get_all_states()
+        assert positions[0].present_position == burst - 2
+        assert positions[1].present_position == burst - 1
+    finally:
+        sender.close()
+        master.close()
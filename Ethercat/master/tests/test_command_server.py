@@ -0,0 +1,110 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from merlin_hand_master.MerlinCommandServer import (
+    COMMAND_HEADER,
+    MerlinCommandClient,
+    MerlinCommandServer,
+)
+from merlin_hand_master.MerlinPdoLayout import RXPDO_DTYPE
+
+NUM_MOTORS = 4
+
+
+def _records(position: float = 0.0) -> np.ndarray:
+    records = np.zeros(NUM_MOTORS, dtype=RXPDO_DTYPE)
+    records["goal_position"] = position
+    return records
+
+
+def _apply(server: MerlinCommandServer, now: float, position: float = 0.0) -> np.ndarray:
+    # Datagrams on a local Unix socket are queued by the time send() returns.
+    records = _records(position)
+    server.apply(records, now)
+    return records
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = MerlinCommandServer(str(tmp_path / "cmd.sock"), NUM_MOTORS, lease_s=0.5)
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def client(server):
+    client = MerlinCommandClient(server.path, priority=1)
+    yield client
+    client.close()
+
+
+def test_release_returns_fields_to_the_application(server, client):
+    client.send([1, 2], goal_position=3.0)
+    assert _apply(server, 1.0)["goal_position"].tolist() == [0.0, 3.0, 3.0, 0.0]
+
+    client.release([1])
+    records = _apply(server, 1.01, position=-1.0)
+    assert records["goal_position"].tolist() == [-1.0, -1.0, 3.0, -1.0]
+    assert server.owners()[1] is None
+
+
+def test_expired_lease_returns_fields_to_the_application(server, client):
+    client.send([0], goal_position=2.0)
+    assert _apply(server, 1.0)["goal_position"][0] == 2.0
+    assert _apply(server, 1.4)["goal_position"][0] == 2.0
+
+    records = _apply(server, 1.6, position=-1.0)
+    assert records["goal_position"][0] == -1.0
+    assert server.owners()[0] is None
+    assert server.leases_expired == 1
+
+
+def test_takeover_drops_fields_of_the_previous_owner(server, client):
+    client.send([0], goal_iq=0.5, goal_position=2.0)
+    _apply(server, 1.0)
+    other = MerlinCommandClient(server.path, priority=2)
+    try:
+        other.send([0], goal_position=4.0)
+        records = _apply(server, 1.01)
+    finally:
+        other.close()
+    assert records["goal_position"][0] == 4.0
+    assert records["goal_iq"][0] == 0.0
+
+
+def test_unknown_message_type_is_rejected(server, client):
+    header = COMMAND_HEADER.pack(0x7F, 0, 1, 0, 0, 0, 1, time.monotonic())
+    client._sock.sendto(header, server.path)
+    assert server.apply(_records(), 1.0) == 0
+    assert server.unknown_messages == 1
+    assert server.owners() == [None] * NUM_MOTORS
+
+
+def test_existing_socket_is_not_taken_over(server, tmp_path):
+    with pytest.raises(FileExistsError):
+        MerlinCommandServer(server.path, NUM_MOTORS)
+
+    regular = tmp_path / "not_a_socket"
+    regular.write_text("keep me")
+    with pytest.raises(FileExistsError):
+        MerlinCommandServer(str(regular), NUM_MOTORS, replace=True)
+    assert regular.read_text() == "keep me"
+
+
+def test_clear_frees_every_motor_while_the_cycle_runs(server, client):
+    client.send([0, 2], goal_position=2.0)
+    _apply(server, 1.0)
+    assert server.owners()[2] == client._client_path
+
+    # clear() waits for an apply() in progress instead of racing it.
+    with server._lock:
+        cleared = threading.Thread(target=server.clear)
+        cleared.start()
+        cleared.join(0.05)
+        assert cleared.is_alive()
+    cleared.join()
+    assert server.owners() == [None] * NUM_MOTORS
+    assert _apply(server, 1.01, position=-1.0)["goal_position"].tolist() == [-1.0] * NUM_MOTORS
@@ -0,0 +1,44 @@
+import numpy as np
+
+from merlin_hand_master.MerlinCompactPdo import CompactCommandDecoder, CompactCommandEncoder
+
+
+def test_request_keyframe_resynchronizes_after_lost_delta():
+    encoder = CompactCommandEncoder(3, keyframe_interval=100)
+    decoder = CompactCommandDecoder(3)
+    decoder.decode(encoder.encode())                 # keyframe
+
+    encoder.goals[1, 3] = 0.5
+    encoder.encode()                                 # delta lost on the wire
+    decoder.decode(encoder.encode())                 # nothing changed since: slave stays stale
+    assert decoder.records["goal_position"][1] == 0.0
+
+    encoder.request_keyframe()
+    decoder.decode(encoder.encode())
+    assert np.isclose(decoder.records["goal_position"][1], 0.5, atol=1.0 / 4096)
+    # One-shot: the frame after is a delta again.
+    assert encoder.encode()[2] == 0
+
+
+def test_saturation_is_flagged_and_counted():
+    encoder = CompactCommandEncoder(2)
+    encoder.goals[0, 3] = 100.0                      # position range is +-8 rad
+    encoder.goals[1, 1] = -1e3                       # current range is +-32.7 A
+    encoder.encode()
+    assert encoder.saturated[0, 3] and encoder.saturated[1, 1]
+    assert encoder.saturated.sum() == 2
+    encoder.encode()
+    assert encoder.saturated_fields == 4
+
+    encoder.goals[:] = 0.0
+    encoder.encode()
+    assert not encoder.saturated.any() and encoder.saturated_fields == 4
+
+
+def test_float16_saturates_instead_of_overflowing_to_inf():
+    encoder = CompactCommandEncoder(1, encoding="float16")
+    decoder = CompactCommandDecoder(1)
+    encoder.goals[0, 2] = 1e6
+    decoder.decode(encoder.encode())
+    assert encoder.saturated[0, 2]
+    assert np.isfinite(decoder.records["goal_velocity"][0])
@@ -0,0 +1,58 @@
+import struct
+
+from merlin_hand_master.MerlinEthercatMaster import MerlinMaster_v1
+
+_RXPDO = struct.Struct("<Iffff")
+
+
+def _sent_position(master, motor: int) -> float:
+    output = master._master.slaves[0].output
+    return _RXPDO.unpack_from(output, motor * _RXPDO.size)[4]
+
+
+def test_clear_controller_keeps_its_last_commands():
+    master = MerlinMaster_v1("sim", lockstep=True)
+    try:
+        master.set_motor_goals(0, torque_enable=1, goal_position=0.1)
+
+        def controller(t, states, commands):
+            commands["goal_position"][0] = 0.7
+
+        master.set_controller(controller)
+        master.step(3)
+        assert abs(_sent_position(master, 0) - 0.7) < 1e-6
+        master.clear_controller()
+        master.step()
+        assert abs(_sent_position(master, 0) - 0.7) < 1e-6
+    finally:
+        master.close()
+
+
+def test_controller_set_and_cleared_before_first_cycle_leaves_goals():
+    master = MerlinMaster_v1("sim", lockstep=True)
+    try:
+        master.set_motor_goals(0, torque_enable=1, goal_position=0.2)
+        master.set_controller(lambda t, states, commands: None)
+        master.clear_controller()
+        master.step()
+        assert abs(_sent_position(master, 0) - 0.2) < 1e-6
+    finally:
+        master.close()
+
+
+def test_failing_controller_is_detached_and_holds_goals():
+    master = MerlinMaster_v1("sim", lockstep=True)
+    try:
+        master.set_motor_goals(0, torque_enable=1, goal_position=0.4)
+
+        def controller(t, states, commands):
+            raise ValueError("boom")
+
+        master.set_controller(controller, max_consecutive_overruns=3)
+        master.step(5)
+        stats = master.get_cycle_stats()
+        assert stats.controller_detached and stats.controller_errors == 3
+        assert isinstance(master.controller_error, ValueError)
+        assert abs(_sent_position(master, 0) - 0.4) < 1e-6
+    finally:
+        master.close()
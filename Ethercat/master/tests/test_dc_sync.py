@@ -0,0 +1,60 @@
+from merlin_hand_master.MerlinDcSync import DcSyncController
+
+CYCLE_NS = 1_000_000
+
+
+def _run(controller, cycles, drift_ppm=0.0, start_phase_ns=0, lost=()):
+    """Close the loop on a model: host wake-ups shifted by the correction, a DC clock drifting against them."""
+    host_ns = 0.0
+    corrections = []
+    dc_ns = 0
+    for k in range(cycles):
+        if k not in lost:
+            dc_ns = int(host_ns * (1 + drift_ppm * 1e-6)) + start_phase_ns + CYCLE_NS
+        correction = controller.update(dc_ns)
+        corrections.append(correction)
+        host_ns += CYCLE_NS + correction * 1e9
+    return corrections
+
+
+def test_locks_with_one_jump_and_estimates_the_drift():
+    controller = DcSyncController(CYCLE_NS, lead_ns=CYCLE_NS // 2)
+    _run(controller, 5000, drift_ppm=200.0, start_phase_ns=100_000)
+    stats = controller.stats
+    assert stats.phase_jumps == 1
+    assert stats.locked
+    assert abs(stats.offset_ns) < 0.01 * CYCLE_NS
+    assert abs(stats.drift_ppm - 200.0) < 10.0
+
+
+def test_lost_frames_keep_compensating_the_drift():
+    controller = DcSyncController(CYCLE_NS, lead_ns=CYCLE_NS // 2)
+    corrections = _run(controller, 5000, drift_ppm=200.0, lost=range(4000, 4010))
+    # The rate term alone: about -200 ppm of a cycle, not zero and not the last P step.
+    for correction in corrections[4001:4010]:
+        assert abs(correction * 1e9 + 200.0) < 20.0
+    assert controller.stats.locked
+
+
+def test_integral_does_not_wind_up_while_saturated():
+    controller = DcSyncController(CYCLE_NS, lead_ns=0)
+    limit = CYCLE_NS / 4
+    # A constant error just under the jump threshold the loop cannot remove.
+    for k in range(1, 20_000):
+        assert abs(controller.update(k * CYCLE_NS + CYCLE_NS // 5) * 1e9) <= limit
+    assert abs(controller.ki * controller._integral) <= limit
+
+    # Once the error reverses, the correction follows within a bounded number of cycles.
+    for k in range(20_000, 20_200):
+        correction = controller.update(k * CYCLE_NS - CYCLE_NS // 5)
+    assert correction > 0
+
+
+def test_phase_jump_restarts_the_integral():
+    controller = DcSyncController(CYCLE_NS, lead_ns=0)
+    for k in range(1, 100):
+        controller.update(k * CYCLE_NS + 100_000)
+    assert controller._integral != 0.0
+    assert controller.update(100 * CYCLE_NS + CYCLE_NS // 2 - 1) == -(CYCLE_NS // 2 - 1) * 1e-9
+    assert controller._integral == 0.0
+    assert controller.stats.phase_jumps == 1
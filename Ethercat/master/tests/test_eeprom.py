@@ -0,0 +1,55 @@
+import time
+
+from merlin_hand_master.MerlinEepromWriter import MerlinEepromWriter, sii_checksum, sii_checksum_ok
+from merlin_hand_master.MerlinEthercatMaster import MerlinMaster_v1
+from merlin_hand_master.MerlinSimSlave import SimMaster, SimSlave
+
+
+def _image(size: int = 256) -> bytes:
+    image = bytearray(range(size))
+    image[14] = sii_checksum(image)
+    return bytes(image)
+
+
+def test_sii_checksum_covers_configuration_area_only():
+    header = bytes.fromhex("0080000000000000000000000000")
+    assert sii_checksum(header) == sii_checksum(header + b"\xAA\xBB")
+    assert not sii_checksum_ok(header + b"\x00\x00")
+    assert sii_checksum_ok(header + bytes([sii_checksum(header)]) + b"\x00")
+
+
+def test_writer_round_trip_on_sim():
+    slave = SimSlave()
+    sim = SimMaster(slaves=[slave])
+    sim.open("sim")
+    sim.config_init()
+    writer = MerlinEepromWriter(sim)
+    image = _image()
+
+    result = writer.write_image(0, image)
+    assert result.verified and result.checksum_ok
+    assert result.words_written == result.words_total
+    assert bytes(slave.eeprom[:len(image)]) == image
+    assert writer.read_image(0, len(image)) == image
+
+    again = writer.write_image(0, image)
+    assert again.words_written == 0 and again.words_skipped == again.words_total
+
+
+def test_program_eeprom_pauses_pdo_loop():
+    slave = SimSlave()
+    master = MerlinMaster_v1("sim", master=SimMaster(slaves=[slave]), num_motors=15)
+    master.connect()
+    try:
+        time.sleep(0.05)
+        image = _image()
+        results = master.program_eeprom(image)
+        assert results[0].verified and results[0].checksum_ok
+        assert bytes(slave.eeprom[:len(image)]) == image
+
+        # The loop is running again afterwards.
+        cycles = master.get_cycle_stats().cycles
+        time.sleep(0.05)
+        assert master.get_cycle_stats().cycles > cycles
+    finally:
+        master.close()
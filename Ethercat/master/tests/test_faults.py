@@ -0,0 +1,187 @@
+import os
+
+import numpy as np
+import pytest
+
+from merlin_hand_master.MerlinFaults import (
+    EVENT_FAULT,
+    EVENT_OVER_TEMPERATURE,
+    EVENT_UNDERVOLTAGE,
+    EVENT_WKC_LOSS,
+    FaultEventExtractor,
+    FaultIndex,
+)
+from merlin_hand_master.MerlinPdoLayout import RXPDO_DTYPE, TXPDO_DTYPE
+from merlin_hand_master.MerlinRecording import RecordingWriter
+
+NUM_MOTORS = 3
+WKC = 3
+DT = 1e-3
+
+
+def _block(first_cycle: int, n: int):
+    """Healthy cycles `first_cycle..first_cycle + n - 1` at 1 kHz."""
+    cycles = np.arange(first_cycle, first_cycle + n, dtype=np.uint64)
+    states = np.zeros((n, NUM_MOTORS), dtype=TXPDO_DTYPE)
+    states["winding_temperature"] = 30.0
+    states["input_voltage"] = 24.0
+    return cycles * DT, cycles, np.full(n, WKC), states
+
+
+def _feed(extractor, block):
+    ts, cycles, wkc, states = block
+    extractor.update_block(ts, cycles, wkc, states)
+
+
+def _single(index, **query):
+    events = index.query(**query)
+    assert len(events) == 1, index.describe()
+    return events[0]
+
+
+def test_over_temperature_spans_blocks_with_hysteresis_and_peak():
+    extractor = FaultEventExtractor(NUM_MOTORS, expected_wkc=WKC)
+    first, second = _block(0, 10), _block(10, 10)
+    first[3]["winding_temperature"][5:, 1] = [85.0, 82.0, 81.0, 80.5, 83.0]
+    # Inside the 78..80 hysteresis band the event holds; 77 clears it at cycle 15.
+    second[3]["winding_temperature"][:6, 1] = [79.0, 90.0, 79.5, 78.5, 80.0, 77.0]
+    _feed(extractor, first)
+    assert extractor.active
+    _feed(extractor, second)
+    assert not extractor.active
+
+    event = _single(extractor.index(), kind=EVENT_OVER_TEMPERATURE)
+    assert event["motor"] == 1
+    assert (event["first_cycle"], event["last_cycle"]) == (5, 15)
+    assert (event["t_start"], event["t_end"]) == pytest.approx((5 * DT, 15 * DT))
+    assert event["peak"] == 90.0
+
+
+def test_undervoltage_reports_the_minimum_and_stays_open_at_the_end():
+    extractor = FaultEventExtractor(NUM_MOTORS, expected_wkc=WKC)
+    first, second = _block(0, 10), _block(10, 10)
+    first[3]["input_voltage"][8:, 0] = [17.5, 16.0]
+    second[3]["input_voltage"][:, 0] = 17.9
+    _feed(extractor, first)
+    _feed(extractor, second)
+
+    index = extractor.index()
+    event = _single(index, kind=EVENT_UNDERVOLTAGE)
+    assert event["first_cycle"] == 8
+    assert np.isinf(event["t_end"])
+    assert event["peak"] == 16.0
+    assert len(index.ongoing()) == 1
+
+
+def test_fault_bits_become_separate_events_across_blocks():
+    extractor = FaultEventExtractor(NUM_MOTORS, expected_wkc=WKC)
+    first, second = _block(0, 10), _block(10, 10)
+    first[3]["error_status"][3:, 2] = float(0x08 | 0x01)
+    second[3]["error_status"][:3, 2] = float(0x08 | 0x01)
+    second[3]["error_status"][3:6, 2] = float(0x08)
+    _feed(extractor, first)
+    _feed(extractor, second)
+
+    index = extractor.index()
+    assert len(index.query(kind=EVENT_FAULT)) == 2
+    over_temperature = _single(index, code=0x01)
+    assert (over_temperature["first_cycle"], over_temperature["last_cycle"]) == (3, 13)
+    overcurrent = _single(index, code=0x08)
+    assert (overcurrent["first_cycle"], overcurrent["last_cycle"]) == (3, 16)
+    assert len(index.query(motor=2, code=0x09)) == 2
+    assert len(index.query(motor=1)) == 0
+
+
+def test_gaps_in_cycle_numbers_are_wkc_loss_events():
+    extractor = FaultEventExtractor(NUM_MOTORS, expected_wkc=WKC)
+    ts, cycles, wkc, states = _block(0, 10)
+    keep = np.r_[0:5, 8:10]
+    extractor.update_block(ts[keep], cycles[keep], wkc[keep], states[keep])
+    # A gap across the block boundary: cycles 10 and 11 never came back.
+    _feed(extractor, _block(12, 5))
+
+    events = extractor.index().query(kind=EVENT_WKC_LOSS)
+    assert [(int(e["first_cycle"]), int(e["last_cycle"])) for e in events] == [(5, 8), (10, 12)]
+    assert events[0]["t_start"] == pytest.approx(5 * DT)
+    assert events[1]["t_start"] == pytest.approx(10 * DT)
+    assert all(e["motor"] == -1 for e in events)
+
+
+def test_short_wkc_spanning_blocks_keeps_the_minimum():
+    extractor = FaultEventExtractor(NUM_MOTORS, expected_wkc=WKC)
+    first, second = _block(0, 10), _block(10, 10)
+    first[2][7:] = [2, 1, 2]
+    second[2][:2] = [0, 2]
+    _feed(extractor, first)
+    _feed(extractor, second)
+
+    event = _single(extractor.index(), kind=EVENT_WKC_LOSS)
+    assert (event["first_cycle"], event["last_cycle"]) == (7, 12)
+    assert event["peak"] == 0.0
+
+
+def test_live_updates_match_the_block_path():
+    live = FaultEventExtractor(NUM_MOTORS, expected_wkc=WKC)
+    block = FaultEventExtractor(NUM_MOTORS, expected_wkc=WKC)
+    ts, cycles, wkc, states = _block(0, 30)
+    states["winding_temperature"][10:20, 0] = 85.0
+    states["error_status"][12:14, 1] = float(0x10)
+    wkc[25] = 0
+    lost = {22}
+    for k in range(30):
+        if k in lost:
+            live.update(ts[k], int(cycles[k]), -1, None)
+        else:
+            live.update(ts[k], int(cycles[k]), int(wkc[k]), states[k])
+    keep = np.array([k not in lost for k in range(30)])
+    block.update_block(ts[keep], cycles[keep], wkc[keep], states[keep])
+
+    assert live.cycles == 30
+    assert live.index().events.tobytes() == block.index().events.tobytes()
+    assert len(live.index()) == 4
+
+
+def test_queries_by_time_window():
+    extractor = FaultEventExtractor(NUM_MOTORS, expected_wkc=WKC)
+    ts, cycles, wkc, states = _block(0, 100)
+    states["winding_temperature"][10:20, 0] = 85.0     # long event, starts first
+    states["input_voltage"][12:13, 1] = 10.0            # short one inside it
+    states["input_voltage"][50:60, 2] = 10.0
+    extractor.update_block(ts, cycles, wkc, states)
+    index = extractor.index()
+
+    assert len(index.query(t_start=0.015, t_end=0.016)) == 1       # only the long event covers it
+    assert len(index.query(t_start=0.012, t_end=0.012)) == 2
+    assert len(index.query(t_start=0.021, t_end=0.049)) == 0
+    assert len(index.query(t_start=0.055)) == 1
+    assert len(index.query(t_end=0.0105)) == 1
+    assert _single(index, t_start=0.0, motor=2)["first_cycle"] == 50
+
+
+def _write_recording(path, over_temperature_from: int):
+    ts, cycles, wkc, states = _block(0, 50)
+    states["winding_temperature"][over_temperature_from:, 0] = 90.0
+    with RecordingWriter(path, NUM_MOTORS, chunk_cycles=16) as writer:
+        writer.append_block(ts, cycles, wkc, np.zeros((50, NUM_MOTORS), dtype=RXPDO_DTYPE), states)
+
+
+def test_from_recording_cache_is_rebuilt_for_new_params_or_data(tmp_path):
+    path = str(tmp_path / "run.rec")
+    _write_recording(path, over_temperature_from=20)
+
+    index = FaultIndex.from_recording(path, expected_wkc=WKC)
+    assert _single(index, kind=EVENT_OVER_TEMPERATURE)["first_cycle"] == 20
+    assert os.path.exists(path + ".events.npz")
+    assert len(FaultIndex.from_recording(path, expected_wkc=WKC, over_temperature=95.0)) == 0
+
+    assert FaultIndex.from_recording(path, expected_wkc=WKC).source == FaultIndex.load(path + ".events.npz").source
+
+    # Replaced by a recording with an older timestamp (e.g. copied with its mtime).
+    _write_recording(path, over_temperature_from=30)
+    stat = os.stat(path + ".events.npz")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns - 1_000_000_000))
+    index = FaultIndex.from_recording(path, expected_wkc=WKC)
+    assert _single(index, kind=EVENT_OVER_TEMPERATURE)["first_cycle"] == 30
+
+    loaded = FaultIndex.load(path + ".events.npz")
+    np.testing.assert_array_equal(loaded.events, index.events)
@@ -0,0 +1,47 @@
+import time
+
+import numpy as np
+import pytest
+
+from merlin_hand_master.MerlinEthercatMaster import MerlinMaster_v1
+from merlin_hand_master.MerlinFilters import FilterBank, LowPass
+from merlin_hand_master.MerlinSimSlave import SimMaster
+
+
+def test_add_rejects_unknown_source():
+    bank = FilterBank(3)
+    with pytest.raises(ValueError):
+        bank.add("vel", "present_velocty", LowPass(cutoff_hz=50))
+    bank.add("vel", "present_velocity", LowPass(cutoff_hz=50))
+    bank.add("vel2", "vel", LowPass(cutoff_hz=50))           # chained on an earlier output
+    with pytest.raises(ValueError):
+        bank.add("vel3", "vel_later", LowPass(cutoff_hz=50))
+    assert bank.names() == ["vel", "vel2"]
+
+
+class _Broken:
+    def bind(self, num_motors):
+        self.out = np.zeros(num_motors)
+        return {"": self.out}
+
+    def update(self, x, dt):
+        raise ZeroDivisionError("bad filter")
+
+
+def test_raising_filter_is_detached_and_loop_keeps_running():
+    master = MerlinMaster_v1("sim", master=SimMaster(), num_motors=15)
+    master.connect()
+    try:
+        master.enable_filters().add("broken", "present_iq", _Broken())
+        deadline = time.monotonic() + 2.0
+        while master.filters is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert master.filters is None
+        assert isinstance(master.hook_errors["filters"], ZeroDivisionError)
+
+        cycles = master.get_cycle_stats().cycles
+        time.sleep(0.05)
+        stats = master.get_cycle_stats()
+        assert stats.cycles > cycles and stats.hook_errors == 1
+    finally:
+        master.close()
@@ -0,0 +1,42 @@
+import struct
+
+from merlin_hand_master.MerlinEthercatMaster import MerlinMaster_v1
+
+_RXPDO = struct.Struct("<Iffff")
+
+
+def _sent_position(master, motor: int) -> float:
+    output = master._master.slaves[0].output
+    return _RXPDO.unpack_from(output, motor * _RXPDO.size)[4]
+
+
+def test_disable_without_waypoints_keeps_goals():
+    master = MerlinMaster_v1("sim", lockstep=True)
+    try:
+        master.set_motor_goals(0, torque_enable=1, goal_position=0.3)
+        master.enable_interpolation()
+        master.step(5)
+        master.disable_interpolation()
+        master.step()
+        assert abs(_sent_position(master, 0) - 0.3) < 1e-6
+    finally:
+        master.close()
+
+
+def test_disable_holds_last_interpolated_position():
+    master = MerlinMaster_v1("sim", lockstep=True)
+    try:
+        master.set_motor_goals(0, torque_enable=1, goal_position=0.0)
+        master.enable_interpolation()
+        positions = [0.0] * master.num_motors
+        positions[0] = 1.0
+        master.push_waypoints(master.now() + 0.01, positions)
+        master.step(20)
+        assert abs(_sent_position(master, 0) - 1.0) < 1e-6
+
+        master.disable_interpolation()
+        master.step()
+        assert abs(_sent_position(master, 0) - 1.0) < 1e-6
+        assert master._commands[0].goal_position == 1.0
+    finally:
+        master.close()
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from merlin_hand_master.MerlinEthercatMaster import MerlinMaster_v1
+from merlin_hand_master.MerlinLatency import LatencyProbe
+from merlin_hand_master.MerlinPdoLayout import RXPDO_DTYPE, TXPDO_DTYPE
+from merlin_hand_master.MerlinSimSlave import SimMaster, SimSlave
+
+NUM_MOTORS = 15
+
+
+def _probe_run(cycles: int, pipelined: bool = False, echo_delay_frames: int = 1, **kwargs):
+    sim = SimMaster(slaves=[SimSlave(echo=True, echo_delay_frames=echo_delay_frames)], latency_s=50e-6,
+                    loss_rate=kwargs.pop("loss_rate", 0.0), seed=0)
+    master = MerlinMaster_v1("sim", num_motors=NUM_MOTORS, master=sim, lockstep=True, pipelined=pipelined)
+    probe = master.start_latency_probe(**kwargs)
+    master.step(cycles)
+    master.close()
+    return probe, sim
+
+
+@pytest.mark.parametrize("pipelined, echo_delay_frames, expected", [
+    (False, 1, 1),
+    (False, 2, 2),
+    (True, 1, 2),       # the outputs of a pipelined cycle go out with the next frame
+])
+def test_echo_latency_in_cycles(pipelined, echo_delay_frames, expected):
+    probe, _ = _probe_run(500, pipelined, echo_delay_frames)
+    summary = probe.summary()
+    assert summary["lost"] == 0
+    assert summary["cycles"] == {expected: summary["samples"]}
+    # Every motor is probed about once per interval + round trip.
+    assert summary["samples"] >= NUM_MOTORS * 500 // (10 + expected + 1)
+    for motor in range(NUM_MOTORS):
+        assert len(probe.latencies(motor)[0]) > 0
+
+
+def test_lossy_bus_expires_tags_and_keeps_probing():
+    probe, sim = _probe_run(2000, loss_rate=0.2, timeout_cycles=3, interval_cycles=5)
+    cycles, _ = probe.latencies()
+    assert sim.frames_lost > 0 and probe.lost > 0
+    assert cycles.min() == 1 and cycles.max() <= 3
+    # Tags lost early are followed by new ones: every motor is still sampled at the end.
+    motors = probe._motor[max(0, probe.samples - 500):probe.samples]
+    assert set(motors.tolist()) == set(range(NUM_MOTORS))
+
+
+def test_unanswered_tags_are_lost_and_replaced():
+    probe = LatencyProbe(2, interval_cycles=4, timeout_cycles=2)
+    records = np.zeros(2, dtype=RXPDO_DTYPE)
+    states = np.zeros(2, dtype=TXPDO_DTYPE)
+
+    def cycle(frame, echo):
+        probe.on_outputs(records, frame * 1e-3, frame)
+        if echo:
+            states["present_position"] = records["goal_position"]
+        probe.on_inputs(states if echo is not None else None, frame * 1e-3, frame)
+
+    cycle(1, echo=False)            # motor 0 tagged (motor 1 starts a frame later)
+    first = float(records["goal_position"][0])
+    cycle(2, echo=None)             # lost frame
+    cycle(3, echo=False)
+    assert probe.lost == 0
+    cycle(4, echo=False)            # 3 frames without the tag: lost
+    assert probe.lost == 1 and probe.samples == 0
+
+    cycle(5, echo=True)             # a new tag goes out right away and is echoed
+    assert float(records["goal_position"][0]) != first
+    # Motor 1's tag (frame 2) is echoed too, but after the timeout: lost, not a sample.
+    assert probe.lost == 2 and probe.samples == 1
+    assert probe.latencies(0)[0].tolist() == [0]
+    cycle(6, echo=True)
+    assert probe.latencies(1)[0].tolist() == [0]
+
+    probe.reset()
+    assert probe.summary() == {"samples": 0, "lost": 0}
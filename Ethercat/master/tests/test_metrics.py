@@ -0,0 +1,57 @@
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from merlin_hand_master.MerlinMetrics import MetricsAggregator, format_prometheus
+
+COUNTERS = SimpleNamespace(cycles=0, missed_frames=0, wkc_errors=0, overruns=0)
+
+
+def test_period_and_jitter_are_measured_start_to_start():
+    aggregator = MetricsAggregator(2, window_s=3600.0, cycle_time_s=0.001, jitter_buckets_us=(10.0, 100.0))
+    try:
+        # Periods of 1000, 1005, 1050, 800 and 1500 us; the work time stays constant.
+        starts = np.cumsum([0.0, 1000e-6, 1005e-6, 1050e-6, 800e-6, 1500e-6])
+        for start in starts:
+            aggregator.record(None, 30.0, None, COUNTERS, 1.0, cycle_start=10.0 + start)
+        summary = aggregator.summarize(aggregator._active)
+    finally:
+        aggregator.close()
+
+    assert summary["cycle_time_us"]["max"] == 30.0
+    assert np.isclose(summary["period_us"]["min"], 800.0)
+    assert np.isclose(summary["period_us"]["max"], 1500.0)
+    assert np.isclose(summary["jitter_us"]["min"], -200.0)
+    assert np.isclose(summary["jitter_us"]["max"], 500.0)
+    histogram = summary["jitter_histogram"]
+    assert histogram["le_us"] == [10.0, 100.0]
+    assert histogram["counts"] == [2, 1, 2]
+    assert np.isclose(histogram["sum_us"], 0 + 5 + 50 + 200 + 500)
+
+
+def test_prometheus_exports_a_cumulative_jitter_histogram():
+    aggregator = MetricsAggregator(2, window_s=0.05, cycle_time_s=0.001, jitter_buckets_us=(10.0, 100.0))
+    try:
+        t0 = time.monotonic()
+        for k in range(200):
+            now = t0 + k * 1e-3
+            aggregator.record(None, 30.0, None, COUNTERS, now, cycle_start=now + (50e-6 if k % 2 else 0.0))
+            if aggregator.windows >= 2:
+                break
+            time.sleep(1e-4)
+        deadline = time.monotonic() + 1.0
+        while aggregator.windows < 2 and time.monotonic() < deadline:
+            time.sleep(1e-3)
+        summary = aggregator.latest
+    finally:
+        aggregator.close()
+
+    histogram = summary["jitter_histogram"]
+    assert sum(histogram["total_counts"]) > sum(histogram["counts"])
+    text = format_prometheus(summary)
+    assert "# TYPE merlin_cycle_jitter_us histogram" in text
+    assert 'merlin_cycle_jitter_us_bucket{le="10"} 0' in text
+    assert f'merlin_cycle_jitter_us_bucket{{le="+Inf"}} {sum(histogram["total_counts"])}' in text
+    assert f"merlin_cycle_jitter_us_count {sum(histogram['total_counts'])}" in text
+    assert 'merlin_jitter_us{stat="max"}' in text
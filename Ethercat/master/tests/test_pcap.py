@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from merlin_hand_master.MerlinPcap import (
+    CMD_FRMW,
+    CMD_LRW,
+    SOEM_MAC,
+    PcapWriter,
+    ethercat_frame,
+    read_pcap,
+    read_pcap_all,
+)
+from merlin_hand_master.MerlinPdoLayout import RXPDO_DTYPE, TXPDO_DTYPE
+
+NUM_MOTORS = 3
+WKC = 3
+RETURNED_MAC = b"\x03" + SOEM_MAC[1:]
+
+
+def _capture(path, cycles: int, lost=(), mark_returned: bool = True, mailbox_every: int = 0):
+    """
+    One LRW per cycle at 1 kHz, returned 80 us later unless the cycle is in
+    `lost`. Returns the commands / states / tx times of the cycles that came back.
+    """
+    rng = np.random.default_rng(0)
+    commands = np.zeros((cycles, NUM_MOTORS), dtype=RXPDO_DTYPE)
+    states = np.zeros((cycles, NUM_MOTORS), dtype=TXPDO_DTYPE)
+    for name in RXPDO_DTYPE.names:
+        commands[name] = rng.integers(0, 100, commands.shape)
+    for name in TXPDO_DTYPE.names:
+        states[name] = rng.standard_normal(states.shape)
+    rx_src = RETURNED_MAC if mark_returned else SOEM_MAC
+    with PcapWriter(path) as pcap:
+        for k in range(cycles):
+            t = 1.0 + k * 1e-3
+            index = k % 256
+            out = commands[k].tobytes()
+            pcap.write(t, ethercat_frame([(CMD_LRW, index, 0, out + bytes(states[k].nbytes), 0)]))
+            if mailbox_every and k % mailbox_every == 0:
+                pcap.write(t + 20e-6, ethercat_frame([(CMD_FRMW, 0, 0x1000, b"\x00" * 4, 0)]))
+            if k not in lost:
+                frame = ethercat_frame([(CMD_LRW, index, 0, out + states[k].tobytes(), WKC)], src_mac=rx_src)
+                pcap.write(t + 80e-6, frame)
+    back = np.array([k not in lost for k in range(cycles)])
+    tx_times = 1.0 + np.arange(cycles) * 1e-3
+    return commands[back], states[back], tx_times[back], tx_times[~back]
+
+
+@pytest.mark.parametrize("mark_returned", [True, False])
+def test_round_trip_across_chunks_with_lost_returns(tmp_path, mark_returned):
+    path = str(tmp_path / "capture.pcap")
+    lost = {3, 4, 10, 17, 18, 19, 38}
+    commands, states, tx_times, lost_times = _capture(path, 40, lost, mark_returned, mailbox_every=9)
+
+    # 7 records per chunk: pairs and lost frames straddle chunk boundaries.
+    data = read_pcap_all(path, num_motors=NUM_MOTORS, chunk_packets=7)
+    assert data.commands.tobytes() == commands.tobytes()
+    assert data.states.tobytes() == states.tobytes()
+    np.testing.assert_allclose(data.timestamp_tx, tx_times)
+    np.testing.assert_allclose(data.timestamp - data.timestamp_tx, 80e-6, atol=1e-9)
+    assert (data.wkc == WKC).all()
+    # Cycle 38 is followed by cycle 39's return, so it is known to be lost.
+    np.testing.assert_allclose(data.lost_tx, lost_times)
+    assert data.other == 5
+
+
+def test_chunking_does_not_change_the_result(tmp_path):
+    path = str(tmp_path / "capture.pcap")
+    _capture(path, 60, lost={0, 25, 26, 59})
+    whole = read_pcap_all(path, num_motors=NUM_MOTORS)
+    for chunk_packets in (1, 2, 5, 16):
+        chunked = read_pcap_all(path, num_motors=NUM_MOTORS, chunk_packets=chunk_packets)
+        for name in ("timestamp", "timestamp_tx", "wkc", "index", "lost_tx"):
+            np.testing.assert_array_equal(getattr(chunked, name), getattr(whole, name))
+        assert chunked.states.tobytes() == whole.states.tobytes()
+    # The last frame was never answered but the capture ends with it: still in flight.
+    assert len(whole.lost_tx) == 3
+    assert len(whole.timestamp) == 56
+
+
+def test_return_with_a_different_index_is_not_paired(tmp_path):
+    path = str(tmp_path / "capture.pcap")
+    with PcapWriter(path) as pcap:
+        pcap.write(1.0, ethercat_frame([(CMD_LRW, 1, 0, bytes(NUM_MOTORS * 56), 0)]))
+        pcap.write(1.0001, ethercat_frame([(CMD_LRW, 7, 0, bytes(NUM_MOTORS * 56), WKC)], src_mac=RETURNED_MAC))
+    chunks = list(read_pcap(path, num_motors=NUM_MOTORS))
+    assert len(chunks) == 1
+    assert np.isnan(chunks[0].timestamp_tx).all()
+    np.testing.assert_allclose(chunks[0].lost_tx, [1.0])
@@ -0,0 +1,40 @@
+import time
+
+import numpy as np
+
+from merlin_hand_master.MerlinEthercatMaster import MerlinMaster_v1
+from merlin_hand_master.MerlinRecording import RecordingReader
+from merlin_hand_master.MerlinSimSlave import SimMaster
+
+
+def test_stop_recording_waits_for_the_append_in_progress(tmp_path):
+    path = str(tmp_path / "run.rec")
+    master = MerlinMaster_v1("sim", num_motors=15, master=SimMaster(), auto_connect=False).connect()
+    try:
+        recorder = master.start_recording(path, chunk_cycles=16)
+        append, close = recorder.append, recorder.close
+        in_append = []
+        closed_during_append = []
+
+        def slow_append(*args):
+            in_append.append(True)
+            time.sleep(0.02)     # much longer than a cycle
+            append(*args)
+            in_append.pop()
+
+        def checked_close():
+            closed_during_append.append(bool(in_append))
+            close()
+
+        recorder.append = slow_append
+        recorder.close = checked_close
+        time.sleep(0.1)
+        master.stop_recording()
+    finally:
+        master.close()
+
+    assert closed_during_append == [False]
+    with RecordingReader(path) as reader:
+        cycles = reader.read()["cycle"]
+    assert len(cycles) == recorder.cycles_written > 0
+    assert np.all(np.diff(cycles) > 0)
@@ -0,0 +1,69 @@
+from merlin_hand_master.MerlinEthercatMaster import CycleStats, MerlinMaster_v1
+from merlin_hand_master.MerlinRedundancy import RX_PATH_RING, RX_PATH_SPLIT, RingMonitor
+from merlin_hand_master.MerlinSimSlave import SimMaster, SimSlave
+
+EXPECTED_WKC = 9
+
+
+def _feed(monitor, stats, cycles, wkc, path=None, t0=0.0):
+    """Account `cycles` cycles at 1 kHz starting at cycle stats.cycles + 1."""
+    for _ in range(cycles):
+        stats.cycles += 1
+        monitor.update(stats, t0 + stats.cycles * 1e-3, wkc, EXPECTED_WKC, path)
+
+
+def test_failover_is_timed_from_the_wkc_without_path_reports():
+    monitor, stats = RingMonitor(redundant=True), CycleStats()
+    _feed(monitor, stats, 10, EXPECTED_WKC)
+    _feed(monitor, stats, 2, -1)               # frames lost while the link goes down
+    _feed(monitor, stats, 1, 6)                # short WKC
+    assert stats.failover_cycles_last == 0
+    _feed(monitor, stats, 5, EXPECTED_WKC)
+    assert stats.failover_cycles_last == 3
+    assert stats.failover_cycles_max == 3
+    assert abs(stats.failover_us_last - 3000.0) < 1e-6
+
+    _feed(monitor, stats, 1, -1)
+    _feed(monitor, stats, 1, EXPECTED_WKC)
+    assert stats.failover_cycles_last == 1
+    assert stats.failover_cycles_max == 3
+
+
+def test_lost_frame_on_an_intact_ring_is_not_a_failover_with_path_reports():
+    monitor, stats = RingMonitor(redundant=True), CycleStats()
+    _feed(monitor, stats, 10, EXPECTED_WKC, RX_PATH_RING)
+    _feed(monitor, stats, 1, -1)
+    _feed(monitor, stats, 5, EXPECTED_WKC, RX_PATH_RING)
+    assert stats.failover_cycles_last == 0
+
+    _feed(monitor, stats, 3, -1)
+    _feed(monitor, stats, 5, EXPECTED_WKC, RX_PATH_SPLIT)
+    assert stats.ring_breaks == 1
+    assert stats.failover_cycles_last == 3
+
+
+class _PathlessSimMaster(SimMaster):
+    """SimMaster that, like pysoem, cannot tell which way a frame went."""
+
+    @property
+    def rx_path(self):
+        return None
+
+    @rx_path.setter
+    def rx_path(self, value):
+        pass
+
+
+def test_master_times_failover_on_a_backend_without_rx_path():
+    sim = _PathlessSimMaster(slaves=[SimSlave() for _ in range(3)], latency_s=100e-6)
+    master = MerlinMaster_v1("sim", ifname_red="sim-red", master=sim, num_motors=15, lockstep=True)
+    try:
+        master.step(100)
+        sim.break_ring(0, link_down_frames=3)
+        master.step(100)
+        stats = master.get_cycle_stats()
+    finally:
+        master.close()
+    assert not stats.rx_path
+    assert stats.failover_cycles_last == 3
+    assert stats.failover_us_last > 0.0
@@ -0,0 +1,74 @@
+import pytest
+
+from merlin_hand_master.MerlinEthercatMaster import MerlinMaster_v1
+from merlin_hand_master.MerlinSimSlave import SimMaster
+
+TIMEOUT_MIN_US = MerlinMaster_v1._RX_TIMEOUT_MIN_US
+TIMEOUT_MAX_US = 1000       # one cycle at 1 kHz
+
+
+class _TimedSimMaster(SimMaster):
+    """Logs (timeout passed, time waited on the virtual clock, wkc) of every receive."""
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.receives = []
+
+    def receive_processdata(self, timeout: int = 2000) -> int:
+        t0 = self._clock()
+        wkc = super().receive_processdata(timeout)
+        self.receives.append((timeout, (self._clock() - t0) * 1e6, wkc))
+        return wkc
+
+
+def _run(pipelined: bool, cycles: int = 1000, **sim):
+    backend = _TimedSimMaster(num_motors=15, seed=1, **sim)
+    master = MerlinMaster_v1("sim", num_motors=15, master=backend, lockstep=True, pipelined=pipelined)
+    master.step(cycles)
+    return master, backend
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_waits_are_bounded_and_misses_counted(pipelined):
+    master, sim = _run(pipelined, latency_s=50e-6, loss_rate=0.05)
+    stats = master.get_cycle_stats()
+    master.close()
+
+    for timeout, waited_us, _ in sim.receives:
+        assert TIMEOUT_MIN_US <= timeout <= TIMEOUT_MAX_US
+        assert waited_us <= timeout + 1e-6
+    misses = [k for k, (_, _, wkc) in enumerate(sim.receives) if wkc <= 0]
+    assert stats.missed_frames == len(misses) == sim.frames_lost > 0
+    # Each miss doubles the timeout of the next receive (RFC 6298 back-off), up to the cycle.
+    for k in misses:
+        if k + 1 < len(sim.receives):
+            assert sim.receives[k + 1][0] == min(2 * sim.receives[k][0], TIMEOUT_MAX_US)
+
+
+def test_timeout_converges_to_the_round_trip():
+    master, sim = _run(False, cycles=200, latency_s=50e-6)
+    # Starts at one cycle, then smoothed RTT + 4 x deviation, floored at the minimum.
+    assert sim.receives[0][0] == TIMEOUT_MAX_US
+    assert master.get_cycle_stats().rx_timeout_us == TIMEOUT_MIN_US
+    assert master.get_cycle_stats().rtt_mean_us == pytest.approx(50.0)
+
+    # The round trip grows past the timeout: frames are missed until the back-off catches up.
+    sim.latency_s = 400e-6
+    master.step(200)
+    stats = master.get_cycle_stats()
+    master.close()
+    late = sim.receives[200:]
+    assert [wkc for _, _, wkc in late[:3]] == [-1, -1, 3]
+    assert [timeout for timeout, _, _ in late[:3]] == [100, 200, 400]
+    assert all(wkc > 0 for _, _, wkc in late[3:])
+    assert stats.missed_frames == 2
+    assert 400 < stats.rx_timeout_us < TIMEOUT_MAX_US
+    assert stats.rtt_mean_us == pytest.approx(400.0, rel=0.01)
+
+
+def test_fixed_timeout_does_not_adapt():
+    backend = _TimedSimMaster(num_motors=15, latency_s=50e-6, loss_rate=0.1, seed=2)
+    master = MerlinMaster_v1("sim", num_motors=15, master=backend, lockstep=True, rx_timeout_us=300)
+    master.step(200)
+    master.close()
+    assert {timeout for timeout, _, _ in backend.receives} == {300}
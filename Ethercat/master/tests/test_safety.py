@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from merlin_hand_master.MerlinPdoLayout import RXPDO_DTYPE
+from merlin_hand_master.MerlinSafety import SafetyLimiter
+
+
+def _records(n: int, position: float = 0.0) -> np.ndarray:
+    records = np.zeros(n, dtype=RXPDO_DTYPE)
+    records["torque_enable"] = 1
+    records["goal_position"] = position
+    return records
+
+
+def test_nan_goal_holds_last_value_and_trips_motor():
+    limiter = SafetyLimiter(3, max_position_rate=10.0, max_iq_rate=100.0)
+    records = _records(3, 0.1)
+    records["goal_iq"] = 0.5
+    limiter.apply(records, None, 0.0)
+
+    records = _records(3, 0.1)
+    records["goal_iq"] = 0.5
+    records["goal_position"][1] = np.nan
+    records["goal_iq"][2] = np.inf
+    limiter.apply(records, None, 0.001)
+
+    assert np.all(np.isfinite(records["goal_position"])) and np.all(np.isfinite(records["goal_iq"]))
+    assert records["goal_position"][1] == pytest.approx(0.1)
+    assert list(limiter.tripped) == [False, True, True]
+    assert list(records["torque_enable"]) == [1, 0, 0]
+    assert limiter.status().nonfinite_goals == 2
+
+    # Rate-limit state stayed finite: the next finite goal is limited normally.
+    records = _records(3, 1.0)
+    limiter.apply(records, None, 0.002)
+    assert np.all(np.isfinite(limiter._last_position)) and np.all(np.isfinite(limiter._last_iq))
+    assert records["goal_position"][0] == pytest.approx(0.1 + 10.0 * 0.001)
+
+
+def test_nan_without_trip_only_replaces():
+    limiter = SafetyLimiter(2, trip_on_nonfinite=False)
+    records = _records(2)
+    records["goal_velocity"][0] = np.nan
+    limiter.apply(records, None, 0.0)
+    assert records["goal_velocity"][0] == 0.0
+    assert not limiter.tripped.any()
+    assert limiter.nonfinite_goals == 1
+
+
+def test_nan_on_non_contiguous_records():
+    limiter = SafetyLimiter(2)
+    records = _records(4)[::2]
+    records["goal_id"][1] = -np.inf
+    limiter.apply(records, None, 0.0)
+    assert records["goal_id"][1] == 0.0 and limiter.tripped[1]
+
+
+def test_reset_rejects_nonfinite_positions():
+    with pytest.raises(ValueError):
+        SafetyLimiter(2).reset([0.0, np.nan])
@@ -0,0 +1,145 @@
+import sys
+import threading
+
+import pytest
+
+from merlin_hand_master.MerlinScheduler import SlackScheduler
+
+
+class FakeClock:
+    """`clock` of the scheduler; tasks advance it to simulate their run time."""
+
+    def __init__(self) -> None:
+        self.t = 0.0
+
+    def __call__(self) -> float:
+        return self.t
+
+    def task(self, run_s: float, log=None, name=None):
+        def fn(now):
+            self.t += run_s
+            if log is not None:
+                log.append(name)
+        return fn
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_task_is_deferred_when_its_budget_does_not_fit(clock):
+    scheduler = SlackScheduler(guard_us=50.0, clock=clock)
+    stats = scheduler.add("slow", clock.task(0.0), period_s=0.01, budget_us=600.0)
+    # 1000 us to the deadline minus 50 us guard: 600 us fits at t=0, not at t=400 us.
+    clock.t = 400e-6
+    scheduler.run(0.0, deadline=1e-3)
+    assert (stats.runs, stats.deferred) == (0, 1)
+    clock.t = 1e-3
+    scheduler.run(0.001, deadline=2e-3)
+    assert (stats.runs, stats.deferred) == (1, 1)
+    assert scheduler.deadline_misses == 0
+
+
+def test_periods_lost_behind_are_skipped(clock):
+    scheduler = SlackScheduler(clock=clock)
+    stats = scheduler.add("t", clock.task(0.0), period_s=0.01, budget_us=10.0)
+    scheduler.run(0.0, deadline=1.0)        # first run, next due at 0.01
+    scheduler.run(0.035, deadline=1.0)      # 0.01 and 0.02 (and 0.03) are gone
+    assert stats.runs == 2
+    assert stats.skipped == 2
+    scheduler.run(0.039, deadline=1.0)
+    assert stats.runs == 2
+    scheduler.run(0.04, deadline=1.0)
+    assert stats.runs == 3
+
+
+def test_task_is_detached_after_consecutive_overruns(clock):
+    scheduler = SlackScheduler(clock=clock)
+    overrun = [True]
+
+    def fn(now):
+        clock.t += 200e-6 if overrun[0] else 10e-6
+
+    stats = scheduler.add("t", fn, period_s=0.001, budget_us=100.0, max_consecutive_overruns=3)
+    for k in range(2):
+        scheduler.run(k * 1e-3, deadline=clock.t + 1.0)
+    overrun[0] = False
+    scheduler.run(0.002, deadline=clock.t + 1.0)     # within budget: the count restarts
+    overrun[0] = True
+    for k in range(3, 10):
+        scheduler.run(k * 1e-3, deadline=clock.t + 1.0)
+    assert stats.detached
+    assert stats.runs == 6
+    assert stats.overruns == 5
+
+
+def test_due_tasks_run_by_priority_then_most_overdue(clock):
+    scheduler = SlackScheduler(clock=clock)
+    log = []
+    scheduler.add("low", clock.task(25e-6, log, "low"), period_s=0.001, budget_us=30.0, priority=0)
+    scheduler.add("high", clock.task(25e-6, log, "high"), period_s=0.001, budget_us=30.0, priority=5)
+    scheduler.add("low2", clock.task(25e-6, log, "low2"), period_s=0.002, budget_us=30.0, priority=0)
+    scheduler.run(0.0, deadline=1.0)
+    assert log == ["high", "low", "low2"]
+    log.clear()
+    # Room for one 30 us budget before the 50 us guard: the higher priority goes first.
+    scheduler.run(0.002, deadline=clock.t + 80e-6)
+    assert log == ["high"]
+
+    # Equal priorities: the most overdue first ("first" ran last tick, "second" was deferred).
+    scheduler = SlackScheduler(clock=clock)
+    log = []
+    scheduler.add("first", clock.task(25e-6, log, "first"), period_s=0.001, budget_us=30.0)
+    scheduler.add("second", clock.task(25e-6, log, "second"), period_s=0.001, budget_us=30.0)
+    scheduler.run(0.0, deadline=clock.t + 80e-6)
+    scheduler.run(0.001, deadline=clock.t + 80e-6)
+    assert log == ["first", "second"]
+
+
+def test_task_errors_are_captured(clock):
+    scheduler = SlackScheduler(clock=clock)
+
+    def fail(now):
+        raise RuntimeError("read-back failed")
+
+    stats = scheduler.add("t", fail, period_s=0.001, budget_us=10.0)
+    ok = scheduler.add("ok", clock.task(0.0), period_s=0.001, budget_us=10.0)
+    scheduler.run(0.0, deadline=1.0)
+    scheduler.run(0.001, deadline=1.0)
+    assert stats.errors == 2
+    assert stats.runs == 2
+    assert isinstance(stats.error, RuntimeError)
+    assert not stats.detached
+    assert ok.runs == 2
+
+
+def test_add_and_remove_from_another_thread_do_not_hide_due_tasks(clock):
+    scheduler = SlackScheduler(clock=clock)
+    every_tick = scheduler.add("every_tick", clock.task(0.0), period_s=1e-6, budget_us=1.0)
+    for k in range(300):
+        # A long list keeps add()'s sort busy long enough for run() to hit it.
+        scheduler.add(f"idle{k}", clock.task(0.0), period_s=1e6, budget_us=1.0)
+    stop = threading.Event()
+
+    def churn():
+        k = 0
+        while not stop.is_set():
+            name = f"extra{k % 8}"
+            scheduler.add(name, clock.task(0.0), period_s=10.0, budget_us=1.0, priority=k % 3)
+            scheduler.remove(name)
+            k += 1
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    thread = threading.Thread(target=churn)
+    thread.start()
+    try:
+        ticks = 5000
+        for k in range(ticks):
+            scheduler.run(k * 1e-3, deadline=1.0)
+    finally:
+        stop.set()
+        thread.join()
+        sys.setswitchinterval(interval)
+    assert every_tick.runs == ticks
@@ -0,0 +1,60 @@
+import os
+import time
+
+import pytest
+
+from merlin_hand_master.MerlinEthercatMaster import MerlinMaster_v1
+from merlin_hand_master.MerlinSimSlave import SimMaster
+from merlin_hand_master.MerlinStateBroadcast import MerlinStateClient, StateDatagramPublisher, StateRingWriter
+
+
+def _shm_name(tag: str) -> str:
+    return f"merlin_test_{tag}_{os.getpid()}"
+
+
+def test_ring_writer_does_not_take_over_existing_segment():
+    name = _shm_name("ring")
+    first = StateRingWriter(name, 4, capacity=8)
+    try:
+        with pytest.raises(FileExistsError):
+            StateRingWriter(name, 4, capacity=8)
+        second = StateRingWriter(name, 4, capacity=8, replace=True)
+        second.close()
+    finally:
+        first.close()
+
+
+def test_datagram_publisher_does_not_take_over_existing_path(tmp_path):
+    path = str(tmp_path / "states.sock")
+    first = StateDatagramPublisher(path)
+    try:
+        with pytest.raises(FileExistsError):
+            StateDatagramPublisher(path)
+        StateDatagramPublisher(path, replace=True).close()
+    finally:
+        first.close()
+
+    regular = tmp_path / "not_a_socket"
+    regular.write_text("keep me")
+    with pytest.raises(FileExistsError):
+        StateDatagramPublisher(str(regular), replace=True)
+    assert regular.read_text() == "keep me"
+
+
+def test_stop_broadcast_waits_for_the_cycle_not_a_fixed_sleep():
+    name = _shm_name("master")
+    master = MerlinMaster_v1("sim", master=SimMaster(), num_motors=15, cycle_time_s=0.5)
+    master.connect()
+    try:
+        master.start_broadcast(name)
+        client = MerlinStateClient(shm_name=name)
+        assert client.wait_next(timeout=2.0)
+        client.close()
+
+        t0 = time.perf_counter()
+        master.stop_broadcast()
+        assert time.perf_counter() - t0 < 0.25
+        with pytest.raises(FileNotFoundError):
+            MerlinStateClient(shm_name=name)
+    finally:
+        master.close()
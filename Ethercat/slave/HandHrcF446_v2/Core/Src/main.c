@@ -43,6 +43,13 @@
 /* USER CODE BEGIN PD */
 #warning "BUILDING V2"
 
+// PDO echo mode for host-side latency measurements (MerlinLatency.LatencyProbe):
+// every TxPDO reports the last received goals as present id/iq/velocity/position.
+// Never enable with motors attached.
+#ifndef PDO_ECHO_MODE
+#define PDO_ECHO_MODE 0
+#endif
+
 
 /* USER CODE END PD */
 
@@ -80,6 +87,14 @@ static esc_cfg_t soes_cfg;
 void cb_get_inputs(void) {
     // This function is called before the EtherCAT frame is sent back.
     // You can read GPIOs or Encoders here if you want strict timing.
+#if PDO_ECHO_MODE
+    for (int i = 0; i < NUM_MOTORS; i++) {
+        robot_in.motor[i].present_id       = robot_out.motor[i].goal_id;
+        robot_in.motor[i].present_iq       = robot_out.motor[i].goal_iq;
+        robot_in.motor[i].present_velocity = robot_out.motor[i].goal_velocity;
+        robot_in.motor[i].present_position = robot_out.motor[i].goal_position;
+    }
+#endif
 }
 
 void cb_set_outputs(void) {